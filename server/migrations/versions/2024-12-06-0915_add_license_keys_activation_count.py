@@ -0,0 +1,43 @@
+"""Add LicenseKey.activation_count and index on key
+
+Revision ID: 3c9e5b1f7a24
+Revises: 8f2c1a7d4e3b
+Create Date: 2024-12-06 09:15:41.302117
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "3c9e5b1f7a24"
+down_revision = "8f2c1a7d4e3b"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "license_keys", sa.Column("activation_count", sa.Integer(), nullable=True)
+    )
+    op.execute(
+        """
+        UPDATE license_keys
+        SET activation_count = (
+            SELECT count(*)
+            FROM license_key_activations
+            WHERE license_key_activations.license_key_id = license_keys.id
+            AND license_key_activations.deleted_at IS NULL
+        )
+        """
+    )
+    op.alter_column("license_keys", "activation_count", nullable=False)
+
+    op.create_index(op.f("ix_license_keys_key"), "license_keys", ["key"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_license_keys_key"), table_name="license_keys")
+    op.drop_column("license_keys", "activation_count")
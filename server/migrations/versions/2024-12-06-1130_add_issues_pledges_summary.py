@@ -0,0 +1,73 @@
+"""Add Issue pledges summary per type and pledgers count
+
+Revision ID: 5d8a3f6c2b19
+Revises: 3c9e5b1f7a24
+Create Date: 2024-12-06 11:30:12.874201
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "5d8a3f6c2b19"
+down_revision = "3c9e5b1f7a24"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    for column in (
+        "pay_upfront_pledged_amount_sum",
+        "pay_on_completion_pledged_amount_sum",
+        "pay_directly_pledged_amount_sum",
+    ):
+        op.add_column(
+            "issues",
+            sa.Column(column, sa.BigInteger(), server_default="0", nullable=False),
+        )
+    op.add_column(
+        "issues",
+        sa.Column("pledgers_count", sa.Integer(), server_default="0", nullable=False),
+    )
+
+    op.execute(
+        """
+        UPDATE issues
+        SET
+            pledged_amount_sum = summary.total,
+            last_pledged_at = summary.last_pledged_at,
+            pay_upfront_pledged_amount_sum = summary.pay_upfront_total,
+            pay_on_completion_pledged_amount_sum = summary.pay_on_completion_total,
+            pay_directly_pledged_amount_sum = summary.pay_directly_total,
+            pledgers_count = summary.pledgers_count
+        FROM (
+            SELECT
+                issue_id,
+                sum(amount) AS total,
+                max(created_at) AS last_pledged_at,
+                coalesce(sum(amount) FILTER (WHERE type = 'pay_upfront'), 0)
+                    AS pay_upfront_total,
+                coalesce(sum(amount) FILTER (WHERE type = 'pay_on_completion'), 0)
+                    AS pay_on_completion_total,
+                coalesce(sum(amount) FILTER (WHERE type = 'pay_directly'), 0)
+                    AS pay_directly_total,
+                count(DISTINCT coalesce(
+                    on_behalf_of_organization_id, by_user_id, by_organization_id
+                )) AS pledgers_count
+            FROM pledges
+            WHERE state IN ('created', 'pending', 'disputed')
+            GROUP BY issue_id
+        ) AS summary
+        WHERE issues.id = summary.issue_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("issues", "pledgers_count")
+    op.drop_column("issues", "pay_directly_pledged_amount_sum")
+    op.drop_column("issues", "pay_on_completion_pledged_amount_sum")
+    op.drop_column("issues", "pay_upfront_pledged_amount_sum")
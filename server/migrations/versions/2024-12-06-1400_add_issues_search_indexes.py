@@ -0,0 +1,82 @@
+"""Add weighted Issue search document and trigram index on title
+
+Revision ID: 9b4e7c1d8a52
+Revises: 5d8a3f6c2b19
+Create Date: 2024-12-06 14:00:27.510438
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy_utils.types.ts_vector import TSVectorType
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "9b4e7c1d8a52"
+down_revision = "5d8a3f6c2b19"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('simple', "
+    "jsonb_path_query_array(coalesce(labels, '[]'::jsonb), '$[*].name'), "
+    "'[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "issues",
+        sa.Column(
+            "search_tsv",
+            TSVectorType(),
+            sa.Computed(SEARCH_TSV_EXPRESSION, persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "idx_issues_search_tsv",
+        "issues",
+        ["search_tsv"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "idx_issues_title_trgm",
+        "issues",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+    op.drop_index("idx_issues_title_tsv", table_name="issues", postgresql_using="gin")
+    op.drop_column("issues", "title_tsv")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "issues",
+        sa.Column(
+            "title_tsv",
+            TSVectorType(),
+            sa.Computed("to_tsvector('simple', \"title\")", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "idx_issues_title_tsv",
+        "issues",
+        ["title_tsv"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+    op.drop_index("idx_issues_title_trgm", table_name="issues", postgresql_using="gin")
+    op.drop_index("idx_issues_search_tsv", table_name="issues", postgresql_using="gin")
+    op.drop_column("issues", "search_tsv")
@@ -0,0 +1,49 @@
+"""Add trigram search indexes on products, discounts, checkout links, custom fields and organizations
+
+Revision ID: 3e7a9c5b1f24
+Revises: 9b4e7c1d8a52
+Create Date: 2024-12-06 16:00:41.208317
+
+"""
+
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "3e7a9c5b1f24"
+down_revision = "9b4e7c1d8a52"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+TRIGRAM_INDEXES = [
+    ("products", "name"),
+    ("discounts", "name"),
+    ("discounts", "code"),
+    ("checkout_links", "label"),
+    ("custom_fields", "name"),
+    ("custom_fields", "slug"),
+    ("organizations", "name"),
+    ("organizations", "slug"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            f"ix_{table}_{column}_trgm",
+            table,
+            [column],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    for table, column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(
+            f"ix_{table}_{column}_trgm", table_name=table, postgresql_using="gin"
+        )
@@ -8,8 +8,11 @@ from fastapi.routing import APIRoute
 
 from polar import receivers, worker  # noqa
 from polar.api import router
+from polar.auth.cache import AuthCache
 from polar.checkout import ip_geolocation
 from polar.config import settings
+from polar.email.renderer import precompile_email_templates
+from polar.eventstream.dispatcher import EventStreamDispatcher
 from polar.exception_handlers import add_exception_handlers
 from polar.health.endpoints import router as health_router
 from polar.kit.cors import CORSConfig, CORSMatcherMiddleware, Scope
@@ -40,6 +43,7 @@ from polar.oauth2.exception_handlers import OAuth2Error, oauth2_error_exception_
 from polar.openapi import OPENAPI_PARAMETERS, APITag, set_openapi_generator
 from polar.postgres import create_async_engine, create_sync_engine
 from polar.posthog import configure_posthog
+from polar.product.catalog import ProductCatalog
 from polar.redis import Redis, create_redis
 from polar.sentry import configure_sentry
 from polar.webhook.webhooks import document_webhooks
@@ -92,6 +96,9 @@ class State(TypedDict):
     sync_sessionmaker: SyncSessionMaker
     arq_pool: ArqRedis
     redis: Redis
+    auth_cache: AuthCache
+    product_catalog: ProductCatalog
+    eventstream_dispatcher: EventStreamDispatcher
     ip_geolocation_client: ip_geolocation.IPGeolocationClient | None
 
 
@@ -100,7 +107,12 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     log.info("Starting Polar API")
 
     async with worker_lifespan() as arq_pool:
-        async with create_redis() as redis:
+        async with (
+            create_redis() as redis,
+            AuthCache(redis) as auth_cache,
+            ProductCatalog(redis) as product_catalog,
+            EventStreamDispatcher(redis) as eventstream_dispatcher,
+        ):
             async_engine = create_async_engine("app")
             async_sessionmaker = create_async_sessionmaker(async_engine)
             instrument_sqlalchemy(async_engine.sync_engine)
@@ -118,6 +130,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
                 )
                 ip_geolocation_client = None
 
+            if settings.EMAIL_RENDERER_PRECOMPILE:
+                precompile_email_templates()
+
             log.info("Polar API started")
 
             yield {
@@ -127,6 +142,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
                 "sync_sessionmaker": sync_sessionmaker,
                 "arq_pool": arq_pool,
                 "redis": redis,
+                "auth_cache": auth_cache,
+                "product_catalog": product_catalog,
+                "eventstream_dispatcher": eventstream_dispatcher,
                 "ip_geolocation_client": ip_geolocation_client,
             }
 
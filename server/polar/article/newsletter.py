@@ -0,0 +1,235 @@
+"""
+Send articles to their subscribers.
+
+An article is rendered by the frontend only once per variant
+(with or without an unsubscribe link), and the rendered HTML is shared
+through Redis by all the send jobs.
+Each recipient then gets a copy of it, personalized by a plain substitution.
+"""
+
+import dataclasses
+from collections.abc import Iterable, Sequence
+from uuid import UUID
+
+import httpx
+import structlog
+from sqlalchemy import func, select, update
+
+from polar.config import settings
+from polar.email.sender import Email, enqueue_emails
+from polar.exceptions import PolarError
+from polar.logging import Logger
+from polar.models import Article, ArticlesSubscription, User
+from polar.models.article import ArticleByline
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+# Rendered in place of the subscriber ID, then replaced for each recipient.
+# A nil UUID survives the HTML and URL escaping made by the renderer.
+SUBSCRIBER_ID_PLACEHOLDER = "00000000-0000-0000-0000-000000000000"
+
+# Longer than the render timeout
+RENDER_LOCK_TIMEOUT_SECONDS = 90
+
+
+class ArticleRenderError(PolarError):
+    def __init__(self, article_id: UUID, status_code: int) -> None:
+        self.article_id = article_id
+        self.status_code = status_code
+        message = f"Failed to render article {article_id}: code={status_code}"
+        super().__init__(message)
+
+
+@dataclasses.dataclass(frozen=True)
+class Variant:
+    unsubscribe_link: bool
+
+    @property
+    def key(self) -> str:
+        return str(int(self.unsubscribe_link))
+
+
+@dataclasses.dataclass(frozen=True)
+class Recipient:
+    user_id: UUID
+    email: str
+    subscriber_id: UUID | None
+
+    @property
+    def variant(self) -> Variant:
+        return Variant(unsubscribe_link=self.subscriber_id is not None)
+
+
+def get_unsubscribe_link(article: Article, subscriber_id: UUID | str) -> str:
+    return (
+        f"https://polar.sh/unsubscribe?org={article.organization.slug}"
+        f"&id={subscriber_id}"
+    )
+
+
+def _get_cache_key(article: Article, variant: Variant) -> str:
+    return f"article:newsletter:{article.id}:{variant.key}"
+
+
+async def _render(article: Article, variant: Variant) -> str:
+    render_data: dict[str, str] = {}
+    if variant.unsubscribe_link:
+        render_data["unsubscribe_link"] = get_unsubscribe_link(
+            article, SUBSCRIBER_ID_PLACEHOLDER
+        )
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"{settings.FRONTEND_BASE_URL}/email/article/{article.id}",
+            json=render_data,
+            # Increase the default timeout because it can be slow to render
+            timeout=60,
+        )
+
+    if not response.is_success:
+        raise ArticleRenderError(article.id, response.status_code)
+
+    return response.text
+
+
+async def render(
+    redis: Redis, article: Article, variant: Variant, *, use_cache: bool = True
+) -> str:
+    """
+    Return the HTML of the article for this variant,
+    rendering it only if it's not already in the cache.
+    """
+    if not use_cache:
+        return await _render(article, variant)
+
+    cache_key = _get_cache_key(article, variant)
+    # Send jobs run concurrently: make them wait for the first render
+    # of a variant instead of rendering it again.
+    async with redis.lock(f"{cache_key}:lock", timeout=RENDER_LOCK_TIMEOUT_SECONDS):
+        cached = await redis.get(cache_key)
+        if isinstance(cached, bytes):
+            cached = cached.decode()
+        if cached is not None:
+            return cached
+
+        html = await _render(article, variant)
+        log.info(
+            "article.newsletter.rendered", article_id=article.id, variant=variant.key
+        )
+        await redis.set(
+            cache_key, html, ex=settings.ARTICLE_NEWSLETTER_RENDER_CACHE_TTL_SECONDS
+        )
+
+    return html
+
+
+async def list_recipients(
+    session: AsyncSession, article: Article, user_ids: Sequence[UUID]
+) -> Sequence[Recipient]:
+    statement = (
+        select(User.id, User.email, ArticlesSubscription.id)
+        .join(
+            ArticlesSubscription,
+            onclause=(ArticlesSubscription.user_id == User.id)
+            & (ArticlesSubscription.organization_id == article.organization_id),
+            isouter=True,
+        )
+        .where(User.id.in_(user_ids))
+    )
+    result = await session.execute(statement)
+    return [
+        Recipient(user_id=user_id, email=email, subscriber_id=subscriber_id)
+        for user_id, email, subscriber_id in result.tuples().all()
+    ]
+
+
+def _get_sender(article: Article) -> tuple[str, dict[str, str]]:
+    email_headers: dict[str, str] = {}
+    if article.byline == ArticleByline.user and article.user is not None:
+        from_name = article.user.public_name
+        if article.user.email:
+            email_headers["Reply-To"] = f"{from_name} <{article.user.email}>"
+    else:
+        from_name = article.organization.name or article.organization.slug
+        if article.organization.email:
+            email_headers["Reply-To"] = f"{from_name} <{article.organization.email}>"
+    return from_name, email_headers
+
+
+async def send(
+    redis: Redis,
+    article: Article,
+    recipients: Iterable[Recipient],
+    *,
+    is_test: bool = False,
+) -> int:
+    """
+    Schedule the article emails for a batch of recipients.
+
+    The article `user` and `organization` relationships should be loaded.
+    Test sends always render the article, so they reflect its latest version.
+
+    Returns:
+        The number of scheduled emails.
+    """
+    subject = "[TEST] " if is_test else ""
+    subject += article.title
+    from_name, sender_headers = _get_sender(article)
+
+    rendered: dict[Variant, str] = {}
+    emails: list[Email] = []
+    for recipient in recipients:
+        variant = recipient.variant
+        if variant not in rendered:
+            rendered[variant] = await render(
+                redis, article, variant, use_cache=not is_test
+            )
+
+        html_content = rendered[variant]
+        email_headers = dict(sender_headers)
+        if recipient.subscriber_id is not None:
+            html_content = html_content.replace(
+                SUBSCRIBER_ID_PLACEHOLDER, str(recipient.subscriber_id)
+            )
+            unsubscribe_link = get_unsubscribe_link(article, recipient.subscriber_id)
+            email_headers["List-Unsubscribe"] = f"<{unsubscribe_link}>"
+
+        emails.append(
+            Email(
+                to_email_addr=recipient.email,
+                subject=subject,
+                html_content=html_content,
+                from_name=from_name,
+                from_email_addr=f"{article.organization.slug}@posts.polar.sh",
+                email_headers=email_headers,
+            )
+        )
+
+    enqueue_emails(emails)
+    return len(emails)
+
+
+async def increment_sent_count(
+    session: AsyncSession, article: Article, count: int
+) -> None:
+    statement = (
+        update(Article)
+        .where(Article.id == article.id)
+        .values(
+            email_sent_to_count=func.coalesce(Article.email_sent_to_count, 0) + count
+        )
+    )
+    await session.execute(statement)
+
+
+__all__ = [
+    "ArticleRenderError",
+    "Recipient",
+    "Variant",
+    "increment_sent_count",
+    "list_recipients",
+    "render",
+    "send",
+]
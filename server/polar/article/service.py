@@ -314,24 +314,23 @@ class ArticleService(ResourceServiceReader[Article]):
 
     async def enqueue_send(self, session: AsyncSession, article: Article) -> Article:
         article.notifications_sent_at = utc_now()
+        # Incremented by the send jobs as they progress
+        article.email_sent_to_count = 0
         session.add(article)
 
         receivers = await article_service.list_receivers(
             session, article.organization_id, article.paid_subscribers_only
         )
+        receiver_user_ids = [receiver_user_id for receiver_user_id, _, _ in receivers]
 
-        for receiver_user_id, _, _ in receivers:
+        batch_size = settings.ARTICLE_NEWSLETTER_BATCH_SIZE
+        for i in range(0, len(receiver_user_ids), batch_size):
             enqueue_job(
-                "articles.send_to_user",
+                "articles.send_batch",
                 article_id=article.id,
-                user_id=receiver_user_id,
-                is_test=False,
+                user_ids=receiver_user_ids[i : i + batch_size],
             )
 
-        # after scheduling is complete
-        article.email_sent_to_count = len(receivers)
-        session.add(article)
-
         return article
 
     async def unsubscribe(
@@ -0,0 +1,189 @@
+import asyncio
+import collections
+import contextlib
+import time
+from collections.abc import Iterable
+from datetime import datetime
+from types import TracebackType
+from typing import Self
+from uuid import UUID
+
+import structlog
+from fastapi import Request
+from redis import RedisError
+from redis.asyncio.client import PubSub
+
+from polar.config import settings
+from polar.kit.schemas import Schema
+from polar.kit.utils import utc_now
+from polar.logging import Logger
+from polar.oauth2.sub_type import SubType
+from polar.redis import Redis
+
+from .models import AuthMethod
+from .scope import Scope
+
+log: Logger = structlog.get_logger()
+
+INVALIDATION_CHANNEL = "auth:invalidate"
+
+
+def _get_key(token_hash: str) -> str:
+    return f"auth:credential:{token_hash}"
+
+
+class CachedCredential(Schema):
+    """
+    Result of a successful credential lookup.
+
+    Only the identity of the subject is cached: the subject itself is loaded
+    from the request session, so it's always fresh and attached to it.
+    """
+
+    method: AuthMethod
+    credential_id: UUID
+    subject_type: SubType
+    subject_id: UUID
+    scopes: set[Scope]
+    expires_at: datetime | None = None
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= utc_now()
+
+
+class AuthCache:
+    """
+    Two-level cache of credentials, keyed by token hash.
+
+    Lookups hit a process-local LRU first, then Redis. Entries are short-lived,
+    and evicted from every process when a credential is revoked,
+    through a Redis pub/sub channel.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl: int = settings.AUTH_CACHE_TTL_SECONDS,
+        max_size: int = settings.AUTH_CACHE_MAX_SIZE,
+    ) -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self._max_size = max_size
+        self._local: collections.OrderedDict[str, tuple[float, CachedCredential]] = (
+            collections.OrderedDict()
+        )
+        self._listener_task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        self._listener_task = asyncio.create_task(self._listen(pubsub))
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener_task
+
+    async def get(self, token_hash: str) -> CachedCredential | None:
+        credential = self._get_local(token_hash)
+
+        if credential is None:
+            try:
+                value = await self._redis.get(_get_key(token_hash))
+            except RedisError as e:
+                log.warning("auth.cache.redis_error", error=str(e))
+                return None
+            if value is None:
+                return None
+            credential = CachedCredential.model_validate_json(value)
+            self._set_local(token_hash, credential)
+
+        if credential.is_expired():
+            self.evict(token_hash)
+            return None
+
+        return credential
+
+    async def set(self, token_hash: str, credential: CachedCredential) -> None:
+        self._set_local(token_hash, credential)
+        try:
+            await self._redis.set(
+                _get_key(token_hash), credential.model_dump_json(), ex=self._ttl
+            )
+        except RedisError as e:
+            log.warning("auth.cache.redis_error", error=str(e))
+
+    def evict(self, *token_hashes: str) -> None:
+        for token_hash in token_hashes:
+            self._local.pop(token_hash, None)
+
+    def _get_local(self, token_hash: str) -> CachedCredential | None:
+        entry = self._local.get(token_hash)
+        if entry is None:
+            return None
+
+        cached_until, credential = entry
+        if cached_until <= time.monotonic():
+            del self._local[token_hash]
+            return None
+
+        self._local.move_to_end(token_hash)
+        return credential
+
+    def _set_local(self, token_hash: str, credential: CachedCredential) -> None:
+        self._local[token_hash] = (time.monotonic() + self._ttl, credential)
+        self._local.move_to_end(token_hash)
+        while len(self._local) > self._max_size:
+            self._local.popitem(last=False)
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                except RedisError as e:
+                    # We may have missed invalidations: don't trust local entries
+                    log.warning("auth.cache.listener_error", error=str(e))
+                    self._local.clear()
+                    await asyncio.sleep(1.0)
+                    continue
+
+                if message is not None and message["type"] == "message":
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self.evict(*data.split(","))
+        finally:
+            await pubsub.close()
+
+
+async def invalidate(redis: Redis, token_hashes: Iterable[str]) -> None:
+    """
+    Remove credentials from the shared cache,
+    and notify every process to evict them from their local one.
+    """
+    token_hashes = list(token_hashes)
+    if not token_hashes:
+        return
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        pipeline.delete(*(_get_key(token_hash) for token_hash in token_hashes))
+        pipeline.publish(INVALIDATION_CHANNEL, ",".join(token_hashes))
+        await pipeline.execute()
+
+
+async def get_auth_cache(request: Request) -> AuthCache:
+    return request.state.auth_cache
+
+
+__all__ = ["AuthCache", "CachedCredential", "invalidate", "get_auth_cache"]
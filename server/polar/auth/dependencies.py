@@ -1,18 +1,33 @@
+from collections.abc import Awaitable, Callable
 from inspect import Parameter, Signature
 from typing import Annotated
 
 from fastapi import Depends, Request, Security
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.security.utils import get_authorization_scheme_param
 from makefun import with_signature
 
 from polar.auth.scope import RESERVED_SCOPES, Scope
+from polar.config import settings
 from polar.exceptions import NotPermitted, Unauthorized
-from polar.models import OAuth2Token, PersonalAccessToken, UserSession
-from polar.oauth2.dependencies import get_optional_token
+from polar.kit.crypto import get_token_hash
+from polar.kit.utils import utc_now
+from polar.models import Organization, UserSession
+from polar.oauth2.constants import ACCESS_TOKEN_PREFIX
+from polar.oauth2.dependencies import openid_scheme
 from polar.oauth2.exceptions import InsufficientScopeError, InvalidTokenError
-from polar.personal_access_token.dependencies import get_optional_personal_access_token
+from polar.oauth2.service.oauth2_token import oauth2_token as oauth2_token_service
+from polar.oauth2.sub_type import SubType
+from polar.personal_access_token.dependencies import auth_header_scheme
+from polar.personal_access_token.service import TOKEN_PREFIX as PAT_TOKEN_PREFIX
+from polar.personal_access_token.service import (
+    personal_access_token as personal_access_token_service,
+)
 from polar.postgres import AsyncSession, get_db_session
+from polar.redis import Redis, get_redis
 from polar.sentry import set_sentry_user
 
+from .cache import AuthCache, CachedCredential, get_auth_cache
 from .models import (
     SUBJECTS,
     Anonymous,
@@ -25,6 +40,10 @@ from .models import (
 )
 from .service import auth as auth_service
 
+ADMIN_GITHUB_USERNAMES = {"birkjernstrom", "frankie567", "emilwidlund"}
+
+CredentialLookup = Callable[[AsyncSession, str], Awaitable[CachedCredential | None]]
+
 
 async def get_user_session(
     request: Request, session: AsyncSession = Depends(get_db_session)
@@ -32,46 +51,164 @@ async def get_user_session(
     return await auth_service.authenticate(session, request)
 
 
-async def get_auth_subject(
-    user_session: UserSession | None = Depends(get_user_session),
-    oauth2_credentials: tuple[OAuth2Token | None, bool] = Depends(get_optional_token),
-    personal_access_token_credentials: tuple[
-        PersonalAccessToken | None, bool
-    ] = Depends(get_optional_personal_access_token),
-) -> AuthSubject[Subject]:
-    # Web session
-    if user_session is not None:
-        user = user_session.user
-        scopes = {Scope.web_default}
-        if user.github_username in {
-            "birkjernstrom",
-            "frankie567",
-            "emilwidlund",
-        }:
-            scopes.add(Scope.admin)
-        return AuthSubject(user, scopes, AuthMethod.COOKIE)
-
-    oauth2_token, oauth2_authorization_set = oauth2_credentials
-    personal_access_token, personal_access_token_authorization_set = (
-        personal_access_token_credentials
+async def _lookup_user_session(
+    session: AsyncSession, token: str
+) -> CachedCredential | None:
+    user_session = await auth_service.get_by_token(session, token)
+    if user_session is None:
+        return None
+    return CachedCredential(
+        method=AuthMethod.COOKIE,
+        credential_id=user_session.id,
+        subject_type=SubType.user,
+        subject_id=user_session.user_id,
+        scopes={Scope.web_default},
+        expires_at=user_session.expires_at,
+    )
+
+
+async def _lookup_oauth2_token(
+    session: AsyncSession, token: str
+) -> CachedCredential | None:
+    oauth2_token = await oauth2_token_service.get_by_access_token(session, token)
+    if oauth2_token is None:
+        return None
+    subject_id = (
+        oauth2_token.user_id
+        if oauth2_token.sub_type == SubType.user
+        else oauth2_token.organization_id
+    )
+    assert subject_id is not None
+    return CachedCredential(
+        method=AuthMethod.OAUTH2_ACCESS_TOKEN,
+        credential_id=oauth2_token.id,
+        subject_type=oauth2_token.sub_type,
+        subject_id=subject_id,
+        scopes=oauth2_token.scopes,
     )
 
-    if oauth2_token:
-        return AuthSubject(
-            oauth2_token.sub, oauth2_token.scopes, AuthMethod.OAUTH2_ACCESS_TOKEN
+
+async def _lookup_personal_access_token(
+    session: AsyncSession, token: str
+) -> CachedCredential | None:
+    personal_access_token = await personal_access_token_service.get_by_token(
+        session, token
+    )
+    if personal_access_token is None:
+        return None
+    return CachedCredential(
+        method=AuthMethod.PERSONAL_ACCESS_TOKEN,
+        credential_id=personal_access_token.id,
+        subject_type=SubType.user,
+        subject_id=personal_access_token.user_id,
+        scopes=personal_access_token.scopes,
+        expires_at=personal_access_token.expires_at,
+    )
+
+
+def _get_bearer_lookups(token: str) -> list[CredentialLookup]:
+    """
+    Route a bearer token to the tables it may be stored in, based on its prefix.
+    """
+    if token.startswith(PAT_TOKEN_PREFIX):
+        return [_lookup_personal_access_token]
+    if token.startswith(tuple(ACCESS_TOKEN_PREFIX.values())):
+        return [_lookup_oauth2_token]
+    # Other Polar tokens, like session tokens or refresh tokens,
+    # are never valid bearer tokens
+    if token.startswith("polar_"):
+        return []
+    # Legacy tokens generated without prefix
+    return [_lookup_oauth2_token, _lookup_personal_access_token]
+
+
+async def _get_credential(
+    session: AsyncSession,
+    auth_cache: AuthCache,
+    token: str,
+    lookups: list[CredentialLookup],
+) -> CachedCredential | None:
+    if not lookups:
+        return None
+
+    token_hash = get_token_hash(token, secret=settings.SECRET)
+    credential = await auth_cache.get(token_hash)
+    if credential is not None:
+        return credential
+
+    for lookup in lookups:
+        credential = await lookup(session, token)
+        if credential is not None:
+            await auth_cache.set(token_hash, credential)
+            return credential
+
+    return None
+
+
+async def _get_credential_auth_subject(
+    session: AsyncSession, redis: Redis, credential: CachedCredential
+) -> AuthSubject[User | Organization] | None:
+    subject: User | Organization | None
+    if credential.subject_type == SubType.user:
+        subject = await session.get(User, credential.subject_id)
+    else:
+        subject = await session.get(Organization, credential.subject_id)
+
+    if subject is None:
+        return None
+
+    scopes = set(credential.scopes)
+    if (
+        credential.method == AuthMethod.COOKIE
+        and isinstance(subject, User)
+        and subject.github_username in ADMIN_GITHUB_USERNAMES
+    ):
+        scopes.add(Scope.admin)
+
+    if credential.method == AuthMethod.PERSONAL_ACCESS_TOKEN:
+        await personal_access_token_service.record_usage(
+            redis, credential.credential_id, utc_now()
         )
 
-    if personal_access_token:
-        return AuthSubject(
-            personal_access_token.user,
-            personal_access_token.scopes,
-            AuthMethod.PERSONAL_ACCESS_TOKEN,
+    return AuthSubject(subject, scopes, credential.method)
+
+
+async def get_auth_subject(
+    request: Request,
+    authorization: str | None = Depends(openid_scheme),
+    # Only declared so the bearer scheme appears in the OpenAPI schema,
+    # the token is read from `authorization`.
+    pat_credentials: HTTPAuthorizationCredentials | None = Depends(auth_header_scheme),
+    session: AsyncSession = Depends(get_db_session),
+    auth_cache: AuthCache = Depends(get_auth_cache),
+    redis: Redis = Depends(get_redis),
+) -> AuthSubject[Subject]:
+    # Web session
+    user_session_token = request.cookies.get(settings.USER_SESSION_COOKIE_KEY)
+    if user_session_token is not None:
+        credential = await _get_credential(
+            session, auth_cache, user_session_token, [_lookup_user_session]
         )
+        if credential is not None and credential.method == AuthMethod.COOKIE:
+            auth_subject = await _get_credential_auth_subject(
+                session, redis, credential
+            )
+            if auth_subject is not None:
+                return auth_subject
+
+    scheme, token = get_authorization_scheme_param(authorization)
+    if not authorization or scheme.lower() != "bearer":
+        return AuthSubject(Anonymous(), set(), AuthMethod.NONE)
 
-    if oauth2_authorization_set or personal_access_token_authorization_set:
-        raise InvalidTokenError()
+    credential = await _get_credential(
+        session, auth_cache, token, _get_bearer_lookups(token)
+    )
+    if credential is not None and credential.method != AuthMethod.COOKIE:
+        auth_subject = await _get_credential_auth_subject(session, redis, credential)
+        if auth_subject is not None:
+            return auth_subject
 
-    return AuthSubject(Anonymous(), set(), AuthMethod.NONE)
+    raise InvalidTokenError()
 
 
 class _Authenticator:
@@ -11,6 +11,7 @@ from polar.kit.http import get_safe_return_url
 from polar.kit.utils import utc_now
 from polar.models import User, UserSession
 from polar.postgres import AsyncSession
+from polar.worker import enqueue_job
 
 USER_SESSION_TOKEN_PREFIX = "polar_us_"
 
@@ -44,6 +45,7 @@ class AuthService:
     ) -> RedirectResponse:
         if user_session is not None:
             await session.delete(user_session)
+            enqueue_job("auth.invalidate_cache", token_hashes=[user_session.token])
         response = RedirectResponse(settings.FRONTEND_BASE_URL)
         response = self._set_user_session_cookie(request, response, "", 0)
         return response
@@ -55,17 +57,17 @@ class AuthService:
         if token is None:
             return None
 
+        return await self.get_by_token(session, token)
+
+    async def get_by_token(
+        self, session: AsyncSession, token: str
+    ) -> UserSession | None:
         token_hash = get_token_hash(token, secret=settings.SECRET)
         statement = select(UserSession).where(
             UserSession.token == token_hash, UserSession.expires_at > utc_now()
         )
         result = await session.execute(statement)
-        user_session = result.unique().scalar_one_or_none()
-
-        if user_session is None:
-            return None
-
-        return user_session
+        return result.unique().scalar_one_or_none()
 
     async def delete_expired(self, session: AsyncSession) -> None:
         statement = delete(UserSession).where(UserSession.expires_at < utc_now())
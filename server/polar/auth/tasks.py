@@ -1,8 +1,16 @@
 import structlog
 
 from polar.logging import Logger
-from polar.worker import AsyncSessionMaker, CronTrigger, JobContext, task
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    JobContext,
+    PolarWorkerContext,
+    get_worker_redis,
+    task,
+)
 
+from .cache import invalidate
 from .service import auth as auth_service
 
 log: Logger = structlog.get_logger()
@@ -12,3 +20,10 @@ log: Logger = structlog.get_logger()
 async def auth_delete_expired(ctx: JobContext) -> None:
     async with AsyncSessionMaker(ctx) as session:
         await auth_service.delete_expired(session)
+
+
+@task("auth.invalidate_cache")
+async def auth_invalidate_cache(
+    ctx: JobContext, token_hashes: list[str], polar_context: PolarWorkerContext
+) -> None:
+    await invalidate(get_worker_redis(ctx), token_hashes)
@@ -25,6 +25,7 @@ from polar.models.benefit import BenefitType
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import sql
+from polar.product import catalog as product_catalog
 from polar.redis import Redis
 from polar.webhook.service import webhook as webhook_service
 
@@ -230,6 +231,8 @@ class BenefitService(ResourceService[Benefit, BenefitCreate, BenefitUpdate]):
             session, redis, benefit, previous_properties
         )
 
+        product_catalog.invalidate_after_commit(session, benefit.organization_id)
+
         if benefit.organization:
             await webhook_service.send(
                 session,
@@ -263,6 +266,8 @@ class BenefitService(ResourceService[Benefit, BenefitCreate, BenefitUpdate]):
 
         await benefit_grant_service.enqueue_benefit_grant_deletions(session, benefit)
 
+        product_catalog.invalidate_after_commit(session, benefit.organization_id)
+
         if benefit.organization:
             await webhook_service.send(
                 session,
@@ -4,16 +4,20 @@ from fastapi import Depends, Path, Query, Request
 from pydantic import UUID4
 from sse_starlette.sse import EventSourceResponse
 
+from polar.eventstream.dispatcher import (
+    EventStreamDispatcher,
+    get_eventstream_dispatcher,
+)
 from polar.eventstream.endpoints import subscribe
 from polar.eventstream.service import Receivers
 from polar.exceptions import ResourceNotFound
 from polar.kit.pagination import ListResource, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
-from polar.locker import Locker, get_locker
 from polar.models import Checkout
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import AsyncSession, get_db_session
+from polar.product.catalog import ProductCatalog, get_product_catalog
 from polar.product.schemas import ProductID
 from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
@@ -110,10 +114,11 @@ async def create(
     auth_subject: auth.CheckoutWrite,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Create a checkout session."""
     return await checkout_service.create(
-        session, checkout_create, auth_subject, ip_geolocation_client
+        session, redis, checkout_create, auth_subject, ip_geolocation_client
     )
 
 
@@ -132,6 +137,7 @@ async def update(
     auth_subject: auth.CheckoutWrite,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Update a checkout session."""
     checkout = await checkout_service.get_by_id(session, auth_subject, id)
@@ -140,7 +146,7 @@ async def update(
         raise ResourceNotFound()
 
     return await checkout_service.update(
-        session, checkout, checkout_update, ip_geolocation_client
+        session, redis, checkout, checkout_update, ip_geolocation_client
     )
 
 
@@ -176,11 +182,19 @@ async def client_create(
     auth_subject: auth.CheckoutWeb,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
+    product_catalog: ProductCatalog = Depends(get_product_catalog),
 ) -> Checkout:
     """Create a checkout session from a client. Suitable to build checkout links."""
     ip_address = request.client.host if request.client else None
     return await checkout_service.client_create(
-        session, checkout_create, auth_subject, ip_geolocation_client, ip_address
+        session,
+        redis,
+        checkout_create,
+        auth_subject,
+        ip_geolocation_client,
+        ip_address,
+        product_catalog=product_catalog,
     )
 
 
@@ -198,6 +212,7 @@ async def client_update(
     checkout_update: CheckoutUpdatePublic,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Update a checkout session by client secret."""
     checkout = await checkout_service.get_by_client_secret(session, client_secret)
@@ -206,7 +221,7 @@ async def client_update(
         raise ResourceNotFound()
 
     return await checkout_service.update(
-        session, checkout, checkout_update, ip_geolocation_client
+        session, redis, checkout, checkout_update, ip_geolocation_client
     )
 
 
@@ -223,7 +238,7 @@ async def client_confirm(
     client_secret: CheckoutClientSecret,
     checkout_confirm: CheckoutConfirm,
     session: AsyncSession = Depends(get_db_session),
-    locker: Locker = Depends(get_locker),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """
     Confirm a checkout session by client secret.
@@ -235,15 +250,14 @@ async def client_confirm(
     if checkout is None:
         raise ResourceNotFound()
 
-    return await checkout_service.confirm(session, locker, checkout, checkout_confirm)
+    return await checkout_service.confirm(session, redis, checkout, checkout_confirm)
 
 
 @router.get("/client/{client_secret}/stream", include_in_schema=False)
 async def client_stream(
-    request: Request,
     client_secret: CheckoutClientSecret,
     session: AsyncSession = Depends(get_db_session),
-    redis: Redis = Depends(get_redis),
+    dispatcher: EventStreamDispatcher = Depends(get_eventstream_dispatcher),
 ) -> EventSourceResponse:
     checkout = await checkout_service.get_by_client_secret(session, client_secret)
 
@@ -251,4 +265,4 @@ async def client_stream(
         raise ResourceNotFound()
 
     receivers = Receivers(checkout_client_secret=checkout.client_secret)
-    return EventSourceResponse(subscribe(redis, receivers.get_channels(), request))
+    return EventSourceResponse(subscribe(dispatcher, receivers.get_channels()))
@@ -38,7 +38,6 @@ from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
-from polar.locker import Locker
 from polar.logging import Logger
 from polar.models import (
     Checkout,
@@ -61,8 +60,10 @@ from polar.models.product_price import (
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.service import organization as organization_service
 from polar.postgres import AsyncSession
+from polar.product.catalog import ProductCatalog
 from polar.product.service.product import product as product_service
 from polar.product.service.product_price import product_price as product_price_service
+from polar.redis import Redis
 from polar.user.service.user import user as user_service
 from polar.webhook.service import webhook as webhook_service
 from polar.worker import enqueue_job
@@ -211,6 +212,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def create(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_create: CheckoutCreate,
         auth_subject: AuthSubject[User | Organization],
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
@@ -259,7 +261,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         discount: Discount | None = None
         if checkout_create.discount_id is not None:
             discount = await self._get_validated_discount(
-                session, checkout_create.discount_id, product, price
+                session, redis, checkout_create.discount_id, product, price
             )
 
         customer_tax_id: TaxID | None = None
@@ -352,7 +354,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, redis, checkout)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -365,10 +367,12 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def client_create(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_create: CheckoutCreatePublic,
         auth_subject: AuthSubject[User | Anonymous],
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
         ip_address: str | None = None,
+        product_catalog: ProductCatalog | None = None,
     ) -> Checkout:
         price = await product_price_service.get_by_id(
             session, checkout_create.product_price_id
@@ -411,7 +415,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                 ]
             )
 
-        product = await self._eager_load_product(session, product)
+        product = await self._eager_load_product(session, product, product_catalog)
 
         amount = None
         currency = None
@@ -466,7 +470,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, redis, checkout)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -489,10 +493,12 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def checkout_link_create(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_link: CheckoutLink,
         embed_origin: str | None = None,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
         ip_address: str | None = None,
+        product_catalog: ProductCatalog | None = None,
     ) -> Checkout:
         price = checkout_link.checkout_price
 
@@ -521,7 +527,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                 ]
             )
 
-        product = await self._eager_load_product(session, product)
+        product = await self._eager_load_product(session, product, product_catalog)
 
         amount = None
         currency = None
@@ -540,7 +546,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         if checkout_link.discount_id is not None:
             try:
                 discount = await self._get_validated_discount(
-                    session, checkout_link.discount_id, product, price
+                    session, redis, checkout_link.discount_id, product, price
                 )
             # If the discount is not valid, just ignore it
             except PolarRequestValidationError:
@@ -567,7 +573,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, redis, checkout)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -580,15 +586,16 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def update(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout: Checkout,
         checkout_update: CheckoutUpdate | CheckoutUpdatePublic,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
     ) -> Checkout:
         checkout = await self._update_checkout(
-            session, checkout, checkout_update, ip_geolocation_client
+            session, redis, checkout, checkout_update, ip_geolocation_client
         )
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, redis, checkout)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -599,21 +606,23 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def confirm(
         self,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout: Checkout,
         checkout_confirm: CheckoutConfirm,
     ) -> Checkout:
-        checkout = await self._update_checkout(session, checkout, checkout_confirm)
+        checkout = await self._update_checkout(
+            session, redis, checkout, checkout_confirm
+        )
 
-        # When redeeming a discount, we need to lock the discount to prevent concurrent redemptions
+        # The redemption is given back if the confirmation fails
         if checkout.discount is not None:
             try:
                 async with discount_service.redeem_discount(
-                    session, locker, checkout.discount
+                    session, redis, checkout.discount
                 ) as discount_redemption:
                     discount_redemption.checkout = checkout
                     return await self._confirm_inner(
-                        session, checkout, checkout_confirm
+                        session, redis, checkout, checkout_confirm
                     )
             except DiscountNotRedeemableError as e:
                 raise PolarRequestValidationError(
@@ -627,17 +636,18 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                     ]
                 ) from e
 
-        return await self._confirm_inner(session, checkout, checkout_confirm)
+        return await self._confirm_inner(session, redis, checkout, checkout_confirm)
 
     async def _confirm_inner(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout: Checkout,
         checkout_confirm: CheckoutConfirm,
     ) -> Checkout:
         errors: list[ValidationError] = []
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, redis, checkout)
         except TaxCalculationError as e:
             errors.append(
                 {
@@ -1117,6 +1127,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def _get_validated_discount(
         self,
         session: AsyncSession,
+        redis: Redis,
         discount_id: uuid.UUID,
         product: Product,
         price: ProductPrice,
@@ -1137,7 +1148,9 @@ class CheckoutService(ResourceServiceReader[Checkout]):
             session, discount_id, product
         )
 
-        if discount is None:
+        if discount is None or not await discount_service.is_redeemable_discount(
+            session, redis, discount
+        ):
             raise PolarRequestValidationError(
                 [
                     {
@@ -1205,6 +1218,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def _update_checkout(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout: Checkout,
         checkout_update: CheckoutUpdate | CheckoutUpdatePublic,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
@@ -1304,6 +1318,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
             if checkout_update.discount_id is not None:
                 checkout.discount = await self._get_validated_discount(
                     session,
+                    redis,
                     checkout_update.discount_id,
                     checkout.product,
                     checkout.product_price,
@@ -1332,7 +1347,12 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                     checkout_update.discount_code,
                     checkout.product,
                 )
-                if discount is None:
+                if (
+                    discount is None
+                    or not await discount_service.is_redeemable_discount(
+                        session, redis, discount
+                    )
+                ):
                     raise PolarRequestValidationError(
                         [
                             {
@@ -1426,7 +1446,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         return checkout
 
     async def _update_checkout_tax(
-        self, session: AsyncSession, checkout: Checkout
+        self, session: AsyncSession, redis: Redis, checkout: Checkout
     ) -> Checkout:
         if not checkout.product.is_tax_applicable:
             checkout.tax_amount = 0
@@ -1440,6 +1460,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         ):
             try:
                 tax_amount = await calculate_tax(
+                    redis,
                     checkout.currency,
                     checkout.subtotal_amount,
                     checkout.product.stripe_product_id,
@@ -1580,8 +1601,16 @@ class CheckoutService(ResourceServiceReader[Checkout]):
             )
 
     async def _eager_load_product(
-        self, session: AsyncSession, product: Product
+        self,
+        session: AsyncSession,
+        product: Product,
+        product_catalog: ProductCatalog | None = None,
     ) -> Product:
+        if product_catalog is not None:
+            cached_product = await product_catalog.get_product(session, product.id)
+            if cached_product is not None:
+                return cached_product
+
         await session.refresh(
             product,
             {"organization", "prices", "product_medias", "attached_custom_fields"},
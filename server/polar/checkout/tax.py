@@ -1,19 +1,28 @@
+import collections
 import hashlib
 import json
+import time
 from collections.abc import Sequence
 from enum import StrEnum
 from typing import Any, LiteralString
 
 import stdnum.exceptions
 import stripe as stripe_lib
+import structlog
+from redis import RedisError
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.engine.interfaces import Dialect
 from sqlalchemy.types import TypeDecorator
 from stdnum import get_cc_module
 
+from polar.config import settings
 from polar.exceptions import PolarError
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.kit.address import Address
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
 
 
 class TaxIDFormat(StrEnum):
@@ -260,7 +269,7 @@ class TaxCalculationError(PolarError):
 
     def __init__(
         self,
-        stripe_error: stripe_lib.StripeError,
+        stripe_error: stripe_lib.StripeError | None,
         message: LiteralString = "An error occurred while calculating tax.",
     ) -> None:
         self.stripe_error = stripe_error
@@ -269,12 +278,14 @@ class TaxCalculationError(PolarError):
 
 
 class IncompleteTaxLocation(TaxCalculationError):
-    def __init__(self, stripe_error: stripe_lib.InvalidRequestError) -> None:
+    def __init__(
+        self, stripe_error: stripe_lib.InvalidRequestError | None = None
+    ) -> None:
         super().__init__(stripe_error, "Required tax location information is missing.")
 
 
 class InvalidTaxLocation(TaxCalculationError):
-    def __init__(self, stripe_error: stripe_lib.StripeError) -> None:
+    def __init__(self, stripe_error: stripe_lib.StripeError | None = None) -> None:
         super().__init__(
             stripe_error,
             (
@@ -284,21 +295,131 @@ class InvalidTaxLocation(TaxCalculationError):
         )
 
 
-async def calculate_tax(
+_TAX_LOCATION_ERRORS: dict[str, type[IncompleteTaxLocation | InvalidTaxLocation]] = {
+    error.__name__: error for error in (IncompleteTaxLocation, InvalidTaxLocation)
+}
+
+# Short-lived process-local layer in front of Redis,
+# for repeated updates of the same checkout.
+_local_cache: collections.OrderedDict[str, tuple[float, str]] = (
+    collections.OrderedDict()
+)
+
+
+def _get_calculation_hash(
     currency: str,
     amount: int,
     stripe_product_id: str,
     address: Address,
     tax_ids: list[TaxID],
-) -> int:
-    # Compute an idempotency key based on the input parameters to work as a sort of cache
+) -> str:
     address_str = address.model_dump_json()
     tax_ids_str = ",".join(f"{tax_id[0]}:{tax_id[1]}" for tax_id in tax_ids)
-    idempotency_key_str = (
-        f"{currency}:{amount}:{stripe_product_id}:{address_str}:{tax_ids_str}"
+    key_str = f"{currency}:{amount}:{stripe_product_id}:{address_str}:{tax_ids_str}"
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+def _get_cache_key(calculation_hash: str) -> str:
+    return f"checkout:tax:{calculation_hash}"
+
+
+def _set_local(calculation_hash: str, value: str) -> None:
+    _local_cache[calculation_hash] = (
+        time.monotonic() + settings.TAX_CALCULATION_LOCAL_CACHE_TTL_SECONDS,
+        value,
+    )
+    _local_cache.move_to_end(calculation_hash)
+    while len(_local_cache) > settings.TAX_CALCULATION_LOCAL_CACHE_MAX_SIZE:
+        _local_cache.popitem(last=False)
+
+
+async def _get_cached(redis: Redis, calculation_hash: str) -> str | None:
+    entry = _local_cache.get(calculation_hash)
+    if entry is not None:
+        cached_until, value = entry
+        if cached_until > time.monotonic():
+            return value
+        del _local_cache[calculation_hash]
+
+    try:
+        redis_value = await redis.get(_get_cache_key(calculation_hash))
+    except RedisError as e:
+        log.warning("checkout.tax.cache.redis_error", error=str(e))
+        return None
+
+    if redis_value is not None:
+        _set_local(calculation_hash, redis_value)
+    return redis_value
+
+
+async def _set_cached(
+    redis: Redis, calculation_hash: str, value: str, *, ttl: int
+) -> None:
+    _set_local(calculation_hash, value)
+    try:
+        await redis.set(_get_cache_key(calculation_hash), value, ex=ttl)
+    except RedisError as e:
+        log.warning("checkout.tax.cache.redis_error", error=str(e))
+
+
+def _from_cached(value: str) -> int:
+    """
+    Return the cached tax amount, or raise the cached tax location error.
+    """
+    cached = json.loads(value)
+    error = cached.get("error")
+    if error is not None:
+        raise _TAX_LOCATION_ERRORS[error]()
+    return cached["tax_amount"]
+
+
+async def calculate_tax(
+    redis: Redis,
+    currency: str,
+    amount: int,
+    stripe_product_id: str,
+    address: Address,
+    tax_ids: list[TaxID],
+) -> int:
+    calculation_hash = _get_calculation_hash(
+        currency, amount, stripe_product_id, address, tax_ids
     )
-    idempotency_key = hashlib.sha256(idempotency_key_str.encode()).hexdigest()
 
+    cached = await _get_cached(redis, calculation_hash)
+    if cached is not None:
+        return _from_cached(cached)
+
+    try:
+        tax_amount = await _create_tax_calculation(
+            calculation_hash, currency, amount, stripe_product_id, address, tax_ids
+        )
+    except (IncompleteTaxLocation, InvalidTaxLocation) as e:
+        # Cache invalid locations too: they're often resubmitted as-is
+        await _set_cached(
+            redis,
+            calculation_hash,
+            json.dumps({"error": type(e).__name__}),
+            ttl=settings.TAX_CALCULATION_NEGATIVE_CACHE_TTL_SECONDS,
+        )
+        raise
+
+    await _set_cached(
+        redis,
+        calculation_hash,
+        json.dumps({"tax_amount": tax_amount}),
+        ttl=settings.TAX_CALCULATION_CACHE_TTL_SECONDS,
+    )
+    return tax_amount
+
+
+async def _create_tax_calculation(
+    calculation_hash: str,
+    currency: str,
+    amount: int,
+    stripe_product_id: str,
+    address: Address,
+    tax_ids: list[TaxID],
+) -> int:
     try:
         calculation = await stripe_service.create_tax_calculation(
             currency=currency,
@@ -315,7 +436,7 @@ async def calculate_tax(
                 "address_source": "billing",
                 "tax_ids": [to_stripe_tax_id(tax_id) for tax_id in tax_ids],
             },
-            idempotency_key=idempotency_key,
+            idempotency_key=calculation_hash,
         )
     except stripe_lib.InvalidRequestError as e:
         if (
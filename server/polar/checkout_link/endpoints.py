@@ -14,7 +14,9 @@ from polar.models import CheckoutLink
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import AsyncSession, get_db_session
+from polar.product.catalog import ProductCatalog, get_product_catalog
 from polar.product.schemas import ProductID
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth, sorting
@@ -48,6 +50,7 @@ async def list(
     product_id: MultipleQueryFilter[ProductID] | None = Query(
         None, title="ProductID Filter", description="Filter by product ID."
     ),
+    query: str | None = Query(None, description="Filter by label or product name."),
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[CheckoutLinkSchema]:
     """List checkout links."""
@@ -56,6 +59,7 @@ async def list(
         auth_subject,
         organization_id=organization_id,
         product_id=product_id,
+        query=query,
         pagination=pagination,
         sorting=sorting,
     )
@@ -161,6 +165,8 @@ async def redirect(
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     embed_origin: str | None = Query(None),
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
+    product_catalog: ProductCatalog = Depends(get_product_catalog),
 ) -> RedirectResponse:
     """Use a checkout link to create a checkout session and redirect to it."""
     checkout_link = await checkout_link_service.get_by_client_secret(
@@ -172,7 +178,13 @@ async def redirect(
 
     ip_address = request.client.host if request.client else None
     checkout = await checkout_service.checkout_link_create(
-        session, checkout_link, embed_origin, ip_geolocation_client, ip_address
+        session,
+        redis,
+        checkout_link,
+        embed_origin,
+        ip_geolocation_client,
+        ip_address,
+        product_catalog=product_catalog,
     )
 
     # Add the query parameters from the request to the URL
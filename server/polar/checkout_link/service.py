@@ -11,6 +11,7 @@ from polar.discount.service import discount as discount_service
 from polar.exceptions import PolarError, PolarRequestValidationError
 from polar.kit.crypto import generate_token
 from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.search import TrigramSearch
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.logging import Logger
@@ -51,6 +52,7 @@ class CheckoutLinkService(ResourceServiceReader[CheckoutLink]):
         *,
         organization_id: Sequence[uuid.UUID] | None = None,
         product_id: Sequence[uuid.UUID] | None = None,
+        query: str | None = None,
         pagination: PaginationParams,
         sorting: list[Sorting[CheckoutLinkSortProperty]] = [
             (CheckoutLinkSortProperty.created_at, False)
@@ -64,6 +66,10 @@ class CheckoutLinkService(ResourceServiceReader[CheckoutLink]):
         if product_id is not None:
             statement = statement.where(Product.id.in_(product_id))
 
+        if query is not None:
+            search = TrigramSearch(query, [CheckoutLink.label, Product.name])
+            statement = statement.where(search.clause).order_by(search.rank.desc())
+
         order_by_clauses: list[UnaryExpression[Any]] = []
         for criterion, is_desc in sorting:
             clause_function = desc if is_desc else asc
@@ -279,7 +285,7 @@ class CheckoutLinkService(ResourceServiceReader[CheckoutLink]):
         self, session: AsyncSession, discount_id: uuid.UUID, product: Product
     ) -> Discount:
         discount = await discount_service.get_by_id_and_product(
-            session, discount_id, product, redeemable=False
+            session, discount_id, product
         )
 
         if discount is None:
@@ -62,6 +62,10 @@ class Settings(BaseSettings):
     USER_SESSION_COOKIE_KEY: str = "polar_session"
     USER_SESSION_COOKIE_DOMAIN: str = "127.0.0.1"
 
+    # Authentication cache
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10_000
+
     # Magic link
     MAGIC_LINK_TTL_SECONDS: int = 60 * 30  # 30 minutes
 
@@ -78,7 +82,9 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DATABASE: str = "polar_development"
     DATABASE_POOL_SIZE: int = 5
-    DATABASE_SYNC_POOL_SIZE: int = 1  # Specific pool size for sync connection: since we only use it in OAuth2 router, don't waste resources.
+    # Sync connections are only used by the OAuth2 authorization server.
+    # It runs in a thread pool of the same size, so each thread gets a connection.
+    DATABASE_SYNC_POOL_SIZE: int = 5
     DATABASE_POOL_RECYCLE_SECONDS: int = 600  # 10 minutes
 
     # Redis
@@ -91,6 +97,18 @@ class Settings(BaseSettings):
     RESEND_API_KEY: str = ""
     EMAIL_FROM_NAME: str = "Polar"
     EMAIL_FROM_EMAIL_ADDRESS: str = "noreply@notifications.polar.sh"
+    # Maximum number of concurrent requests to the email provider per process
+    EMAIL_SENDER_MAX_CONCURRENCY: int = 10
+    # Maximum number of compiled email templates kept in memory per renderer
+    EMAIL_RENDERER_CACHE_SIZE: int = 400
+    # Compile all email templates when the API and the worker start
+    EMAIL_RENDERER_PRECOMPILE: bool = True
+
+    # Articles newsletter
+    # Number of recipients handled by a single send job
+    ARTICLE_NEWSLETTER_BATCH_SIZE: int = 100
+    # How long rendered articles are kept for the send jobs
+    ARTICLE_NEWSLETTER_RENDER_CACHE_TTL_SECONDS: int = 60 * 60  # 1 hour
 
     # Github App
     GITHUB_APP_NAMESPACE: str = ""  # Unused
@@ -137,6 +155,50 @@ class Settings(BaseSettings):
     FAVICON_URL: str = "https://raw.githubusercontent.com/polarsource/polar/2648cf7472b5128704a097cd1eb3ae5f1dd847e5/docs/docs/assets/favicon.png"
     THUMBNAIL_URL: str = "https://raw.githubusercontent.com/polarsource/polar/4fd899222e200ca70982f437039f549b7a822ecc/clients/apps/web/public/email-logo-dark.png"
 
+    # Event stream
+    EVENTSTREAM_CLIENT_BUFFER_SIZE: int = 100
+
+    # Webhooks delivery
+    WEBHOOK_MAX_CONNECTIONS: int = 100
+    WEBHOOK_MAX_CONNECTIONS_PER_HOST: int = 10
+    WEBHOOK_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    WEBHOOK_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    WEBHOOK_TIMEOUT_SECONDS: float = 20.0
+
+    # Tax calculations
+    TAX_CALCULATION_CACHE_TTL_SECONDS: int = 60 * 60  # 1 hour
+    TAX_CALCULATION_NEGATIVE_CACHE_TTL_SECONDS: int = 5 * 60  # 5 minutes
+    TAX_CALCULATION_LOCAL_CACHE_TTL_SECONDS: int = 10
+    TAX_CALCULATION_LOCAL_CACHE_MAX_SIZE: int = 1000
+
+    # Issues search
+    ISSUE_SEARCH_CACHE_TTL_SECONDS: int = 30
+    ISSUE_SEARCH_CACHE_MAX_SIZE: int = 1000
+    # Maximum number of matching issues returned by a search
+    ISSUE_SEARCH_MAX_RESULTS: int = 1000
+
+    # Discounts
+    # Idle counters of remaining redemptions expire, and are seeded again
+    # from the database, so drift after failed transactions is corrected
+    DISCOUNT_REDEMPTIONS_COUNTER_TTL_SECONDS: int = 60 * 60  # 1 hour
+
+    # Product catalogs
+    # Catalogs are invalidated on change, the TTL only bounds memory staleness
+    # if an invalidation message is lost
+    PRODUCT_CATALOG_CACHE_TTL_SECONDS: int = 60 * 5  # 5 minutes
+    # Maximum number of organizations whose catalog is kept in memory
+    PRODUCT_CATALOG_CACHE_MAX_SIZE: int = 500
+
+    # Storefronts
+    # Cached responses are invalidated on change, the TTL only evicts idle ones
+    STOREFRONT_CACHE_TTL_SECONDS: int = 60 * 60  # 1 hour
+
+    # License keys
+    LICENSE_KEY_CACHE_TTL_SECONDS: int = 600
+
+    # CSV exports
+    EXPORT_YIELD_PER: int = 1000
+
     # Posthog
     POSTHOG_PROJECT_API_KEY: str = ""
 
@@ -156,10 +218,15 @@ class Settings(BaseSettings):
     S3_FILES_BUCKET_NAME: str = "polar-s3"
     S3_FILES_PUBLIC_BUCKET_NAME: str = "polar-s3-public"
     S3_FILES_PRESIGN_TTL: int = 600  # 10 minutes
+    # Presigned URLs are reused until this many seconds before they expire
+    S3_FILES_PRESIGN_CACHE_MARGIN: int = 120
+    S3_FILES_URL_CACHE_SIZE: int = 10_000
     S3_FILES_DOWNLOAD_SECRET: str = "supersecret"
     S3_FILES_DOWNLOAD_SALT: str = "saltysalty"
     # Override to http://127.0.0.1:9000 in .env during development
     S3_ENDPOINT_URL: str | None = None
+    # Maximum number of concurrent S3 requests per process
+    S3_MAX_CONCURRENCY: int = 20
 
     MINIO_USER: str = "polar"
     MINIO_PWD: str = "polarpolar"
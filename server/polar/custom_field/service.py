@@ -9,7 +9,6 @@ from sqlalchemy import (
     delete,
     desc,
     func,
-    or_,
     select,
     update,
 )
@@ -20,12 +19,14 @@ from polar.authz.service import AccessType, Authz
 from polar.custom_field.sorting import CustomFieldSortProperty
 from polar.exceptions import PolarError, PolarRequestValidationError
 from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.search import TrigramSearch
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.models import CustomField, Organization, User, UserOrganization
 from polar.models.custom_field import CustomFieldType
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncSession
+from polar.product import catalog as product_catalog
 
 from .attachment import attached_custom_fields_models
 from .data import custom_field_data_models
@@ -57,12 +58,8 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
             )
 
         if query is not None:
-            statement = statement.where(
-                or_(
-                    CustomField.name.ilike(f"%{query}%"),
-                    CustomField.slug.ilike(f"%{query}%"),
-                )
-            )
+            search = TrigramSearch(query, [CustomField.name, CustomField.slug])
+            statement = statement.where(search.clause).order_by(search.rank.desc())
 
         if type is not None:
             statement = statement.where(CustomField.type.in_(type))
@@ -209,6 +206,7 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
                 await session.execute(update_statement)
 
         session.add(custom_field)
+        product_catalog.invalidate_after_commit(session, custom_field.organization_id)
         return custom_field
 
     async def delete(
@@ -224,6 +222,7 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
             )
             await session.execute(delete_statement)
 
+        product_catalog.invalidate_after_commit(session, custom_field.organization_id)
         return custom_field
 
     async def get_by_organization_and_id(
@@ -11,6 +11,7 @@ from polar.models import Discount
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import AsyncSession, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth, sorting
@@ -118,6 +119,7 @@ async def update(
     discount_update: DiscountUpdate,
     auth_subject: auth.DiscountWrite,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Discount:
     """Update a discount."""
     discount = await discount_service.get_by_id(session, auth_subject, id)
@@ -125,7 +127,7 @@ async def update(
     if discount is None:
         raise ResourceNotFound()
 
-    return await discount_service.update(session, discount, discount_update)
+    return await discount_service.update(session, redis, discount, discount_update)
 
 
 @router.delete(
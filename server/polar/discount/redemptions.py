@@ -0,0 +1,133 @@
+"""
+Counters of the remaining redemptions of discounts.
+
+Discounts with a maximum number of redemptions get a counter in Redis,
+decremented when a checkout redeems them. Checking and decrementing it
+is a single atomic script: concurrent checkouts don't wait on each other,
+the ones coming after the last redemption are simply rejected.
+
+Counters are seeded from the database on first use.
+A redemption is given back with `release` when its checkout fails.
+Idle counters expire, so they're eventually seeded again from the database,
+which corrects the drift of redemptions lost in failed transactions.
+"""
+
+from sqlalchemy import func, select
+
+from polar.config import settings
+from polar.models import Discount
+from polar.models.discount_redemption import DiscountRedemption
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+
+# Returns the remaining redemptions after the reservation, -1 if there are none,
+# or nil if the counter has to be seeded.
+_RESERVE_SCRIPT = """
+local remaining = redis.call("GET", KEYS[1])
+if not remaining then
+    return false
+end
+if tonumber(remaining) <= 0 then
+    return -1
+end
+redis.call("EXPIRE", KEYS[1], ARGV[1])
+return redis.call("DECR", KEYS[1])
+"""
+
+# Adds to the counter only if it exists: otherwise, it'll be seeded from the database.
+_INCREMENT_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("INCRBY", KEYS[1], ARGV[1])
+end
+return false
+"""
+
+
+def _get_key(discount: Discount) -> str:
+    return f"discount:{discount.id}:remaining_redemptions"
+
+
+async def _seed(session: AsyncSession, redis: Redis, discount: Discount) -> None:
+    assert discount.max_redemptions is not None
+    statement = select(func.count(DiscountRedemption.id)).where(
+        DiscountRedemption.discount_id == discount.id
+    )
+    result = await session.execute(statement)
+    remaining = max(discount.max_redemptions - result.scalar_one(), 0)
+    await redis.set(
+        _get_key(discount),
+        remaining,
+        ex=settings.DISCOUNT_REDEMPTIONS_COUNTER_TTL_SECONDS,
+        nx=True,
+    )
+
+
+async def get_remaining(
+    session: AsyncSession, redis: Redis, discount: Discount
+) -> int | None:
+    """
+    Return the number of remaining redemptions of the discount,
+    or `None` if it's unlimited.
+    """
+    if discount.max_redemptions is None:
+        return None
+
+    value = await redis.get(_get_key(discount))
+    if value is None:
+        await _seed(session, redis, discount)
+        value = await redis.get(_get_key(discount))
+    # Lowering the maximum can take the counter below zero
+    return max(int(value), 0) if value is not None else 0
+
+
+async def reserve(session: AsyncSession, redis: Redis, discount: Discount) -> bool:
+    """
+    Take one of the remaining redemptions of the discount.
+
+    Returns:
+        Whether a redemption was available.
+    """
+    if discount.max_redemptions is None:
+        return True
+
+    script = redis.register_script(_RESERVE_SCRIPT)
+    keys = [_get_key(discount)]
+    args = [settings.DISCOUNT_REDEMPTIONS_COUNTER_TTL_SECONDS]
+    remaining = await script(keys, args)
+    if remaining is None:
+        await _seed(session, redis, discount)
+        remaining = await script(keys, args)
+    return remaining is not None and int(remaining) >= 0
+
+
+async def release(redis: Redis, discount: Discount) -> None:
+    """
+    Give back a redemption taken by `reserve`.
+    """
+    if discount.max_redemptions is None:
+        return
+
+    script = redis.register_script(_INCREMENT_SCRIPT)
+    await script([_get_key(discount)], [1])
+
+
+async def update_max_redemptions(
+    redis: Redis, discount: Discount, previous_max_redemptions: int | None
+) -> None:
+    """
+    Apply a change of the maximum number of redemptions to the counter.
+    """
+    if discount.max_redemptions == previous_max_redemptions:
+        return
+
+    if discount.max_redemptions is None or previous_max_redemptions is None:
+        await redis.delete(_get_key(discount))
+        return
+
+    script = redis.register_script(_INCREMENT_SCRIPT)
+    await script(
+        [_get_key(discount)], [discount.max_redemptions - previous_max_redemptions]
+    )
+
+
+__all__ = ["get_remaining", "reserve", "release", "update_max_redemptions"]
@@ -3,7 +3,7 @@ import uuid
 from collections.abc import AsyncIterator, Sequence
 from typing import Any
 
-from sqlalchemy import Select, UnaryExpression, asc, desc, func, or_, select
+from sqlalchemy import Select, UnaryExpression, asc, desc, select
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject, is_organization, is_user
@@ -11,10 +11,10 @@ from polar.authz.service import AccessType, Authz
 from polar.exceptions import PolarError, PolarRequestValidationError
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.search import TrigramSearch
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
-from polar.locker import Locker
 from polar.models import (
     Discount,
     DiscountProduct,
@@ -27,7 +27,9 @@ from polar.models.discount_redemption import DiscountRedemption
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncSession
 from polar.product.service.product import product as product_service
+from polar.redis import Redis
 
+from . import redemptions
 from .schemas import DiscountCreate, DiscountUpdate
 from .sorting import DiscountSortProperty
 
@@ -59,12 +61,8 @@ class DiscountService(ResourceServiceReader[Discount]):
             statement = statement.where(Discount.organization_id.in_(organization_id))
 
         if query is not None:
-            statement = statement.where(
-                or_(
-                    Discount.name.like(f"%{query}%"),
-                    Discount.code.ilike(f"%{query}%"),
-                )
-            )
+            search = TrigramSearch(query, [Discount.name, Discount.code])
+            statement = statement.where(search.clause).order_by(search.rank.desc())
 
         order_by_clauses: list[UnaryExpression[Any]] = []
         for criterion, is_desc in sorting:
@@ -121,7 +119,7 @@ class DiscountService(ResourceServiceReader[Discount]):
 
         if discount_create.code is not None:
             existing_discount = await self.get_by_code_and_organization(
-                session, discount_create.code, organization, redeemable=False
+                session, discount_create.code, organization
             )
             if existing_discount is not None:
                 raise PolarRequestValidationError(
@@ -176,10 +174,12 @@ class DiscountService(ResourceServiceReader[Discount]):
     async def update(
         self,
         session: AsyncSession,
+        redis: Redis,
         discount: Discount,
         discount_update: DiscountUpdate,
     ) -> Discount:
         previous_name = discount.name
+        previous_max_redemptions = discount.max_redemptions
 
         if (
             discount_update.duration is not None
@@ -282,6 +282,10 @@ class DiscountService(ResourceServiceReader[Discount]):
         await session.flush()
         await session.refresh(discount)
 
+        await redemptions.update_max_redemptions(
+            redis, discount, previous_max_redemptions
+        )
+
         return discount
 
     async def delete(self, session: AsyncSession, discount: Discount) -> Discount:
@@ -297,8 +301,6 @@ class DiscountService(ResourceServiceReader[Discount]):
         session: AsyncSession,
         id: uuid.UUID,
         product: Product,
-        *,
-        redeemable: bool = True,
     ) -> Discount | None:
         statement = select(Discount).where(
             Discount.id == id,
@@ -314,9 +316,6 @@ class DiscountService(ResourceServiceReader[Discount]):
         if len(discount.products) > 0 and product not in discount.products:
             return None
 
-        if redeemable and not await self.is_redeemable_discount(session, discount):
-            return None
-
         return discount
 
     async def get_by_code_and_organization(
@@ -324,8 +323,6 @@ class DiscountService(ResourceServiceReader[Discount]):
         session: AsyncSession,
         code: str,
         organization: Organization,
-        *,
-        redeemable: bool = True,
     ) -> Discount | None:
         statement = select(Discount).where(
             Discount.code == code,
@@ -333,26 +330,16 @@ class DiscountService(ResourceServiceReader[Discount]):
             Discount.deleted_at.is_(None),
         )
         result = await session.execute(statement)
-        discount = result.scalar_one_or_none()
-
-        if discount is None:
-            return None
-
-        if redeemable and not await self.is_redeemable_discount(session, discount):
-            return None
-
-        return discount
+        return result.scalar_one_or_none()
 
     async def get_by_code_and_product(
         self,
         session: AsyncSession,
         code: str,
         product: Product,
-        *,
-        redeemable: bool = True,
     ) -> Discount | None:
         discount = await self.get_by_code_and_organization(
-            session, code, product.organization, redeemable=redeemable
+            session, code, product.organization
         )
 
         if discount is None:
@@ -373,40 +360,49 @@ class DiscountService(ResourceServiceReader[Discount]):
         return result.scalar_one_or_none()
 
     async def is_redeemable_discount(
-        self, session: AsyncSession, discount: Discount
+        self, session: AsyncSession, redis: Redis, discount: Discount
     ) -> bool:
-        if discount.starts_at is not None and discount.starts_at > utc_now():
+        if not self._is_in_redemption_period(discount):
             return False
 
-        if discount.ends_at is not None and discount.ends_at < utc_now():
-            return False
-
-        if discount.max_redemptions is not None:
-            statement = select(func.count(DiscountRedemption.id)).where(
-                DiscountRedemption.discount_id == discount.id
-            )
-            result = await session.execute(statement)
-            redemptions_count = result.scalar_one()
-            return redemptions_count < discount.max_redemptions
-
-        return True
+        remaining = await redemptions.get_remaining(session, redis, discount)
+        return remaining is None or remaining > 0
 
     @contextlib.asynccontextmanager
     async def redeem_discount(
-        self, session: AsyncSession, locker: Locker, discount: Discount
+        self, session: AsyncSession, redis: Redis, discount: Discount
     ) -> AsyncIterator[DiscountRedemption]:
-        async with locker.lock(
-            f"discount:{discount.id}", timeout=5, blocking_timeout=5
+        """
+        Redeem the discount for the duration of the block.
+
+        Concurrent redemptions don't wait on each other: a redemption is taken
+        from the counter of remaining ones, or rejected if there are none left.
+        It's given back if the block fails.
+        """
+        if not self._is_in_redemption_period(discount) or not (
+            await redemptions.reserve(session, redis, discount)
         ):
-            if not await self.is_redeemable_discount(session, discount):
-                raise DiscountNotRedeemableError(discount)
+            raise DiscountNotRedeemableError(discount)
 
+        try:
             discount_redemption = DiscountRedemption(discount=discount)
 
             yield discount_redemption
 
             session.add(discount_redemption)
             await session.flush()
+        except BaseException:
+            await redemptions.release(redis, discount)
+            raise
+
+    def _is_in_redemption_period(self, discount: Discount) -> bool:
+        if discount.starts_at is not None and discount.starts_at > utc_now():
+            return False
+
+        if discount.ends_at is not None and discount.ends_at < utc_now():
+            return False
+
+        return True
 
     def _get_readable_discount_statement(
         self, auth_subject: AuthSubject[User | Organization]
@@ -1,21 +1,37 @@
 import datetime
+import functools
+import hashlib
+from collections import OrderedDict
 from collections.abc import Mapping
+from pathlib import Path
 from typing import Any
 
+import structlog
 from jinja2 import (
     ChoiceLoader,
     Environment,
     PackageLoader,
     PrefixLoader,
     StrictUndefined,
+    Template,
     select_autoescape,
 )
 
+from polar.config import settings
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
+
 EMAIL_TEMPLATES_FOLDER_NAME = "email_templates"
 
 
 class EmailRenderer:
-    def __init__(self, extras_templates_packages: Mapping[str, str] = {}) -> None:
+    def __init__(
+        self,
+        extras_templates_packages: Mapping[str, str] = {},
+        *,
+        cache_size: int = settings.EMAIL_RENDERER_CACHE_SIZE,
+    ) -> None:
         """
         Args:
             extras_templates_package: Optional mapping to load additional templates.
@@ -23,6 +39,8 @@ class EmailRenderer:
                 e.g. `magic_link/template.html`.
                 Value is the namespace of the package containing an `email_templates`
                 directory containing Jinja templates.
+            cache_size: Maximum number of compiled templates kept in memory,
+                both for file templates and templates compiled from strings.
 
         Example:
 
@@ -44,12 +62,18 @@ class EmailRenderer:
             ),
             autoescape=select_autoescape(),
             undefined=StrictUndefined,
+            cache_size=cache_size,
+            # Templates are shipped with the code: don't stat them on every render,
+            # except in development where they're edited while the server runs
+            auto_reload=settings.is_development(),
         )
+        self._cache_size = cache_size
+        self._string_templates: OrderedDict[str, Template] = OrderedDict()
 
     def render_from_string(
         self, subject: str, body: str, context: dict[str, Any]
     ) -> tuple[str, str]:
-        rendered_subject = self.env.from_string(subject).render(context).strip()
+        rendered_subject = self._from_string(subject).render(context).strip()
 
         wrapped_body = f"""
         {{% extends 'base.html' %}}
@@ -61,18 +85,82 @@ class EmailRenderer:
 
         context["current_year"] = datetime.datetime.now().year
 
-        rendered_body = self.env.from_string(wrapped_body).render(context).strip()
+        rendered_body = self._from_string(wrapped_body).render(context).strip()
         return rendered_subject, rendered_body
 
     def render_from_template(
         self, subject: str, body_template: str, context: dict[str, Any]
     ) -> tuple[str, str]:
-        rendered_subject = self.env.from_string(subject).render(context).strip()
+        rendered_subject = self._from_string(subject).render(context).strip()
         rendered_body = self.env.get_template(body_template).render(context).strip()
         return rendered_subject, rendered_body
 
+    def precompile(self) -> int:
+        """
+        Compile every template reachable by this renderer,
+        so the first renders don't pay the compilation cost.
+
+        Returns:
+            The number of compiled templates.
+        """
+        templates = self.env.list_templates(extensions=["html", "txt"])
+        for template in templates:
+            self.env.get_template(template)
+        return len(templates)
+
+    def _from_string(self, source: str) -> Template:
+        key = hashlib.sha256(source.encode()).hexdigest()
+        template = self._string_templates.get(key)
+        if template is not None:
+            self._string_templates.move_to_end(key)
+            return template
+
+        template = self.env.from_string(source)
+        self._string_templates[key] = template
+        while len(self._string_templates) > self._cache_size:
+            self._string_templates.popitem(last=False)
+        return template
+
+
+@functools.cache
+def _get_email_renderer(
+    extras_templates_packages: frozenset[tuple[str, str]],
+) -> EmailRenderer:
+    return EmailRenderer(dict(extras_templates_packages))
+
 
 def get_email_renderer(
     extras_templates_packages: Mapping[str, str] = {},
 ) -> EmailRenderer:
-    return EmailRenderer(extras_templates_packages)
+    """
+    Return the process-wide renderer for this set of template packages.
+
+    Renderers are cheap to use but expensive to build:
+    they are created once and reuse their compiled templates across calls.
+    """
+    return _get_email_renderer(frozenset(extras_templates_packages.items()))
+
+
+def _get_templates_packages() -> dict[str, str]:
+    polar_root = Path(__file__).parent.parent
+    return {
+        path.parent.name: f"polar.{path.parent.name}"
+        for path in sorted(polar_root.glob(f"*/{EMAIL_TEMPLATES_FOLDER_NAME}"))
+        if path.is_dir() and path.parent.name != "email"
+    }
+
+
+def precompile_email_templates() -> None:
+    """
+    Build the renderers of every package shipping email templates
+    and compile their templates.
+
+    Meant to be called at API and worker startup.
+    """
+    count = get_email_renderer().precompile()
+    for prefix, package in _get_templates_packages().items():
+        count += get_email_renderer({prefix: package}).precompile()
+    log.info("email.renderer.precompiled", count=count)
+
+
+__all__ = ["EmailRenderer", "get_email_renderer", "precompile_email_templates"]
@@ -1,11 +1,18 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from typing import Any
 
+import httpx
 import resend
 import structlog
 
 from polar.config import EmailSender as EmailSenderType
 from polar.config import settings
+from polar.exceptions import PolarError
+from polar.kit.schemas import Schema
 from polar.logging import Logger
+from polar.worker import enqueue_job
 
 log: Logger = structlog.get_logger()
 
@@ -15,84 +22,170 @@ DEFAULT_REPLY_TO_NAME = "Polar Support"
 DEFAULT_REPLY_TO_EMAIL_ADDRESS = "support@polar.sh"
 
 
+class EmailSenderError(PolarError):
+    def __init__(self, message: str, *, retryable: bool = True) -> None:
+        # Whether sending the same emails again may succeed
+        self.retryable = retryable
+        super().__init__(message)
+
+
+class Email(Schema):
+    to_email_addr: str
+    subject: str
+    html_content: str
+    from_name: str = DEFAULT_FROM_NAME
+    from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS
+    email_headers: dict[str, str] = {}
+    reply_to_name: str | None = DEFAULT_REPLY_TO_NAME
+    reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS
+
+
 class EmailSender(ABC):
+    """
+    Deliver emails to the provider.
+
+    Senders are used by the `email.send` worker task:
+    call sites should use `enqueue_email` to avoid waiting on delivery.
+    """
+
+    # Maximum number of emails sent in a single call of `send_batch`
+    batch_size: int = 1
+
+    def __init__(
+        self, *, max_concurrency: int = settings.EMAIL_SENDER_MAX_CONCURRENCY
+    ) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
     @abstractmethod
-    def send_to_user(
-        self,
-        *,
-        to_email_addr: str,
-        subject: str,
-        html_content: str,
-        from_name: str = DEFAULT_FROM_NAME,
-        from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
-        email_headers: dict[str, str] = {},
-        reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
-        reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
+    async def send(self, email: Email, *, idempotency_key: str | None = None) -> None:
+        pass
+
+    async def send_batch(
+        self, emails: Sequence[Email], *, idempotency_key: str | None = None
     ) -> None:
+        """
+        Send at most `batch_size` emails.
+
+        Args:
+            idempotency_key: Key identifying this batch, so the provider
+            doesn't deliver it twice if it's sent again.
+        """
+        for i, email in enumerate(emails):
+            await self.send(
+                email,
+                idempotency_key=f"{idempotency_key}:{i}" if idempotency_key else None,
+            )
+
+    async def close(self) -> None:
         pass
 
 
 class LoggingEmailSender(EmailSender):
-    def send_to_user(
-        self,
-        *,
-        to_email_addr: str,
-        subject: str,
-        html_content: str,
-        from_name: str = DEFAULT_FROM_NAME,
-        from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
-        email_headers: dict[str, str] = {},
-        reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
-        reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
-    ) -> None:
+    async def send(self, email: Email, *, idempotency_key: str | None = None) -> None:
         log.info(
             "logging email",
-            to_email_addr=to_email_addr,
-            subject=subject,
-            html_content=html_content,
-            from_name=from_name,
-            from_email_addr=from_email_addr,
-            email_headers=email_headers,
+            to_email_addr=email.to_email_addr,
+            subject=email.subject,
+            html_content=email.html_content,
+            from_name=email.from_name,
+            from_email_addr=email.from_email_addr,
+            email_headers=email.email_headers,
         )
 
 
-class ResendEmailSender(EmailSender):
+class InMemoryEmailSender(EmailSender):
+    """
+    Keep sent emails in memory. Useful in tests.
+    """
+
     def __init__(self) -> None:
         super().__init__()
-        resend.api_key = settings.RESEND_API_KEY
-
-    def send_to_user(
-        self,
-        *,
-        to_email_addr: str,
-        subject: str,
-        html_content: str,
-        from_name: str = DEFAULT_FROM_NAME,
-        from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
-        email_headers: dict[str, str] = {},
-        reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
-        reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
-    ) -> None:
-        params: resend.Emails.SendParams = {
-            "from": f"{from_name} <{from_email_addr}>",
-            "to": [to_email_addr],
-            "subject": subject,
-            "html": html_content,
-            "headers": email_headers,
-        }
+        self.sent: list[Email] = []
 
-        if reply_to_name and reply_to_email_addr:
-            params["reply_to"] = f"{reply_to_name} <{reply_to_email_addr}>"
+    async def send(self, email: Email, *, idempotency_key: str | None = None) -> None:
+        self.sent.append(email)
 
-        email = resend.Emails.send(params)
 
+class ResendEmailSender(EmailSender):
+    # Maximum number of emails accepted by the batch endpoint
+    batch_size = 100
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.client = httpx.AsyncClient(
+            base_url="https://api.resend.com",
+            headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
+            timeout=httpx.Timeout(10.0),
+        )
+
+    async def send(self, email: Email, *, idempotency_key: str | None = None) -> None:
+        response = await self._request(
+            "/emails", self._get_params(email), idempotency_key
+        )
         log.info(
             "resend.send",
-            to_email_addr=to_email_addr,
-            subject=subject,
-            email_id=email["id"],
+            to_email_addr=email.to_email_addr,
+            subject=email.subject,
+            email_id=response["id"],
         )
 
+    async def send_batch(
+        self, emails: Sequence[Email], *, idempotency_key: str | None = None
+    ) -> None:
+        response = await self._request(
+            "/emails/batch",
+            [self._get_params(email) for email in emails],
+            idempotency_key,
+        )
+        log.info(
+            "resend.send_batch",
+            count=len(emails),
+            email_ids=[email["id"] for email in response["data"]],
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def _get_params(self, email: Email) -> resend.Emails.SendParams:
+        params: resend.Emails.SendParams = {
+            "from": f"{email.from_name} <{email.from_email_addr}>",
+            "to": [email.to_email_addr],
+            "subject": email.subject,
+            "html": email.html_content,
+            "headers": email.email_headers,
+        }
+        if email.reply_to_name and email.reply_to_email_addr:
+            params["reply_to"] = f"{email.reply_to_name} <{email.reply_to_email_addr}>"
+        return params
+
+    async def _request(
+        self, url: str, payload: Any, idempotency_key: str | None
+    ) -> Any:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        async with self._semaphore:
+            try:
+                response = await self.client.post(url, json=payload, headers=headers)
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                log.warning("resend.error", error=str(e))
+                status_code = e.response.status_code
+                # Invalid emails are rejected: sending them again won't help.
+                # Rate limits and concurrent requests with the same
+                # idempotency key are worth a retry.
+                raise EmailSenderError(
+                    str(e),
+                    retryable=status_code >= 500 or status_code in {409, 429},
+                ) from e
+            except httpx.HTTPError as e:
+                log.warning("resend.error", error=str(e))
+                raise EmailSenderError(str(e)) from e
+        return response.json()
+
+
+def chunks(emails: Sequence[Email], size: int) -> Iterable[Sequence[Email]]:
+    for i in range(0, len(emails), size):
+        yield emails[i : i + size]
+
 
 def get_email_sender() -> EmailSender:
     if settings.EMAIL_SENDER == EmailSenderType.resend:
@@ -100,3 +193,40 @@ def get_email_sender() -> EmailSender:
 
     # Logging in development
     return LoggingEmailSender()
+
+
+def enqueue_email(
+    *,
+    to_email_addr: str,
+    subject: str,
+    html_content: str,
+    from_name: str = DEFAULT_FROM_NAME,
+    from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
+    email_headers: dict[str, str] = {},
+    reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
+    reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
+) -> None:
+    """
+    Schedule the delivery of an email in the background.
+    """
+    email = Email(
+        to_email_addr=to_email_addr,
+        subject=subject,
+        html_content=html_content,
+        from_name=from_name,
+        from_email_addr=from_email_addr,
+        email_headers=email_headers,
+        reply_to_name=reply_to_name,
+        reply_to_email_addr=reply_to_email_addr,
+    )
+    enqueue_job("email.send", emails=[email.model_dump()])
+
+
+def enqueue_emails(emails: Iterable[Email]) -> None:
+    """
+    Schedule the delivery of several emails in the background, in a single job,
+    so they can be sent with the provider batch endpoint.
+    """
+    payload = [email.model_dump() for email in emails]
+    if payload:
+        enqueue_job("email.send", emails=payload)
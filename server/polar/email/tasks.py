@@ -0,0 +1,67 @@
+from typing import Any
+
+import structlog
+from arq import Retry
+
+from polar.logging import Logger
+from polar.worker import JobContext, compute_backoff, get_worker_redis, task
+
+from .sender import Email, EmailSenderError, chunks
+
+log: Logger = structlog.get_logger()
+
+MAX_RETRIES = 5
+
+# Batches already sent by a job are remembered for its retries
+SENT_BATCHES_TTL_SECONDS = 60 * 60 * 24  # 1 day
+
+
+def _get_sent_batches_key(job_id: str) -> str:
+    return f"email:send:{job_id}:sent"
+
+
+@task("email.send")
+async def email_send(ctx: JobContext, emails: list[dict[str, Any]]) -> None:
+    """
+    Send emails in batches.
+
+    Each batch is sent with an idempotency key derived from the job and
+    its position, and is skipped when the job is retried after it was sent:
+    only batches which failed are sent again.
+    """
+    email_sender = ctx["email_sender"]
+    redis = get_worker_redis(ctx)
+    sent_batches_key = _get_sent_batches_key(ctx["job_id"])
+    sent_batches = {int(index) for index in await redis.smembers(sent_batches_key)}
+
+    failed_count = 0
+    error: EmailSenderError | None = None
+    batches = chunks(
+        [Email.model_validate(email) for email in emails], email_sender.batch_size
+    )
+    for index, batch in enumerate(batches):
+        if index in sent_batches:
+            continue
+
+        try:
+            await email_sender.send_batch(
+                batch, idempotency_key=f"{ctx['job_id']}:{index}"
+            )
+        except EmailSenderError as e:
+            if not e.retryable:
+                log.error("email.send.rejected", count=len(batch), error=str(e))
+                continue
+            failed_count += len(batch)
+            error = e
+            continue
+
+        async with redis.pipeline() as pipe:
+            pipe.sadd(sent_batches_key, index)
+            pipe.expire(sent_batches_key, SENT_BATCHES_TTL_SECONDS)
+            await pipe.execute()
+
+    if error is not None:
+        if ctx["job_try"] >= MAX_RETRIES:
+            log.error("email.send.failed", count=failed_count, error=str(error))
+            raise error
+        raise Retry(compute_backoff(ctx["job_try"], factor=2)) from error
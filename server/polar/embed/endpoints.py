@@ -1,12 +1,14 @@
-from fastapi import Depends, Request
+from fastapi import Depends, Request, Response
 from pydantic import UUID4
 
-from polar.exceptions import ResourceNotFound, ResourceNotModified
+from polar.exceptions import ResourceNotFound
 from polar.openapi import APITag
 from polar.postgres import AsyncSession, get_db_session
+from polar.product.catalog import ProductCatalog, get_product_catalog
 from polar.product.schemas import ProductID
-from polar.product.service.product import product as product_service
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
+from polar.storefront import cache
 
 from . import auth
 from .schemas import ProductEmbed
@@ -14,23 +16,29 @@ from .schemas import ProductEmbed
 router = APIRouter(prefix="/embed", tags=["embeds", APITag.private])
 
 
-@router.get("/product/{id}", summary="Product Embed")
+@router.get("/product/{id}", summary="Product Embed", response_model=ProductEmbed)
 async def get_product(
     request: Request,
     auth_subject: auth.EmbedsRead,
     id: ProductID,
     price_id: UUID4 | None = None,
     session: AsyncSession = Depends(get_db_session),
-) -> ProductEmbed:
+    redis: Redis = Depends(get_redis),
+    product_catalog: ProductCatalog = Depends(get_product_catalog),
+) -> Response:
     """Get product card."""
-    product = await product_service.get_embed(session, id)
-    if product is None:
+    cache_key = f"embed:product:{id}:{price_id}"
+    cached_response = await cache.get_response(redis, cache_key)
+    if cached_response is not None:
+        return cached_response.to_response(request)
+
+    product = await product_catalog.get_product(session, id)
+    if product is None or product.is_archived:
         raise ResourceNotFound()
 
-    cached_etag = request.headers.get("If-None-Match")
-    etag = product.etag
-    if cached_etag and etag == cached_etag:
-        raise ResourceNotModified()
+    versions = await cache.get_versions(
+        redis, product.organization_id, storefront=False
+    )
 
     cover = None
     if product.medias:
@@ -43,7 +51,7 @@ async def get_product(
                 price = p
                 break
 
-    return ProductEmbed.model_validate(
+    product_embed = ProductEmbed.model_validate(
         dict(
             id=product.id,
             name=product.name,
@@ -54,6 +62,11 @@ async def get_product(
             cover=cover,
             price=price,
             benefits=product.benefits,
-            etag=etag,
+            etag=product.etag,
         )
     )
+    response = cache.CachedResponse.from_content(
+        product_embed.model_dump_json(by_alias=True)
+    )
+    await cache.set_response(redis, cache_key, response, versions, product_catalog)
+    return response.to_response(request)
@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+from types import TracebackType
+from typing import Self
+
+import structlog
+from fastapi import Request
+from redis.exceptions import ConnectionError
+from uvicorn import Server
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+
+def _get_uvicorn_server() -> Server | None:
+    """
+    Hacky way to retrieve the Uvicorn server from the running asyncio tasks,
+    so we can check if it's shutting down.
+
+    We do this because the exit signal handler monkey-patch made by sse_starlette
+    doesn't work when running Uvicorn from the CLI,
+    preventing a graceful shutdown when a SSE connection is open.
+
+    It's only called once when the dispatcher starts.
+    """
+    try:
+        for task in asyncio.all_tasks():
+            coroutine = task.get_coro()
+            if coroutine is not None:
+                frame = getattr(coroutine, "cr_frame", None)
+                if frame is not None:
+                    args = frame.f_locals
+                    if self := args.get("self"):
+                        if isinstance(self, Server):
+                            return self
+    except RuntimeError:
+        pass
+    return None
+
+
+class Subscription:
+    """
+    Stream of messages received on a set of channels by a single client.
+
+    Messages are buffered in a bounded queue. If the client is too slow to consume
+    them, the oldest messages are dropped.
+    """
+
+    def __init__(self, channels: list[str], buffer_size: int) -> None:
+        self.channels = channels
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(buffer_size)
+
+    def put(self, message: str | None) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            log.debug(
+                "eventstream.subscription.message_dropped", channels=self.channels
+            )
+        self._queue.put_nowait(message)
+
+    def close(self) -> None:
+        self.put(None)
+
+    def __aiter__(self) -> Self:
+        return self
+
+    async def __anext__(self) -> str:
+        message = await self._queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class EventStreamDispatcher:
+    """
+    Fan out the messages of a single Redis pub/sub connection
+    to all the clients connected to this process.
+
+    Channels are subscribed on demand, and unsubscribed when no client
+    listens to them anymore.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        buffer_size: int = settings.EVENTSTREAM_CLIENT_BUFFER_SIZE,
+    ) -> None:
+        self._pubsub = redis.pubsub()
+        self._buffer_size = buffer_size
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = asyncio.Lock()
+        self._subscribed = asyncio.Event()
+        self._closed = False
+        self._server: Server | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._unsubscribe_tasks: set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> Self:
+        self._server = _get_uvicorn_server()
+        self._reader_task = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._close_subscriptions()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader_task
+        await self._pubsub.close()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channels: list[str]) -> AsyncIterator[Subscription]:
+        subscription = Subscription(channels, self._buffer_size)
+        try:
+            async with self._lock:
+                new_channels: list[str] = []
+                for channel in channels:
+                    if channel not in self._subscriptions:
+                        self._subscriptions[channel] = set()
+                        new_channels.append(channel)
+                    self._subscriptions[channel].add(subscription)
+                if new_channels:
+                    await self._pubsub.subscribe(*new_channels)
+                    self._subscribed.set()
+
+            if self._closed:
+                subscription.close()
+
+            yield subscription
+        finally:
+            # Don't await anything here: the client task is likely being cancelled
+            for channel in channels:
+                channel_subscriptions = self._subscriptions.get(channel)
+                if channel_subscriptions is not None:
+                    channel_subscriptions.discard(subscription)
+            task = asyncio.create_task(self._unsubscribe_unused_channels())
+            self._unsubscribe_tasks.add(task)
+            task.add_done_callback(self._unsubscribe_tasks.discard)
+
+    async def _unsubscribe_unused_channels(self) -> None:
+        async with self._lock:
+            unused_channels = [
+                channel
+                for channel, channel_subscriptions in self._subscriptions.items()
+                if not channel_subscriptions
+            ]
+            for channel in unused_channels:
+                del self._subscriptions[channel]
+            if unused_channels and not self._closed:
+                await self._pubsub.unsubscribe(*unused_channels)
+
+    async def _read(self) -> None:
+        await self._subscribed.wait()
+        while True:
+            if self._server is not None and self._server.should_exit:
+                log.info("eventstream.dispatcher.server_exiting")
+                self._close_subscriptions()
+                return
+
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except ConnectionError as e:
+                log.warning("eventstream.dispatcher.connection_error", error=str(e))
+                await asyncio.sleep(1.0)
+                continue
+
+            if message is None or message["type"] != "message":
+                continue
+
+            for subscription in self._subscriptions.get(message["channel"], ()):
+                subscription.put(message["data"])
+
+    def _close_subscriptions(self) -> None:
+        self._closed = True
+        for channel_subscriptions in self._subscriptions.values():
+            for subscription in channel_subscriptions:
+                subscription.close()
+
+
+async def get_eventstream_dispatcher(request: Request) -> EventStreamDispatcher:
+    return request.state.eventstream_dispatcher
+
+
+__all__ = ["EventStreamDispatcher", "Subscription", "get_eventstream_dispatcher"]
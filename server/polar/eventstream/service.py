@@ -47,29 +47,27 @@ class Event(BaseModel):
 
 
 async def send_event(redis: Redis, event_json: str, channels: list[str]) -> None:
-    for channel in channels:
-        await redis.publish(channel, event_json)
+    # Publish to all channels in a single round-trip
+    async with redis.pipeline(transaction=False) as pipe:
+        for channel in channels:
+            pipe.publish(channel, event_json)
+        await pipe.execute()
     log.debug(
         "Published event to eventstream", event_json=event_json, channels=channels
     )
 
 
-async def publish(
+async def _publish_event(
     key: str,
     payload: dict[str, Any],
-    user_id: UUID | None = None,
-    organization_id: UUID | None = None,
-    checkout_client_secret: str | None = None,
+    channels: list[str],
     *,
-    run_in_worker: bool = True,
-    redis: Redis | None = None,
+    run_in_worker: bool,
+    redis: Redis | None,
 ) -> None:
-    receivers = Receivers(
-        user_id=user_id,
-        organization_id=organization_id,
-        checkout_client_secret=checkout_client_secret,
-    )
-    channels = receivers.get_channels()
+    if not channels:
+        return
+
     event = Event(
         id=generate_uuid(),
         key=key,
@@ -84,6 +82,30 @@ async def publish(
         await send_event(redis, event, channels)
 
 
+async def publish(
+    key: str,
+    payload: dict[str, Any],
+    user_id: UUID | None = None,
+    organization_id: UUID | None = None,
+    checkout_client_secret: str | None = None,
+    *,
+    run_in_worker: bool = True,
+    redis: Redis | None = None,
+) -> None:
+    receivers = Receivers(
+        user_id=user_id,
+        organization_id=organization_id,
+        checkout_client_secret=checkout_client_secret,
+    )
+    await _publish_event(
+        key,
+        payload,
+        receivers.get_channels(),
+        run_in_worker=run_in_worker,
+        redis=redis,
+    )
+
+
 async def publish_members(
     session: AsyncSession,
     key: str,
@@ -97,20 +119,11 @@ async def publish_members(
         session, org_id=organization_id
     )
 
+    # Send the same event to all members at once
+    channels: list[str] = []
     for m in members:
-        receivers = Receivers(user_id=m.user_id)
-        channels = receivers.get_channels()
-        event = Event(
-            id=generate_uuid(),
-            key=key,
-            payload=payload,
-        ).model_dump_json()
-
-        if run_in_worker:
-            enqueue_job("eventstream.publish", event, channels)
-        else:
-            if redis is None:
-                raise RuntimeError(
-                    "Redis instance is required when run_in_worker is False"
-                )
-            await send_event(redis, event, channels)
+        channels.extend(Receivers(user_id=m.user_id).get_channels())
+
+    await _publish_event(
+        key, payload, channels, run_in_worker=run_in_worker, redis=redis
+    )
@@ -79,7 +79,7 @@ class FileService(ResourceServiceReader[File]):
         create_schema: FileCreate,
     ) -> FileUpload:
         s3_service = S3_SERVICES[create_schema.service]
-        upload = s3_service.create_multipart_upload(
+        upload = await s3_service.create_multipart_upload(
             create_schema, namespace=create_schema.service.value
         )
 
@@ -109,7 +109,7 @@ class FileService(ResourceServiceReader[File]):
         completed_schema: FileUploadCompleted,
     ) -> File:
         s3_service = S3_SERVICES[file.service]
-        s3file = s3_service.complete_multipart_upload(completed_schema)
+        s3file = await s3_service.complete_multipart_upload(completed_schema)
 
         file.is_uploaded = True
 
@@ -135,6 +135,7 @@ class FileService(ResourceServiceReader[File]):
             path=file.path,
             filename=file.name,
             mime_type=file.mime_type,
+            version=file.storage_version,
         )
         return FileDownload.from_presigned(file, url=url, expires_at=expires_at)
 
@@ -148,7 +149,7 @@ class FileService(ResourceServiceReader[File]):
         await session.execute(statement)
 
         s3_service = S3_SERVICES[file.service]
-        deleted = s3_service.delete_file(file.path)
+        deleted = await s3_service.delete_file(file.path)
         log.info("file.delete", file_id=file.id, s3_deleted=deleted)
         return True
 
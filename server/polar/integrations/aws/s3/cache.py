@@ -0,0 +1,52 @@
+import collections
+from collections.abc import Hashable
+from datetime import datetime, timedelta
+
+from polar.config import settings
+from polar.kit.utils import utc_now
+
+
+class PresignedURLCache:
+    """
+    Process-local LRU cache of presigned URLs.
+
+    An entry is reused until `margin` seconds before its expiration,
+    so clients always get a URL with some validity left.
+    """
+
+    def __init__(
+        self,
+        *,
+        margin: int = settings.S3_FILES_PRESIGN_CACHE_MARGIN,
+        max_size: int = settings.S3_FILES_URL_CACHE_SIZE,
+    ) -> None:
+        self._margin = timedelta(seconds=margin)
+        self._max_size = max_size
+        self._entries: collections.OrderedDict[Hashable, tuple[str, datetime]] = (
+            collections.OrderedDict()
+        )
+
+    def get(self, key: Hashable) -> tuple[str, datetime] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        _, expires_at = entry
+        if expires_at - self._margin <= utc_now():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, url: str, expires_at: datetime) -> None:
+        self._entries[key] = (url, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+__all__ = ["PresignedURLCache"]
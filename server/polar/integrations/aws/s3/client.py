@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING
 
 import boto3
+import botocore
 from botocore.config import Config
 
 from polar.config import settings
@@ -18,11 +20,22 @@ def get_client(
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
         config=Config(
-            region_name=settings.AWS_REGION, signature_version=signature_version
+            region_name=settings.AWS_REGION,
+            signature_version=signature_version,
+            max_pool_connections=settings.S3_MAX_CONCURRENCY,
         ),
     )
 
 
 client = get_client()
 
-__all__ = ("client", "get_client")
+# Used to build public URLs: no signature is computed.
+unsigned_client = get_client(signature_version=botocore.UNSIGNED)
+
+# boto3 is synchronous: requests are run in this pool to keep the event loop free.
+# It's sized like the client connection pool, so each thread gets a connection.
+executor = ThreadPoolExecutor(
+    max_workers=settings.S3_MAX_CONCURRENCY, thread_name_prefix="s3"
+)
+
+__all__ = ("client", "executor", "get_client", "unsigned_client")
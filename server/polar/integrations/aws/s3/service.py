@@ -1,14 +1,19 @@
+import asyncio
 import base64
+import functools
+from collections.abc import Callable
+from concurrent.futures import Executor
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar, cast
 
-import botocore
 import structlog
 from botocore.client import ClientError
 
+from polar.config import settings
 from polar.kit.utils import generate_uuid, utc_now
 
-from .client import client, get_client
+from .cache import PresignedURLCache
+from .client import client, executor, unsigned_client
 from .exceptions import S3FileError
 from .schemas import (
     S3File,
@@ -26,19 +31,52 @@ if TYPE_CHECKING:
 
 log = structlog.get_logger()
 
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+@functools.lru_cache(maxsize=settings.S3_FILES_URL_CACHE_SIZE)
+def _get_public_url(bucket: str, path: str) -> str:
+    # This is apparently the *only* way to get a public URL with boto3,
+    # apart from building a URL manually 🙄
+    # Ref: https://stackoverflow.com/a/48197923
+    return unsigned_client.generate_presigned_url(
+        "get_object", ExpiresIn=0, Params=dict(Bucket=bucket, Key=path)
+    )
+
 
 class S3Service:
+    """
+    S3 operations for a bucket.
+
+    Methods performing network requests are async: they run the boto3 client
+    in a thread pool so they don't block the event loop. Presigning is local
+    and stays synchronous.
+    """
+
     def __init__(
         self,
         bucket: str,
         presign_ttl: int = 600,
         client: "S3Client" = client,
+        executor: Executor = executor,
+        presign_cache: PresignedURLCache | None = None,
     ):
         self.bucket = bucket
         self.presign_ttl = presign_ttl
         self.client = client
+        self.executor = executor
+        self.presign_cache = presign_cache or PresignedURLCache()
+
+    async def _run(
+        self, func: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs
+    ) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
 
-    def create_multipart_upload(
+    async def create_multipart_upload(
         self, data: S3FileCreate, namespace: str = ""
     ) -> S3FileUpload:
         if not data.organization_id:
@@ -69,7 +107,8 @@ class S3Service:
             file.checksum_sha256_base64 = sha256_base64
             file.checksum_sha256_hex = base64.b64decode(sha256_base64).hex()
 
-        multipart_upload = self.client.create_multipart_upload(
+        multipart_upload = await self._run(
+            self.client.create_multipart_upload,
             Bucket=self.bucket,
             Key=file.path,
             ContentType=file.mime_type,
@@ -140,9 +179,12 @@ class S3Service:
             )
         return ret
 
-    def get_object_or_raise(self, path: str, s3_version_id: str = "") -> dict[str, Any]:
+    async def get_object_or_raise(
+        self, path: str, s3_version_id: str = ""
+    ) -> dict[str, Any]:
         try:
-            obj = self.client.get_object(
+            obj = await self._run(
+                self.client.get_object,
                 Bucket=self.bucket,
                 Key=path,
                 VersionId=s3_version_id,
@@ -153,26 +195,34 @@ class S3Service:
 
         return cast(dict[str, Any], obj)
 
-    def get_head_or_raise(self, path: str, s3_version_id: str = "") -> dict[str, Any]:
+    async def get_head_or_raise(
+        self, path: str, s3_version_id: str = ""
+    ) -> dict[str, Any]:
         try:
-            head = self.client.head_object(
-                Bucket=self.bucket, Key=path, VersionId=s3_version_id
+            head = await self._run(
+                self.client.head_object,
+                Bucket=self.bucket,
+                Key=path,
+                VersionId=s3_version_id,
             )
         except ClientError:
             raise S3FileError("No metadata from S3")
 
         return cast(dict[str, Any], head)
 
-    def complete_multipart_upload(self, data: S3FileUploadCompleted) -> S3File:
+    async def complete_multipart_upload(self, data: S3FileUploadCompleted) -> S3File:
         boto_arguments = data.get_boto3_arguments()
-        response = self.client.complete_multipart_upload(
-            Bucket=self.bucket, Key=data.path, **boto_arguments
+        response = await self._run(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=data.path,
+            **boto_arguments,
         )
         if not response:
             raise S3FileError("No response from S3")
 
         version_id = response.get("VersionId", "")
-        head = self.get_head_or_raise(data.path, s3_version_id=version_id)
+        head = await self.get_head_or_raise(data.path, s3_version_id=version_id)
         file = S3File.from_head(data.path, head)
         return file
 
@@ -182,7 +232,13 @@ class S3Service:
         path: str,
         filename: str,
         mime_type: str,
+        version: str | None = None,
     ) -> tuple[str, datetime]:
+        cache_key = (path, version, filename, mime_type)
+        cached = self.presign_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         expires_in = self.presign_ttl
         presign_from = utc_now()
         signed_download_url = self.client.generate_presigned_url(
@@ -199,17 +255,14 @@ class S3Service:
         )
 
         presign_expires_at = presign_from + timedelta(seconds=expires_in)
+        self.presign_cache.set(cache_key, signed_download_url, presign_expires_at)
         return (signed_download_url, presign_expires_at)
 
     def get_public_url(self, path: str) -> str:
-        # This is apparently the *only* way to get a public URL with boto3,
-        # apart from building a URL manually 🙄
-        # Ref: https://stackoverflow.com/a/48197923
-        unsigned_client = get_client(signature_version=botocore.UNSIGNED)
-        return unsigned_client.generate_presigned_url(
-            "get_object", ExpiresIn=0, Params=dict(Bucket=self.bucket, Key=path)
-        )
+        return _get_public_url(self.bucket, path)
 
-    def delete_file(self, path: str) -> bool:
-        deleted = self.client.delete_object(Bucket=self.bucket, Key=path)
+    async def delete_file(self, path: str) -> bool:
+        deleted = await self._run(
+            self.client.delete_object, Bucket=self.bucket, Key=path
+        )
         return deleted.get("DeleteMarker", False)
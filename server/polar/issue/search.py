@@ -1,35 +1,222 @@
-def search_query(text: str) -> str:
-    # cleanup search query
-    text = (
-        text.replace(":", "")
-        .replace("*", "")
-        .replace("|", "")
-        .replace("<", "")
-        .replace(">", "")
-        .replace("!", "")
-        .replace(")", "")
-        .replace("(", "")
-        .replace("'", "")
-        .replace("&", "")
-        .replace("/", "")
-        .replace(" OR ", "")
-        .replace(" AND ", "")
+"""
+Full-text search of issues.
+
+Issues are matched against a weighted search document made of their title,
+labels and body, backed by a GIN index. Typos in titles are tolerated thanks to
+a trigram index.
+
+A query is first planned, to pick the matching strategy:
+
+* `phrase`: the query is quoted, e.g. `"memory leak"`. Words must appear
+  in sequence.
+* `prefix`: every word is a prefix, e.g. `feat cli`.
+  Used when words are too short to be matched fuzzily.
+* `fuzzy`: prefix matching, plus titles with words similar to the query,
+  e.g. `documetation`.
+
+Ranked issue IDs are then kept in a short-lived process-local cache,
+so paginating or repeating hot queries doesn't rank matches again.
+Only the most relevant matches are kept: callers pass their own filters,
+so they're applied before matches are ranked and capped.
+"""
+
+import collections
+import dataclasses
+import re
+import time
+from collections.abc import Sequence
+from enum import StrEnum
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Select, Uuid, func, literal, or_, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from polar.config import settings
+from polar.models import Issue
+from polar.postgres import AsyncSession
+
+# Minimum length of a word to be matched fuzzily
+FUZZY_MIN_LENGTH = 4
+
+_OPERATORS_RE = re.compile(r"[:*|<>!()'&/\\]")
+_BOOLEAN_KEYWORDS_RE = re.compile(r"\s(OR|AND)\s")
+
+
+class SearchMode(StrEnum):
+    phrase = "phrase"
+    prefix = "prefix"
+    fuzzy = "fuzzy"
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchPlan:
+    mode: SearchMode
+    text: str
+    words: tuple[str, ...]
+
+    @property
+    def tsquery(self) -> ColumnElement[Any]:
+        if self.mode == SearchMode.phrase:
+            return func.phraseto_tsquery("simple", self.text)
+        # Convert a user query like "feat cli" to "feat:* | cli:*"
+        return func.to_tsquery("simple", " | ".join(f"{w}:*" for w in self.words))
+
+    @property
+    def clause(self) -> ColumnElement[bool]:
+        clause: ColumnElement[bool] = Issue.search_tsv.bool_op("@@")(self.tsquery)
+        if self.mode == SearchMode.fuzzy:
+            # `<%` is true when the query is similar to a word of the title
+            clause = or_(clause, literal(self.text).bool_op("<%")(Issue.title))
+        return clause
+
+    @property
+    def rank(self) -> ColumnElement[float]:
+        rank: ColumnElement[float] = func.ts_rank_cd(Issue.search_tsv, self.tsquery)
+        if self.mode == SearchMode.fuzzy:
+            rank = rank + func.word_similarity(self.text, Issue.title)
+        return rank
+
+
+def plan_search(text: str) -> SearchPlan | None:
+    """
+    Pick the matching strategy of a user query.
+
+    Returns:
+        The search plan, or `None` if the query doesn't contain any word.
+    """
+    text = text.strip()
+    is_phrase = len(text) > 1 and text.startswith('"') and text.endswith('"')
+
+    text = _BOOLEAN_KEYWORDS_RE.sub(" ", text.replace('"', ""))
+    text = _OPERATORS_RE.sub("", text)
+    words = tuple(word for word in text.split() if word)
+    if not words:
+        return None
+
+    text = " ".join(words)
+    if is_phrase:
+        return SearchPlan(SearchMode.phrase, text, words)
+    if any(len(word) >= FUZZY_MIN_LENGTH for word in words):
+        return SearchPlan(SearchMode.fuzzy, text, words)
+    return SearchPlan(SearchMode.prefix, text, words)
+
+
+_CacheKey = tuple[SearchPlan, str, tuple[tuple[str, Any], ...]]
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list | tuple):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _get_cache_key(plan: SearchPlan, candidates: Select[tuple[UUID]]) -> _CacheKey:
+    compiled = candidates.compile(dialect=postgresql.dialect())
+    return (
+        plan,
+        str(compiled),
+        tuple(sorted((k, _hashable(v)) for k, v in compiled.params.items())),
     )
 
-    # Search in titles using the vector index
-    # https://www.postgresql.org/docs/current/textsearch-controls.html#TEXTSEARCH-PARSING-QUERIES
-    #
-    # The index supports fast matching of words and prefix-matching of words
-    #
-    # Here we're converting a user query like "feat cli" to
-    # "feat:* | cli:*"
-    words = text.split(" ")
 
-    # remove empty words
-    words = [w for w in words if len(w.strip()) > 0]
+class IssueSearch:
+    """
+    Search issues and rank them by relevance.
+
+    Only the ranked IDs of matching issues are returned,
+    cached by query and filters.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: int = settings.ISSUE_SEARCH_CACHE_TTL_SECONDS,
+        max_size: int = settings.ISSUE_SEARCH_CACHE_MAX_SIZE,
+        max_results: int = settings.ISSUE_SEARCH_MAX_RESULTS,
+    ) -> None:
+        self._ttl = ttl
+        self._max_size = max_size
+        self._max_results = max_results
+        self._cache: collections.OrderedDict[_CacheKey, tuple[float, list[UUID]]] = (
+            collections.OrderedDict()
+        )
+
+    async def search(
+        self,
+        session: AsyncSession,
+        plan: SearchPlan,
+        candidates: Select[tuple[UUID]],
+    ) -> list[UUID]:
+        """
+        Return the IDs of the issues matching the search, most relevant first.
+
+        Args:
+            candidates: Statement selecting the IDs of the issues to search in,
+            with every filter of the caller, e.g. `statement.with_only_columns(Issue.id)`.
+            It's part of the cache key: issues filtered out by the caller
+            never take the place of the ones they can list.
+        """
+        key = _get_cache_key(plan, candidates)
+        issue_ids = self._get_cached(key)
+        if issue_ids is not None:
+            return issue_ids
+
+        statement = (
+            select(Issue.id)
+            .where(
+                Issue.deleted_at.is_(None),
+                Issue.id.in_(candidates.order_by(None)),
+                plan.clause,
+            )
+            .order_by(plan.rank.desc(), Issue.id)
+            .limit(self._max_results)
+        )
+
+        result = await session.execute(statement)
+        issue_ids = list(result.scalars().all())
+        self._set_cached(key, issue_ids)
+        return issue_ids
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _get_cached(self, key: _CacheKey) -> list[UUID] | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        cached_until, issue_ids = entry
+        if cached_until <= time.monotonic():
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return issue_ids
+
+    def _set_cached(self, key: _CacheKey, issue_ids: list[UUID]) -> None:
+        self._cache[key] = (time.monotonic() + self._ttl, issue_ids)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+
+def order_by_relevance(issue_ids: Sequence[UUID]) -> ColumnElement[int]:
+    """
+    Sort issues in the order returned by `IssueSearch.search`.
+    """
+    return func.array_position(literal(list(issue_ids), ARRAY(Uuid)), Issue.id)
+
+
+issue_search = IssueSearch()
 
-    # convert all words to prefix matches
-    words = [f"{w}:*" for w in words]
 
-    # OR all words
-    return " | ".join(words)
+__all__ = [
+    "SearchMode",
+    "SearchPlan",
+    "plan_search",
+    "IssueSearch",
+    "issue_search",
+    "order_by_relevance",
+]
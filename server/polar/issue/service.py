@@ -14,7 +14,6 @@ from sqlalchemy import (
     and_,
     asc,
     desc,
-    func,
     nullslast,
     or_,
     select,
@@ -24,7 +23,7 @@ from sqlalchemy.orm import aliased, contains_eager, joinedload
 from polar.auth.models import Anonymous, AuthSubject, is_organization, is_user
 from polar.dashboard.schemas import IssueSortBy
 from polar.enums import Platforms
-from polar.issue.search import search_query
+from polar.issue.search import issue_search, order_by_relevance, plan_search
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceService
 from polar.kit.sorting import Sorting
@@ -320,7 +319,11 @@ class IssueService(ResourceService[Issue, IssueCreate, IssueUpdate]):
                     # listings after it's been confirmed. Which can be unexpected
                     # from a user point of view, and also causes som bugs in the UI,
                     # if an element that currently has spawned a modal disappears.
-                    Issue.confirmed_solved_at > utc_now() - timedelta(hours=12),
+                    #
+                    # Truncated to the minute, so text searches with this filter
+                    # can be served from the search cache.
+                    Issue.confirmed_solved_at
+                    > utc_now().replace(second=0, microsecond=0) - timedelta(hours=12),
                 )
             )
         elif not show_closed:
@@ -328,16 +331,20 @@ class IssueService(ResourceService[Issue, IssueCreate, IssueUpdate]):
 
         # free text search
         if text:
-            search = search_query(text)
-
-            statement = statement.where(
-                Issue.title_tsv.bool_op("@@")(func.to_tsquery(search))
+            plan = plan_search(text)
+            matching_issue_ids = (
+                await issue_search.search(
+                    session, plan, statement.with_only_columns(Issue.id)
+                )
+                if plan is not None
+                else []
             )
+            statement = statement.where(Issue.id.in_(matching_issue_ids))
 
             # Sort results based on matching
             if sort_by == IssueSortBy.relevance:
                 statement = statement.order_by(
-                    desc(func.ts_rank_cd(Issue.title_tsv, func.to_tsquery(search)))
+                    order_by_relevance(matching_issue_ids).asc()
                 )
 
         if sort_by == IssueSortBy.issues_default:
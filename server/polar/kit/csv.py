@@ -1,6 +1,7 @@
 import collections
 import csv
-from collections.abc import Iterable
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
 from typing import TYPE_CHECKING, Any, BinaryIO
 
 if TYPE_CHECKING:
@@ -87,3 +88,20 @@ class IterableCSVWriter:
 
     def read(self) -> str:
         return self._lines.popleft()
+
+
+async def gzip_iterable(
+    content: AsyncIterable[str], *, encoding: str = "utf-8", level: int = 6
+) -> AsyncIterator[bytes]:
+    """
+    Compress a stream of strings on the fly into a gzip stream.
+
+    It's useful to serve large CSV exports with StreamingResponse,
+    without having to buffer the whole file in memory.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in content:
+        compressed = compressor.compress(chunk.encode(encoding))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
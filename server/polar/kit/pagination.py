@@ -1,15 +1,35 @@
+import base64
+import binascii
+import json
 import math
+import uuid
 from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
 from typing import Annotated, Any, Generic, NamedTuple, Self, TypeVar, overload
 
 from fastapi import Depends, Query
 from pydantic import BaseModel, GetCoreSchemaHandler
 from pydantic._internal._repr import display_as_type
 from pydantic_core import CoreSchema
-from sqlalchemy import Select, func, over
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    SQLColumnExpression,
+    UnaryExpression,
+    and_,
+    asc,
+    desc,
+    false,
+    func,
+    or_,
+    over,
+)
 from sqlalchemy.sql._typing import _ColumnsClauseArgument
 
 from polar.config import settings
+from polar.exceptions import PolarRequestValidationError
 from polar.kit.db.models import RecordModel
 from polar.kit.db.models.base import Model
 from polar.kit.db.postgres import AsyncSession
@@ -23,6 +43,7 @@ M = TypeVar("M", bound=Model)
 class PaginationParams(NamedTuple):
     page: int
     limit: int
+    cursor: str | None = None
 
 
 @overload
@@ -62,7 +83,7 @@ async def paginate(
     pagination: PaginationParams,
     count_clause: _ColumnsClauseArgument[Any] | None = None,
 ) -> tuple[Sequence[Any], int]:
-    page, limit = pagination
+    page, limit, _ = pagination
     offset = limit * (page - 1)
     statement = statement.offset(offset).limit(limit)
 
@@ -86,6 +107,214 @@ async def paginate(
     return results, count
 
 
+class KeysetColumn(NamedTuple):
+    """
+    A sorting criterion of a keyset-paginated statement.
+
+    The last criterion should be unique, like the primary key, so the ordering
+    is deterministic.
+    """
+
+    expression: SQLColumnExpression[Any]
+    descending: bool = False
+    nulls_last: bool | None = None
+    """If `None`, follows PostgreSQL default: last if ascending, first otherwise."""
+
+    def get_order_by_clause(self) -> UnaryExpression[Any]:
+        clause = desc(self.expression) if self.descending else asc(self.expression)
+        if self.nulls_last is True:
+            return clause.nulls_last()
+        if self.nulls_last is False:
+            return clause.nulls_first()
+        return clause
+
+    def get_after_clause(self, value: Any) -> ColumnElement[bool]:
+        nulls_last = not self.descending if self.nulls_last is None else self.nulls_last
+        if value is None:
+            return false() if nulls_last else self.expression.is_not(None)
+        clause = self.expression < value if self.descending else self.expression > value
+        if nulls_last:
+            return or_(clause, self.expression.is_(None))
+        return clause
+
+    def get_equal_clause(self, value: Any) -> ColumnElement[bool]:
+        if value is None:
+            return self.expression.is_(None)
+        return self.expression == value
+
+
+def _encode_cursor_value(value: Any) -> list[Any]:
+    if value is None or isinstance(value, bool | int | float):
+        return ["", value]
+    if isinstance(value, Enum):
+        return ["", value.value]
+    if isinstance(value, str):
+        return ["", value]
+    if isinstance(value, datetime):
+        return ["datetime", value.isoformat()]
+    if isinstance(value, uuid.UUID):
+        return ["uuid", str(value)]
+    if isinstance(value, Decimal):
+        return ["decimal", str(value)]
+    raise TypeError(f"Can't encode {type(value)} in a pagination cursor")
+
+
+def _decode_cursor_value(encoded: list[Any]) -> Any:
+    type, value = encoded
+    if type == "datetime":
+        return datetime.fromisoformat(value)
+    if type == "uuid":
+        return uuid.UUID(value)
+    if type == "decimal":
+        return Decimal(value)
+    return value
+
+
+def _encode_cursor(values: Sequence[Any], total_count: int) -> str:
+    data = {"k": [_encode_cursor_value(v) for v in values], "c": total_count}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("utf-8")
+
+
+def _decode_cursor(cursor: str, length: int) -> tuple[list[Any], int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+        values = [_decode_cursor_value(v) for v in data["k"]]
+        total_count = int(data["c"])
+        if len(values) != length:
+            raise ValueError()
+    except (
+        binascii.Error,
+        UnicodeDecodeError,
+        json.JSONDecodeError,
+        KeyError,
+        TypeError,
+        ValueError,
+    ) as e:
+        raise PolarRequestValidationError(
+            [
+                {
+                    "loc": ("query", "cursor"),
+                    "input": cursor,
+                    "msg": "Invalid cursor.",
+                    "type": "value_error",
+                }
+            ]
+        ) from e
+    return values, total_count
+
+
+def _get_seek_clause(
+    keyset: Sequence[KeysetColumn], values: Sequence[Any]
+) -> ColumnElement[bool]:
+    clauses: list[ColumnElement[bool]] = []
+    for i, column in enumerate(keyset):
+        clauses.append(
+            and_(
+                *(keyset[j].get_equal_clause(values[j]) for j in range(i)),
+                column.get_after_clause(values[i]),
+            )
+        )
+    return or_(*clauses)
+
+
+@overload
+async def paginate_keyset(
+    session: AsyncSession,
+    statement: Select[tuple[RM]],
+    *,
+    pagination: PaginationParams,
+    keyset: Sequence[KeysetColumn],
+) -> tuple[Sequence[RM], int, str | None]: ...
+
+
+@overload
+async def paginate_keyset(
+    session: AsyncSession,
+    statement: Select[tuple[M]],
+    *,
+    pagination: PaginationParams,
+    keyset: Sequence[KeysetColumn],
+) -> tuple[Sequence[M], int, str | None]: ...
+
+
+@overload
+async def paginate_keyset(
+    session: AsyncSession,
+    statement: Select[T],
+    *,
+    pagination: PaginationParams,
+    keyset: Sequence[KeysetColumn],
+) -> tuple[Sequence[T], int, str | None]: ...
+
+
+async def paginate_keyset(
+    session: AsyncSession,
+    statement: Select[Any],
+    *,
+    pagination: PaginationParams,
+    keyset: Sequence[KeysetColumn],
+) -> tuple[Sequence[Any], int, str | None]:
+    """
+    Paginate a statement, supporting both page-based and cursor-based pagination.
+
+    Without a cursor, it behaves like `paginate`, but also returns a cursor
+    to the next page.
+
+    With a cursor, it seeks directly after the last row of the previous page,
+    using the `keyset` ordering, instead of scanning and counting all the previous
+    rows. In this mode, the total count is the one computed when the first page
+    was fetched, carried along by the cursor: it's an estimate.
+
+    The `keyset` determines the ordering of the statement, so it shouldn't
+    be ordered beforehand.
+    """
+    page, limit, cursor = pagination
+    statement = statement.order_by(*(column.get_order_by_clause() for column in keyset))
+    keyset_columns = [column.expression for column in keyset]
+
+    if cursor is None:
+        offset = limit * (page - 1)
+        statement = statement.offset(offset).limit(limit)
+        statement = statement.add_columns(over(func.count()), *keyset_columns)
+    else:
+        values, total_count = _decode_cursor(cursor, len(keyset))
+        statement = statement.where(_get_seek_clause(keyset, values))
+        # Fetch one more row to know if there is a next page
+        statement = statement.limit(limit + 1)
+        statement = statement.add_columns(*keyset_columns)
+
+    result = await session.execute(statement)
+
+    results: list[Any] = []
+    last_keyset_values: Sequence[Any] = []
+    has_next_page = False
+    for row in result.unique().all():
+        data = row._tuple()
+        if cursor is None:
+            total_count = int(data[-len(keyset) - 1])
+            queried_data = data[: -len(keyset) - 1]
+        else:
+            if len(results) == limit:
+                has_next_page = True
+                break
+            queried_data = data[: -len(keyset)]
+        last_keyset_values = data[-len(keyset) :]
+        if len(queried_data) == 1:
+            results.append(queried_data[0])
+        else:
+            results.append(queried_data)
+
+    if cursor is None:
+        if not results:
+            total_count = 0
+        has_next_page = offset + len(results) < total_count
+
+    next_cursor = (
+        _encode_cursor(last_keyset_values, total_count) if has_next_page else None
+    )
+    return results, total_count, next_cursor
+
+
 async def get_pagination_params(
     page: int = Query(1, description="Page number, defaults to 1.", gt=0),
     limit: int = Query(
@@ -103,9 +332,30 @@ async def get_pagination_params(
 PaginationParamsQuery = Annotated[PaginationParams, Depends(get_pagination_params)]
 
 
+async def get_cursor_pagination_params(
+    pagination: PaginationParamsQuery,
+    cursor: str | None = Query(
+        None,
+        description=(
+            "Cursor to fetch the page following the one "
+            "that returned this `pagination.next_cursor`. "
+            "When set, `page` is ignored. "
+            "It's faster than `page` to go through large lists."
+        ),
+    ),
+) -> PaginationParams:
+    return pagination._replace(cursor=cursor)
+
+
+CursorPaginationParamsQuery = Annotated[
+    PaginationParams, Depends(get_cursor_pagination_params)
+]
+
+
 class Pagination(Schema):
     total_count: int
     max_page: int
+    next_cursor: str | None = None
 
 
 class ListResource(BaseModel, Generic[T]):
@@ -114,13 +364,18 @@ class ListResource(BaseModel, Generic[T]):
 
     @classmethod
     def from_paginated_results(
-        cls, items: Sequence[T], total_count: int, pagination_params: PaginationParams
+        cls,
+        items: Sequence[T],
+        total_count: int,
+        pagination_params: PaginationParams,
+        next_cursor: str | None = None,
     ) -> Self:
         return cls(
             items=list(items),
             pagination=Pagination(
                 total_count=total_count,
                 max_page=math.ceil(total_count / pagination_params.limit),
+                next_cursor=next_cursor,
             ),
         )
 
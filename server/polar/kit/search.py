@@ -0,0 +1,75 @@
+"""
+Search of short text columns, like names, slugs or codes, backed by `pg_trgm`.
+
+Searched columns need a GIN index with the `gin_trgm_ops` operator class,
+which serves both substring matching and similarity operators:
+
+    Index(
+        "ix_products_name_trgm",
+        "name",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+"""
+
+import dataclasses
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import ColumnElement, Text, cast, func, literal, or_
+from sqlalchemy.orm import InstrumentedAttribute
+
+# Minimum length of a query to be matched fuzzily
+FUZZY_MIN_LENGTH = 4
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclasses.dataclass(frozen=True)
+class TrigramSearch:
+    """
+    Match columns containing the query, or words similar to it,
+    and rank them by similarity.
+
+    Example:
+        >>> search = TrigramSearch(query, [Product.name])
+        >>> statement.where(search.clause).order_by(search.rank.desc())
+    """
+
+    query: str
+    columns: Sequence[InstrumentedAttribute[Any]]
+
+    @property
+    def clause(self) -> ColumnElement[bool]:
+        clauses: list[ColumnElement[bool]] = []
+        for column in self._text_columns:
+            clauses.append(column.ilike(f"%{_escape_like(self.query)}%", escape="\\"))
+            if len(self.query) >= FUZZY_MIN_LENGTH:
+                # `<%` is true when the query is similar to a word of the column
+                clauses.append(self._literal_query.bool_op("<%")(column))
+        return or_(*clauses)
+
+    @property
+    def rank(self) -> ColumnElement[float]:
+        similarities = [
+            func.word_similarity(self._literal_query, column)
+            for column in self._text_columns
+        ]
+        if len(similarities) == 1:
+            return similarities[0]
+        return func.greatest(*similarities)
+
+    @property
+    def _literal_query(self) -> ColumnElement[str]:
+        return literal(self.query, Text)
+
+    @property
+    def _text_columns(self) -> list[ColumnElement[str]]:
+        # Case-insensitive CITEXT columns have their own LIKE operators,
+        # which can't use trigram indexes: compare them as text.
+        return [cast(column, Text) for column in self.columns]
+
+
+__all__ = ["FUZZY_MIN_LENGTH", "TrigramSearch"]
@@ -5,12 +5,16 @@ from polar.authz.service import AccessType, Authz
 from polar.benefit.schemas import BenefitID
 from polar.exceptions import ResourceNotFound, Unauthorized
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import LicenseKey, LicenseKeyActivation
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
@@ -44,7 +48,7 @@ router = APIRouter(
 )
 async def list(
     auth_subject: auth.LicenseKeysRead,
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, title="OrganizationID Filter", description="Filter by organization ID."
     ),
@@ -54,7 +58,7 @@ async def list(
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[LicenseKeyRead]:
     """Get license keys connected to the given organization & filters."""
-    results, count = await license_key_service.get_list(
+    results, count, next_cursor = await license_key_service.get_list(
         session,
         auth_subject,
         organization_ids=organization_id,
@@ -66,6 +70,7 @@ async def list(
         [LicenseKeyRead.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
     )
 
 
@@ -109,6 +114,7 @@ async def update(
     id: UUID4,
     updates: LicenseKeyUpdate,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
     authz: Authz = Depends(Authz.authz),
 ) -> LicenseKey:
     """Update a license key."""
@@ -119,7 +125,9 @@ async def update(
     if not await authz.can(auth_subject.subject, AccessType.write, lk):
         raise Unauthorized()
 
-    updated = await license_key_service.update(session, license_key=lk, updates=updates)
+    updated = await license_key_service.update(
+        session, redis, license_key=lk, updates=updates
+    )
     return updated
 
 
@@ -1,13 +1,19 @@
 from collections.abc import Sequence
+from datetime import datetime
+from typing import NoReturn
 from uuid import UUID
 
 import structlog
-from sqlalchemy import Select, and_, func, select
-from sqlalchemy.orm import contains_eager, joinedload
+from redis import RedisError
+from sqlalchemy import Select, and_, or_, select, update
+from sqlalchemy.orm import aliased, contains_eager, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.auth.models import AuthSubject, is_organization, is_user
+from polar.config import settings
 from polar.exceptions import BadRequest, NotPermitted, ResourceNotFound
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import KeysetColumn, PaginationParams, paginate_keyset
+from polar.kit.schemas import Schema
 from polar.kit.services import ResourceService
 from polar.kit.utils import utc_now
 from polar.models import (
@@ -19,7 +25,9 @@ from polar.models import (
     UserOrganization,
 )
 from polar.models.benefit import BenefitLicenseKeys
+from polar.models.license_key import LicenseKeyStatus
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 
 from .schemas import (
     LicenseKeyActivate,
@@ -32,6 +40,25 @@ from .schemas import (
 log = structlog.get_logger()
 
 
+class CachedLicenseKey(Schema):
+    """
+    Immutable or rarely changing attributes of a license key, cached to
+    reject invalid validations and find the key without querying the database.
+    """
+
+    id: UUID
+    organization_id: UUID
+    key: str
+    user_id: UUID
+    benefit_id: UUID
+    status: LicenseKeyStatus
+    expires_at: datetime | None
+
+
+def _get_cache_key(organization_id: UUID, key: str) -> str:
+    return f"license_key:{organization_id}:{key}"
+
+
 class LicenseKeyService(
     ResourceService[LicenseKey, LicenseKeyCreate, LicenseKeyUpdate]
 ):
@@ -143,8 +170,8 @@ class LicenseKeyService(
         pagination: PaginationParams,
         benefit_ids: Sequence[UUID] | None = None,
         organization_ids: Sequence[UUID] | None = None,
-    ) -> tuple[Sequence[LicenseKey], int]:
-        query = self._get_select_base().order_by(LicenseKey.created_at.asc())
+    ) -> tuple[Sequence[LicenseKey], int, str | None]:
+        query = self._get_select_base()
 
         if is_user(auth_subject):
             user = auth_subject.subject
@@ -163,7 +190,9 @@ class LicenseKeyService(
         if benefit_ids:
             query = query.where(LicenseKey.benefit_id.in_(benefit_ids))
 
-        return await paginate(session, query, pagination=pagination)
+        return await paginate_keyset(
+            session, query, pagination=pagination, keyset=self._get_list_keyset()
+        )
 
     async def get_user_list(
         self,
@@ -173,23 +202,22 @@ class LicenseKeyService(
         pagination: PaginationParams,
         benefit_id: UUID | None = None,
         organization_ids: Sequence[UUID] | None = None,
-    ) -> tuple[Sequence[LicenseKey], int]:
-        query = (
-            self._get_select_base()
-            .where(LicenseKey.user_id == user.id)
-            .order_by(LicenseKey.created_at.asc())
-        )
+    ) -> tuple[Sequence[LicenseKey], int, str | None]:
+        query = self._get_select_base().where(LicenseKey.user_id == user.id)
         if organization_ids:
             query = query.where(LicenseKey.organization_id.in_(organization_ids))
 
         if benefit_id:
             query = query.where(LicenseKey.benefit_id == benefit_id)
 
-        return await paginate(session, query, pagination=pagination)
+        return await paginate_keyset(
+            session, query, pagination=pagination, keyset=self._get_list_keyset()
+        )
 
     async def update(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key: LicenseKey,
         updates: LicenseKeyUpdate,
@@ -200,92 +228,100 @@ class LicenseKeyService(
 
         session.add(license_key)
         await session.flush()
+        await self._invalidate_cache(redis, license_key)
         return license_key
 
     async def validate(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
-        license_key: LicenseKey,
         validate: LicenseKeyValidate,
     ) -> tuple[LicenseKey, LicenseKeyActivation | None]:
-        if not license_key.is_active():
-            log.info(
-                "license_key.validate.invalid_status",
-                license_key_id=license_key.id,
-                organization_id=license_key.organization_id,
-                user=license_key.user_id,
-                benefit_id=license_key.benefit_id,
+        cached = await self._get_cached(redis, validate.organization_id, validate.key)
+        if cached is not None:
+            self._check_validate(cached, validate)
+
+        # Check and count the validation in a single conditional statement,
+        # so concurrent validations can't oversubscribe the usage limit.
+        now = utc_now()
+        update_statement = (
+            update(LicenseKey)
+            .where(
+                LicenseKey.deleted_at.is_(None),
+                LicenseKey.status == LicenseKeyStatus.granted,
+                or_(LicenseKey.expires_at.is_(None), LicenseKey.expires_at > now),
             )
-            raise ResourceNotFound("License key is no longer active.")
-
-        if license_key.expires_at:
-            if utc_now() >= license_key.expires_at:
-                log.info(
-                    "license_key.validate.invalid_ttl",
-                    license_key_id=license_key.id,
-                    organization_id=license_key.organization_id,
-                    user=license_key.user_id,
-                    benefit_id=license_key.benefit_id,
-                )
-                raise ResourceNotFound("License key has expired.")
+            .values(validations=LicenseKey.validations + 1, last_validated_at=now)
+            .returning(*LicenseKey.__table__.c)
+        )
 
-        activation = None
-        if validate.activation_id:
-            activation = await self.get_activation_or_raise(
-                session,
-                license_key=license_key,
-                activation_id=validate.activation_id,
+        if cached is not None:
+            update_statement = update_statement.where(LicenseKey.id == cached.id)
+        else:
+            update_statement = update_statement.where(
+                LicenseKey.organization_id == validate.organization_id,
+                LicenseKey.key == validate.key,
             )
-            if activation.conditions and validate.conditions != activation.conditions:
-                # Skip logging UGC conditions
-                log.info(
-                    "license_key.validate.invalid_conditions",
-                    license_key_id=license_key.id,
-                    organization_id=license_key.organization_id,
-                    user=license_key.user_id,
-                    benefit_id=license_key.benefit_id,
-                )
-                raise ResourceNotFound("License key does not match required conditions")
 
-        if validate.benefit_id and validate.benefit_id != license_key.benefit_id:
-            log.info(
-                "license_key.validate.invalid_benefit",
-                license_key_id=license_key.id,
-                organization_id=license_key.organization_id,
-                user=license_key.user_id,
-                benefit_id=license_key.benefit_id,
-                validate_benefit_id=validate.benefit_id,
+        if validate.benefit_id:
+            update_statement = update_statement.where(
+                LicenseKey.benefit_id == validate.benefit_id
             )
-            raise ResourceNotFound("License key does not match given benefit.")
 
-        if validate.user_id and validate.user_id != license_key.user_id:
-            log.warn(
-                "license_key.validate.invalid_owner",
-                license_key_id=license_key.id,
-                organization_id=license_key.organization_id,
-                user=license_key.user_id,
-                benefit_id=license_key.benefit_id,
-                validate_user_id=validate.user_id,
+        if validate.user_id:
+            update_statement = update_statement.where(
+                LicenseKey.user_id == validate.user_id
             )
-            raise ResourceNotFound("License key does not match given user.")
 
-        if validate.increment_usage and license_key.limit_usage:
-            remaining = license_key.limit_usage - license_key.usage
-            if validate.increment_usage > remaining:
-                log.info(
-                    "license_key.validate.insufficient_usage",
-                    license_key_id=license_key.id,
-                    organization_id=license_key.organization_id,
-                    user=license_key.user_id,
-                    benefit_id=license_key.benefit_id,
-                    usage_remaining=remaining,
-                    usage_requested=validate.increment_usage,
+        if validate.increment_usage:
+            update_statement = update_statement.where(
+                or_(
+                    LicenseKey.limit_usage.is_(None),
+                    LicenseKey.usage + validate.increment_usage
+                    <= LicenseKey.limit_usage,
                 )
-                raise BadRequest(f"License key only has {remaining} more usages.")
+            ).values(usage=LicenseKey.usage + validate.increment_usage)
+
+        # Load the updated license key, its user and the activation
+        # with the same statement.
+        # Joins aren't supported on the CTE of an UPDATE: relate them in WHERE.
+        validated = update_statement.cte("validated_license_key")
+        validated_license_key = aliased(LicenseKey, validated)
+        statement = (
+            select(validated_license_key, User)
+            .where(User.id == validated_license_key.user_id)
+            .execution_options(populate_existing=True)
+        )
+        if validate.activation_id:
+            statement = statement.add_columns(LicenseKeyActivation).where(
+                LicenseKeyActivation.id == validate.activation_id,
+                LicenseKeyActivation.license_key_id == validated_license_key.id,
+                LicenseKeyActivation.deleted_at.is_(None),
+            )
+
+        result = await session.execute(statement)
+        row = result.unique().one_or_none()
+
+        # The key didn't validate, or the activation doesn't exist
+        if row is None:
+            if cached is not None:
+                await self._invalidate_cache(redis, cached)
+            await self._raise_validate_error(session, validate)
+
+        license_key, user = row[0], row[1]
+        set_committed_value(license_key, "user", user)
+
+        activation: LicenseKeyActivation | None = (
+            row[2] if validate.activation_id else None
+        )
+        if activation is not None:
+            set_committed_value(activation, "license_key", license_key)
+            self._check_validate_activation(activation, validate)
+
+        if cached is None:
+            await self._set_cached(redis, license_key)
 
-        license_key.mark_validated(increment_usage=validate.increment_usage)
-        session.add(license_key)
         log.info(
             "license_key.validate",
             license_key_id=license_key.id,
@@ -295,21 +331,6 @@ class LicenseKeyService(
         )
         return (license_key, activation)
 
-    async def get_activation_count(
-        self,
-        session: AsyncSession,
-        license_key: LicenseKey,
-    ) -> int:
-        query = select(func.count(LicenseKeyActivation.id)).where(
-            LicenseKeyActivation.license_key_id == license_key.id,
-            LicenseKeyActivation.deleted_at.is_(None),
-        )
-        res = await session.execute(query)
-        count = res.scalar()
-        if count:
-            return count
-        return 0
-
     async def activate(
         self,
         session: AsyncSession,
@@ -319,11 +340,19 @@ class LicenseKeyService(
         if not license_key.limit_activations:
             raise NotPermitted("License key does not require activation")
 
-        current_activation_count = await self.get_activation_count(
-            session,
-            license_key=license_key,
+        # Reserve an activation slot in a single conditional statement,
+        # so concurrent activations can't exceed the limit.
+        statement = (
+            update(LicenseKey)
+            .where(
+                LicenseKey.id == license_key.id,
+                LicenseKey.activation_count < LicenseKey.limit_activations,
+            )
+            .values(activation_count=LicenseKey.activation_count + 1)
+            .returning(LicenseKey.activation_count)
         )
-        if current_activation_count >= license_key.limit_activations:
+        result = await session.execute(statement)
+        if result.scalar_one_or_none() is None:
             log.info(
                 "license_key.activate.limit_reached",
                 license_key_id=license_key.id,
@@ -358,28 +387,40 @@ class LicenseKeyService(
         license_key: LicenseKey,
         deactivate: LicenseKeyDeactivate,
     ) -> bool:
-        activation = await self.get_activation_or_raise(
-            session,
-            license_key=license_key,
-            activation_id=deactivate.activation_id,
+        statement = (
+            update(LicenseKeyActivation)
+            .where(
+                LicenseKeyActivation.id == deactivate.activation_id,
+                LicenseKeyActivation.license_key_id == license_key.id,
+                LicenseKeyActivation.deleted_at.is_(None),
+            )
+            .values(deleted_at=utc_now())
+            .returning(LicenseKeyActivation.id)
+        )
+        result = await session.execute(statement)
+        activation_id = result.scalar_one_or_none()
+        if activation_id is None:
+            raise ResourceNotFound()
+
+        await session.execute(
+            update(LicenseKey)
+            .where(LicenseKey.id == license_key.id)
+            .values(activation_count=LicenseKey.activation_count - 1)
         )
-        activation.mark_deleted()
-        session.add(activation)
-        await session.flush()
-        assert activation.deleted_at is not None
         log.info(
             "license_key.deactivate",
             license_key_id=license_key.id,
             organization_id=license_key.organization_id,
             user=license_key.user_id,
             benefit_id=license_key.benefit_id,
-            activation_id=activation.id,
+            activation_id=activation_id,
         )
         return True
 
     async def user_grant(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         user: User,
         benefit: BenefitLicenseKeys,
@@ -404,6 +445,7 @@ class LicenseKeyService(
         if license_key_id:
             return await self.user_update_grant(
                 session,
+                redis,
                 create_schema=create_schema,
                 license_key_id=license_key_id,
             )
@@ -416,6 +458,7 @@ class LicenseKeyService(
     async def user_update_grant(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key_id: UUID,
         create_schema: LicenseKeyCreate,
@@ -443,6 +486,7 @@ class LicenseKeyService(
         session.add(key)
         await session.flush()
         assert key.id is not None
+        await self._invalidate_cache(redis, key)
         log.info(
             "license_key.grant.update",
             license_key_id=key.id,
@@ -474,6 +518,7 @@ class LicenseKeyService(
     async def user_revoke(
         self,
         session: AsyncSession,
+        redis: Redis,
         user: User,
         benefit: BenefitLicenseKeys,
         license_key_id: UUID,
@@ -488,6 +533,7 @@ class LicenseKeyService(
         key.mark_revoked()
         session.add(key)
         await session.flush()
+        await self._invalidate_cache(redis, key)
         log.info(
             "license_key.revoke",
             license_key_id=key.id,
@@ -497,6 +543,133 @@ class LicenseKeyService(
         )
         return key
 
+    def _check_validate_activation(
+        self, activation: LicenseKeyActivation, validate: LicenseKeyValidate
+    ) -> None:
+        if activation.conditions and validate.conditions != activation.conditions:
+            license_key = activation.license_key
+            # Skip logging UGC conditions
+            log.info(
+                "license_key.validate.invalid_conditions",
+                license_key_id=license_key.id,
+                organization_id=license_key.organization_id,
+                user=license_key.user_id,
+                benefit_id=license_key.benefit_id,
+            )
+            raise ResourceNotFound("License key does not match required conditions")
+
+    def _check_validate(
+        self,
+        license_key: LicenseKey | CachedLicenseKey,
+        validate: LicenseKeyValidate,
+    ) -> None:
+        if license_key.status != LicenseKeyStatus.granted:
+            log.info(
+                "license_key.validate.invalid_status",
+                license_key_id=license_key.id,
+                organization_id=license_key.organization_id,
+                user=license_key.user_id,
+                benefit_id=license_key.benefit_id,
+            )
+            raise ResourceNotFound("License key is no longer active.")
+
+        if license_key.expires_at:
+            if utc_now() >= license_key.expires_at:
+                log.info(
+                    "license_key.validate.invalid_ttl",
+                    license_key_id=license_key.id,
+                    organization_id=license_key.organization_id,
+                    user=license_key.user_id,
+                    benefit_id=license_key.benefit_id,
+                )
+                raise ResourceNotFound("License key has expired.")
+
+        if validate.benefit_id and validate.benefit_id != license_key.benefit_id:
+            log.info(
+                "license_key.validate.invalid_benefit",
+                license_key_id=license_key.id,
+                organization_id=license_key.organization_id,
+                user=license_key.user_id,
+                benefit_id=license_key.benefit_id,
+                validate_benefit_id=validate.benefit_id,
+            )
+            raise ResourceNotFound("License key does not match given benefit.")
+
+        if validate.user_id and validate.user_id != license_key.user_id:
+            log.warn(
+                "license_key.validate.invalid_owner",
+                license_key_id=license_key.id,
+                organization_id=license_key.organization_id,
+                user=license_key.user_id,
+                benefit_id=license_key.benefit_id,
+                validate_user_id=validate.user_id,
+            )
+            raise ResourceNotFound("License key does not match given user.")
+
+    async def _raise_validate_error(
+        self, session: AsyncSession, validate: LicenseKeyValidate
+    ) -> NoReturn:
+        """
+        Find out why the conditional validation didn't match,
+        to surface the same errors as a step-by-step validation.
+        """
+        license_key = await self.get_or_raise_by_key(
+            session, organization_id=validate.organization_id, key=validate.key
+        )
+        self._check_validate(license_key, validate)
+
+        if validate.increment_usage and license_key.limit_usage:
+            remaining = license_key.limit_usage - license_key.usage
+            if validate.increment_usage > remaining:
+                log.info(
+                    "license_key.validate.insufficient_usage",
+                    license_key_id=license_key.id,
+                    organization_id=license_key.organization_id,
+                    user=license_key.user_id,
+                    benefit_id=license_key.benefit_id,
+                    usage_remaining=remaining,
+                    usage_requested=validate.increment_usage,
+                )
+                raise BadRequest(f"License key only has {remaining} more usages.")
+
+        raise ResourceNotFound()
+
+    async def _get_cached(
+        self, redis: Redis, organization_id: UUID, key: str
+    ) -> CachedLicenseKey | None:
+        try:
+            value = await redis.get(_get_cache_key(organization_id, key))
+        except RedisError as e:
+            log.warning("license_key.cache.redis_error", error=str(e))
+            return None
+        if value is None:
+            return None
+        return CachedLicenseKey.model_validate_json(value)
+
+    async def _set_cached(self, redis: Redis, license_key: LicenseKey) -> None:
+        cached = CachedLicenseKey.model_validate(license_key)
+        try:
+            await redis.set(
+                _get_cache_key(license_key.organization_id, license_key.key),
+                cached.model_dump_json(),
+                ex=settings.LICENSE_KEY_CACHE_TTL_SECONDS,
+            )
+        except RedisError as e:
+            log.warning("license_key.cache.redis_error", error=str(e))
+
+    async def _invalidate_cache(
+        self, redis: Redis, license_key: LicenseKey | CachedLicenseKey
+    ) -> None:
+        try:
+            await redis.delete(
+                _get_cache_key(license_key.organization_id, license_key.key)
+            )
+        except RedisError as e:
+            log.warning("license_key.cache.redis_error", error=str(e))
+
+    def _get_list_keyset(self) -> list[KeysetColumn]:
+        return [KeysetColumn(LicenseKey.created_at), KeysetColumn(LicenseKey.id)]
+
     def _get_select_base(self) -> Select[tuple[LicenseKey]]:
         return (
             select(LicenseKey)
@@ -2,10 +2,10 @@ from datetime import datetime
 from enum import StrEnum
 from typing import ClassVar, Protocol, cast
 
-from sqlalchemy import ColumnElement, Integer, SQLColumnExpression, case, func
+from sqlalchemy import ColumnElement, Integer, Numeric, SQLColumnExpression, func
+from sqlalchemy.orm import InstrumentedAttribute
 
-from polar.enums import SubscriptionRecurringInterval
-from polar.models import Order, Subscription
+from polar.models import MetricsOrdersRollup, MetricsSubscriptionsRollup
 
 from .queries import Interval, MetricQuery
 
@@ -27,6 +27,44 @@ class Metric(Protocol):
     ) -> ColumnElement[int]: ...
 
 
+def _is_new_subscription(
+    t: ColumnElement[datetime], i: Interval
+) -> ColumnElement[bool]:
+    return i.sql_date_trunc(
+        cast(SQLColumnExpression[datetime], MetricsOrdersRollup.subscription_started_at)
+    ) == i.sql_date_trunc(t)
+
+
+def _is_renewed_subscription(
+    t: ColumnElement[datetime], i: Interval
+) -> ColumnElement[bool]:
+    return i.sql_date_trunc(
+        cast(SQLColumnExpression[datetime], MetricsOrdersRollup.subscription_started_at)
+    ) != i.sql_date_trunc(t)
+
+
+def _get_running_total(
+    t: ColumnElement[datetime],
+    i: Interval,
+    started: InstrumentedAttribute[int],
+    ended: InstrumentedAttribute[int],
+) -> ColumnElement[int]:
+    """
+    Compute the total of a subscriptions value at each period from the rollup deltas.
+
+    A subscription is counted in every period between its start and its end,
+    both included, so the ends of the current period are added back.
+    """
+    period_ended = func.sum(ended).filter(
+        i.sql_date_trunc(MetricsSubscriptionsRollup.timestamp) == i.sql_date_trunc(t)
+    )
+    return (
+        func.sum(func.coalesce(func.sum(started), 0)).over(order_by=t)
+        - func.sum(func.coalesce(func.sum(ended), 0)).over(order_by=t)
+        + func.coalesce(period_ended, 0)
+    )
+
+
 class OrdersMetric(Metric):
     slug = "orders"
     display_name = "Orders"
@@ -37,7 +75,7 @@ class OrdersMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.count(Order.id)
+        return func.sum(MetricsOrdersRollup.orders)
 
 
 class RevenueMetric(Metric):
@@ -50,7 +88,7 @@ class RevenueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.sum(Order.amount)
+        return func.sum(MetricsOrdersRollup.revenue)
 
 
 class AverageOrderValueMetric(Metric):
@@ -63,7 +101,13 @@ class AverageOrderValueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.cast(func.ceil(func.avg(Order.amount)), Integer)
+        return func.cast(
+            func.ceil(
+                func.cast(func.sum(MetricsOrdersRollup.revenue), Numeric)
+                / func.nullif(func.sum(MetricsOrdersRollup.orders), 0)
+            ),
+            Integer,
+        )
 
 
 class OneTimeProductsMetric(Metric):
@@ -76,7 +120,7 @@ class OneTimeProductsMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.count(Order.id).filter(Order.subscription_id.is_(None))
+        return func.sum(MetricsOrdersRollup.one_time_orders)
 
 
 class OneTimeProductsRevenueMetric(Metric):
@@ -89,7 +133,7 @@ class OneTimeProductsRevenueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.sum(Order.amount).filter(Order.subscription_id.is_(None))
+        return func.sum(MetricsOrdersRollup.one_time_revenue)
 
 
 class NewSubscriptionsMetric(Metric):
@@ -102,10 +146,8 @@ class NewSubscriptionsMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.count(Subscription.id).filter(
-            i.sql_date_trunc(
-                cast(SQLColumnExpression[datetime], Subscription.started_at)
-            )
+        return func.sum(MetricsSubscriptionsRollup.started_subscriptions).filter(
+            i.sql_date_trunc(MetricsSubscriptionsRollup.timestamp)
             == i.sql_date_trunc(t)
         )
 
@@ -120,12 +162,7 @@ class NewSubscriptionsRevenueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.sum(Order.amount).filter(
-            i.sql_date_trunc(
-                cast(SQLColumnExpression[datetime], Subscription.started_at)
-            )
-            == i.sql_date_trunc(t)
-        )
+        return func.sum(MetricsOrdersRollup.revenue).filter(_is_new_subscription(t, i))
 
 
 class RenewedSubscriptionsMetric(Metric):
@@ -138,11 +175,8 @@ class RenewedSubscriptionsMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.count(Subscription.id.distinct()).filter(
-            i.sql_date_trunc(
-                cast(SQLColumnExpression[datetime], Subscription.started_at)
-            )
-            != i.sql_date_trunc(t)
+        return func.sum(MetricsOrdersRollup.subscriptions).filter(
+            _is_renewed_subscription(t, i)
         )
 
 
@@ -156,11 +190,8 @@ class RenewedSubscriptionsRevenueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.sum(Order.amount).filter(
-            i.sql_date_trunc(
-                cast(SQLColumnExpression[datetime], Subscription.started_at)
-            )
-            != i.sql_date_trunc(t)
+        return func.sum(MetricsOrdersRollup.revenue).filter(
+            _is_renewed_subscription(t, i)
         )
 
 
@@ -174,7 +205,12 @@ class ActiveSubscriptionsMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.count(Subscription.id)
+        return _get_running_total(
+            t,
+            i,
+            MetricsSubscriptionsRollup.started_subscriptions,
+            MetricsSubscriptionsRollup.ended_subscriptions,
+        )
 
 
 class MonthlyRecurringRevenueMetric(Metric):
@@ -187,22 +223,11 @@ class MonthlyRecurringRevenueMetric(Metric):
     def get_sql_expression(
         cls, t: ColumnElement[datetime], i: Interval
     ) -> ColumnElement[int]:
-        return func.coalesce(
-            func.sum(
-                case(
-                    (
-                        Subscription.recurring_interval
-                        == SubscriptionRecurringInterval.year,
-                        func.round(Subscription.amount / 12),
-                    ),
-                    (
-                        Subscription.recurring_interval
-                        == SubscriptionRecurringInterval.month,
-                        Subscription.amount,
-                    ),
-                )
-            ),
-            0,
+        return _get_running_total(
+            t,
+            i,
+            MetricsSubscriptionsRollup.started_monthly_recurring_revenue,
+            MetricsSubscriptionsRollup.ended_monthly_recurring_revenue,
         )
 
 
@@ -2,7 +2,7 @@ import uuid
 from collections.abc import Generator, Sequence
 from datetime import datetime
 from enum import StrEnum
-from typing import TYPE_CHECKING, Protocol, cast
+from typing import TYPE_CHECKING, Protocol
 
 from sqlalchemy import (
     CTE,
@@ -20,11 +20,9 @@ from sqlalchemy import (
 
 from polar.auth.models import AuthSubject, is_organization, is_user
 from polar.models import (
-    Order,
+    MetricsOrdersRollup,
+    MetricsSubscriptionsRollup,
     Organization,
-    Product,
-    ProductPrice,
-    Subscription,
     User,
     UserOrganization,
 )
@@ -96,24 +94,19 @@ class QueryCallable(Protocol):
     ) -> CTE: ...
 
 
-def get_orders_cte(
-    timestamp_series: CTE,
-    interval: Interval,
+def _get_readable_rollups_clause(
+    model: type[MetricsOrdersRollup] | type[MetricsSubscriptionsRollup],
     auth_subject: AuthSubject[User | Organization],
-    metrics: list["type[Metric]"],
     *,
     organization_id: Sequence[uuid.UUID] | None = None,
     product_id: Sequence[uuid.UUID] | None = None,
     product_price_type: Sequence[ProductPriceType] | None = None,
-) -> CTE:
-    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+) -> ColumnElement[bool]:
+    clauses: list[ColumnElement[bool]] = []
 
-    readable_orders_statement = select(Order.id).join(
-        Product, onclause=Order.product_id == Product.id
-    )
     if is_user(auth_subject):
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id.in_(
+        clauses.append(
+            model.organization_id.in_(
                 select(UserOrganization.organization_id).where(
                     UserOrganization.user_id == auth_subject.subject.id,
                     UserOrganization.deleted_at.is_(None),
@@ -121,25 +114,31 @@ def get_orders_cte(
             )
         )
     elif is_organization(auth_subject):
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id == auth_subject.subject.id
-        )
+        clauses.append(model.organization_id == auth_subject.subject.id)
 
     if organization_id is not None:
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id.in_(organization_id)
-        )
+        clauses.append(model.organization_id.in_(organization_id))
 
     if product_id is not None:
-        readable_orders_statement = readable_orders_statement.where(
-            Order.product_id.in_(product_id)
-        )
+        clauses.append(model.product_id.in_(product_id))
 
     if product_price_type is not None:
-        readable_orders_statement = readable_orders_statement.join(
-            ProductPrice,
-            onclause=Order.product_price_id == ProductPrice.id,
-        ).where(ProductPrice.type.in_(product_price_type))
+        clauses.append(model.product_price_type.in_(product_price_type))
+
+    return and_(*clauses)
+
+
+def get_orders_cte(
+    timestamp_series: CTE,
+    interval: Interval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[Metric]"],
+    *,
+    organization_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    product_price_type: Sequence[ProductPriceType] | None = None,
+) -> CTE:
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
 
     return cte(
         select(
@@ -150,17 +149,19 @@ def get_orders_cte(
         )
         .select_from(
             timestamp_series.join(
-                Order,
+                MetricsOrdersRollup,
                 isouter=True,
                 onclause=and_(
-                    interval.sql_date_trunc(Order.created_at)
+                    interval.sql_date_trunc(MetricsOrdersRollup.timestamp)
                     == interval.sql_date_trunc(timestamp_column),
-                    Order.id.in_(readable_orders_statement),
+                    _get_readable_rollups_clause(
+                        MetricsOrdersRollup,
+                        auth_subject,
+                        organization_id=organization_id,
+                        product_id=product_id,
+                        product_price_type=product_price_type,
+                    ),
                 ),
-            ).join(
-                Subscription,
-                isouter=True,
-                onclause=Order.subscription_id == Subscription.id,
             )
         )
         .group_by(timestamp_column)
@@ -179,39 +180,10 @@ def get_active_subscriptions_cte(
     product_price_type: Sequence[ProductPriceType] | None = None,
 ) -> CTE:
     timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
-
-    readable_subscriptions_statement = select(Subscription.id).join(
-        Product, onclause=Subscription.product_id == Product.id
+    first_timestamp = (
+        select(func.min(timestamp_column)).correlate(None).scalar_subquery()
     )
-    if is_user(auth_subject):
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id.in_(
-                select(UserOrganization.organization_id).where(
-                    UserOrganization.user_id == auth_subject.subject.id,
-                    UserOrganization.deleted_at.is_(None),
-                )
-            )
-        )
-    elif is_organization(auth_subject):
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id == auth_subject.subject.id
-        )
-
-    if organization_id is not None:
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id.in_(organization_id)
-        )
-
-    if product_id is not None:
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Subscription.product_id.in_(product_id)
-        )
-
-    if product_price_type is not None:
-        readable_subscriptions_statement = readable_subscriptions_statement.join(
-            ProductPrice,
-            onclause=Subscription.price_id == ProductPrice.id,
-        ).where(ProductPrice.type.in_(product_price_type))
+    rollup_timestamp = interval.sql_date_trunc(MetricsSubscriptionsRollup.timestamp)
 
     return cte(
         select(
@@ -222,29 +194,27 @@ def get_active_subscriptions_cte(
         )
         .select_from(
             timestamp_series.join(
-                Subscription,
+                MetricsSubscriptionsRollup,
                 isouter=True,
                 onclause=and_(
                     or_(
-                        Subscription.started_at.is_(None),
-                        interval.sql_date_trunc(
-                            cast(SQLColumnExpression[datetime], Subscription.started_at)
-                        )
-                        <= interval.sql_date_trunc(timestamp_column),
+                        rollup_timestamp == interval.sql_date_trunc(timestamp_column),
+                        # Attach everything that happened before the first period
+                        # to it, so running sums start from the right values.
+                        and_(
+                            timestamp_column == first_timestamp,
+                            rollup_timestamp
+                            < interval.sql_date_trunc(timestamp_column),
+                        ),
                     ),
-                    or_(
-                        Subscription.ended_at.is_(None),
-                        interval.sql_date_trunc(
-                            cast(SQLColumnExpression[datetime], Subscription.ended_at)
-                        )
-                        >= interval.sql_date_trunc(timestamp_column),
+                    _get_readable_rollups_clause(
+                        MetricsSubscriptionsRollup,
+                        auth_subject,
+                        organization_id=organization_id,
+                        product_id=product_id,
+                        product_price_type=product_price_type,
                     ),
-                    Subscription.id.in_(readable_subscriptions_statement),
                 ),
-            ).join(
-                ProductPrice,
-                isouter=True,
-                onclause=Subscription.price_id == ProductPrice.id,
             )
         )
         .group_by(timestamp_column)
@@ -0,0 +1,216 @@
+import uuid
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    SQLColumnExpression,
+    and_,
+    case,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    union_all,
+)
+
+from polar.enums import SubscriptionRecurringInterval
+from polar.models import (
+    MetricsOrdersRollup,
+    MetricsSubscriptionsRollup,
+    Order,
+    Product,
+    ProductPrice,
+    Subscription,
+)
+
+ROLLUP_RESOLUTION = timedelta(hours=1)
+
+
+def truncate_timestamp(timestamp: datetime) -> datetime:
+    """Truncate a timestamp to the resolution of the rollup tables."""
+    return timestamp.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+
+
+def _get_timestamps_clause(
+    column: SQLColumnExpression[datetime | None], timestamps: Sequence[datetime] | None
+) -> ColumnElement[bool]:
+    if timestamps is None:
+        return true()
+    return or_(
+        *(
+            and_(column >= timestamp, column < timestamp + ROLLUP_RESOLUTION)
+            for timestamp in timestamps
+        )
+    )
+
+
+def get_orders_rollup_statement(
+    organization_id: uuid.UUID, timestamps: Sequence[datetime] | None = None
+) -> Select[Any]:
+    """
+    Build the statement aggregating orders to insert in `MetricsOrdersRollup`.
+
+    Orders are bucketed by their creation hour and the start hour
+    of their subscription: both are matched against `timestamps`,
+    so orders move to their new bucket when the start of a subscription changes.
+
+    Args:
+        organization_id: The organization to aggregate orders for.
+        timestamps: Hours to aggregate, truncated with `truncate_timestamp`.
+        If `None`, the whole history of the organization is aggregated.
+    """
+    timestamp = func.date_trunc("hour", Order.created_at)
+    subscription_started_at = func.date_trunc("hour", Subscription.started_at)
+    return (
+        select(
+            func.gen_random_uuid(),
+            Product.organization_id,
+            Order.product_id,
+            ProductPrice.type,
+            timestamp,
+            subscription_started_at,
+            func.count(Order.id),
+            func.sum(Order.amount),
+            func.count(Order.id).filter(Order.subscription_id.is_(None)),
+            func.coalesce(
+                func.sum(Order.amount).filter(Order.subscription_id.is_(None)), 0
+            ),
+            func.count(Order.subscription_id.distinct()),
+        )
+        .join(Product, onclause=Order.product_id == Product.id)
+        .join(ProductPrice, onclause=Order.product_price_id == ProductPrice.id)
+        .join(
+            Subscription,
+            isouter=True,
+            onclause=Order.subscription_id == Subscription.id,
+        )
+        .where(
+            Product.organization_id == organization_id,
+            or_(
+                _get_timestamps_clause(Order.created_at, timestamps),
+                _get_timestamps_clause(Subscription.started_at, timestamps),
+            ),
+        )
+        .group_by(
+            Product.organization_id,
+            Order.product_id,
+            ProductPrice.type,
+            timestamp,
+            subscription_started_at,
+        )
+    )
+
+
+ORDERS_ROLLUP_COLUMNS = [
+    MetricsOrdersRollup.id,
+    MetricsOrdersRollup.organization_id,
+    MetricsOrdersRollup.product_id,
+    MetricsOrdersRollup.product_price_type,
+    MetricsOrdersRollup.timestamp,
+    MetricsOrdersRollup.subscription_started_at,
+    MetricsOrdersRollup.orders,
+    MetricsOrdersRollup.revenue,
+    MetricsOrdersRollup.one_time_orders,
+    MetricsOrdersRollup.one_time_revenue,
+    MetricsOrdersRollup.subscriptions,
+]
+
+
+def _get_subscription_monthly_recurring_revenue() -> ColumnElement[int]:
+    return func.coalesce(
+        case(
+            (
+                Subscription.recurring_interval == SubscriptionRecurringInterval.year,
+                func.round(Subscription.amount / 12),
+            ),
+            (
+                Subscription.recurring_interval == SubscriptionRecurringInterval.month,
+                Subscription.amount,
+            ),
+        ),
+        0,
+    )
+
+
+def get_subscriptions_rollup_statement(
+    organization_id: uuid.UUID, timestamps: Sequence[datetime] | None = None
+) -> Select[Any]:
+    """
+    Build the statement aggregating subscriptions starts and ends
+    to insert in `MetricsSubscriptionsRollup`.
+
+    Subscriptions that never started are ignored.
+
+    Args:
+        organization_id: The organization to aggregate subscriptions for.
+        timestamps: Hours to aggregate, truncated with `truncate_timestamp`.
+        If `None`, the whole history of the organization is aggregated.
+    """
+    monthly_recurring_revenue = _get_subscription_monthly_recurring_revenue()
+
+    def _events_statement(
+        column: SQLColumnExpression[datetime | None], started: bool
+    ) -> Select[Any]:
+        return (
+            select(
+                Product.organization_id.label("organization_id"),
+                Subscription.product_id.label("product_id"),
+                ProductPrice.type.label("product_price_type"),
+                func.date_trunc("hour", column).label("timestamp"),
+                literal(1 if started else 0).label("started_subscriptions"),
+                (monthly_recurring_revenue if started else literal(0)).label(
+                    "started_monthly_recurring_revenue"
+                ),
+                literal(0 if started else 1).label("ended_subscriptions"),
+                (literal(0) if started else monthly_recurring_revenue).label(
+                    "ended_monthly_recurring_revenue"
+                ),
+            )
+            .join(Product, onclause=Subscription.product_id == Product.id)
+            .join(ProductPrice, onclause=Subscription.price_id == ProductPrice.id)
+            .where(
+                Product.organization_id == organization_id,
+                Subscription.started_at.is_not(None),
+                column.is_not(None),
+                _get_timestamps_clause(column, timestamps),
+            )
+        )
+
+    events = union_all(
+        _events_statement(Subscription.started_at, True),
+        _events_statement(Subscription.ended_at, False),
+    ).subquery()
+
+    return select(
+        func.gen_random_uuid(),
+        events.c.organization_id,
+        events.c.product_id,
+        events.c.product_price_type,
+        events.c.timestamp,
+        func.sum(events.c.started_subscriptions),
+        func.sum(events.c.started_monthly_recurring_revenue),
+        func.sum(events.c.ended_subscriptions),
+        func.sum(events.c.ended_monthly_recurring_revenue),
+    ).group_by(
+        events.c.organization_id,
+        events.c.product_id,
+        events.c.product_price_type,
+        events.c.timestamp,
+    )
+
+
+SUBSCRIPTIONS_ROLLUP_COLUMNS = [
+    MetricsSubscriptionsRollup.id,
+    MetricsSubscriptionsRollup.organization_id,
+    MetricsSubscriptionsRollup.product_id,
+    MetricsSubscriptionsRollup.product_price_type,
+    MetricsSubscriptionsRollup.timestamp,
+    MetricsSubscriptionsRollup.started_subscriptions,
+    MetricsSubscriptionsRollup.started_monthly_recurring_revenue,
+    MetricsSubscriptionsRollup.ended_subscriptions,
+    MetricsSubscriptionsRollup.ended_monthly_recurring_revenue,
+]
@@ -2,15 +2,37 @@ import uuid
 from collections.abc import Sequence
 from datetime import UTC, date, datetime
 
-from sqlalchemy import ColumnElement, FromClause, select
+from sqlalchemy import (
+    ColumnElement,
+    FromClause,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    true,
+)
 
 from polar.auth.models import AuthSubject
-from polar.models import Organization, User
+from polar.models import (
+    MetricsOrdersRollup,
+    MetricsSubscriptionsRollup,
+    Organization,
+    User,
+)
 from polar.models.product_price import ProductPriceType
 from polar.postgres import AsyncSession
+from polar.worker import enqueue_job
 
 from .metrics import METRICS
 from .queries import QUERIES, Interval, get_timestamp_series_cte
+from .rollups import (
+    ORDERS_ROLLUP_COLUMNS,
+    SUBSCRIPTIONS_ROLLUP_COLUMNS,
+    get_orders_rollup_statement,
+    get_subscriptions_rollup_statement,
+    truncate_timestamp,
+)
 from .schemas import MetricsPeriod, MetricsResponse
 
 
@@ -76,5 +98,92 @@ class MetricsService:
             {"periods": periods, "metrics": {m.slug: m for m in METRICS}}
         )
 
+    async def update_rollups(
+        self,
+        session: AsyncSession,
+        organization_id: uuid.UUID,
+        timestamps: Sequence[datetime] | None = None,
+    ) -> None:
+        """
+        Recompute the metrics rollups of an organization.
+
+        Args:
+            session: The database session.
+            organization_id: The organization to recompute rollups for.
+            timestamps: Timestamps of the changes. Each hour containing one of them
+            is recomputed from the source data. If `None`, all the rollups
+            of the organization are rebuilt.
+        """
+        hours: list[datetime] | None = None
+        if timestamps is not None:
+            hours = sorted({truncate_timestamp(t) for t in timestamps})
+            if len(hours) == 0:
+                return
+
+        # Serialize updates for the same organization, so concurrent jobs
+        # don't insert the same aggregates twice.
+        await session.execute(
+            select(
+                func.pg_advisory_xact_lock(
+                    func.hashtext(f"metrics_rollups:{organization_id}")
+                )
+            )
+        )
+
+        orders_delete_clause: ColumnElement[bool] = true()
+        subscriptions_delete_clause: ColumnElement[bool] = true()
+        if hours is not None:
+            # Orders are also bucketed by the start of their subscription
+            orders_delete_clause = or_(
+                MetricsOrdersRollup.timestamp.in_(hours),
+                MetricsOrdersRollup.subscription_started_at.in_(hours),
+            )
+            subscriptions_delete_clause = MetricsSubscriptionsRollup.timestamp.in_(
+                hours
+            )
+
+        for model, columns, statement, delete_clause in (
+            (
+                MetricsOrdersRollup,
+                ORDERS_ROLLUP_COLUMNS,
+                get_orders_rollup_statement(organization_id, hours),
+                orders_delete_clause,
+            ),
+            (
+                MetricsSubscriptionsRollup,
+                SUBSCRIPTIONS_ROLLUP_COLUMNS,
+                get_subscriptions_rollup_statement(organization_id, hours),
+                subscriptions_delete_clause,
+            ),
+        ):
+            await session.execute(
+                delete(model).where(
+                    model.organization_id == organization_id, delete_clause
+                )
+            )
+            await session.execute(insert(model).from_select(columns, statement))
+
+    def enqueue_rollups_update(
+        self, organization_id: uuid.UUID, *timestamps: datetime | None
+    ) -> None:
+        """
+        Schedule the update of the metrics rollups affected by a change
+        on orders or subscriptions.
+
+        Args:
+            organization_id: The organization owning the changed objects.
+            *timestamps: The changed timestamps, like the creation date of an order
+            or the previous and new start and end dates of a subscription.
+            `None` values are ignored.
+        """
+        hours = sorted({truncate_timestamp(t) for t in timestamps if t is not None})
+        if len(hours) == 0:
+            return
+        enqueue_job(
+            "metrics.update_rollups",
+            organization_id=organization_id,
+            timestamps=hours,
+        )
+
 
 metrics = MetricsService()
@@ -0,0 +1,17 @@
+import uuid
+from datetime import datetime
+
+from polar.worker import AsyncSessionMaker, JobContext, PolarWorkerContext, task
+
+from .service import metrics as metrics_service
+
+
+@task("metrics.update_rollups")
+async def metrics_update_rollups(
+    ctx: JobContext,
+    organization_id: uuid.UUID,
+    timestamps: list[datetime] | None,
+    polar_context: PolarWorkerContext,
+) -> None:
+    async with AsyncSessionMaker(ctx) as session:
+        await metrics_service.update_rollups(session, organization_id, timestamps)
@@ -7,7 +7,7 @@ from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from polar.config import settings
 from polar.logging import Logger, generate_correlation_id
-from polar.worker import flush_enqueued_jobs
+from polar.worker import flush_enqueued_jobs, initialize_enqueued_jobs
 
 
 class LogCorrelationIdMiddleware:
@@ -34,6 +34,8 @@ class FlushEnqueuedWorkerJobsMiddleware:
         self.app = app
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        initialize_enqueued_jobs()
+
         await self.app(scope, receive, send)
 
         if not settings.is_testing():
@@ -21,6 +21,8 @@ from .issue_reward import IssueReward
 from .license_key import LicenseKey
 from .license_key_activation import LicenseKeyActivation
 from .magic_link import MagicLink
+from .metrics_orders_rollup import MetricsOrdersRollup
+from .metrics_subscriptions_rollup import MetricsSubscriptionsRollup
 from .notification import Notification
 from .oauth2_authorization_code import OAuth2AuthorizationCode
 from .oauth2_client import OAuth2Client
@@ -76,6 +78,8 @@ __all__ = [
     "LicenseKey",
     "LicenseKeyActivation",
     "MagicLink",
+    "MetricsOrdersRollup",
+    "MetricsSubscriptionsRollup",
     "Notification",
     "OAuth2AuthorizationCode",
     "OAuth2Client",
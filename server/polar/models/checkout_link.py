@@ -1,6 +1,6 @@
 from uuid import UUID
 
-from sqlalchemy import Boolean, ForeignKey, String, Uuid
+from sqlalchemy import Boolean, ForeignKey, Index, String, Uuid
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from polar.enums import PaymentProcessor
@@ -14,6 +14,14 @@ from .product_price import ProductPrice
 
 class CheckoutLink(MetadataMixin, RecordModel):
     __tablename__ = "checkout_links"
+    __table_args__ = (
+        Index(
+            "ix_checkout_links_label_trgm",
+            "label",
+            postgresql_using="gin",
+            postgresql_ops={"label": "gin_trgm_ops"},
+        ),
+    )
 
     payment_processor: Mapped[PaymentProcessor] = mapped_column(
         String, nullable=False, default=PaymentProcessor.stripe, index=True
@@ -25,7 +33,7 @@ class CheckoutLink(MetadataMixin, RecordModel):
         "success_url", String, nullable=True, default=None
     )
 
-    label: Mapped[UUID] = mapped_column(String, nullable=True)
+    label: Mapped[str | None] = mapped_column(String, nullable=True)
     allow_discount_codes: Mapped[bool] = mapped_column(
         Boolean, nullable=False, default=True
     )
@@ -5,7 +5,7 @@ from uuid import UUID
 
 from annotated_types import Ge, Len
 from pydantic import Field
-from sqlalchemy import ForeignKey, String, UniqueConstraint, Uuid
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint, Uuid
 from sqlalchemy.dialects.postgresql import CITEXT, JSONB
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
@@ -77,7 +77,21 @@ class CustomFieldSelectProperties(CustomFieldProperties):
 
 class CustomField(MetadataMixin, RecordModel):
     __tablename__ = "custom_fields"
-    __table_args__ = (UniqueConstraint("slug", "organization_id"),)
+    __table_args__ = (
+        UniqueConstraint("slug", "organization_id"),
+        Index(
+            "ix_custom_fields_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_custom_fields_slug_trgm",
+            "slug",
+            postgresql_using="gin",
+            postgresql_ops={"slug": "gin_trgm_ops"},
+        ),
+    )
 
     type: Mapped[CustomFieldType] = mapped_column(String, nullable=False, index=True)
     slug: Mapped[str] = mapped_column(CITEXT, nullable=False, index=True)
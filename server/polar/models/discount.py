@@ -8,6 +8,7 @@ import stripe as stripe_lib
 from sqlalchemy import (
     TIMESTAMP,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -60,7 +61,21 @@ class DiscountDuration(StrEnum):
 
 class Discount(MetadataMixin, RecordModel):
     __tablename__ = "discounts"
-    __table_args__ = (UniqueConstraint("organization_id", "code"),)
+    __table_args__ = (
+        UniqueConstraint("organization_id", "code"),
+        Index(
+            "ix_discounts_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_discounts_code_trgm",
+            "code",
+            postgresql_using="gin",
+            postgresql_ops={"code": "gin_trgm_ops"},
+        ),
+    )
 
     name: Mapped[str] = mapped_column(CITEXT, nullable=False)
     type: Mapped[DiscountType] = mapped_column(String, nullable=False)
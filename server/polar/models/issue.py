@@ -42,6 +42,15 @@ if TYPE_CHECKING:  # pragma: no cover
     from .repository import Repository
 
 
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('simple', "
+    "jsonb_path_query_array(coalesce(labels, '[]'::jsonb), '$[*].name'), "
+    "'[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'C')"
+)
+
+
 class IssueFields:
     class State(str, enum.Enum):
         OPEN = "open"
@@ -104,9 +113,12 @@ class IssueFields:
         TIMESTAMP(timezone=True), nullable=True
     )
 
-    title_tsv: Mapped[TSVectorType] = mapped_column(
-        TSVectorType("title", regconfig="simple"),
-        sa.Computed("to_tsvector('simple', \"title\")", persisted=True),
+    # Weighted search document: title (A), labels names (B) and body (C).
+    # Deferred, since it's only used to filter and rank search results.
+    search_tsv: Mapped[TSVectorType] = mapped_column(
+        TSVectorType(),
+        sa.Computed(SEARCH_TSV_EXPRESSION, persisted=True),
+        deferred=True,
     )
 
 
@@ -135,8 +147,14 @@ class Issue(IssueFields, RecordModel):
         UniqueConstraint("external_id"),
         UniqueConstraint("platform", "external_lookup_key"),
         UniqueConstraint("organization_id", "repository_id", "number"),
-        # Search index
-        Index("idx_issues_title_tsv", "title_tsv", postgresql_using="gin"),
+        # Search indexes
+        Index("idx_issues_search_tsv", "search_tsv", postgresql_using="gin"),
+        Index(
+            "idx_issues_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
         Index(
             "idx_issues_id_closed_at",
             "id",
@@ -170,6 +188,10 @@ class Issue(IssueFields, RecordModel):
         "badge_custom_content",
         "funding_goal",
         "pledged_amount_sum",
+        "pay_upfront_pledged_amount_sum",
+        "pay_on_completion_pledged_amount_sum",
+        "pay_directly_pledged_amount_sum",
+        "pledgers_count",
         "needs_confirmation_solved",
         "confirmed_solved_at",
         "confirmed_solved_by",
@@ -220,6 +242,21 @@ class Issue(IssueFields, RecordModel):
         TIMESTAMP(timezone=True), nullable=True
     )
 
+    # calculated sums of pledges per type and number of pledgers,
+    # maintained with `pledged_amount_sum` and used in funding listings
+    pay_upfront_pledged_amount_sum: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+    pay_on_completion_pledged_amount_sum: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+    pay_directly_pledged_amount_sum: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+    pledgers_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
     issue_has_in_progress_relationship: Mapped[bool] = mapped_column(
         Boolean, nullable=False, server_default="false"
     )
@@ -65,7 +65,7 @@ class LicenseKey(RecordModel):
     def benefit(cls) -> Mapped[BenefitLicenseKeys]:
         return relationship("BenefitLicenseKeys", lazy="raise")
 
-    key: Mapped[str] = mapped_column(String, nullable=False)
+    key: Mapped[str] = mapped_column(String, nullable=False, index=True)
 
     status: Mapped[LicenseKeyStatus] = mapped_column(
         String, nullable=False, default=LicenseKeyStatus.granted
@@ -73,6 +73,12 @@ class LicenseKey(RecordModel):
 
     limit_activations: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
+    activation_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    """
+    Number of active activations, maintained alongside `activations`
+    so the activation limit can be enforced atomically.
+    """
+
     @declared_attr
     def activations(cls) -> Mapped[list["LicenseKeyActivation"]]:
         return relationship(
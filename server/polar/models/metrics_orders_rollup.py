@@ -0,0 +1,49 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, Integer, String, Uuid
+from sqlalchemy.orm import Mapped, mapped_column
+
+from polar.kit.db.models import Model
+from polar.kit.utils import generate_uuid
+from polar.models.product_price import ProductPriceType
+
+
+class MetricsOrdersRollup(Model):
+    """
+    Hourly pre-aggregation of orders, used to compute metrics.
+
+    Rows are grouped by organization, product, price type, hour of creation
+    and hour of the subscription start, so metrics can be re-bucketed to any
+    coarser interval without touching the `orders` table.
+    """
+
+    __tablename__ = "metrics_orders_rollups"
+    __table_args__ = (
+        Index(
+            "ix_metrics_orders_rollups_organization_id_timestamp",
+            "organization_id",
+            "timestamp",
+        ),
+    )
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=generate_uuid)
+    organization_id: Mapped[UUID] = mapped_column(
+        Uuid, ForeignKey("organizations.id", ondelete="cascade"), nullable=False
+    )
+    product_id: Mapped[UUID] = mapped_column(
+        Uuid, ForeignKey("products.id", ondelete="cascade"), nullable=False
+    )
+    product_price_type: Mapped[ProductPriceType] = mapped_column(String, nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )
+    subscription_started_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    revenue: Mapped[int] = mapped_column(Integer, nullable=False)
+    one_time_orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    one_time_revenue: Mapped[int] = mapped_column(Integer, nullable=False)
+    subscriptions: Mapped[int] = mapped_column(Integer, nullable=False)
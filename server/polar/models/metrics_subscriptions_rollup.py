@@ -0,0 +1,48 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, Integer, String, Uuid
+from sqlalchemy.orm import Mapped, mapped_column
+
+from polar.kit.db.models import Model
+from polar.kit.utils import generate_uuid
+from polar.models.product_price import ProductPriceType
+
+
+class MetricsSubscriptionsRollup(Model):
+    """
+    Hourly pre-aggregation of subscriptions starts and ends, used to compute metrics.
+
+    The number of active subscriptions at a given time is the running sum
+    of started subscriptions minus the running sum of ended ones.
+    """
+
+    __tablename__ = "metrics_subscriptions_rollups"
+    __table_args__ = (
+        Index(
+            "ix_metrics_subscriptions_rollups_organization_id_timestamp",
+            "organization_id",
+            "timestamp",
+        ),
+    )
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=generate_uuid)
+    organization_id: Mapped[UUID] = mapped_column(
+        Uuid, ForeignKey("organizations.id", ondelete="cascade"), nullable=False
+    )
+    product_id: Mapped[UUID] = mapped_column(
+        Uuid, ForeignKey("products.id", ondelete="cascade"), nullable=False
+    )
+    product_price_type: Mapped[ProductPriceType] = mapped_column(String, nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )
+
+    started_subscriptions: Mapped[int] = mapped_column(Integer, nullable=False)
+    started_monthly_recurring_revenue: Mapped[int] = mapped_column(
+        Integer, nullable=False
+    )
+    ended_subscriptions: Mapped[int] = mapped_column(Integer, nullable=False)
+    ended_monthly_recurring_revenue: Mapped[int] = mapped_column(
+        Integer, nullable=False
+    )
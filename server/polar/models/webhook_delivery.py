@@ -31,3 +31,9 @@ class WebhookDelivery(RecordModel):
     http_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     succeeded: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    connect_duration: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    """Time in milliseconds to get a connection to the endpoint and send the request."""
+
+    response_duration: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    """Time in milliseconds to receive the response once the request was sent."""
@@ -8,6 +8,7 @@ from polar.kit.extensions.sqlalchemy import sql
 from polar.models.issue import Issue
 from polar.models.notification import Notification
 from polar.models.pledge import Pledge
+from polar.models.user import User
 from polar.models.user_notification import UserNotification
 from polar.notifications.notification import Notification as NotificationSchema
 from polar.notifications.notification import NotificationPayload, NotificationType
@@ -32,6 +33,18 @@ class NotificationsService:
         res = await session.execute(stmt)
         return res.scalars().unique().one_or_none()
 
+    async def list_with_user_email(
+        self, session: AsyncSession, ids: Sequence[UUID]
+    ) -> Sequence[tuple[Notification, str]]:
+        stmt = (
+            sql.select(Notification, User.email)
+            .join(User, User.id == Notification.user_id)
+            .where(Notification.id.in_(ids), User.deleted_at.is_(None))
+        )
+
+        res = await session.execute(stmt)
+        return res.tuples().all()
+
     async def get_for_user(
         self, session: AsyncSession, user_id: UUID
     ) -> Sequence[Notification]:
@@ -72,13 +85,34 @@ class NotificationsService:
         org_id: UUID,
         notif: PartialNotification,
     ) -> None:
+        """
+        Create the notification for every member of the organization
+        in a single statement, and send them all in a single job.
+
+        Notifications are inserted in the caller's transaction:
+        the job is only enqueued once it's committed.
+        """
         members = await user_organization_service.list_by_org(session, org_id)
-        for member in members:
-            await self.send_to_user(
-                session=session,
-                user_id=member.user_id,
-                notif=notif,
-            )
+        if not members:
+            return
+
+        payload = notif.payload.model_dump(mode="json")
+        statement = sql.insert(Notification).returning(Notification.id)
+        result = await session.execute(
+            statement,
+            [
+                {
+                    "user_id": member.user_id,
+                    "type": notif.type,
+                    "issue_id": notif.issue_id,
+                    "pledge_id": notif.pledge_id,
+                    "payload": payload,
+                }
+                for member in members
+            ],
+        )
+        notification_ids = list(result.scalars().all())
+        enqueue_job("notifications.send_batch", notification_ids=notification_ids)
 
     async def send_to_anonymous_email(
         self,
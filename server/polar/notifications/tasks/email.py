@@ -1,16 +1,15 @@
+import json
 from uuid import UUID
 
 import structlog
 
-from polar.email.sender import get_email_sender
+from polar.email.sender import Email, enqueue_email, enqueue_emails
 from polar.notifications.service import notifications
 from polar.user.service.user import user as user_service
 from polar.worker import AsyncSessionMaker, JobContext, PolarWorkerContext, task
 
 log = structlog.get_logger()
 
-sender = get_email_sender()
-
 
 @task("notifications.send")
 async def notifications_send(
@@ -48,8 +47,50 @@ async def notifications_send(
                 )
                 return
 
-            sender.send_to_user(
+            enqueue_email(
                 to_email_addr=user.email,
                 subject=f"[Polar] {subject}",
                 html_content=body,
             )
+
+
+@task("notifications.send_batch")
+async def notifications_send_batch(
+    ctx: JobContext,
+    notification_ids: list[UUID],
+    polar_context: PolarWorkerContext,
+) -> None:
+    with polar_context.to_execution_context():
+        async with AsyncSessionMaker(ctx) as session:
+            notifs = await notifications.list_with_user_email(session, notification_ids)
+
+            # Notifications sent in batch usually share the same payload:
+            # render each distinct one only once.
+            rendered: dict[tuple[str, str], tuple[str, str]] = {}
+            emails: list[Email] = []
+            for notif, email in notifs:
+                if not email:
+                    log.warning(
+                        "notifications.send.user_no_email", user_id=notif.user_id
+                    )
+                    continue
+
+                key = (notif.type, json.dumps(notif.payload, sort_keys=True))
+                if key not in rendered:
+                    notification_type = notifications.parse_payload(notif)
+                    rendered[key] = notification_type.render()
+
+                (subject, body) = rendered[key]
+                if not subject or not body:
+                    log.error("notifications.send.could_not_render", notif=notif)
+                    continue
+
+                emails.append(
+                    Email(
+                        to_email_addr=email,
+                        subject=f"[Polar] {subject}",
+                        html_content=body,
+                    )
+                )
+
+            enqueue_emails(emails)
@@ -1,7 +1,12 @@
+import asyncio
+import contextvars
+import functools
 import json
 import secrets
 import time
 import typing
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import structlog
 from authlib.oauth2 import AuthorizationServer as _AuthorizationServer
@@ -26,6 +31,7 @@ from polar.kit.crypto import generate_token, get_token_hash
 from polar.logging import Logger
 from polar.models import OAuth2Client, OAuth2Token, User
 from polar.oauth2.sub_type import SubTypeValue
+from polar.worker import enqueue_job
 
 from .constants import (
     ACCESS_TOKEN_PREFIX,
@@ -42,6 +48,16 @@ from .service.oauth2_grant import oauth2_grant as oauth2_grant_service
 
 logger: Logger = structlog.get_logger(__name__)
 
+P = typing.ParamSpec("P")
+R = typing.TypeVar("R")
+
+# Authlib is synchronous: the authorization server is run in this pool
+# to keep the event loop free. It's sized like the sync engine connection pool,
+# so each thread gets a connection.
+executor = ThreadPoolExecutor(
+    max_workers=settings.DATABASE_SYNC_POOL_SIZE, thread_name_prefix="oauth2"
+)
+
 
 def _get_server_metadata(server: "AuthorizationServer") -> dict[str, typing.Any]:
     def _dummy_url_for(name: str) -> str:
@@ -226,6 +242,9 @@ class RevocationEndpoint(_QueryTokenMixin, _RevocationEndpoint):
             token.refresh_token_revoked_at = now  # pyright: ignore
         self.server.session.add(token)
         self.server.session.flush()
+        enqueue_job(
+            "auth.invalidate_cache", token_hashes=[typing.cast(str, token.access_token)]
+        )
 
 
 class IntrospectionEndpoint(_QueryTokenMixin, _IntrospectionEndpoint):
@@ -278,6 +297,22 @@ class AuthorizationServer(_AuthorizationServer):
         register_grants(authorization_server)
         return authorization_server
 
+    async def run(
+        self, func: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs
+    ) -> R:
+        """
+        Run a method of the authorization server in the thread pool.
+
+        Calls of a request are run one after the other,
+        since they share the same database session.
+        The context is copied, so logging context and enqueued jobs are kept.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
     def query_client(self, client_id: str) -> OAuth2Client | None:
         statement = select(OAuth2Client).where(
             OAuth2Client.deleted_at.is_(None), OAuth2Client.client_id == client_id
@@ -79,8 +79,10 @@ async def create(
     """Create an OAuth2 client."""
     request.state.user = auth_subject.subject
     request.state.parsed_data = client_configuration.model_dump(mode="json")
-    return authorization_server.create_endpoint_response(
-        ClientRegistrationEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        ClientRegistrationEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
@@ -98,8 +100,10 @@ async def get(
 ) -> Response:
     """Get an OAuth2 client by Client ID."""
     request.state.user = auth_subject.subject if is_user(auth_subject) else None
-    return authorization_server.create_endpoint_response(
-        ClientConfigurationEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        ClientConfigurationEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
@@ -119,8 +123,10 @@ async def update(
     """Update an OAuth2 client."""
     request.state.user = auth_subject.subject if is_user(auth_subject) else None
     request.state.parsed_data = client_configuration.model_dump(mode="json")
-    return authorization_server.create_endpoint_response(
-        ClientConfigurationEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        ClientConfigurationEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
@@ -138,8 +144,10 @@ async def delete(
 ) -> Response:
     """Delete an OAuth2 client."""
     request.state.user = auth_subject.subject if is_user(auth_subject) else None
-    return authorization_server.create_endpoint_response(
-        ClientConfigurationEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        ClientConfigurationEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
@@ -152,15 +160,18 @@ async def authorize(
 ) -> AuthorizeResponse:
     user = auth_subject.subject if is_user(auth_subject) else None
     await request.form()
-    grant: AuthorizationCodeGrant = authorization_server.get_consent_grant(
-        request=request, end_user=user
+    grant: AuthorizationCodeGrant = await authorization_server.run(
+        authorization_server.get_consent_grant, request=request, end_user=user
     )
 
     if grant.prompt == "login":
         raise HTTPException(status_code=401)
     elif grant.prompt == "none":
-        return authorization_server.create_authorization_response(
-            request=request, grant_user=user, save_consent=False
+        return await authorization_server.run(
+            authorization_server.create_authorization_response,
+            request=request,
+            grant_user=user,
+            save_consent=False,
         )
 
     organizations: Sequence[Organization] | None = None
@@ -190,8 +201,11 @@ async def consent(
 ) -> Response:
     await request.form()
     grant_user = auth_subject.subject if action == "allow" else None
-    return authorization_server.create_authorization_response(
-        request=request, grant_user=grant_user, save_consent=True
+    return await authorization_server.run(
+        authorization_server.create_authorization_response,
+        request=request,
+        grant_user=grant_user,
+        save_consent=True,
     )
 
 
@@ -224,7 +238,9 @@ async def token(
 ) -> Response:
     """Request an access token using a valid grant."""
     await request.form()
-    return authorization_server.create_token_response(request)
+    return await authorization_server.run(
+        authorization_server.create_token_response, request
+    )
 
 
 @router.post(
@@ -251,8 +267,10 @@ async def revoke(
 ) -> Response:
     """Revoke an access token or a refresh token."""
     await request.form()
-    return authorization_server.create_endpoint_response(
-        RevocationEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        RevocationEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
@@ -280,8 +298,10 @@ async def introspect(
 ) -> Response:
     """Get information about an access token."""
     await request.form()
-    return authorization_server.create_endpoint_response(
-        IntrospectionEndpoint.ENDPOINT_NAME, request
+    return await authorization_server.run(
+        authorization_server.create_endpoint_response,
+        IntrospectionEndpoint.ENDPOINT_NAME,
+        request,
     )
 
 
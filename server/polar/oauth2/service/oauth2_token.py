@@ -8,7 +8,7 @@ from sqlalchemy.orm import joinedload
 
 from polar.config import settings
 from polar.email.renderer import get_email_renderer
-from polar.email.sender import get_email_sender
+from polar.email.sender import Email, enqueue_emails
 from polar.enums import TokenType
 from polar.exceptions import PolarError
 from polar.kit.crypto import get_token_hash
@@ -20,6 +20,7 @@ from polar.postgres import AsyncSession
 from polar.user_organization.service import (
     user_organization as user_organization_service,
 )
+from polar.worker import enqueue_job
 
 from .oauth2_client import oauth2_client as oauth2_client_service
 
@@ -82,10 +83,12 @@ class OAuth2TokenService(ResourceServiceReader[OAuth2Token]):
         oauth2_token.access_token_revoked_at = int(time.time())  # pyright: ignore
         oauth2_token.refresh_token_revoked_at = int(time.time())  # pyright: ignore
         session.add(oauth2_token)
+        enqueue_job(
+            "auth.invalidate_cache", token_hashes=[cast(str, oauth2_token.access_token)]
+        )
 
         # Notify
         email_renderer = get_email_renderer({"oauth2": "polar.oauth2"})
-        email_sender = get_email_sender()
 
         recipients: list[str]
         sub = oauth2_token.sub
@@ -112,10 +115,10 @@ class OAuth2TokenService(ResourceServiceReader[OAuth2Token]):
                 },
             )
 
-            for recipient in recipients:
-                email_sender.send_to_user(
-                    to_email_addr=recipient, subject=subject, html_content=body
-                )
+            enqueue_emails(
+                Email(to_email_addr=recipient, subject=subject, html_content=body)
+                for recipient in recipients
+            )
 
         log.info(
             "Revoke leaked access token and refresh token",
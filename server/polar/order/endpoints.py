@@ -1,16 +1,22 @@
 from typing import Annotated
 
-from fastapi import Depends, Path, Query
+from fastapi import Depends, Path, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import UUID4
 
 from polar.exceptions import ResourceNotFound
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.csv import gzip_iterable
+from polar.kit.db.postgres import AsyncSessionMaker
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import Order
 from polar.models.product_price import ProductPriceType
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_session, get_db_sessionmaker
 from polar.product.schemas import ProductID
 from polar.routing import APIRouter
 
@@ -29,7 +35,7 @@ OrderNotFound = {"description": "Order not found.", "model": ResourceNotFound.sc
 @router.get("/", summary="List Orders", response_model=ListResource[OrderSchema])
 async def list(
     auth_subject: auth.OrdersRead,
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     sorting: sorting.ListSorting,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, title="OrganizationID Filter", description="Filter by organization ID."
@@ -56,7 +62,7 @@ async def list(
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[OrderSchema]:
     """List orders."""
-    results, count = await order_service.list(
+    results, count, next_cursor = await order_service.list(
         session,
         auth_subject,
         organization_id=organization_id,
@@ -72,6 +78,41 @@ async def list(
         [OrderSchema.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
+    )
+
+
+@router.get("/export", summary="Export Orders")
+async def export(
+    auth_subject: auth.OrdersRead,
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, title="OrganizationID Filter", description="Filter by organization ID."
+    ),
+    product_id: MultipleQueryFilter[ProductID] | None = Query(
+        None, title="ProductID Filter", description="Filter by product ID."
+    ),
+    compress: bool = Query(False, description="Compress the CSV file with gzip."),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_sessionmaker),
+) -> Response:
+    """Export orders as a CSV file."""
+    content = order_service.get_export_csv(
+        sessionmaker,
+        auth_subject,
+        organization_id=organization_id,
+        product_id=product_id,
+    )
+
+    filename = "polar-orders.csv"
+    if compress:
+        return StreamingResponse(
+            gzip_iterable(content),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.gz"},
+        )
+    return StreamingResponse(
+        content,
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
@@ -1,11 +1,11 @@
 import uuid
-from collections.abc import Sequence
+from collections.abc import AsyncIterable, Sequence
 from datetime import UTC, datetime
 from typing import Any
 
 import stripe as stripe_lib
 import structlog
-from sqlalchemy import Select, UnaryExpression, asc, desc, select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import aliased, contains_eager, joinedload
 
 from polar.account.service import account as account_service
@@ -15,18 +15,20 @@ from polar.checkout.service import checkout as checkout_service
 from polar.config import settings
 from polar.discount.service import discount as discount_service
 from polar.email.renderer import get_email_renderer
-from polar.email.sender import get_email_sender
+from polar.email.sender import enqueue_email
 from polar.exceptions import PolarError
 from polar.held_balance.service import held_balance as held_balance_service
 from polar.integrations.stripe.schemas import ProductType
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
 from polar.kit.address import Address
-from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.csv import IterableCSVWriter
+from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
+from polar.kit.pagination import KeysetColumn, PaginationParams, paginate_keyset
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.logging import Logger
+from polar.metrics.service import metrics as metrics_service
 from polar.models import (
     Checkout,
     Discount,
@@ -182,7 +184,7 @@ class OrderService(ResourceServiceReader[Order]):
         sorting: list[Sorting[OrderSortProperty]] = [
             (OrderSortProperty.created_at, True)
         ],
-    ) -> tuple[Sequence[Order], int]:
+    ) -> tuple[Sequence[Order], int, str | None]:
         statement = self._get_readable_order_statement(auth_subject)
 
         statement = statement.join(Order.discount, isouter=True).options(
@@ -215,24 +217,99 @@ class OrderService(ResourceServiceReader[Order]):
         if user_id is not None:
             statement = statement.where(Order.user_id.in_(user_id))
 
-        order_by_clauses: list[UnaryExpression[Any]] = []
+        keyset: list[KeysetColumn] = []
         for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
             if criterion == OrderSortProperty.created_at:
-                order_by_clauses.append(clause_function(Order.created_at))
+                keyset.append(KeysetColumn(Order.created_at, is_desc))
             elif criterion == OrderSortProperty.amount:
-                order_by_clauses.append(clause_function(Order.amount))
+                keyset.append(KeysetColumn(Order.amount, is_desc))
             elif criterion == OrderSortProperty.user:
-                order_by_clauses.append(clause_function(OrderUser.email))
+                keyset.append(KeysetColumn(OrderUser.email, is_desc))
             elif criterion == OrderSortProperty.product:
-                order_by_clauses.append(clause_function(Product.name))
+                keyset.append(KeysetColumn(Product.name, is_desc))
             elif criterion == OrderSortProperty.discount:
-                order_by_clauses.append(clause_function(Discount.name))
+                keyset.append(KeysetColumn(Discount.name, is_desc))
             elif criterion == OrderSortProperty.subscription:
-                order_by_clauses.append(clause_function(Order.subscription_id))
-        statement = statement.order_by(*order_by_clauses)
+                keyset.append(KeysetColumn(Order.subscription_id, is_desc))
+        keyset.append(KeysetColumn(Order.id, keyset[0].descending if keyset else False))
 
-        return await paginate(session, statement, pagination=pagination)
+        return await paginate_keyset(
+            session, statement, pagination=pagination, keyset=keyset
+        )
+
+    async def get_export_csv(
+        self,
+        sessionmaker: AsyncSessionMaker,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+    ) -> AsyncIterable[str]:
+        statement = (
+            self._get_readable_order_statement(auth_subject)
+            .join(Order.user)
+            .join(Order.discount, isouter=True)
+            .with_only_columns(
+                User.email,
+                Order.created_at,
+                Product.name,
+                Order.amount,
+                Order.tax_amount,
+                Order.currency,
+                Order.billing_reason,
+                Discount.name,
+            )
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .execution_options(yield_per=settings.EXPORT_YIELD_PER)
+        )
+
+        if organization_id is not None:
+            statement = statement.where(Product.organization_id.in_(organization_id))
+
+        if product_id is not None:
+            statement = statement.where(Order.product_id.in_(product_id))
+
+        csv_writer = IterableCSVWriter(dialect="excel")
+        yield csv_writer.getrow(
+            (
+                "Email",
+                "Created At",
+                "Product",
+                "Amount",
+                "Tax Amount",
+                "Currency",
+                "Billing Reason",
+                "Discount",
+            )
+        )
+
+        # StreamingResponse is running its own async task to exhaust the iterator,
+        # so we can't rely on the request session. Rows are fetched in chunks
+        # through a server-side cursor, so the export is never fully loaded in memory.
+        async with sessionmaker() as session:
+            result = await session.stream(statement)
+            async for (
+                email,
+                created_at,
+                product_name,
+                amount,
+                tax_amount,
+                currency,
+                billing_reason,
+                discount_name,
+            ) in result:
+                yield csv_writer.getrow(
+                    (
+                        email,
+                        created_at.isoformat(),
+                        product_name,
+                        amount / 100,
+                        tax_amount / 100,
+                        currency,
+                        billing_reason,
+                        discount_name if discount_name is not None else "",
+                    )
+                )
 
     async def get_by_id(
         self,
@@ -442,6 +519,17 @@ class OrderService(ResourceServiceReader[Order]):
         session.add(order)
         await session.flush()
 
+        metrics_service.enqueue_rollups_update(
+            product.organization_id,
+            order.created_at,
+            # The subscription amount may have changed, affecting its MRR
+            *(
+                (subscription.started_at, subscription.ended_at)
+                if subscription is not None
+                else ()
+            ),
+        )
+
         # Create the transactions balances for the order, if payment was actually made
         # Payment can be skipped in two cases:
         # * The invoice total is zero, like a free product (obviously)
@@ -489,6 +577,8 @@ class OrderService(ResourceServiceReader[Order]):
                 "order.discord_notification",
                 order_id=order.id,
             )
+            # New customers are listed on the storefront
+            enqueue_job("storefront.invalidate_cache", product.organization_id)
 
         # Notify checkout channel that an order has been created from it
         if checkout is not None:
@@ -522,7 +612,6 @@ class OrderService(ResourceServiceReader[Order]):
         self, session: AsyncSession, organization: Organization, order: Order
     ) -> None:
         email_renderer = get_email_renderer({"order": "polar.order"})
-        email_sender = get_email_sender()
 
         product = order.product
         user = order.user
@@ -537,9 +626,7 @@ class OrderService(ResourceServiceReader[Order]):
             },
         )
 
-        email_sender.send_to_user(
-            to_email_addr=user.email, subject=subject, html_content=body
-        )
+        enqueue_email(to_email_addr=user.email, subject=subject, html_content=body)
 
     async def update_product_benefits_grants(
         self, session: AsyncSession, product: Product
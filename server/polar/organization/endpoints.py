@@ -62,6 +62,7 @@ async def list(
     pagination: PaginationParamsQuery,
     sorting: sorting.ListSorting,
     slug: str | None = Query(None, description="Filter by slug."),
+    query: str | None = Query(None, description="Filter by name or slug."),
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[OrganizationSchema]:
     """List organizations."""
@@ -69,6 +70,7 @@ async def list(
         session,
         auth_subject,
         slug=slug,
+        query=query,
         pagination=pagination,
         sorting=sorting,
     )
@@ -14,6 +14,7 @@ from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, PolarError, PolarRequestValidationError
 from polar.integrations.loops.service import loops as loops_service
 from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.search import TrigramSearch
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.models import Organization, User, UserOrganization
@@ -50,6 +51,7 @@ class OrganizationService(ResourceServiceReader[Organization]):
         auth_subject: AuthSubject[User | Organization],
         *,
         slug: str | None = None,
+        query: str | None = None,
         pagination: PaginationParams,
         sorting: list[Sorting[OrganizationSortProperty]] = [
             (OrganizationSortProperty.created_at, False)
@@ -60,6 +62,10 @@ class OrganizationService(ResourceServiceReader[Organization]):
         if slug is not None:
             statement = statement.where(Organization.slug == slug)
 
+        if query is not None:
+            search = TrigramSearch(query, [Organization.name, Organization.slug])
+            statement = statement.where(search.clause).order_by(search.rank.desc())
+
         order_by_clauses: list[UnaryExpression[Any]] = []
         for criterion, is_desc in sorting:
             clause_function = desc if is_desc else asc
@@ -325,6 +331,7 @@ class OrganizationService(ResourceServiceReader[Organization]):
             target=organization,
             we=(WebhookEventType.organization_updated, organization),
         )
+        enqueue_job("storefront.invalidate_cache", organization.id)
 
     def _get_readable_organization_statement(
         self, auth_subject: AuthSubject[User | Organization]
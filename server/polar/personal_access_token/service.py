@@ -1,15 +1,27 @@
 from collections.abc import Sequence
-from datetime import datetime
+from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
 import structlog
-from sqlalchemy import Select, or_, select, update
+from redis import RedisError
+from sqlalchemy import (
+    TIMESTAMP,
+    Select,
+    Uuid,
+    column,
+    func,
+    or_,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject
 from polar.config import settings
 from polar.email.renderer import get_email_renderer
-from polar.email.sender import get_email_sender
+from polar.email.sender import enqueue_email
 from polar.enums import TokenType
 from polar.integrations.loops.service import loops as loops_service
 from polar.kit.crypto import generate_token_hash_pair, get_token_hash
@@ -18,13 +30,29 @@ from polar.kit.services import ResourceServiceReader
 from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models import PersonalAccessToken, User
-from polar.postgres import AsyncSession
+from polar.postgres import AsyncSession, add_after_commit_hook
+from polar.redis import Redis
+from polar.worker import enqueue_job
 
 from .schemas import PersonalAccessTokenCreate
 
 log: Logger = structlog.get_logger()
 
 TOKEN_PREFIX = "polar_pat_"
+USAGE_KEY = "personal_access_token:usage"
+
+# Removes the flushed usages, unless a more recent one was recorded since.
+# ARGV holds pairs of token ID and flushed timestamp.
+_REMOVE_FLUSHED_USAGE_SCRIPT = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    local score = redis.call("ZSCORE", KEYS[1], ARGV[i])
+    if score and tonumber(score) <= tonumber(ARGV[i + 1]) then
+        removed = removed + redis.call("ZREM", KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
 
 
 class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
@@ -102,17 +130,75 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
     ) -> None:
         personal_access_token.set_deleted_at()
         session.add(personal_access_token)
+        enqueue_job("auth.invalidate_cache", token_hashes=[personal_access_token.token])
 
     async def record_usage(
-        self, session: AsyncSession, id: UUID, last_used_at: datetime
+        self, redis: Redis, id: UUID, last_used_at: datetime
     ) -> None:
+        """
+        Record the usage of a token in Redis.
+
+        Usages are coalesced in a sorted set, only keeping the latest timestamp
+        of each token, and written to the database by `flush_usage`.
+        """
+        try:
+            await redis.zadd(USAGE_KEY, {str(id): last_used_at.timestamp()}, gt=True)
+        except RedisError as e:
+            log.warning("personal_access_token.record_usage_error", error=str(e))
+
+    async def flush_usage(self, session: AsyncSession, redis: Redis) -> int:
+        """
+        Write the usages recorded in Redis to the database.
+
+        Usages are removed from Redis only once the session is committed:
+        if the transaction fails, they're written by the next flush.
+        """
+        # Members are bytes when the client doesn't decode responses
+        usages: list[tuple[Any, float]] = await redis.zrange(
+            USAGE_KEY, 0, -1, withscores=True
+        )
+
+        if not usages:
+            return 0
+
+        usage_values = values(
+            column("id", Uuid),
+            column("last_used_at", TIMESTAMP(timezone=True)),
+            name="usage",
+        ).data(
+            [
+                (
+                    UUID(id.decode() if isinstance(id, bytes) else id),
+                    datetime.fromtimestamp(timestamp, UTC),
+                )
+                for id, timestamp in usages
+            ]
+        )
         statement = (
             update(PersonalAccessToken)
-            .where(PersonalAccessToken.id == id)
-            .values(last_used_at=last_used_at)
+            .where(PersonalAccessToken.id == usage_values.c.id)
+            .values(
+                last_used_at=func.greatest(
+                    func.coalesce(
+                        PersonalAccessToken.last_used_at, usage_values.c.last_used_at
+                    ),
+                    usage_values.c.last_used_at,
+                )
+            )
         )
         await session.execute(statement)
 
+        async def _remove_flushed_usage() -> None:
+            script = redis.register_script(_REMOVE_FLUSHED_USAGE_SCRIPT)
+            await script(
+                [USAGE_KEY],
+                [value for usage in usages for value in usage],
+            )
+
+        add_after_commit_hook(session, _remove_flushed_usage)
+
+        return len(usages)
+
     async def revoke_leaked(
         self,
         session: AsyncSession,
@@ -129,11 +215,11 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
 
         personal_access_token.set_deleted_at()
         session.add(personal_access_token)
+        enqueue_job("auth.invalidate_cache", token_hashes=[personal_access_token.token])
 
         email_renderer = get_email_renderer(
             {"personal_access_token": "polar.personal_access_token"}
         )
-        email_sender = get_email_sender()
 
         subject, body = email_renderer.render_from_template(
             "Security Notice - Your Polar Personal Access Token has been leaked",
@@ -146,7 +232,7 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
             },
         )
 
-        email_sender.send_to_user(
+        enqueue_email(
             to_email_addr=personal_access_token.user.email,
             subject=subject,
             html_content=body,
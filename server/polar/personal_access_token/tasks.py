@@ -1,11 +1,34 @@
 import uuid
 from datetime import datetime
 
-from polar.worker import AsyncSessionMaker, JobContext, PolarWorkerContext, task
+import structlog
+
+from polar.logging import Logger
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    JobContext,
+    PolarWorkerContext,
+    get_worker_redis,
+    task,
+)
 
 from .service import personal_access_token as personal_access_token_service
 
+log: Logger = structlog.get_logger()
+
+
+@task("personal_access_token.flush_usage", cron_trigger=CronTrigger(second=0))
+async def flush_usage(ctx: JobContext) -> None:
+    async with AsyncSessionMaker(ctx) as session:
+        count = await personal_access_token_service.flush_usage(
+            session, get_worker_redis(ctx)
+        )
+        log.debug("personal_access_token.flush_usage", count=count)
+
 
+# Usages are now recorded in Redis by the API.
+# Kept to process the jobs enqueued before; remove it in the next release.
 @task("personal_access_token.record_usage")
 async def record_usage(
     ctx: JobContext,
@@ -13,7 +36,6 @@ async def record_usage(
     last_used_at: datetime,
     polar_context: PolarWorkerContext,
 ) -> None:
-    async with AsyncSessionMaker(ctx) as session:
-        await personal_access_token_service.record_usage(
-            session, personal_access_token_id, last_used_at
-        )
+    await personal_access_token_service.record_usage(
+        get_worker_redis(ctx), personal_access_token_id, last_used_at
+    )
@@ -966,20 +966,59 @@ class PledgeService(ResourceServiceReader[Pledge]):
                 ),
             )
 
-    async def set_issue_pledged_amount_sum(
+    async def set_issue_pledges_summary(
         self,
         session: AsyncSession,
         issue_id: UUID,
     ) -> None:
-        pledges = await self.get_by_issue_ids(session, issue_ids=[issue_id])
-        last_pledged_at = max(p.created_at for p in pledges) if pledges else None
-        summed = sum(p.amount for p in pledges) if pledges else 0
+        """
+        Maintain the pledges summary of the issue:
+        the sum of active pledges, in total and per type,
+        the date of the last one and the number of distinct pledgers.
+        """
+
+        def _sum_by_type(pledge_type: PledgeType) -> Any:
+            return func.coalesce(
+                func.sum(Pledge.amount).filter(Pledge.type == pledge_type), 0
+            )
+
+        summary_statement = select(
+            func.coalesce(func.sum(Pledge.amount), 0),
+            func.max(Pledge.created_at),
+            _sum_by_type(PledgeType.pay_upfront),
+            _sum_by_type(PledgeType.pay_on_completion),
+            _sum_by_type(PledgeType.pay_directly),
+            func.count(
+                func.coalesce(
+                    Pledge.on_behalf_of_organization_id,
+                    Pledge.by_user_id,
+                    Pledge.by_organization_id,
+                ).distinct()
+            ),
+        ).where(
+            Pledge.issue_id == issue_id,
+            Pledge.state.in_(PledgeState.active_states()),
+        )
+        result = await session.execute(summary_statement)
+        (
+            total,
+            last_pledged_at,
+            pay_upfront_total,
+            pay_on_completion_total,
+            pay_directly_total,
+            pledgers_count,
+        ) = result.one()._tuple()
+
         stmt = (
             sql.update(Issue)
             .where(Issue.id == issue_id)
             .values(
-                pledged_amount_sum=summed,
+                pledged_amount_sum=total,
                 last_pledged_at=last_pledged_at,
+                pay_upfront_pledged_amount_sum=pay_upfront_total,
+                pay_on_completion_pledged_amount_sum=pay_on_completion_total,
+                pay_directly_pledged_amount_sum=pay_directly_total,
+                pledgers_count=pledgers_count,
             )
         )
 
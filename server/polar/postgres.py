@@ -1,6 +1,7 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from typing import Literal, TypeAlias
 
+import structlog
 from fastapi import Depends, Request
 
 from polar.config import settings
@@ -17,9 +18,16 @@ from polar.kit.db.postgres import (
 from polar.kit.db.postgres import (
     create_sync_engine as _create_sync_engine,
 )
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
 
 ProcessName: TypeAlias = Literal["app", "worker", "script", "backoffice"]
 
+AfterCommitHook: TypeAlias = Callable[[], Awaitable[None]]
+
+_AFTER_COMMIT_HOOKS_KEY = "after_commit_hooks"
+
 
 def create_async_engine(process_name: ProcessName) -> AsyncEngine:
     return _create_async_engine(
@@ -75,16 +83,46 @@ async def get_db_session(
                 yield session
             except:
                 await session.rollback()
+                clear_after_commit_hooks(session)
                 raise
             else:
                 await session.commit()
+                await run_after_commit_hooks(session)
+
+
+def add_after_commit_hook(session: AsyncSession, hook: AfterCommitHook) -> None:
+    """
+    Schedule a hook to run once the session is committed.
+
+    Hooks are run by the request session and the worker sessions,
+    and dropped if the session is rolled back.
+    """
+    session.info.setdefault(_AFTER_COMMIT_HOOKS_KEY, []).append(hook)
+
+
+def clear_after_commit_hooks(session: AsyncSession) -> None:
+    session.info.pop(_AFTER_COMMIT_HOOKS_KEY, None)
+
+
+async def run_after_commit_hooks(session: AsyncSession) -> None:
+    hooks: list[AfterCommitHook] = session.info.pop(_AFTER_COMMIT_HOOKS_KEY, [])
+    for hook in hooks:
+        # The transaction is committed: a failing hook shouldn't fail the request
+        try:
+            await hook()
+        except Exception as e:
+            log.error("postgres.after_commit_hook.failed", hook=hook, error=str(e))
 
 
 __all__ = [
+    "AfterCommitHook",
     "AsyncSession",
     "sql",
+    "add_after_commit_hook",
+    "clear_after_commit_hooks",
     "create_async_engine",
     "create_sync_engine",
     "get_db_session",
     "get_db_sessionmaker",
+    "run_after_commit_hooks",
 ]
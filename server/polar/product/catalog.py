@@ -0,0 +1,343 @@
+"""
+Process-local cache of the product catalogs of organizations.
+
+A catalog holds the products of an organization, fully loaded: prices,
+benefits, medias and attached custom fields. It's loaded on first use, then shared
+by the requests of the process: each one gets its own copy of the products,
+attached to its session without querying the database.
+
+Catalogs are versioned. When products, prices, benefits or custom fields change,
+the version of the catalog is incremented in Redis as soon as the change is
+committed, and broadcast to every process, which evict their stale copy.
+The process making the change evicts its own copy right away.
+Catalogs loaded before an invalidation are never cached.
+
+Organizations change through many paths, so they're not part of the catalog:
+they're attached to the products of each request.
+"""
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import time
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any, Self
+from uuid import UUID
+
+import structlog
+from fastapi import Request
+from redis import RedisError
+from redis.asyncio.client import PubSub
+from sqlalchemy import Select, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.models import Organization, Product, ProductPrice
+from polar.postgres import AsyncSession, add_after_commit_hook
+from polar.redis import Redis
+from polar.worker import enqueue_job
+
+log: Logger = structlog.get_logger()
+
+INVALIDATION_CHANNEL = "product:catalog:invalidate"
+
+
+def get_version_key(organization_id: UUID) -> str:
+    return f"product:catalog:{organization_id}:version"
+
+
+@dataclasses.dataclass(frozen=True)
+class _Catalog:
+    version: int
+    cached_until: float
+    products: dict[UUID, Product]
+    # Product of each price, including archived ones
+    price_products: dict[UUID, Product]
+
+
+class ProductCatalog:
+    """
+    Cache of the product catalogs of organizations, kept in process memory.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl: int = settings.PRODUCT_CATALOG_CACHE_TTL_SECONDS,
+        max_size: int = settings.PRODUCT_CATALOG_CACHE_MAX_SIZE,
+    ) -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self._max_size = max_size
+        self._catalogs: collections.OrderedDict[UUID, _Catalog] = (
+            collections.OrderedDict()
+        )
+        # Latest version seen for each organization
+        self._versions: dict[UUID, int] = {}
+        # Organization of the products and prices of the cached catalogs
+        self._organizations: dict[UUID, UUID] = {}
+        self._listener_task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        self._listener_task = asyncio.create_task(self._listen(pubsub))
+        _product_catalogs.add(self)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        _product_catalogs.discard(self)
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener_task
+
+    async def list_products(
+        self, session: AsyncSession, organization: Organization
+    ) -> Sequence[Product]:
+        """
+        Return the products of the organization, archived ones excluded.
+        """
+        catalog = await self._get_catalog(session, organization.id)
+        return [
+            await self._attach(session, product, organization)
+            for product in catalog.products.values()
+            if not product.is_archived
+        ]
+
+    async def get_product(self, session: AsyncSession, id: UUID) -> Product | None:
+        organization_id = await self._get_organization_id(
+            session, id, select(Product.organization_id).where(Product.id == id)
+        )
+        if organization_id is None:
+            return None
+
+        catalog = await self._get_catalog(session, organization_id)
+        product = catalog.products.get(id)
+        if product is None:
+            return None
+
+        return await self._attach(session, product)
+
+    async def get_price(self, session: AsyncSession, id: UUID) -> ProductPrice | None:
+        """
+        Return a price, archived or not, with its product.
+        """
+        organization_id = await self._get_organization_id(
+            session,
+            id,
+            select(Product.organization_id)
+            .join(ProductPrice, onclause=ProductPrice.product_id == Product.id)
+            .where(ProductPrice.id == id),
+        )
+        if organization_id is None:
+            return None
+
+        catalog = await self._get_catalog(session, organization_id)
+        product = catalog.price_products.get(id)
+        if product is None:
+            return None
+
+        product = await self._attach(session, product)
+        for price in product.all_prices:
+            if price.id == id:
+                set_committed_value(price, "product", product)
+                return price
+        return None
+
+    def get_version(self, organization_id: UUID) -> int | None:
+        """
+        Return the version of the catalog of the organization held in memory, if any.
+        """
+        catalog = self._catalogs.get(organization_id)
+        return catalog.version if catalog is not None else None
+
+    def evict(self, organization_id: UUID, version: int) -> None:
+        if version > self._versions.get(organization_id, 0):
+            self._versions[organization_id] = version
+        self._pop_catalog(organization_id)
+
+    async def _get_organization_id(
+        self, session: AsyncSession, id: UUID, statement: Select[tuple[UUID]]
+    ) -> UUID | None:
+        organization_id = self._organizations.get(id)
+        if organization_id is None:
+            result = await session.execute(statement)
+            organization_id = result.scalar_one_or_none()
+        return organization_id
+
+    async def _get_catalog(
+        self, session: AsyncSession, organization_id: UUID
+    ) -> _Catalog:
+        catalog = self._catalogs.get(organization_id)
+        if catalog is not None:
+            if catalog.cached_until > time.monotonic():
+                self._catalogs.move_to_end(organization_id)
+                return catalog
+            self._pop_catalog(organization_id)
+
+        version = await self._get_version(organization_id)
+        catalog = await self._load(session, organization_id, version)
+
+        # The catalog was invalidated while we were loading it
+        if version < self._versions.get(organization_id, 0):
+            return catalog
+
+        self._set_catalog(organization_id, catalog)
+        return catalog
+
+    async def _get_version(self, organization_id: UUID) -> int:
+        try:
+            version = await self._redis.get(get_version_key(organization_id))
+        except RedisError as e:
+            log.warning("product.catalog.redis_error", error=str(e))
+            # Without a version, don't let this catalog be cached
+            return -1
+        return int(version) if version is not None else 0
+
+    async def _load(
+        self, session: AsyncSession, organization_id: UUID, version: int
+    ) -> _Catalog:
+        statement = (
+            select(Product)
+            .where(
+                Product.organization_id == organization_id,
+                Product.deleted_at.is_(None),
+            )
+            .order_by(Product.created_at)
+            .options(
+                selectinload(Product.all_prices),
+                selectinload(Product.product_medias),
+                selectinload(Product.attached_custom_fields),
+            )
+        )
+        # Load in a separate session, sharing the connection of the request:
+        # the cached objects must not be attached to the request session.
+        connection = await session.connection()
+        async with AsyncSession(
+            bind=connection, expire_on_commit=False
+        ) as catalog_session:
+            result = await catalog_session.execute(statement)
+            products = result.scalars().all()
+
+        return _Catalog(
+            version=version,
+            cached_until=time.monotonic() + self._ttl,
+            products={product.id: product for product in products},
+            price_products={
+                price.id: product
+                for product in products
+                for price in product.all_prices
+            },
+        )
+
+    async def _attach(
+        self,
+        session: AsyncSession,
+        product: Product,
+        organization: Organization | None = None,
+    ) -> Product:
+        product = await session.merge(product, load=False)
+        if organization is None:
+            organization = await session.get(Organization, product.organization_id)
+        set_committed_value(product, "organization", organization)
+        return product
+
+    def _set_catalog(self, organization_id: UUID, catalog: _Catalog) -> None:
+        self._pop_catalog(organization_id)
+        self._catalogs[organization_id] = catalog
+        for id in (*catalog.products.keys(), *catalog.price_products.keys()):
+            self._organizations[id] = organization_id
+        while len(self._catalogs) > self._max_size:
+            oldest_organization_id = next(iter(self._catalogs))
+            self._pop_catalog(oldest_organization_id)
+
+    def _pop_catalog(self, organization_id: UUID) -> None:
+        catalog = self._catalogs.pop(organization_id, None)
+        if catalog is None:
+            return
+        for id in (*catalog.products.keys(), *catalog.price_products.keys()):
+            self._organizations.pop(id, None)
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                except RedisError as e:
+                    # We may have missed invalidations: don't trust cached catalogs
+                    log.warning("product.catalog.listener_error", error=str(e))
+                    for cached_organization_id in list(self._catalogs.keys()):
+                        self._pop_catalog(cached_organization_id)
+                    await asyncio.sleep(1.0)
+                    continue
+
+                if message is not None and message["type"] == "message":
+                    data: Any = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    organization_id, version = data.split(":")
+                    self.evict(UUID(organization_id), int(version))
+        finally:
+            await pubsub.close()
+
+
+# Catalogs of this process, listening to invalidations
+_product_catalogs: set[ProductCatalog] = set()
+
+
+async def invalidate(redis: Redis, organization_id: UUID) -> int:
+    """
+    Increment the version of the catalog of the organization,
+    evict it from the catalogs of this process and notify every other one.
+
+    Returns:
+        The new version of the catalog.
+    """
+    version = await redis.incr(get_version_key(organization_id))
+    for product_catalog in _product_catalogs:
+        product_catalog.evict(organization_id, version)
+    await redis.publish(INVALIDATION_CHANNEL, f"{organization_id}:{version}")
+    return version
+
+
+def invalidate_after_commit(session: AsyncSession, organization_id: UUID) -> None:
+    """
+    Invalidate the catalog of the organization once the session is committed.
+
+    Processes without a catalog, like the worker, delegate it to a job.
+    """
+
+    async def _invalidate() -> None:
+        product_catalog = next(iter(_product_catalogs), None)
+        if product_catalog is None:
+            enqueue_job("product.invalidate_catalog", organization_id)
+            return
+        await invalidate(product_catalog._redis, organization_id)
+
+    add_after_commit_hook(session, _invalidate)
+
+
+async def get_product_catalog(request: Request) -> ProductCatalog:
+    return request.state.product_catalog
+
+
+__all__ = [
+    "ProductCatalog",
+    "get_version_key",
+    "invalidate",
+    "invalidate_after_commit",
+    "get_product_catalog",
+]
@@ -16,6 +16,7 @@ from polar.integrations.loops.service import loops as loops_service
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.search import TrigramSearch
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.models import (
@@ -42,6 +43,7 @@ from polar.webhook.service import webhook as webhook_service
 from polar.webhook.webhooks import WebhookTypeObject
 from polar.worker import enqueue_job
 
+from .. import catalog as product_catalog
 from ..schemas import (
     ExistingProductPrice,
     ProductCreate,
@@ -95,7 +97,8 @@ class ProductService(ResourceServiceReader[Product]):
             statement = statement.where(Product.organization_id.in_(organization_id))
 
         if query is not None:
-            statement = statement.where(Product.name.ilike(f"%{query}%"))
+            search = TrigramSearch(query, [Product.name])
+            statement = statement.where(search.clause).order_by(search.rank.desc())
 
         if is_archived is not None:
             statement = statement.where(Product.is_archived.is_(is_archived))
@@ -197,23 +200,6 @@ class ProductService(ResourceServiceReader[Product]):
         result = await session.execute(statement)
         return result.scalar_one_or_none()
 
-    async def get_embed(self, session: AsyncSession, id: uuid.UUID) -> Product | None:
-        statement = (
-            select(Product)
-            .where(
-                Product.id == id,
-                Product.deleted_at.is_(None),
-                Product.is_archived.is_(False),
-            )
-            .options(
-                selectinload(Product.product_medias),
-            )
-            .limit(1)
-        )
-
-        result = await session.execute(statement)
-        return result.scalar_one_or_none()
-
     async def get_loaded(
         self, session: AsyncSession, id: uuid.UUID, allow_deleted: bool = False
     ) -> Product | None:
@@ -650,6 +636,7 @@ class ProductService(ResourceServiceReader[Product]):
         product: Product,
     ) -> None:
         await self._send_webhook(session, product, WebhookEventType.product_created)
+        product_catalog.invalidate_after_commit(session, product.organization_id)
         if is_user(auth_subject):
             user = auth_subject.subject
             await loops_service.user_created_product(user)
@@ -658,6 +645,7 @@ class ProductService(ResourceServiceReader[Product]):
         self, session: AsyncSession, product: Product
     ) -> None:
         await self._send_webhook(session, product, WebhookEventType.product_updated)
+        product_catalog.invalidate_after_commit(session, product.organization_id)
 
     async def _send_webhook(
         self,
@@ -0,0 +1,12 @@
+import uuid
+
+from polar.worker import JobContext, PolarWorkerContext, get_worker_redis, task
+
+from .catalog import invalidate
+
+
+@task("product.invalidate_catalog")
+async def product_invalidate_catalog(
+    ctx: JobContext, organization_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    await invalidate(get_worker_redis(ctx), organization_id)
@@ -105,14 +105,14 @@ async def pledge_created_backoffice_discord_alert(hook: PledgeHook) -> None:
 pledge_created_hook.add(pledge_created_backoffice_discord_alert)
 
 
-async def pledge_created_issue_pledge_sum(hook: PledgeHook) -> None:
+async def pledge_issue_pledges_summary(hook: PledgeHook) -> None:
     session = hook.session
     pledge = hook.pledge
-    await pledge_service.set_issue_pledged_amount_sum(session, pledge.issue_id)
+    await pledge_service.set_issue_pledges_summary(session, pledge.issue_id)
 
 
-pledge_created_hook.add(pledge_created_issue_pledge_sum)
-pledge_updated_hook.add(pledge_created_issue_pledge_sum)
+pledge_created_hook.add(pledge_issue_pledges_summary)
+pledge_updated_hook.add(pledge_issue_pledges_summary)
 
 
 def issue_url(org: ExternalOrganization, repo: Repository, issue: Issue) -> str:
@@ -127,6 +127,11 @@ def pledger_name(pledge: Pledge) -> str | None:
 
 
 async def pledge_created_notification(pledge: Pledge, session: AsyncSession) -> None:
+    # Load the pledger relationships
+    loaded_pledge = await pledge_service.get_with_loaded(session, pledge.id)
+    if loaded_pledge is not None:
+        pledge = loaded_pledge
+
     issue = await issue_service.get(session, pledge.issue_id)
     if not issue:
         log.error("pledge_created_notification.no_issue_found")
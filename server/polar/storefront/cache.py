@@ -0,0 +1,187 @@
+"""
+Cache of the public storefront and product embed responses.
+
+Responses are stored in Redis, serialized, along with the versions of the data
+they were built from: the product catalog of the organization and, for storefronts,
+the storefront version, bumped when the organization or its customers change.
+A cached response is served as long as these versions didn't change,
+without touching the database.
+
+Responses get a strong ETag, so clients revalidate them with `If-None-Match`
+and get a `304 Not Modified` while they're current.
+"""
+
+import dataclasses
+import hashlib
+import json
+from typing import Self
+from uuid import UUID
+
+from fastapi import Request, Response
+
+from polar.config import settings
+from polar.product.catalog import ProductCatalog
+from polar.product.catalog import get_version_key as get_catalog_version_key
+from polar.redis import Redis
+
+# Clients and proxies may store responses, but must revalidate them:
+# revalidation is cheap and changes are visible immediately.
+CACHE_CONTROL = "public, no-cache"
+
+
+def get_storefront_version_key(organization_id: UUID) -> str:
+    return f"storefront:{organization_id}:version"
+
+
+def _get_key(key: str) -> str:
+    return f"storefront:cache:{key}"
+
+
+@dataclasses.dataclass(frozen=True)
+class Versions:
+    """
+    Versions of the data of an organization a response is built from.
+    """
+
+    organization_id: UUID
+    catalog: int
+    # `None` if the response doesn't depend on the organization and its customers
+    storefront: int | None
+
+    @property
+    def keys(self) -> list[str]:
+        keys = [get_catalog_version_key(self.organization_id)]
+        if self.storefront is not None:
+            keys.append(get_storefront_version_key(self.organization_id))
+        return keys
+
+    @property
+    def values(self) -> list[int]:
+        values = [self.catalog]
+        if self.storefront is not None:
+            values.append(self.storefront)
+        return values
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedResponse:
+    content: bytes
+    etag: str
+
+    @classmethod
+    def from_content(cls, content: str) -> Self:
+        encoded_content = content.encode()
+        return cls(
+            content=encoded_content,
+            etag=f'"{hashlib.sha256(encoded_content).hexdigest()}"',
+        )
+
+    def to_response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if _etag_matches(request.headers.get("If-None-Match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(self.content, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    # `If-None-Match` uses weak comparison
+    for value in if_none_match.split(","):
+        value = value.strip().removeprefix("W/")
+        if value == "*" or value == etag:
+            return True
+    return False
+
+
+async def _get_values(redis: Redis, keys: list[str]) -> list[int]:
+    values = await redis.mget(keys)
+    return [int(value) if value is not None else 0 for value in values]
+
+
+async def get_versions(
+    redis: Redis, organization_id: UUID, *, storefront: bool
+) -> Versions:
+    """
+    Return the current versions of the data a response depends on.
+
+    Read them *before* building the response: if the data changes meanwhile,
+    the response is stored with outdated versions and never served.
+
+    Args:
+        storefront: Whether the response depends on the organization
+        and its customers, besides its product catalog.
+    """
+    keys = [get_catalog_version_key(organization_id)]
+    if storefront:
+        keys.append(get_storefront_version_key(organization_id))
+    values = await _get_values(redis, keys)
+    return Versions(
+        organization_id=organization_id,
+        catalog=values[0],
+        storefront=values[1] if storefront else None,
+    )
+
+
+async def get_response(redis: Redis, key: str) -> CachedResponse | None:
+    raw_entry = await redis.get(_get_key(key))
+    if raw_entry is None:
+        return None
+
+    entry = json.loads(raw_entry)
+    versions = Versions(
+        organization_id=UUID(entry["organization_id"]),
+        catalog=entry["catalog_version"],
+        storefront=entry["storefront_version"],
+    )
+    if await _get_values(redis, versions.keys) != versions.values:
+        return None
+
+    return CachedResponse(content=entry["content"].encode(), etag=entry["etag"])
+
+
+async def set_response(
+    redis: Redis,
+    key: str,
+    response: CachedResponse,
+    versions: Versions,
+    product_catalog: ProductCatalog,
+) -> None:
+    """
+    Store a response built from the given versions.
+
+    The product catalog of the process may not have received an invalidation yet:
+    the response is only stored if its products were read from the same version.
+    """
+    if product_catalog.get_version(versions.organization_id) != versions.catalog:
+        return
+
+    entry = {
+        "organization_id": str(versions.organization_id),
+        "catalog_version": versions.catalog,
+        "storefront_version": versions.storefront,
+        "content": response.content.decode(),
+        "etag": response.etag,
+    }
+    await redis.set(
+        _get_key(key), json.dumps(entry), ex=settings.STOREFRONT_CACHE_TTL_SECONDS
+    )
+
+
+async def invalidate(redis: Redis, organization_id: UUID) -> None:
+    """
+    Bump the storefront version of the organization,
+    so its cached storefront isn't served anymore.
+    """
+    await redis.incr(get_storefront_version_key(organization_id))
+
+
+__all__ = [
+    "Versions",
+    "CachedResponse",
+    "get_storefront_version_key",
+    "get_versions",
+    "get_response",
+    "set_response",
+    "invalidate",
+]
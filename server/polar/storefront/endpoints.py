@@ -1,12 +1,15 @@
-from fastapi import Depends
+from fastapi import Depends, Request, Response
 
 from polar.exceptions import ResourceNotFound
 from polar.kit.pagination import PaginationParams
 from polar.models import Product
 from polar.openapi import APITag
 from polar.postgres import AsyncSession, get_db_session
+from polar.product.catalog import ProductCatalog, get_product_catalog
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
+from . import cache
 from .schemas import Storefront
 from .service import storefront as storefront_service
 
@@ -24,15 +27,30 @@ OrganizationNotFound = {
     response_model=Storefront,
     responses={404: OrganizationNotFound},
 )
-async def get(slug: str, session: AsyncSession = Depends(get_db_session)) -> Storefront:
+async def get(
+    request: Request,
+    slug: str,
+    session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
+    product_catalog: ProductCatalog = Depends(get_product_catalog),
+) -> Response:
     """Get an organization storefront by slug."""
+    cache_key = f"storefront:{slug}"
+    cached_response = await cache.get_response(redis, cache_key)
+    if cached_response is not None:
+        return cached_response.to_response(request)
+
     organization = await storefront_service.get(session, slug)
     if organization is None:
         raise ResourceNotFound()
 
+    versions = await cache.get_versions(redis, organization.id, storefront=True)
+
+    products = await product_catalog.list_products(session, organization)
+
     # Retrieve the product that was created from the migrated donation feature
     donation_product: Product | None = None
-    for product in organization.products:
+    for product in products:
         if product.user_metadata.get("donation_product", False):
             donation_product = product
 
@@ -40,10 +58,10 @@ async def get(slug: str, session: AsyncSession = Depends(get_db_session)) -> Sto
         session, organization, pagination=PaginationParams(1, 3)
     )
 
-    return Storefront.model_validate(
+    storefront = Storefront.model_validate(
         {
             "organization": organization,
-            "products": organization.products,
+            "products": products,
             "donation_product": donation_product,
             "customers": {
                 "total": total,
@@ -51,3 +69,8 @@ async def get(slug: str, session: AsyncSession = Depends(get_db_session)) -> Sto
             },
         }
     )
+    response = cache.CachedResponse.from_content(
+        storefront.model_dump_json(by_alias=True)
+    )
+    await cache.set_response(redis, cache_key, response, versions, product_catalog)
+    return response.to_response(request)
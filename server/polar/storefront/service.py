@@ -1,7 +1,6 @@
 from collections.abc import Sequence
 
 from sqlalchemy import and_, select
-from sqlalchemy.orm import selectinload
 
 from polar.kit.pagination import PaginationParams, paginate
 from polar.models import OAuthAccount, Order, Organization, Product, User
@@ -11,22 +10,14 @@ from polar.postgres import AsyncSession
 
 class StorefrontService:
     async def get(self, session: AsyncSession, slug: str) -> Organization | None:
-        statement = (
-            select(Organization)
-            .where(
-                Organization.deleted_at.is_(None),
-                Organization.blocked_at.is_(None),
-                Organization.slug == slug,
-                Organization.storefront_enabled.is_(True),
-            )
-            .options(
-                selectinload(Organization.products).options(
-                    selectinload(Product.product_medias)
-                )
-            )
+        statement = select(Organization).where(
+            Organization.deleted_at.is_(None),
+            Organization.blocked_at.is_(None),
+            Organization.slug == slug,
+            Organization.storefront_enabled.is_(True),
         )
         result = await session.execute(statement)
-        return result.unique().scalar_one_or_none()
+        return result.scalar_one_or_none()
 
     async def list_customers(
         self,
@@ -0,0 +1,12 @@
+import uuid
+
+from polar.worker import JobContext, PolarWorkerContext, get_worker_redis, task
+
+from .cache import invalidate
+
+
+@task("storefront.invalidate_cache")
+async def storefront_invalidate_cache(
+    ctx: JobContext, organization_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    await invalidate(get_worker_redis(ctx), organization_id)
@@ -1,19 +1,20 @@
-from collections.abc import AsyncGenerator
 from typing import Annotated
 
 import structlog
 from fastapi import Depends, Query, Response
 from fastapi.responses import StreamingResponse
 
-from polar.kit.csv import (
-    IterableCSVWriter,
+from polar.kit.csv import gzip_iterable
+from polar.kit.db.postgres import AsyncSessionMaker
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
 )
-from polar.kit.pagination import ListResource, PaginationParams, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_session, get_db_sessionmaker
 from polar.product.schemas import ProductID
 from polar.routing import APIRouter
 
@@ -38,7 +39,7 @@ SearchSorting = Annotated[
 )
 async def list(
     auth_subject: auth.SubscriptionsRead,
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     sorting: SearchSorting,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, title="OrganizationID Filter", description="Filter by organization ID."
@@ -55,7 +56,7 @@ async def list(
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[SubscriptionSchema]:
     """List subscriptions."""
-    results, count = await subscription_service.list(
+    results, count, next_cursor = await subscription_service.list(
         session,
         auth_subject,
         organization_id=organization_id,
@@ -70,6 +71,7 @@ async def list(
         [SubscriptionSchema.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
     )
 
 
@@ -79,48 +81,23 @@ async def export(
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, description="Filter by organization ID."
     ),
-    session: AsyncSession = Depends(get_db_session),
+    compress: bool = Query(False, description="Compress the CSV file with gzip."),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_sessionmaker),
 ) -> Response:
     """Export subscriptions as a CSV file."""
-
-    async def create_csv() -> AsyncGenerator[str, None]:
-        csv_writer = IterableCSVWriter(dialect="excel")
-        # CSV header
-        yield csv_writer.getrow(
-            (
-                "Email",
-                "Created At",
-                "Active",
-                "Product",
-                "Price",
-                "Currency",
-                "Interval",
-            )
-        )
-
-        (subscribers, _) = await subscription_service.list(
-            session,
-            auth_subject,
-            organization_id=organization_id,
-            pagination=PaginationParams(limit=1000000, page=1),
-        )
-
-        for sub in subscribers:
-            yield csv_writer.getrow(
-                (
-                    sub.user.email,
-                    sub.created_at.isoformat(),
-                    "true" if sub.active else "false",
-                    sub.product.name,
-                    sub.amount / 100 if sub.amount is not None else "",
-                    sub.currency if sub.currency is not None else "",
-                    sub.recurring_interval,
-                )
-            )
+    content = subscription_service.get_export_csv(
+        sessionmaker, auth_subject, organization_id=organization_id
+    )
 
     filename = "polar-subscribers.csv"
+    if compress:
+        return StreamingResponse(
+            gzip_iterable(content),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.gz"},
+        )
     return StreamingResponse(
-        create_csv(),
+        content,
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
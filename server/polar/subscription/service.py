@@ -1,12 +1,12 @@
 import typing
 import uuid
-from collections.abc import Sequence
+from collections.abc import AsyncIterable, Sequence
 from datetime import UTC, date, datetime
 from enum import StrEnum
 from typing import Any, Literal, cast, overload
 
 import stripe as stripe_lib
-from sqlalchemy import Select, UnaryExpression, and_, asc, case, desc, select
+from sqlalchemy import Select, and_, case, select
 from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from polar.auth.models import (
@@ -19,16 +19,18 @@ from polar.checkout.service import checkout as checkout_service
 from polar.config import settings
 from polar.discount.service import discount as discount_service
 from polar.email.renderer import get_email_renderer
-from polar.email.sender import get_email_sender
+from polar.email.sender import enqueue_email
 from polar.enums import SubscriptionRecurringInterval
 from polar.exceptions import PolarError
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
-from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.csv import IterableCSVWriter
+from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
+from polar.kit.pagination import KeysetColumn, PaginationParams, paginate_keyset
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
+from polar.metrics.service import metrics as metrics_service
 from polar.models import (
     Benefit,
     BenefitGrant,
@@ -194,7 +196,7 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
         sorting: list[Sorting[SubscriptionSortProperty]] = [
             (SubscriptionSortProperty.started_at, True)
         ],
-    ) -> tuple[Sequence[Subscription], int]:
+    ) -> tuple[Sequence[Subscription], int, str | None]:
         statement = self._get_readable_subscriptions_statement(auth_subject).where(
             Subscription.started_at.is_not(None)
         )
@@ -220,14 +222,13 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             else:
                 statement = statement.where(Subscription.revoked.is_(True))
 
-        order_by_clauses: list[UnaryExpression[Any]] = []
+        keyset: list[KeysetColumn] = []
         for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
             if criterion == SubscriptionSortProperty.user:
-                order_by_clauses.append(clause_function(User.email))
+                keyset.append(KeysetColumn(User.email, is_desc))
             if criterion == SubscriptionSortProperty.status:
-                order_by_clauses.append(
-                    clause_function(
+                keyset.append(
+                    KeysetColumn(
                         case(
                             (Subscription.status == SubscriptionStatus.incomplete, 1),
                             (
@@ -246,18 +247,17 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
                             (Subscription.status == SubscriptionStatus.past_due, 6),
                             (Subscription.status == SubscriptionStatus.canceled, 7),
                             (Subscription.status == SubscriptionStatus.unpaid, 8),
-                        )
+                        ),
+                        is_desc,
                     )
                 )
             if criterion == SubscriptionSortProperty.started_at:
-                order_by_clauses.append(clause_function(Subscription.started_at))
+                keyset.append(KeysetColumn(Subscription.started_at, is_desc))
             if criterion == SubscriptionSortProperty.current_period_end:
-                order_by_clauses.append(
-                    clause_function(Subscription.current_period_end)
-                )
+                keyset.append(KeysetColumn(Subscription.current_period_end, is_desc))
             if criterion == SubscriptionSortProperty.amount:
-                order_by_clauses.append(
-                    clause_function(
+                keyset.append(
+                    KeysetColumn(
                         case(
                             (
                                 Subscription.recurring_interval
@@ -269,14 +269,18 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
                                 == SubscriptionRecurringInterval.month,
                                 Subscription.amount,
                             ),
-                        )
-                    ).nulls_last()
+                        ),
+                        is_desc,
+                        nulls_last=True,
+                    )
                 )
             if criterion == SubscriptionSortProperty.product:
-                order_by_clauses.append(clause_function(Product.name))
+                keyset.append(KeysetColumn(Product.name, is_desc))
             if criterion == SubscriptionSortProperty.discount:
-                order_by_clauses.append(clause_function(Discount.name))
-        statement = statement.order_by(*order_by_clauses)
+                keyset.append(KeysetColumn(Discount.name, is_desc))
+        keyset.append(
+            KeysetColumn(Subscription.id, keyset[0].descending if keyset else False)
+        )
 
         statement = statement.options(
             contains_eager(Subscription.product).options(
@@ -288,9 +292,75 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             contains_eager(Subscription.user),
         )
 
-        results, count = await paginate(session, statement, pagination=pagination)
+        return await paginate_keyset(
+            session, statement, pagination=pagination, keyset=keyset
+        )
 
-        return results, count
+    async def get_export_csv(
+        self,
+        sessionmaker: AsyncSessionMaker,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+    ) -> AsyncIterable[str]:
+        statement = (
+            self._get_readable_subscriptions_statement(auth_subject)
+            .join(Subscription.user)
+            .where(Subscription.started_at.is_not(None))
+            .with_only_columns(
+                User.email,
+                Subscription.created_at,
+                Subscription.active,
+                Product.name,
+                Subscription.amount,
+                Subscription.currency,
+                Subscription.recurring_interval,
+            )
+            .order_by(Subscription.started_at.desc(), Subscription.id.desc())
+            .execution_options(yield_per=settings.EXPORT_YIELD_PER)
+        )
+
+        if organization_id is not None:
+            statement = statement.where(Product.organization_id.in_(organization_id))
+
+        csv_writer = IterableCSVWriter(dialect="excel")
+        yield csv_writer.getrow(
+            (
+                "Email",
+                "Created At",
+                "Active",
+                "Product",
+                "Price",
+                "Currency",
+                "Interval",
+            )
+        )
+
+        # StreamingResponse is running its own async task to exhaust the iterator,
+        # so we can't rely on the request session. Rows are fetched in chunks
+        # through a server-side cursor, so the export is never fully loaded in memory.
+        async with sessionmaker() as session:
+            result = await session.stream(statement)
+            async for (
+                email,
+                created_at,
+                active,
+                product_name,
+                amount,
+                currency,
+                recurring_interval,
+            ) in result:
+                yield csv_writer.getrow(
+                    (
+                        email,
+                        created_at.isoformat(),
+                        "true" if active else "false",
+                        product_name,
+                        amount / 100 if amount is not None else "",
+                        currency if currency is not None else "",
+                        recurring_interval,
+                    )
+                )
 
     async def get_by_stripe_subscription_id(
         self, session: AsyncSession, stripe_subscription_id: str
@@ -512,6 +582,11 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
     async def _after_subscription_created(
         self, session: AsyncSession, subscription: Subscription
     ) -> None:
+        metrics_service.enqueue_rollups_update(
+            subscription.product.organization_id,
+            subscription.started_at,
+            subscription.ended_at,
+        )
         await self._send_webhook(
             session, subscription, WebhookEventType.subscription_created
         )
@@ -533,6 +608,8 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
 
         previous_status = subscription.status
         previous_cancel_at_period_end = subscription.cancel_at_period_end
+        previous_started_at = subscription.started_at
+        previous_ended_at = subscription.ended_at
 
         subscription.status = SubscriptionStatus(stripe_subscription.status)
         subscription.current_period_start = _from_timestamp(
@@ -598,6 +675,14 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
 
         await self.enqueue_benefits_grants(session, subscription)
 
+        metrics_service.enqueue_rollups_update(
+            subscription.product.organization_id,
+            previous_started_at,
+            previous_ended_at,
+            subscription.started_at,
+            subscription.ended_at,
+        )
+
         await self._after_subscription_updated(
             session, subscription, previous_status, previous_cancel_at_period_end
         )
@@ -724,7 +809,6 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
         self, session: AsyncSession, subscription: Subscription
     ) -> None:
         email_renderer = get_email_renderer({"subscription": "polar.subscription"})
-        email_sender = get_email_sender()
 
         product = subscription.product
         featured_organization = await organization_service.get(
@@ -747,15 +831,12 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             },
         )
 
-        email_sender.send_to_user(
-            to_email_addr=user.email, subject=subject, html_content=body
-        )
+        enqueue_email(to_email_addr=user.email, subject=subject, html_content=body)
 
     async def send_cancellation_email(
         self, session: AsyncSession, subscription: Subscription
     ) -> None:
         email_renderer = get_email_renderer({"subscription": "polar.subscription"})
-        email_sender = get_email_sender()
 
         product = subscription.product
         featured_organization = await organization_service.get(
@@ -779,9 +860,7 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             },
         )
 
-        email_sender.send_to_user(
-            to_email_addr=user.email, subject=subject, html_content=body
-        )
+        enqueue_email(to_email_addr=user.email, subject=subject, html_content=body)
 
     def _get_readable_subscriptions_statement(
         self, auth_subject: AuthSubject[User | Organization]
@@ -3,15 +3,19 @@ from polar.article import tasks as article
 from polar.auth import tasks as auth
 from polar.benefit import tasks as benefit
 from polar.checkout import tasks as checkout
+from polar.email import tasks as email
 from polar.eventstream import tasks as eventstream
 from polar.integrations.github import tasks as github
 from polar.integrations.loops import tasks as loops
 from polar.integrations.stripe import tasks as stripe
 from polar.magic_link import tasks as magic_link
+from polar.metrics import tasks as metrics
 from polar.notifications import tasks as notifications
 from polar.order import tasks as order
 from polar.organization import tasks as organization
 from polar.personal_access_token import tasks as personal_access_token
+from polar.product import tasks as product
+from polar.storefront import tasks as storefront
 from polar.subscription import tasks as subscription
 from polar.transaction import tasks as transaction
 from polar.user import tasks as user
@@ -23,15 +27,19 @@ __all__ = [
     "auth",
     "benefit",
     "checkout",
+    "email",
     "eventstream",
     "github",
     "loops",
     "stripe",
     "magic_link",
+    "metrics",
     "order",
     "notifications",
     "organization",
     "personal_access_token",
+    "product",
+    "storefront",
     "subscription",
     "transaction",
     "user",
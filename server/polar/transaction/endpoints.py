@@ -9,7 +9,10 @@ from polar.auth.dependencies import WebUser
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound
 from polar.kit.db.postgres import AsyncSessionMaker
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+)
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.models import Transaction as TransactionModel
 from polar.models.transaction import TransactionType
@@ -39,7 +42,7 @@ SearchSorting = Annotated[
 
 @router.get("/search", response_model=ListResource[Transaction])
 async def search_transactions(
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     sorting: SearchSorting,
     auth_subject: WebUser,
     type: TransactionType | None = Query(None),
@@ -49,7 +52,7 @@ async def search_transactions(
     exclude_platform_fees: bool = Query(False),
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[Transaction]:
-    results, count = await transaction_service.search(
+    results, count, next_cursor = await transaction_service.search(
         session,
         auth_subject.subject,
         type=type,
@@ -65,6 +68,7 @@ async def search_transactions(
         [Transaction.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
     )
 
 
@@ -3,13 +3,13 @@ from collections.abc import Sequence
 from enum import StrEnum
 from typing import Any, cast
 
-from sqlalchemy import Select, UnaryExpression, asc, desc, func, or_, select
+from sqlalchemy import Select, func, or_, select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import aliased, joinedload, subqueryload
 
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import KeysetColumn, PaginationParams, paginate_keyset
 from polar.kit.sorting import Sorting
 from polar.models import (
     Account,
@@ -52,7 +52,7 @@ class TransactionService(BaseTransactionService):
         sorting: list[Sorting[TransactionSortProperty]] = [
             (TransactionSortProperty.created_at, True)
         ],
-    ) -> tuple[Sequence[Transaction], int]:
+    ) -> tuple[Sequence[Transaction], int, str | None]:
         statement = self._get_readable_transactions_statement(user)
 
         statement = statement.options(
@@ -88,18 +88,19 @@ class TransactionService(BaseTransactionService):
         if exclude_platform_fees:
             statement = statement.where(Transaction.platform_fee_type.is_(None))
 
-        order_by_clauses: list[UnaryExpression[Any]] = []
+        keyset: list[KeysetColumn] = []
         for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
             if criterion == TransactionSortProperty.created_at:
-                order_by_clauses.append(clause_function(Transaction.created_at))
+                keyset.append(KeysetColumn(Transaction.created_at, is_desc))
             elif criterion == TransactionSortProperty.amount:
-                order_by_clauses.append(clause_function(Transaction.amount))
-        statement = statement.order_by(*order_by_clauses)
-
-        results, count = await paginate(session, statement, pagination=pagination)
+                keyset.append(KeysetColumn(Transaction.amount, is_desc))
+        keyset.append(
+            KeysetColumn(Transaction.id, keyset[0].descending if keyset else False)
+        )
 
-        return results, count
+        return await paginate_keyset(
+            session, statement, pagination=pagination, keyset=keyset
+        )
 
     async def lookup(
         self, session: AsyncSession, id: uuid.UUID, user: User
@@ -4,7 +4,10 @@ from pydantic import UUID4
 from polar.benefit.schemas import BenefitID
 from polar.exceptions import NotPermitted, ResourceNotFound, Unauthorized
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.license_key.schemas import (
     LicenseKeyActivate,
@@ -23,6 +26,7 @@ from polar.models import LicenseKeyActivation
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from .. import auth
@@ -49,7 +53,7 @@ ActivationNotPermitted = {
 )
 async def list(
     auth_subject: auth.UserLicenseKeysRead,
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, title="OrganizationID Filter", description="Filter by organization ID."
     ),
@@ -58,7 +62,7 @@ async def list(
     ),
     session: AsyncSession = Depends(get_db_session),
 ) -> ListResource[LicenseKeyRead]:
-    results, count = await license_key_service.get_user_list(
+    results, count, next_cursor = await license_key_service.get_user_list(
         session,
         user=auth_subject.subject,
         organization_ids=organization_id,
@@ -70,6 +74,7 @@ async def list(
         [LicenseKeyRead.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
     )
 
 
@@ -115,17 +120,11 @@ async def get(
 async def validate(
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> ValidatedLicenseKey:
     """Validate a license key."""
-    lk = await license_key_service.get_or_raise_by_key(
-        session,
-        organization_id=validate.organization_id,
-        key=validate.key,
-    )
     license_key, activation = await license_key_service.validate(
-        session,
-        license_key=lk,
-        validate=validate,
+        session, redis, validate=validate
     )
     activation_schema = None
     if activation:
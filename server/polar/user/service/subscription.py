@@ -14,6 +14,7 @@ from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
+from polar.metrics.service import metrics as metrics_service
 from polar.models import (
     Organization,
     Product,
@@ -273,6 +274,10 @@ class UserSubscriptionService(ResourceServiceReader[Subscription]):
             subscription.recurring_interval = price.recurring_interval
         session.add(subscription)
 
+        metrics_service.enqueue_rollups_update(
+            product.organization_id, subscription.started_at, subscription.ended_at
+        )
+
         return subscription
 
     async def cancel(
@@ -294,6 +299,12 @@ class UserSubscriptionService(ResourceServiceReader[Subscription]):
             # queue removal of grants
             await subscription_service.enqueue_benefits_grants(session, subscription)
 
+            metrics_service.enqueue_rollups_update(
+                subscription.product.organization_id,
+                subscription.started_at,
+                subscription.ended_at,
+            )
+
         session.add(subscription)
 
         return subscription
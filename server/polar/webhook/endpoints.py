@@ -5,7 +5,11 @@ from pydantic import UUID4
 
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound, Unauthorized
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
+)
 from polar.models import WebhookEndpoint
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
@@ -158,7 +162,7 @@ async def delete_webhook_endpoint(
     response_model=ListResource[WebhookDeliverySchema],
 )
 async def list_webhook_deliveries(
-    pagination: PaginationParamsQuery,
+    pagination: CursorPaginationParamsQuery,
     auth_subject: WebhooksRead,
     endpoint_id: UUID4 | None = Query(
         None, description="Filter by webhook endpoint ID."
@@ -170,7 +174,7 @@ async def list_webhook_deliveries(
 
     Deliveries are all the attempts to deliver a webhook event to an endpoint.
     """
-    results, count = await webhook_service.list_deliveries(
+    results, count, next_cursor = await webhook_service.list_deliveries(
         session, auth_subject, endpoint_id=endpoint_id, pagination=pagination
     )
 
@@ -178,6 +182,7 @@ async def list_webhook_deliveries(
         [WebhookDeliverySchema.model_validate(result) for result in results],
         count,
         pagination,
+        next_cursor,
     )
 
 
@@ -125,6 +125,16 @@ class WebhookDelivery(TimestampedSchema):
         " `null` if the endpoint was unreachable.",
     )
     succeeded: bool = Field(description="Whether the delivery was successful.")
+    connect_duration: int | None = Field(
+        None,
+        description="Time in milliseconds to connect to the URL and send the request."
+        " Close to zero when an existing connection was reused.",
+    )
+    response_duration: int | None = Field(
+        None,
+        description="Time in milliseconds to receive the response"
+        " once the request was sent.",
+    )
     webhook_event: WebhookEvent = Field(
         description="The webhook event sent by this delivery."
     )
@@ -2,7 +2,7 @@ from collections.abc import Sequence
 from uuid import UUID
 
 import structlog
-from sqlalchemy import Select, and_, desc, or_, select, text
+from sqlalchemy import Select, and_, or_, select, text
 from sqlalchemy.orm import contains_eager, joinedload
 
 from polar.auth.models import AuthSubject, is_organization, is_user
@@ -15,7 +15,12 @@ from polar.exceptions import (
     ResourceNotFound,
 )
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import (
+    KeysetColumn,
+    PaginationParams,
+    paginate,
+    paginate_keyset,
+)
 from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models.organization import Organization
@@ -182,7 +187,7 @@ class WebhookService:
         *,
         endpoint_id: UUID | None = None,
         pagination: PaginationParams,
-    ) -> tuple[Sequence[WebhookDelivery], int]:
+    ) -> tuple[Sequence[WebhookDelivery], int, str | None]:
         readable_endpoints_statement = self._get_readable_endpoints_statement(
             auth_subject
         )
@@ -196,7 +201,6 @@ class WebhookService:
                 ),
             )
             .options(joinedload(WebhookDelivery.webhook_event))
-            .order_by(desc(WebhookDelivery.created_at))
         )
 
         if endpoint_id is not None:
@@ -204,7 +208,15 @@ class WebhookService:
                 WebhookDelivery.webhook_endpoint_id == endpoint_id
             )
 
-        return await paginate(session, statement, pagination=pagination)
+        return await paginate_keyset(
+            session,
+            statement,
+            pagination=pagination,
+            keyset=[
+                KeysetColumn(WebhookDelivery.created_at, descending=True),
+                KeysetColumn(WebhookDelivery.id, descending=True),
+            ],
+        )
 
     async def redeliver_event(
         self,
@@ -290,25 +302,41 @@ class WebhookService:
         target: Organization | User,
         payload: BaseWebhookPayload,
     ) -> list[WebhookEvent]:
+        # The payload only depends on the format, so serialize it once per format
+        payloads: dict[WebhookFormat, str | None] = {}
         events: list[WebhookEvent] = []
-        for e in await self._get_event_target_endpoints(
+        for endpoint in await self._get_event_target_endpoints(
             session, event=payload.type, target=target
         ):
-            try:
-                payload_data = payload.get_payload(e.format, target)
-                event_type = WebhookEvent(
-                    webhook_endpoint_id=e.id, payload=payload_data
-                )
-                session.add(event_type)
-                events.append(event_type)
-                await session.flush()
-                enqueue_job("webhook_event.send", webhook_event_id=event_type.id)
-            except UnsupportedTarget as e:
-                # Log the error but do not raise to not fail the whole request
-                log.error(e.message)
-                continue
-            except SkipEvent:
+            if endpoint.format not in payloads:
+                try:
+                    payloads[endpoint.format] = payload.get_payload(
+                        endpoint.format, target
+                    )
+                except UnsupportedTarget as e:
+                    # Log the error but do not raise to not fail the whole request
+                    log.error(e.message)
+                    payloads[endpoint.format] = None
+                except SkipEvent:
+                    payloads[endpoint.format] = None
+
+            payload_data = payloads[endpoint.format]
+            if payload_data is None:
                 continue
+            events.append(
+                WebhookEvent(webhook_endpoint_id=endpoint.id, payload=payload_data)
+            )
+
+        if not events:
+            return events
+
+        # Insert all the events at once
+        session.add_all(events)
+        await session.flush()
+
+        for event in events:
+            enqueue_job("webhook_event.send", webhook_event_id=event.id)
+
         return events
 
     def _get_readable_endpoints_statement(
@@ -1,6 +1,10 @@
+import asyncio
 import base64
+import contextlib
 import socket
-from collections.abc import Mapping
+import time
+from collections.abc import AsyncIterator, Mapping
+from typing import Any
 from urllib.parse import urlparse
 from uuid import UUID
 
@@ -10,6 +14,7 @@ from arq import Retry
 from netaddr import IPAddress
 from standardwebhooks.webhooks import Webhook as StandardWebhook
 
+from polar.config import settings
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.utils import utc_now
 from polar.logging import Logger
@@ -30,6 +35,84 @@ log: Logger = structlog.get_logger()
 MAX_RETRIES = 10
 
 
+class HostLimiter:
+    """
+    Limit the number of concurrent deliveries to a single host,
+    so a burst of events doesn't monopolize the shared connection pool.
+
+    A host only holds a semaphore while deliveries to it are running or waiting:
+    it's dropped as soon as the last one is done.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._users: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._semaphores)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._limit)
+            self._semaphores[host] = semaphore
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._users[host] -= 1
+            if self._users[host] == 0:
+                del self._users[host]
+                del self._semaphores[host]
+
+
+_host_limiter = HostLimiter(settings.WEBHOOK_MAX_CONNECTIONS_PER_HOST)
+
+
+class DeliveryTimer:
+    """
+    Measure the connect and response phases of a webhook delivery.
+
+    The connect phase starts once the delivery is allowed to reach the host,
+    and lasts until the request headers start being sent: it includes
+    waiting for a pooled connection, DNS resolution, TCP and TLS handshakes.
+    It's close to zero when a keep-alive connection is reused.
+    The response phase lasts from there until the response is received.
+    """
+
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self._request_sent: float | None = None
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    async def trace(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name.endswith(".send_request_headers.started"):
+            self._request_sent = time.perf_counter()
+
+    def get_durations(self) -> tuple[int | None, int]:
+        """
+        Return the connect and response durations, in milliseconds.
+
+        The connect duration is `None` if the request was never sent.
+        """
+        end = time.perf_counter()
+        if self._request_sent is None:
+            return None, _to_ms(end - self._start)
+        return (
+            _to_ms(self._request_sent - self._start),
+            _to_ms(end - self._request_sent),
+        )
+
+
+def _to_ms(seconds: float) -> int:
+    return round(seconds * 1000)
+
+
 @task("webhook_event.send")
 async def webhook_event_send(
     ctx: JobContext,
@@ -119,17 +202,23 @@ async def _webhook_event_send(
         webhook_event_id=webhook_event_id, webhook_endpoint_id=event.webhook_endpoint_id
     )
 
+    client = ctx["webhook_http_client"]
+    host = urlparse(event.webhook_endpoint.url).netloc
+    timer = DeliveryTimer()
+
     try:
-        async with httpx.AsyncClient() as client:
+        async with _host_limiter.acquire(host):
+            # Don't count the time spent waiting for other deliveries to the host
+            timer.start()
             response = await client.post(
                 event.webhook_endpoint.url,
                 content=event.payload,
                 headers=headers,
-                timeout=20.0,
+                extensions={"trace": timer.trace},
             )
-            delivery.http_code = response.status_code
-            event.last_http_code = response.status_code
-            response.raise_for_status()
+        delivery.http_code = response.status_code
+        event.last_http_code = response.status_code
+        response.raise_for_status()
     # Error
     except httpx.HTTPError as e:
         log.debug("An errror occurred while sending a webhook", error=e)
@@ -147,6 +236,7 @@ async def _webhook_event_send(
         enqueue_job("webhook_event.success", webhook_event_id=webhook_event_id)
     # Either way, save the delivery
     finally:
+        delivery.connect_duration, delivery.response_duration = timer.get_durations()
         assert delivery.succeeded is not None
         session.add(delivery)
         session.add(event)
@@ -2,13 +2,23 @@ import asyncio
 import contextlib
 import contextvars
 import functools
+import itertools
 import random
 import uuid
-from collections.abc import AsyncIterator, Awaitable, Callable
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
 from datetime import datetime
 from enum import Enum
-from typing import Any, ParamSpec, TypeAlias, TypedDict, TypeVar, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ParamSpec,
+    TypeAlias,
+    TypedDict,
+    TypeVar,
+    cast,
+)
 
+import httpx
 import logfire
 import structlog
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -16,13 +26,18 @@ from apscheduler.triggers.cron import CronTrigger
 from arq import func
 from arq.connections import ArqRedis, RedisSettings
 from arq.connections import create_pool as arq_create_pool
+from arq.constants import job_key_prefix, result_key_prefix
 from arq.cron import CronJob
+from arq.jobs import serialize_job
 from arq.typing import SecondsTimedelta
+from arq.utils import timestamp_ms
 from arq.worker import Function
 from pydantic import BaseModel
+from redis.exceptions import WatchError
 
 from polar.config import settings
 from polar.context import ExecutionContext
+from polar.email.renderer import precompile_email_templates
 from polar.kit.db.postgres import (
     AsyncEngine,
     AsyncSession,
@@ -33,9 +48,16 @@ from polar.kit.db.postgres import (
 )
 from polar.logfire import instrument_httpx, instrument_sqlalchemy
 from polar.logging import generate_correlation_id
-from polar.postgres import create_async_engine
+from polar.postgres import (
+    clear_after_commit_hooks,
+    create_async_engine,
+    run_after_commit_hooks,
+)
 from polar.redis import REDIS_RETRY, REDIS_RETRY_ON_ERRROR, Redis, create_redis
 
+if TYPE_CHECKING:
+    from polar.email.sender import EmailSender
+
 log = structlog.get_logger()
 
 JobToEnqueue: TypeAlias = tuple[str, tuple[Any], dict[str, Any]]
@@ -49,6 +71,8 @@ class WorkerContext(TypedDict):
     raw_redis: Redis
     async_engine: AsyncEngine
     async_sessionmaker: AsyncSessionMakerType
+    webhook_http_client: httpx.AsyncClient
+    email_sender: "EmailSender"
     exit_stack: contextlib.AsyncExitStack
 
 
@@ -84,6 +108,20 @@ def get_redis_settings() -> RedisSettings:
     return redis_settings
 
 
+def create_webhook_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            keepalive_expiry=settings.WEBHOOK_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            settings.WEBHOOK_TIMEOUT_SECONDS,
+            connect=settings.WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+        ),
+    )
+
+
 class WorkerSettings:
     functions: list[Function] = []
     cron_jobs: list[CronJob] = []
@@ -100,16 +138,31 @@ class WorkerSettings:
         instrument_sqlalchemy(async_engine.sync_engine)
         instrument_httpx()
 
+        if settings.EMAIL_RENDERER_PRECOMPILE:
+            precompile_email_templates()
+
         exit_stack = contextlib.AsyncExitStack()
         # Create a dedicated Redis instance instead of sharing the ARQ one,
         # because we need to have decode_responses=True.
         redis = await exit_stack.enter_async_context(create_redis())
+        # Share a connection pool across webhook deliveries, so we can reuse
+        # connections to the same endpoints instead of doing a TLS handshake each time.
+        webhook_http_client = await exit_stack.enter_async_context(
+            create_webhook_http_client()
+        )
+        # The email sender enqueues jobs itself: import it lazily
+        from polar.email.sender import get_email_sender
+
+        email_sender = get_email_sender()
+        exit_stack.push_async_callback(email_sender.close)
 
         ctx.update(
             {
                 "async_engine": async_engine,
                 "async_sessionmaker": async_sessionmaker,
                 "raw_redis": redis,
+                "webhook_http_client": webhook_http_client,
+                "email_sender": email_sender,
                 "exit_stack": exit_stack,
             }
         )
@@ -266,12 +319,101 @@ def enqueue_job(
     log.debug("polar.worker.job_enqueued", name=name, args=args, kwargs=kwargs)
 
 
+ENQUEUE_BATCH_SIZE = 500
+"""Maximum number of jobs written to Redis in a single transaction."""
+
+_BATCHABLE_JOB_OPTIONS = {"_job_id", "_queue_name"}
+_NON_BATCHABLE_JOB_OPTIONS = {"_defer_until", "_defer_by", "_expires", "_job_try"}
+
+
+async def _enqueue_jobs_batch(arq_pool: ArqRedis, jobs: Sequence[JobToEnqueue]) -> None:
+    """
+    Enqueue a batch of jobs in a single Redis transaction.
+
+    It follows the same semantics as `ArqRedis.enqueue_job`: a job is skipped
+    if a job or a result with the same ID already exists.
+    Instead of three round-trips per job, we have three round-trips per batch:
+    one to watch the job keys, one to check their existence
+    and one to write the jobs and add them to their queues.
+
+    If one of the watched jobs is enqueued concurrently, we fall back
+    to enqueueing the jobs one by one.
+    """
+    jobs_by_id: dict[str, JobToEnqueue] = {}
+    for job in jobs:
+        jobs_by_id.setdefault(job[2]["_job_id"], job)
+
+    job_ids = list(jobs_by_id.keys())
+    job_keys = [job_key_prefix + job_id for job_id in job_ids]
+    result_keys = [result_key_prefix + job_id for job_id in job_ids]
+
+    async with arq_pool.pipeline(transaction=True) as pipe:
+        await pipe.watch(*job_keys)
+        existing = await pipe.mget(*job_keys, *result_keys)
+        existing_jobs = existing[: len(job_ids)]
+        existing_results = existing[len(job_ids) :]
+
+        enqueue_time_ms = timestamp_ms()
+        queues: dict[str, dict[str | bytes, int]] = {}
+        pipe.multi()
+        for job_id, job_key, job_exists, result_exists in zip(
+            job_ids, job_keys, existing_jobs, existing_results
+        ):
+            if job_exists is not None or result_exists is not None:
+                continue
+            name, args, kwargs = jobs_by_id[job_id]
+            queue_name = kwargs["_queue_name"]
+            serialized_job = serialize_job(
+                name,
+                args,
+                {k: v for k, v in kwargs.items() if k not in _BATCHABLE_JOB_OPTIONS},
+                None,
+                enqueue_time_ms,
+                serializer=arq_pool.job_serializer,
+            )
+            pipe.psetex(job_key, arq_pool.expires_extra_ms, serialized_job)
+            queues.setdefault(queue_name, {})[job_id] = enqueue_time_ms
+
+        if not queues:
+            return
+
+        for queue_name, mapping in queues.items():
+            pipe.zadd(queue_name, mapping)
+
+        try:
+            await pipe.execute()
+        except WatchError:
+            log.debug("polar.worker.enqueue_jobs_batch_conflict", count=len(jobs))
+            for name, args, kwargs in jobs_by_id.values():
+                await arq_pool.enqueue_job(name, *args, **kwargs)
+
+
+def initialize_enqueued_jobs() -> None:
+    """
+    Start an empty list of jobs to enqueue in the current context.
+
+    Contexts copied from this one, like the ones of synchronous code run in threads,
+    share the list: their jobs are flushed with the others.
+    """
+    _jobs_to_enqueue.set([])
+
+
 async def flush_enqueued_jobs(arq_pool: ArqRedis) -> None:
     if _jobs_to_enqueue_list := _jobs_to_enqueue.get([]):
-        log.debug("polar.worker.flush_enqueued_jobs")
+        log.debug("polar.worker.flush_enqueued_jobs", count=len(_jobs_to_enqueue_list))
+
+        batchable_jobs: list[JobToEnqueue] = []
         for name, args, kwargs in _jobs_to_enqueue_list:
-            await arq_pool.enqueue_job(name, *args, **kwargs)
+            # Jobs with specific options like deferring go through the regular path
+            if kwargs.keys() & _NON_BATCHABLE_JOB_OPTIONS:
+                await arq_pool.enqueue_job(name, *args, **kwargs)
+            else:
+                batchable_jobs.append((name, args, kwargs))
             log.debug("polar.worker.job_flushed", name=name, args=args, kwargs=kwargs)
+
+        for batch in itertools.batched(batchable_jobs, ENQUEUE_BATCH_SIZE):
+            await _enqueue_jobs_batch(arq_pool, batch)
+
         _jobs_to_enqueue.set([])
 
 
@@ -367,9 +509,11 @@ async def AsyncSessionMaker(ctx: JobContext) -> AsyncIterator[AsyncSession]:
             yield session
         except:
             await session.rollback()
+            clear_after_commit_hooks(session)
             raise
         else:
             await session.commit()
+            await run_after_commit_hooks(session)
 
 
 def compute_backoff(
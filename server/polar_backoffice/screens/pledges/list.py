@@ -10,7 +10,7 @@ from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.widgets import DataTable, Footer
 
-from polar.issue.search import search_query
+from polar.issue.search import plan_search
 from polar.models import (
     ExternalOrganization,
     Issue,
@@ -163,11 +163,9 @@ class PledgesListScreen(Screen[None]):
                         )
                     else:
                         fuzzy_clauses.append(clause)
-                if len(fuzzy_clauses):
-                    fuzzy_query = search_query(" ".join(fuzzy_clauses))
-                    statement = statement.where(
-                        Issue.title_tsv.bool_op("@@")(func.to_tsquery(fuzzy_query))
-                    )
+                search_plan = plan_search(" ".join(fuzzy_clauses))
+                if search_plan is not None:
+                    statement = statement.where(search_plan.clause)
 
             stream = await session.stream(statement)
             async for issue, pending_rewards_count in stream.unique():
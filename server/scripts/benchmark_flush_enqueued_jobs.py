@@ -0,0 +1,109 @@
+import asyncio
+import logging.config
+import time
+from functools import wraps
+from typing import Any
+
+import structlog
+import typer
+from arq import ArqRedis
+from arq.connections import create_pool as arq_create_pool
+from arq.constants import job_key_prefix
+
+from polar.worker import (
+    JobToEnqueue,
+    WorkerSettings,
+    _jobs_to_enqueue,
+    flush_enqueued_jobs,
+)
+
+cli = typer.Typer()
+
+
+def drop_all(*args: Any, **kwargs: Any) -> Any:
+    raise structlog.DropEvent
+
+
+structlog.configure(processors=[drop_all])
+logging.config.dictConfig(
+    {
+        "version": 1,
+        "disable_existing_loggers": True,
+    }
+)
+
+
+def typer_async(f):  # type: ignore
+    # From https://github.com/tiangolo/typer/issues/85
+    @wraps(f)
+    def wrapper(*args, **kwargs):  # type: ignore
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+BENCHMARK_QUEUE_NAME = "arq:queue:benchmark"
+
+
+def _build_jobs(count: int, prefix: str) -> list[JobToEnqueue]:
+    # Use a dedicated queue so the jobs are never picked up by a running worker
+    return [
+        (
+            "benchmark.noop",
+            (i,),
+            {
+                "request_correlation_id": None,
+                "_job_id": f"benchmark:{prefix}:{i}",
+                "_queue_name": BENCHMARK_QUEUE_NAME,
+            },
+        )
+        for i in range(count)
+    ]
+
+
+async def _cleanup(arq_pool: ArqRedis, prefix: str) -> None:
+    async for key in arq_pool.scan_iter(f"{job_key_prefix}benchmark:{prefix}:*"):
+        await arq_pool.delete(key)
+    await arq_pool.delete(BENCHMARK_QUEUE_NAME)
+
+
+async def _flush_one_by_one(arq_pool: ArqRedis, jobs: list[JobToEnqueue]) -> None:
+    for name, args, kwargs in jobs:
+        await arq_pool.enqueue_job(name, *args, **kwargs)
+
+
+@cli.command()
+@typer_async
+async def benchmark_flush_enqueued_jobs(
+    count: int = typer.Option(10_000, help="Number of jobs to flush."),
+) -> None:
+    """
+    Measure the time it takes to flush enqueued jobs to Redis,
+    comparing the batched implementation with one-by-one enqueueing.
+    """
+    arq_pool = await arq_create_pool(WorkerSettings.redis_settings)
+    try:
+        await _cleanup(arq_pool, "single")
+        start = time.perf_counter()
+        await _flush_one_by_one(arq_pool, _build_jobs(count, "single"))
+        single_duration = time.perf_counter() - start
+        assert await arq_pool.zcard(BENCHMARK_QUEUE_NAME) == count
+        await _cleanup(arq_pool, "single")
+
+        await _cleanup(arq_pool, "batched")
+        _jobs_to_enqueue.set(_build_jobs(count, "batched"))
+        start = time.perf_counter()
+        await flush_enqueued_jobs(arq_pool)
+        batched_duration = time.perf_counter() - start
+        assert await arq_pool.zcard(BENCHMARK_QUEUE_NAME) == count
+        await _cleanup(arq_pool, "batched")
+    finally:
+        await arq_pool.close()
+
+    typer.echo(f"One by one: {count} jobs in {single_duration:.3f}s")
+    typer.echo(f"Batched: {count} jobs in {batched_duration:.3f}s")
+    typer.echo(f"Speedup: {single_duration / batched_duration:.1f}x")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,124 @@
+import asyncio
+import logging.config
+import time
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any
+
+import structlog
+import typer
+
+from polar.config import settings
+from polar.integrations.aws.s3 import S3Service
+from polar.integrations.aws.s3.client import client
+
+cli = typer.Typer()
+
+
+def drop_all(*args: Any, **kwargs: Any) -> Any:
+    raise structlog.DropEvent
+
+
+structlog.configure(processors=[drop_all])
+logging.config.dictConfig(
+    {
+        "version": 1,
+        "disable_existing_loggers": True,
+    }
+)
+
+
+def typer_async(f):  # type: ignore
+    # From https://github.com/tiangolo/typer/issues/85
+    @wraps(f)
+    def wrapper(*args, **kwargs):  # type: ignore
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+BENCHMARK_KEY = "benchmark/event-loop.txt"
+HEARTBEAT_INTERVAL = 0.005
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list[float]) -> None:
+    """
+    Tick at a fixed interval, recording how late each tick wakes up.
+
+    This is the latency any other request handled by the process would suffer.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+
+async def _measure(
+    run: Callable[[], Awaitable[None]],
+) -> tuple[float, float, float]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    start = time.perf_counter()
+    await run()
+    duration = time.perf_counter() - start
+
+    stop.set()
+    await heartbeat
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return duration, max(lags, default=0.0), p99
+
+
+@cli.command()
+@typer_async
+async def benchmark_s3_event_loop(
+    count: int = typer.Option(200, help="Number of S3 requests."),
+    concurrency: int = typer.Option(
+        settings.S3_MAX_CONCURRENCY, help="Number of concurrent requests."
+    ),
+) -> None:
+    """
+    Measure the event loop stall caused by S3 requests against the local MinIO,
+    comparing blocking boto3 calls with the executor-backed S3Service.
+    """
+    bucket = settings.S3_FILES_BUCKET_NAME
+    service = S3Service(bucket)
+    client.put_object(Bucket=bucket, Key=BENCHMARK_KEY, Body=b"benchmark")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _blocking_head() -> None:
+        async with semaphore:
+            client.head_object(Bucket=bucket, Key=BENCHMARK_KEY)
+
+    async def _async_head() -> None:
+        async with semaphore:
+            await service.get_head_or_raise(BENCHMARK_KEY)
+
+    async def _run_blocking() -> None:
+        await asyncio.gather(*(_blocking_head() for _ in range(count)))
+
+    async def _run_async() -> None:
+        await asyncio.gather(*(_async_head() for _ in range(count)))
+
+    try:
+        results = {
+            "Blocking": await _measure(_run_blocking),
+            "Executor": await _measure(_run_async),
+        }
+    finally:
+        client.delete_object(Bucket=bucket, Key=BENCHMARK_KEY)
+
+    for name, (duration, max_lag, p99_lag) in results.items():
+        typer.echo(
+            f"{name}: {count} requests in {duration:.3f}s, "
+            f"event loop lag max {max_lag * 1000:.1f}ms, "
+            f"p99 {p99_lag * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,212 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+import respx
+from httpx import Response
+from pytest_mock import MockerFixture
+
+from polar.article import newsletter
+from polar.article.newsletter import SUBSCRIBER_ID_PLACEHOLDER, Recipient
+from polar.config import settings
+from polar.email.sender import Email
+from polar.models import (
+    Article,
+    ArticlesSubscription,
+    Organization,
+    User,
+    UserOrganization,
+)
+from polar.models.article import ArticleVisibility
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+
+
+@pytest_asyncio.fixture
+async def article(
+    save_fixture: SaveFixture, user: User, organization: Organization
+) -> Article:
+    article = Article(
+        slug="hello-world",
+        title="Hello world",
+        body="Hello world!",
+        user=user,
+        organization=organization,
+        visibility=ArticleVisibility.public,
+    )
+    await save_fixture(article)
+    return article
+
+
+@pytest.fixture
+def render_mock(respx_mock: respx.MockRouter, article: Article) -> respx.Route:
+    return respx_mock.post(
+        f"{settings.FRONTEND_BASE_URL}/email/article/{article.id}"
+    ).mock(
+        return_value=Response(
+            200, text=f"<a href='/unsubscribe?id={SUBSCRIBER_ID_PLACEHOLDER}'>"
+        )
+    )
+
+
+@pytest.fixture
+def enqueue_emails_mock(mocker: MockerFixture) -> list[Email]:
+    emails: list[Email] = []
+    mocker.patch(
+        "polar.article.newsletter.enqueue_emails",
+        side_effect=lambda batch: emails.extend(batch),
+    )
+    return emails
+
+
+@pytest.mark.asyncio
+class TestSend:
+    async def test_render_once_per_variant(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        article: Article,
+        render_mock: respx.Route,
+        enqueue_emails_mock: list[Email],
+    ) -> None:
+        session.expunge_all()
+
+        subscriber_ids = [uuid.uuid4() for _ in range(3)]
+        recipients = [
+            Recipient(
+                user_id=uuid.uuid4(),
+                email=f"subscriber{i}@example.com",
+                subscriber_id=subscriber_id,
+            )
+            for i, subscriber_id in enumerate(subscriber_ids)
+        ]
+
+        # Two batches of the same variant
+        assert await newsletter.send(redis, article, recipients[:2]) == 2
+        assert await newsletter.send(redis, article, recipients[2:]) == 1
+
+        assert render_mock.call_count == 1
+        assert len(enqueue_emails_mock) == 3
+        for email, subscriber_id in zip(enqueue_emails_mock, subscriber_ids):
+            assert email.subject == "Hello world"
+            assert str(subscriber_id) in email.html_content
+            assert SUBSCRIBER_ID_PLACEHOLDER not in email.html_content
+            assert str(subscriber_id) in email.email_headers["List-Unsubscribe"]
+
+    async def test_variants(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        article: Article,
+        render_mock: respx.Route,
+        enqueue_emails_mock: list[Email],
+    ) -> None:
+        recipients = [
+            Recipient(
+                user_id=uuid.uuid4(),
+                email="free@example.com",
+                subscriber_id=uuid.uuid4(),
+            ),
+            Recipient(
+                user_id=uuid.uuid4(),
+                email="member@example.com",
+                subscriber_id=None,
+            ),
+        ]
+        session.expunge_all()
+
+        await newsletter.send(redis, article, recipients)
+
+        assert render_mock.call_count == 2
+        member_email = enqueue_emails_mock[1]
+        assert "List-Unsubscribe" not in member_email.email_headers
+
+    async def test_test_send_renders(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        article: Article,
+        render_mock: respx.Route,
+        enqueue_emails_mock: list[Email],
+    ) -> None:
+        recipient = Recipient(
+            user_id=uuid.uuid4(),
+            email="test@example.com",
+            subscriber_id=None,
+        )
+        session.expunge_all()
+
+        await newsletter.send(redis, article, [recipient], is_test=True)
+        await newsletter.send(redis, article, [recipient], is_test=True)
+
+        assert render_mock.call_count == 2
+        assert enqueue_emails_mock[0].subject == "[TEST] Hello world"
+
+    async def test_render_error(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        respx_mock: respx.MockRouter,
+        article: Article,
+    ) -> None:
+        respx_mock.post(
+            f"{settings.FRONTEND_BASE_URL}/email/article/{article.id}"
+        ).mock(return_value=Response(500))
+        recipient = Recipient(
+            user_id=uuid.uuid4(),
+            email="test@example.com",
+            subscriber_id=None,
+        )
+        session.expunge_all()
+
+        with pytest.raises(newsletter.ArticleRenderError):
+            await newsletter.send(redis, article, [recipient])
+
+
+@pytest.mark.asyncio
+class TestListRecipients:
+    async def test_recipients(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        article: Article,
+        organization: Organization,
+        user: User,
+        user_second: User,
+        user_organization: UserOrganization,
+    ) -> None:
+        subscription = ArticlesSubscription(
+            paid_subscriber=False, organization=organization, user=user_second
+        )
+        await save_fixture(subscription)
+        session.expunge_all()
+
+        recipients = await newsletter.list_recipients(
+            session, article, [user.id, user_second.id]
+        )
+
+        assert sorted(recipients, key=lambda r: r.email != user.email) == [
+            Recipient(
+                user_id=user.id,
+                email=user.email,
+                subscriber_id=None,
+            ),
+            Recipient(
+                user_id=user_second.id,
+                email=user_second.email,
+                subscriber_id=subscription.id,
+            ),
+        ]
+
+
+@pytest.mark.asyncio
+async def test_increment_sent_count(session: AsyncSession, article: Article) -> None:
+    session.expunge_all()
+
+    await newsletter.increment_sent_count(session, article, 10)
+    await newsletter.increment_sent_count(session, article, 5)
+
+    updated_article = await session.get(Article, article.id)
+    assert updated_article is not None
+    assert updated_article.email_sent_to_count == 15
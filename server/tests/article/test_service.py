@@ -6,9 +6,11 @@ from datetime import datetime
 
 import pytest
 import pytest_asyncio
+from pytest_mock import MockerFixture
 
 from polar.article.service import article_service
 from polar.auth.models import Anonymous, AuthSubject, Subject
+from polar.config import settings
 from polar.kit.pagination import PaginationParams
 from polar.kit.utils import utc_now
 from polar.models import (
@@ -611,3 +613,48 @@ class TestListReceivers:
         receivers = await article_service.list_receivers(session, organization.id, True)
         assert len(receivers) == 1
         assert receivers[0] == (user.id, True, True)
+
+
+@pytest.mark.asyncio
+class TestEnqueueSend:
+    async def test_batches(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        user: User,
+        organization: Organization,
+    ) -> None:
+        mocker.patch.object(settings, "ARTICLE_NEWSLETTER_BATCH_SIZE", 2)
+        enqueue_job_mock = mocker.patch("polar.article.service.enqueue_job")
+
+        for _ in range(3):
+            subscriber = await create_user(save_fixture)
+            await create_articles_subscription(
+                save_fixture,
+                user=subscriber,
+                organization=organization,
+                paid_subscriber=False,
+            )
+        article = await create_article(
+            save_fixture,
+            user=user,
+            organization=organization,
+            visibility=ArticleVisibility.public,
+            paid_subscribers_only=False,
+            published_at=utc_now(),
+        )
+        session.expunge_all()
+
+        article = await article_service.enqueue_send(session, article)
+
+        assert article.notifications_sent_at is not None
+        assert article.email_sent_to_count == 0
+        assert enqueue_job_mock.call_count == 2
+        batch_sizes = [
+            len(call.kwargs["user_ids"]) for call in enqueue_job_mock.call_args_list
+        ]
+        assert batch_sizes == [2, 1]
+        for call in enqueue_job_mock.call_args_list:
+            assert call.args == ("articles.send_batch",)
+            assert call.kwargs["article_id"] == article.id
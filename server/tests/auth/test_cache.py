@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+
+from polar.auth.cache import AuthCache, CachedCredential, invalidate
+from polar.auth.models import AuthMethod
+from polar.auth.scope import Scope
+from polar.kit.utils import utc_now
+from polar.oauth2.sub_type import SubType
+from polar.redis import Redis
+
+
+def _get_credential(expires_in: timedelta | None = None) -> CachedCredential:
+    return CachedCredential(
+        method=AuthMethod.PERSONAL_ACCESS_TOKEN,
+        credential_id=uuid.uuid4(),
+        subject_type=SubType.user,
+        subject_id=uuid.uuid4(),
+        scopes={Scope.web_default},
+        expires_at=utc_now() + expires_in if expires_in is not None else None,
+    )
+
+
+@pytest_asyncio.fixture
+async def auth_cache(redis: Redis) -> AsyncIterator[AuthCache]:
+    async with AuthCache(redis, ttl=60, max_size=2) as auth_cache:
+        yield auth_cache
+
+
+@pytest.mark.asyncio
+class TestAuthCache:
+    async def test_miss(self, auth_cache: AuthCache) -> None:
+        assert await auth_cache.get("TOKEN_HASH") is None
+
+    async def test_local(self, redis: Redis, auth_cache: AuthCache) -> None:
+        credential = _get_credential()
+        await auth_cache.set("TOKEN_HASH", credential)
+        await redis.flushall()
+
+        assert await auth_cache.get("TOKEN_HASH") == credential
+
+    async def test_shared(self, redis: Redis, auth_cache: AuthCache) -> None:
+        credential = _get_credential()
+        await auth_cache.set("TOKEN_HASH", credential)
+
+        async with AuthCache(redis) as other_auth_cache:
+            assert await other_auth_cache.get("TOKEN_HASH") == credential
+
+    async def test_expired_credential(self, auth_cache: AuthCache) -> None:
+        await auth_cache.set("TOKEN_HASH", _get_credential(timedelta(seconds=-1)))
+
+        assert await auth_cache.get("TOKEN_HASH") is None
+
+    async def test_local_max_size(self, redis: Redis, auth_cache: AuthCache) -> None:
+        for token_hash in ("TOKEN_HASH_1", "TOKEN_HASH_2", "TOKEN_HASH_3"):
+            await auth_cache.set(token_hash, _get_credential())
+        await redis.flushall()
+
+        assert await auth_cache.get("TOKEN_HASH_1") is None
+        assert await auth_cache.get("TOKEN_HASH_2") is not None
+        assert await auth_cache.get("TOKEN_HASH_3") is not None
+
+    async def test_invalidate(self, redis: Redis, auth_cache: AuthCache) -> None:
+        await auth_cache.set("TOKEN_HASH_1", _get_credential())
+        await auth_cache.set("TOKEN_HASH_2", _get_credential())
+
+        await invalidate(redis, ["TOKEN_HASH_1"])
+        # Eviction from the local cache happens in the background
+        await asyncio.sleep(0.1)
+
+        assert await redis.exists("auth:credential:TOKEN_HASH_1") == 0
+        assert "TOKEN_HASH_1" not in auth_cache._local
+        assert await auth_cache.get("TOKEN_HASH_1") is None
+        assert await auth_cache.get("TOKEN_HASH_2") is not None
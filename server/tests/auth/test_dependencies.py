@@ -0,0 +1,144 @@
+from collections.abc import AsyncIterator
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+from starlette.requests import Request
+
+from polar.auth.cache import AuthCache
+from polar.auth.dependencies import get_auth_subject
+from polar.auth.models import AuthMethod, is_anonymous
+from polar.auth.scope import Scope
+from polar.auth.service import auth as auth_service
+from polar.config import settings
+from polar.kit.crypto import get_token_hash
+from polar.kit.utils import utc_now
+from polar.models import PersonalAccessToken, User
+from polar.oauth2.exceptions import InvalidTokenError
+from polar.oauth2.service.oauth2_token import oauth2_token as oauth2_token_service
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+
+
+def _get_request(cookie: str | None = None) -> Request:
+    headers = []
+    if cookie is not None:
+        headers.append(
+            (b"cookie", f"{settings.USER_SESSION_COOKIE_KEY}={cookie}".encode())
+        )
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest_asyncio.fixture
+async def auth_cache(redis: Redis) -> AsyncIterator[AuthCache]:
+    async with AuthCache(redis) as auth_cache:
+        yield auth_cache
+
+
+@pytest_asyncio.fixture
+async def personal_access_token(
+    save_fixture: SaveFixture, user: User
+) -> PersonalAccessToken:
+    personal_access_token = PersonalAccessToken(
+        comment="Test",
+        token=get_token_hash("polar_pat_123", secret=settings.SECRET),
+        user_id=user.id,
+        expires_at=utc_now() + timedelta(days=1),
+        scope="openid",
+    )
+    await save_fixture(personal_access_token)
+    return personal_access_token
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetAuthSubject:
+    async def test_anonymous(
+        self, session: AsyncSession, redis: Redis, auth_cache: AuthCache
+    ) -> None:
+        auth_subject = await get_auth_subject(
+            _get_request(), None, None, session, auth_cache, redis
+        )
+
+        assert is_anonymous(auth_subject)
+
+    async def test_user_session(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_cache: AuthCache,
+        user: User,
+        mocker: MockerFixture,
+    ) -> None:
+        token, _ = await auth_service._create_user_session(
+            session, user, user_agent="test"
+        )
+        get_by_token_spy = mocker.spy(auth_service, "get_by_token")
+
+        for _ in range(2):
+            auth_subject = await get_auth_subject(
+                _get_request(token), None, None, session, auth_cache, redis
+            )
+            assert auth_subject.subject == user
+            assert auth_subject.method == AuthMethod.COOKIE
+            assert auth_subject.scopes == {Scope.web_default}
+
+        get_by_token_spy.assert_called_once()
+
+    async def test_personal_access_token(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_cache: AuthCache,
+        user: User,
+        personal_access_token: PersonalAccessToken,
+        mocker: MockerFixture,
+    ) -> None:
+        record_usage_mock = mocker.patch(
+            "polar.auth.dependencies.personal_access_token_service.record_usage"
+        )
+        get_by_access_token_spy = mocker.spy(
+            oauth2_token_service, "get_by_access_token"
+        )
+
+        auth_subject = await get_auth_subject(
+            _get_request(), "Bearer polar_pat_123", None, session, auth_cache, redis
+        )
+
+        assert auth_subject.subject == user
+        assert auth_subject.method == AuthMethod.PERSONAL_ACCESS_TOKEN
+        assert auth_subject.scopes == {Scope.openid}
+        get_by_access_token_spy.assert_not_called()
+        record_usage_mock.assert_called_once_with(
+            redis, personal_access_token.id, mocker.ANY
+        )
+
+    async def test_invalid_personal_access_token(
+        self, session: AsyncSession, redis: Redis, auth_cache: AuthCache
+    ) -> None:
+        with pytest.raises(InvalidTokenError):
+            await get_auth_subject(
+                _get_request(), "Bearer polar_pat_456", None, session, auth_cache, redis
+            )
+
+    async def test_user_session_token_as_bearer(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_cache: AuthCache,
+        user: User,
+        mocker: MockerFixture,
+    ) -> None:
+        token, _ = await auth_service._create_user_session(
+            session, user, user_agent="test"
+        )
+        get_by_token_spy = mocker.spy(auth_service, "get_by_token")
+
+        with pytest.raises(InvalidTokenError):
+            await get_auth_subject(
+                _get_request(), f"Bearer {token}", None, session, auth_cache, redis
+            )
+
+        get_by_token_spy.assert_not_called()
@@ -39,7 +39,6 @@ from polar.integrations.stripe.schemas import ProductType
 from polar.integrations.stripe.service import StripeService
 from polar.kit.address import Address
 from polar.kit.utils import utc_now
-from polar.locker import Locker
 from polar.models import (
     Checkout,
     Discount,
@@ -57,6 +56,8 @@ from polar.models.product_price import (
     ProductPriceType,
 )
 from polar.postgres import AsyncSession
+from polar.product.catalog import ProductCatalog
+from polar.redis import Redis
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
@@ -229,11 +230,12 @@ async def checkout_tax_not_applicable(
 class TestCreate:
     @pytest.mark.auth
     async def test_not_existing_price(
-        self, session: AsyncSession, auth_subject: AuthSubject[User]
+        self, session: AsyncSession, redis: Redis, auth_subject: AuthSubject[User]
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=uuid.uuid4(),
@@ -248,12 +250,14 @@ class TestCreate:
     async def test_not_writable_price(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         product_one_time: Product,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=product_one_time.prices[0].id,
@@ -269,6 +273,7 @@ class TestCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -282,6 +287,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe, product_price_id=price.id
                 ),
@@ -296,6 +302,7 @@ class TestCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -305,6 +312,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=product_one_time.prices[0].id,
@@ -322,6 +330,7 @@ class TestCreate:
         amount: int,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time_custom_price: Product,
@@ -335,6 +344,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=product_one_time_custom_price.prices[0].id,
@@ -358,6 +368,7 @@ class TestCreate:
         self,
         payload: dict[str, Any],
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -368,6 +379,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate.model_validate(
                     {
                         "payment_processor": PaymentProcessor.stripe,
@@ -385,6 +397,7 @@ class TestCreate:
     async def test_invalid_not_existing_subscription(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product: Product,
@@ -395,6 +408,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=price.id,
@@ -411,6 +425,7 @@ class TestCreate:
     async def test_invalid_not_existing_discount(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product: Product,
@@ -421,6 +436,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=price.id,
@@ -436,6 +452,7 @@ class TestCreate:
     async def test_invalid_not_applicable_discount(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time_custom_price: Product,
@@ -447,6 +464,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=price.id,
@@ -463,6 +481,7 @@ class TestCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product: Product,
@@ -478,6 +497,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=price.id,
@@ -496,6 +516,7 @@ class TestCreate:
         self,
         amount: int | None,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -504,6 +525,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -528,6 +550,7 @@ class TestCreate:
         self,
         amount: int | None,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time_free_price: Product,
@@ -536,6 +559,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFree)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -561,6 +585,7 @@ class TestCreate:
         amount: int | None,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time_custom_price: Product,
@@ -571,6 +596,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -596,6 +622,7 @@ class TestCreate:
     async def test_valid_tax_id(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -604,6 +631,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -620,6 +648,7 @@ class TestCreate:
     async def test_valid_success_url_with_interpolation(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -628,6 +657,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -647,6 +677,7 @@ class TestCreate:
     async def test_valid_success_url_with_invalid_interpolation_variable(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -655,6 +686,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -673,6 +705,7 @@ class TestCreate:
     async def test_silent_calculate_tax_error(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         calculate_tax_mock: AsyncMock,
         user_organization: UserOrganization,
@@ -687,6 +720,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -702,6 +736,7 @@ class TestCreate:
     async def test_valid_calculate_tax(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         calculate_tax_mock: AsyncMock,
         user_organization: UserOrganization,
@@ -714,6 +749,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -734,6 +770,7 @@ class TestCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product: Product,
@@ -749,6 +786,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -773,6 +811,7 @@ class TestCreate:
         self,
         custom_field_data: dict[str, Any],
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_custom_fields: Product,
@@ -783,6 +822,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError) as e:
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutPriceCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_price_id=price.id,
@@ -797,6 +837,7 @@ class TestCreate:
     async def test_valid_custom_field_data(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_custom_fields: Product,
@@ -806,6 +847,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -825,6 +867,7 @@ class TestCreate:
         self,
         amount: int | None,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -833,6 +876,7 @@ class TestCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -847,6 +891,7 @@ class TestCreate:
     async def test_valid_tax_not_applicable(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_tax_not_applicable: Product,
@@ -856,6 +901,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -871,6 +917,7 @@ class TestCreate:
     async def test_valid_discount(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         user_organization: UserOrganization,
         product_one_time: Product,
@@ -881,6 +928,7 @@ class TestCreate:
 
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutPriceCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_price_id=price.id,
@@ -899,11 +947,12 @@ class TestCreate:
 
     @pytest.mark.auth
     async def test_product_not_existing(
-        self, session: AsyncSession, auth_subject: AuthSubject[User]
+        self, session: AsyncSession, redis: Redis, auth_subject: AuthSubject[User]
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutProductCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_id=uuid.uuid4(),
@@ -918,12 +967,14 @@ class TestCreate:
     async def test_product_not_writable(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         product_one_time: Product,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutProductCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_id=product_one_time.id,
@@ -939,6 +990,7 @@ class TestCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         product_one_time: Product,
     ) -> None:
@@ -947,6 +999,7 @@ class TestCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.create(
                 session,
+                redis,
                 CheckoutProductCreate(
                     payment_processor=PaymentProcessor.stripe,
                     product_id=product_one_time.id,
@@ -961,12 +1014,14 @@ class TestCreate:
     async def test_product_valid(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User | Organization],
         product_one_time: Product,
         user_organization: UserOrganization,
     ) -> None:
         checkout = await checkout_service.create(
             session,
+            redis,
             CheckoutProductCreate(
                 payment_processor=PaymentProcessor.stripe,
                 product_id=product_one_time.id,
@@ -982,11 +1037,12 @@ class TestCreate:
 @pytest.mark.skip_db_asserts
 class TestClientCreate:
     async def test_not_existing_price(
-        self, session: AsyncSession, auth_subject: AuthSubject[Anonymous]
+        self, session: AsyncSession, redis: Redis, auth_subject: AuthSubject[Anonymous]
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.client_create(
                 session,
+                redis,
                 CheckoutCreatePublic(
                     product_price_id=uuid.uuid4(),
                 ),
@@ -997,6 +1053,7 @@ class TestClientCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time: Product,
     ) -> None:
@@ -1009,6 +1066,7 @@ class TestClientCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.client_create(
                 session,
+                redis,
                 CheckoutCreatePublic(product_price_id=price.id),
                 auth_subject,
             )
@@ -1017,6 +1075,7 @@ class TestClientCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time: Product,
     ) -> None:
@@ -1025,6 +1084,7 @@ class TestClientCreate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.client_create(
                 session,
+                redis,
                 CheckoutCreatePublic(
                     product_price_id=product_one_time.prices[0].id,
                 ),
@@ -1034,6 +1094,7 @@ class TestClientCreate:
     async def test_valid_fixed_price(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time: Product,
     ) -> None:
@@ -1041,6 +1102,7 @@ class TestClientCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(product_price_id=price.id),
             auth_subject,
         )
@@ -1050,9 +1112,36 @@ class TestClientCreate:
         assert checkout.amount == price.price_amount
         assert checkout.currency == price.price_currency
 
+    async def test_valid_product_catalog(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[Anonymous],
+        product_one_time: Product,
+    ) -> None:
+        price = product_one_time.prices[0]
+        assert isinstance(price, ProductPriceFixed)
+        product_catalog = ProductCatalog(redis)
+        session.expunge_all()
+
+        checkout = await checkout_service.client_create(
+            session,
+            redis,
+            CheckoutCreatePublic(product_price_id=price.id),
+            auth_subject,
+            product_catalog=product_catalog,
+        )
+
+        assert checkout.product_price.id == price.id
+        assert checkout.product.id == product_one_time.id
+        assert checkout.product.organization.id == product_one_time.organization_id
+        assert checkout.amount == price.price_amount
+        assert product_one_time.organization_id in product_catalog._catalogs
+
     async def test_valid_free_price(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time_free_price: Product,
     ) -> None:
@@ -1060,6 +1149,7 @@ class TestClientCreate:
         assert isinstance(price, ProductPriceFree)
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(product_price_id=price.id),
             auth_subject,
         )
@@ -1072,6 +1162,7 @@ class TestClientCreate:
     async def test_valid_custom_price(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time_custom_price: Product,
     ) -> None:
@@ -1081,6 +1172,7 @@ class TestClientCreate:
 
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(product_price_id=price.id),
             auth_subject,
         )
@@ -1097,6 +1189,7 @@ class TestClientCreate:
     async def test_valid_direct_user(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User],
         product_one_time: Product,
     ) -> None:
@@ -1104,6 +1197,7 @@ class TestClientCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(product_price_id=price.id),
             auth_subject,
         )
@@ -1116,6 +1210,7 @@ class TestClientCreate:
     async def test_valid_indirect_user(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[User],
         product_one_time: Product,
     ) -> None:
@@ -1123,6 +1218,7 @@ class TestClientCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(product_price_id=price.id),
             auth_subject,
         )
@@ -1132,6 +1228,7 @@ class TestClientCreate:
     async def test_valid_from_legacy_checkout_link(
         self,
         session: AsyncSession,
+        redis: Redis,
         auth_subject: AuthSubject[Anonymous],
         product_one_time: Product,
     ) -> None:
@@ -1139,6 +1236,7 @@ class TestClientCreate:
         assert isinstance(price, ProductPriceFixed)
         checkout = await checkout_service.client_create(
             session,
+            redis,
             CheckoutCreatePublic(
                 product_price_id=price.id, from_legacy_checkout_link=True
             ),
@@ -1158,6 +1256,7 @@ class TestCheckoutLinkCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product_one_time: Product,
     ) -> None:
         first_price = product_one_time.prices[0]
@@ -1170,13 +1269,16 @@ class TestCheckoutLinkCreate:
         checkout_link = await create_checkout_link(
             save_fixture, product=product_one_time, price=price
         )
-        checkout = await checkout_service.checkout_link_create(session, checkout_link)
+        checkout = await checkout_service.checkout_link_create(
+            session, redis, checkout_link
+        )
         assert checkout.product_price.id == first_price.id
 
     async def test_archived_product(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product_one_time: Product,
     ) -> None:
         product_one_time.is_archived = True
@@ -1185,12 +1287,13 @@ class TestCheckoutLinkCreate:
             save_fixture, product=product_one_time, price=product_one_time.prices[0]
         )
         with pytest.raises(PolarRequestValidationError):
-            await checkout_service.checkout_link_create(session, checkout_link)
+            await checkout_service.checkout_link_create(session, redis, checkout_link)
 
     async def test_valid(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product_one_time: Product,
     ) -> None:
         price = product_one_time.prices[0]
@@ -1201,7 +1304,9 @@ class TestCheckoutLinkCreate:
             success_url="https://example.com/success",
             user_metadata={"key": "value"},
         )
-        checkout = await checkout_service.checkout_link_create(session, checkout_link)
+        checkout = await checkout_service.checkout_link_create(
+            session, redis, checkout_link
+        )
 
         assert checkout.product_price == price
         assert checkout.product == product_one_time
@@ -1212,6 +1317,7 @@ class TestCheckoutLinkCreate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product_one_time: Product,
         discount_fixed_once: Discount,
     ) -> None:
@@ -1222,7 +1328,9 @@ class TestCheckoutLinkCreate:
             price=price,
             discount=discount_fixed_once,
         )
-        checkout = await checkout_service.checkout_link_create(session, checkout_link)
+        checkout = await checkout_service.checkout_link_create(
+            session, redis, checkout_link
+        )
 
         assert checkout.product_price == price
         assert checkout.discount == discount_fixed_once
@@ -1234,11 +1342,13 @@ class TestUpdate:
     async def test_not_existing_price(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutUpdate(
                     product_price_id=uuid.uuid4(),
@@ -1249,6 +1359,7 @@ class TestUpdate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product_one_time: Product,
         checkout_one_time_fixed: Checkout,
     ) -> None:
@@ -1261,6 +1372,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutUpdate(
                     product_price_id=price.id,
@@ -1270,12 +1382,14 @@ class TestUpdate:
     async def test_price_from_different_product(
         self,
         session: AsyncSession,
+        redis: Redis,
         product_one_time_custom_price: Product,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutUpdate(
                     product_price_id=product_one_time_custom_price.prices[0].id,
@@ -1288,6 +1402,7 @@ class TestUpdate:
         amount: int,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
     ) -> None:
         price = checkout_one_time_custom.product.prices[0]
@@ -1299,6 +1414,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_custom,
                 CheckoutUpdate(
                     amount=amount,
@@ -1308,11 +1424,13 @@ class TestUpdate:
     async def test_not_open(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_confirmed_one_time: Checkout,
     ) -> None:
         with pytest.raises(NotOpenCheckout):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_confirmed_one_time,
                 CheckoutUpdate(
                     customer_email="customer@example.com",
@@ -1345,6 +1463,7 @@ class TestUpdate:
         updated_values: dict[str, Any],
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         checkout_recurring_fixed: Checkout,
     ) -> None:
         for key, value in initial_values.items():
@@ -1354,6 +1473,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_recurring_fixed,
                 CheckoutUpdate.model_validate(updated_values),
             )
@@ -1361,11 +1481,13 @@ class TestUpdate:
     async def test_invalid_discount_id(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutUpdate(
                     discount_id=uuid.uuid4(),
@@ -1375,11 +1497,13 @@ class TestUpdate:
     async def test_invalid_discount_code(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutUpdatePublic(
                     discount_code="invalid",
@@ -1389,12 +1513,14 @@ class TestUpdate:
     async def test_invalid_discount_id_not_applicable(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
         discount_fixed_once: Discount,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_custom,
                 CheckoutUpdate(discount_id=discount_fixed_once.id),
             )
@@ -1402,12 +1528,14 @@ class TestUpdate:
     async def test_invalid_discount_code_not_applicable(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
         discount_fixed_once: Discount,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.update(
                 session,
+                redis,
                 checkout_one_time_custom,
                 CheckoutUpdatePublic(discount_code=discount_fixed_once.code),
             )
@@ -1416,6 +1544,7 @@ class TestUpdate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         product: Product,
         checkout_recurring_fixed: Checkout,
     ) -> None:
@@ -1424,6 +1553,7 @@ class TestUpdate:
         )
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_recurring_fixed,
             CheckoutUpdate(
                 product_price_id=new_price.id,
@@ -1438,10 +1568,12 @@ class TestUpdate:
     async def test_valid_fixed_price_amount_update(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdate(
                 amount=4242,
@@ -1455,10 +1587,12 @@ class TestUpdate:
     async def test_valid_custom_price_amount_update(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_custom,
             CheckoutUpdate(
                 amount=4242,
@@ -1469,10 +1603,12 @@ class TestUpdate:
     async def test_valid_free_price_amount_update(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_free: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_free,
             CheckoutUpdate(
                 amount=4242,
@@ -1486,10 +1622,12 @@ class TestUpdate:
     async def test_valid_tax_id(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_custom,
             CheckoutUpdate(
                 customer_billing_address=Address.model_validate({"country": "FR"}),
@@ -1503,6 +1641,7 @@ class TestUpdate:
     async def test_valid_unset_tax_id(
         self,
         session: AsyncSession,
+        redis: Redis,
         save_fixture: SaveFixture,
         checkout_one_time_custom: Checkout,
     ) -> None:
@@ -1511,6 +1650,7 @@ class TestUpdate:
 
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_custom,
             CheckoutUpdate(
                 customer_billing_address=Address.model_validate({"country": "US"}),
@@ -1526,6 +1666,7 @@ class TestUpdate:
     async def test_silent_calculate_tax_error(
         self,
         session: AsyncSession,
+        redis: Redis,
         calculate_tax_mock: AsyncMock,
         checkout_one_time_fixed: Checkout,
     ) -> None:
@@ -1535,6 +1676,7 @@ class TestUpdate:
 
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdate(
                 customer_billing_address=Address.model_validate({"country": "US"}),
@@ -1548,6 +1690,7 @@ class TestUpdate:
     async def test_valid_calculate_tax(
         self,
         session: AsyncSession,
+        redis: Redis,
         calculate_tax_mock: AsyncMock,
         checkout_one_time_fixed: Checkout,
     ) -> None:
@@ -1555,6 +1698,7 @@ class TestUpdate:
 
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdate(
                 customer_billing_address=Address.model_validate({"country": "FR"}),
@@ -1568,6 +1712,7 @@ class TestUpdate:
     async def test_ignore_email_update_if_customer_set(
         self,
         session: AsyncSession,
+        redis: Redis,
         save_fixture: SaveFixture,
         user: User,
         checkout_one_time_fixed: Checkout,
@@ -1578,6 +1723,7 @@ class TestUpdate:
 
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdate(customer_email="updatedemail@example.com"),
         )
@@ -1587,10 +1733,12 @@ class TestUpdate:
     async def test_valid_metadata(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_free: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_free,
             CheckoutUpdate(
                 metadata={"key": "value"},
@@ -1610,11 +1758,13 @@ class TestUpdate:
         self,
         custom_field_data: dict[str, Any],
         session: AsyncSession,
+        redis: Redis,
         checkout_custom_fields: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError) as e:
             await checkout_service.update(
                 session,
+                redis,
                 checkout_custom_fields,
                 CheckoutUpdate(custom_field_data=custom_field_data),
             )
@@ -1623,10 +1773,11 @@ class TestUpdate:
             assert error["loc"][0:2] == ("body", "custom_field_data")
 
     async def test_valid_custom_field_data(
-        self, session: AsyncSession, checkout_custom_fields: Checkout
+        self, session: AsyncSession, redis: Redis, checkout_custom_fields: Checkout
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_custom_fields,
             CheckoutUpdate(
                 custom_field_data={"text": "abc", "select": "a"},
@@ -1638,10 +1789,12 @@ class TestUpdate:
     async def test_valid_embed_origin(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_free: Checkout,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_free,
             CheckoutUpdate(
                 embed_origin="https://example.com",
@@ -1651,10 +1804,11 @@ class TestUpdate:
         assert checkout.embed_origin == "https://example.com"
 
     async def test_valid_tax_not_applicable(
-        self, session: AsyncSession, checkout_tax_not_applicable: Checkout
+        self, session: AsyncSession, redis: Redis, checkout_tax_not_applicable: Checkout
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_tax_not_applicable,
             CheckoutUpdate(
                 customer_billing_address=Address.model_validate({"country": "FR"}),
@@ -1668,11 +1822,13 @@ class TestUpdate:
     async def test_valid_discount_id(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
         discount_fixed_once: Discount,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdate(
                 discount_id=discount_fixed_once.id,
@@ -1693,11 +1849,13 @@ class TestUpdate:
     async def test_valid_discount_code(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
         discount_fixed_once: Discount,
     ) -> None:
         checkout = await checkout_service.update(
             session,
+            redis,
             checkout_one_time_fixed,
             CheckoutUpdatePublic(
                 discount_code=discount_fixed_once.code,
@@ -1722,13 +1880,13 @@ class TestConfirm:
     async def test_missing_amount_on_custom_price(
         self,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_custom: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.confirm(
                 session,
-                locker,
+                redis,
                 checkout_one_time_custom,
                 CheckoutConfirmStripe.model_validate(
                     {
@@ -1752,13 +1910,13 @@ class TestConfirm:
         self,
         payload: dict[str, str],
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.confirm(
                 session,
-                locker,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutConfirmStripe.model_validate(payload),
             )
@@ -1766,13 +1924,13 @@ class TestConfirm:
     async def test_not_open(
         self,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_confirmed_one_time: Checkout,
     ) -> None:
         with pytest.raises(NotOpenCheckout):
             await checkout_service.confirm(
                 session,
-                locker,
+                redis,
                 checkout_confirmed_one_time,
                 CheckoutConfirmStripe.model_validate(
                     {"confirmation_token_id": "CONFIRMATION_TOKEN_ID"}
@@ -1783,7 +1941,7 @@ class TestConfirm:
         self,
         calculate_tax_mock: AsyncMock,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         calculate_tax_mock.side_effect = IncompleteTaxLocation(
@@ -1793,7 +1951,7 @@ class TestConfirm:
         with pytest.raises(PolarRequestValidationError):
             await checkout_service.confirm(
                 session,
-                locker,
+                redis,
                 checkout_one_time_fixed,
                 CheckoutConfirmStripe.model_validate(
                     {
@@ -1821,7 +1979,7 @@ class TestConfirm:
         expected_tax_metadata: dict[str, str],
         stripe_service_mock: MagicMock,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         stripe_service_mock.create_customer.return_value = SimpleNamespace(
@@ -1832,7 +1990,7 @@ class TestConfirm:
         )
         checkout = await checkout_service.confirm(
             session,
-            locker,
+            redis,
             checkout_one_time_fixed,
             CheckoutConfirmStripe.model_validate(
                 {
@@ -1876,7 +2034,7 @@ class TestConfirm:
         expected_tax_metadata: dict[str, str],
         stripe_service_mock: MagicMock,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_discount_percentage_100: Checkout,
         discount_percentage_100: Discount,
     ) -> None:
@@ -1888,7 +2046,7 @@ class TestConfirm:
         )
         checkout = await checkout_service.confirm(
             session,
-            locker,
+            redis,
             checkout_discount_percentage_100,
             CheckoutConfirmStripe.model_validate(
                 {
@@ -1930,7 +2088,7 @@ class TestConfirm:
         stripe_service_mock: MagicMock,
         mocker: MockerFixture,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_free: Checkout,
     ) -> None:
         enqueue_job_mock = mocker.patch("polar.checkout.service.enqueue_job")
@@ -1941,7 +2099,7 @@ class TestConfirm:
 
         checkout = await checkout_service.confirm(
             session,
-            locker,
+            redis,
             checkout_one_time_free,
             CheckoutConfirmStripe.model_validate(
                 {
@@ -1968,7 +2126,7 @@ class TestConfirm:
         save_fixture: SaveFixture,
         stripe_service_mock: MagicMock,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         user = await create_user(save_fixture, stripe_customer_id="STRIPE_CUSTOMER_ID")
@@ -1982,7 +2140,7 @@ class TestConfirm:
 
         checkout = await checkout_service.confirm(
             session,
-            locker,
+            redis,
             checkout_one_time_fixed,
             CheckoutConfirmStripe.model_validate(
                 {
@@ -1,7 +1,21 @@
+from collections.abc import Iterator
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
+import stripe as stripe_lib
 from pydantic_extra_types.country import CountryAlpha2
+from pytest_mock import MockerFixture
 
-from polar.checkout.tax import TaxID, TaxIDFormat, validate_tax_id
+from polar.checkout import tax
+from polar.checkout.tax import (
+    IncompleteTaxLocation,
+    TaxID,
+    TaxIDFormat,
+    calculate_tax,
+    validate_tax_id,
+)
+from polar.kit.address import Address
+from polar.redis import Redis
 
 
 @pytest.mark.parametrize(
@@ -42,3 +56,72 @@ def test_validate_tax_id_valid(
 def test_validate_tax_id_invalid(number: str, country: CountryAlpha2) -> None:
     with pytest.raises(ValueError):
         validate_tax_id(number, country)
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache() -> Iterator[None]:
+    tax._local_cache.clear()
+    yield
+    tax._local_cache.clear()
+
+
+@pytest.fixture
+def create_tax_calculation_mock(mocker: MockerFixture) -> AsyncMock:
+    return mocker.patch(
+        "polar.checkout.tax.stripe_service.create_tax_calculation",
+        new_callable=AsyncMock,
+    )
+
+
+ADDRESS = Address.model_validate({"country": "FR"})
+
+
+@pytest.mark.asyncio
+class TestCalculateTax:
+    async def test_cached(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        create_tax_calculation_mock.return_value = MagicMock(tax_amount_exclusive=200)
+
+        assert await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, []) == 200
+        assert await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, []) == 200
+        create_tax_calculation_mock.assert_awaited_once()
+
+        # Shared through Redis
+        tax._local_cache.clear()
+        assert await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, []) == 200
+        create_tax_calculation_mock.assert_awaited_once()
+
+        assert await calculate_tax(redis, "usd", 2000, "PRODUCT_ID", ADDRESS, []) == 200
+        assert create_tax_calculation_mock.await_count == 2
+
+    async def test_negative_cached(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        create_tax_calculation_mock.side_effect = stripe_lib.InvalidRequestError(
+            "Missing address", param="customer_details[address][postal_code]"
+        )
+        create_tax_calculation_mock.side_effect.error = MagicMock(
+            param="customer_details[address][postal_code]"
+        )
+
+        with pytest.raises(IncompleteTaxLocation):
+            await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, [])
+
+        tax._local_cache.clear()
+        with pytest.raises(IncompleteTaxLocation):
+            await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, [])
+        create_tax_calculation_mock.assert_awaited_once()
+
+    async def test_other_error_not_cached(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        create_tax_calculation_mock.side_effect = stripe_lib.APIConnectionError(
+            "Connection error"
+        )
+
+        with pytest.raises(stripe_lib.APIConnectionError):
+            await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, [])
+        with pytest.raises(stripe_lib.APIConnectionError):
+            await calculate_tax(redis, "usd", 1000, "PRODUCT_ID", ADDRESS, [])
+        assert create_tax_calculation_mock.await_count == 2
@@ -9,6 +9,7 @@ from polar.checkout_link.schemas import CheckoutLinkPriceCreate, CheckoutLinkUpd
 from polar.checkout_link.service import checkout_link as checkout_link_service
 from polar.enums import PaymentProcessor
 from polar.exceptions import PolarRequestValidationError
+from polar.kit.pagination import PaginationParams
 from polar.models import Discount, Organization, Product, User, UserOrganization
 from polar.models.checkout_link import CheckoutLink
 from polar.models.product_price import ProductPriceFixed, ProductPriceType
@@ -32,6 +33,36 @@ async def checkout_link(save_fixture: SaveFixture, product: Product) -> Checkout
     )
 
 
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestList:
+    @pytest.mark.auth
+    async def test_query(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User],
+        user_organization: UserOrganization,
+        product: Product,
+    ) -> None:
+        newsletter_link = await create_checkout_link(save_fixture, product=product)
+        newsletter_link.label = "Newsletter signup"
+        await save_fixture(newsletter_link)
+        twitter_link = await create_checkout_link(save_fixture, product=product)
+        twitter_link.label = "Twitter bio"
+        await save_fixture(twitter_link)
+
+        results, count = await checkout_link_service.list(
+            session,
+            auth_subject,
+            query="newsletter",
+            pagination=PaginationParams(1, 10),
+        )
+
+        assert count == 1
+        assert results[0].id == newsletter_link.id
+
+
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
 class TestCreate:
@@ -1,4 +1,3 @@
-import asyncio
 from datetime import timedelta
 from types import SimpleNamespace
 from typing import Literal
@@ -13,10 +12,10 @@ from polar.discount.service import discount as discount_service
 from polar.exceptions import PolarRequestValidationError
 from polar.integrations.stripe.service import StripeService
 from polar.kit.utils import utc_now
-from polar.locker import Locker
 from polar.models import Checkout, Discount, DiscountRedemption, Organization, Product
 from polar.models.discount import DiscountDuration, DiscountType
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import create_checkout, create_discount
 
@@ -43,6 +42,7 @@ class TestUpdate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         discount = await create_discount(
@@ -57,6 +57,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await discount_service.update(
                 session,
+                redis,
                 discount,
                 discount_update=DiscountUpdate(duration=DiscountDuration.once),
             )
@@ -65,6 +66,7 @@ class TestUpdate:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         discount = await create_discount(
@@ -79,6 +81,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await discount_service.update(
                 session,
+                redis,
                 discount,
                 discount_update=DiscountUpdate(type=DiscountType.fixed),
             )
@@ -96,6 +99,7 @@ class TestUpdate:
         value: int,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
         product: Product,
     ) -> None:
@@ -126,6 +130,7 @@ class TestUpdate:
         with pytest.raises(PolarRequestValidationError):
             await discount_service.update(
                 session,
+                redis,
                 discount,
                 discount_update=DiscountUpdate.model_validate({field: value}),
             )
@@ -135,6 +140,7 @@ class TestUpdate:
         stripe_service_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         stripe_service_mock.create_coupon.return_value = SimpleNamespace(
@@ -155,6 +161,7 @@ class TestUpdate:
         updated_ends_at = utc_now() + timedelta(days=2)
         updated_discount = await discount_service.update(
             session,
+            redis,
             discount,
             discount_update=DiscountUpdate(ends_at=updated_ends_at),
         )
@@ -170,6 +177,7 @@ class TestUpdate:
         stripe_service_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         discount = await create_discount(
@@ -183,6 +191,7 @@ class TestUpdate:
 
         updated_discount = await discount_service.update(
             session,
+            redis,
             discount,
             discount_update=DiscountUpdate(name="Updated Name"),
         )
@@ -199,6 +208,7 @@ class TestUpdate:
         stripe_service_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
         product: Product,
         product_one_time: Product,
@@ -215,6 +225,7 @@ class TestUpdate:
 
         updated_discount = await discount_service.update(
             session,
+            redis,
             discount,
             discount_update=DiscountUpdate(products=[product_one_time.id]),
         )
@@ -228,6 +239,7 @@ class TestUpdate:
         stripe_service_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
         product: Product,
     ) -> None:
@@ -243,6 +255,7 @@ class TestUpdate:
 
         updated_discount = await discount_service.update(
             session,
+            redis,
             discount,
             discount_update=DiscountUpdate(products=[]),
         )
@@ -259,6 +272,7 @@ class TestIsRedeemableDiscount:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         discount = await create_discount(
@@ -272,13 +286,14 @@ class TestIsRedeemableDiscount:
         )
 
         assert (
-            await discount_service.is_redeemable_discount(session, discount)
+            await discount_service.is_redeemable_discount(session, redis, discount)
         ) is False
 
     async def test_ended(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         discount = await create_discount(
@@ -292,13 +307,14 @@ class TestIsRedeemableDiscount:
         )
 
         assert (
-            await discount_service.is_redeemable_discount(session, discount)
+            await discount_service.is_redeemable_discount(session, redis, discount)
         ) is False
 
     async def test_max_redemptions_reached(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
         product: Product,
     ) -> None:
@@ -319,13 +335,14 @@ class TestIsRedeemableDiscount:
             )
 
         assert (
-            await discount_service.is_redeemable_discount(session, discount)
+            await discount_service.is_redeemable_discount(session, redis, discount)
         ) is False
 
     async def test_redeemable(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
         product: Product,
     ) -> None:
@@ -348,7 +365,7 @@ class TestIsRedeemableDiscount:
             )
 
         assert (
-            await discount_service.is_redeemable_discount(session, discount)
+            await discount_service.is_redeemable_discount(session, redis, discount)
         ) is True
 
 
@@ -359,7 +376,7 @@ class TestRedeemDiscount:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
-        locker: Locker,
+        redis: Redis,
         organization: Organization,
         product: Product,
     ) -> None:
@@ -373,36 +390,88 @@ class TestRedeemDiscount:
             max_redemptions=1,
         )
         first_checkout = await create_checkout(save_fixture, price=product.prices[0])
-        second_checkout = await create_checkout(save_fixture, price=product.prices[0])
-
-        async def _redemption_task(
-            session: AsyncSession,
-            locker: Locker,
-            discount: Discount,
-            checkout: Checkout,
-        ) -> DiscountRedemption:
-            async with discount_service.redeem_discount(
-                session, locker, discount
-            ) as redemption:
-                redemption.checkout = checkout
-                session.add(redemption)
-                await session.flush()
-                return redemption
-
-        first_redemption = asyncio.create_task(
-            _redemption_task(session, locker, discount, first_checkout)
-        )
-        second_redemption = asyncio.create_task(
-            _redemption_task(session, locker, discount, second_checkout)
+
+        async with discount_service.redeem_discount(
+            session, redis, discount
+        ) as redemption:
+            # Rejected right away, without waiting for the first redemption
+            with pytest.raises(DiscountNotRedeemableError):
+                async with discount_service.redeem_discount(session, redis, discount):
+                    pass
+            redemption.checkout = first_checkout
+
+        assert redemption.id is not None
+        assert (
+            await discount_service.is_redeemable_discount(session, redis, discount)
+        ) is False
+
+    async def test_failure(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        organization: Organization,
+    ) -> None:
+        discount = await create_discount(
+            save_fixture,
+            type=DiscountType.percentage,
+            basis_points=1000,
+            duration=DiscountDuration.repeating,
+            duration_in_months=1,
+            organization=organization,
+            max_redemptions=1,
         )
 
-        done, _ = await asyncio.wait(
-            [first_redemption, second_redemption], return_when=asyncio.ALL_COMPLETED
+        with pytest.raises(ValueError):
+            async with discount_service.redeem_discount(session, redis, discount):
+                assert (
+                    await discount_service.is_redeemable_discount(
+                        session, redis, discount
+                    )
+                ) is False
+                raise ValueError()
+
+        assert (
+            await discount_service.is_redeemable_discount(session, redis, discount)
+        ) is True
+
+    async def test_max_redemptions_update(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        stripe_service_mock: MagicMock,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        stripe_service_mock.create_coupon.return_value = SimpleNamespace(
+            id="NEW_STRIPE_COUPON_ID"
+        )
+        discount = await create_discount(
+            save_fixture,
+            type=DiscountType.percentage,
+            basis_points=1000,
+            duration=DiscountDuration.repeating,
+            duration_in_months=1,
+            organization=organization,
+            max_redemptions=1,
         )
+        checkout = await create_checkout(save_fixture, price=product.prices[0])
+        async with discount_service.redeem_discount(
+            session, redis, discount
+        ) as redemption:
+            redemption.checkout = checkout
+        assert (
+            await discount_service.is_redeemable_discount(session, redis, discount)
+        ) is False
+        await session.refresh(discount, ["redemptions_count"])
 
-        assert first_redemption in done
-        assert isinstance(first_redemption.result(), DiscountRedemption)
+        updated_discount = await discount_service.update(
+            session, redis, discount, DiscountUpdate(max_redemptions=2)
+        )
 
-        assert second_redemption in done
-        with pytest.raises(DiscountNotRedeemableError):
-            second_redemption.result()
+        assert (
+            await discount_service.is_redeemable_discount(
+                session, redis, updated_discount
+            )
+        ) is True
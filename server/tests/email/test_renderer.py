@@ -1,4 +1,8 @@
-from polar.email.renderer import EmailRenderer
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.config import Environment, settings
+from polar.email.renderer import EmailRenderer, get_email_renderer
 
 email_renderer = EmailRenderer()
 
@@ -14,3 +18,50 @@ def test_render_from_string() -> None:
     assert rendered_subject == "Hello, John!"
     assert rendered_body.startswith("<!DOCTYPE html")
     assert "<p>Hi, John! Welcome to Polar!</p>" in rendered_body
+
+
+def test_get_email_renderer_reuses_instance() -> None:
+    renderer = get_email_renderer({"magic_link": "polar.magic_link"})
+
+    assert get_email_renderer({"magic_link": "polar.magic_link"}) is renderer
+    assert get_email_renderer() is not renderer
+
+
+def test_render_from_string_reuses_compiled_templates(mocker: MockerFixture) -> None:
+    renderer = EmailRenderer()
+    from_string_spy = mocker.spy(renderer.env, "from_string")
+
+    for name in ("John", "Jane"):
+        rendered_subject, _ = renderer.render_from_string(
+            "Hello, {{ name }}!", "<p>Hi!</p>", context={"name": name}
+        )
+        assert rendered_subject == f"Hello, {name}!"
+
+    assert from_string_spy.call_count == 2
+
+
+def test_render_from_string_cache_eviction() -> None:
+    renderer = EmailRenderer(cache_size=2)
+
+    for i in range(3):
+        renderer.render_from_string(f"Subject {i}", "<p>Hi!</p>", context={})
+
+    assert len(renderer._string_templates) == 2
+
+
+def test_precompile() -> None:
+    renderer = EmailRenderer({"subscription": "polar.subscription"})
+
+    assert renderer.precompile() == 3
+
+
+@pytest.mark.parametrize(
+    "environment,auto_reload",
+    [(Environment.development, True), (Environment.production, False)],
+)
+def test_auto_reload(
+    environment: Environment, auto_reload: bool, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(settings, "ENV", environment)
+
+    assert EmailRenderer().env.auto_reload is auto_reload
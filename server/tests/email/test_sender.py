@@ -0,0 +1,85 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from polar.email.sender import (
+    Email,
+    EmailSenderError,
+    InMemoryEmailSender,
+    ResendEmailSender,
+)
+
+
+def _get_emails(count: int) -> list[Email]:
+    return [
+        Email(
+            to_email_addr=f"user{i}@example.com",
+            subject="Subject",
+            html_content="<p>Hello</p>",
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+class TestInMemoryEmailSender:
+    async def test_send_batch(self) -> None:
+        sender = InMemoryEmailSender()
+        emails = _get_emails(3)
+
+        await sender.send_batch(emails)
+
+        assert sorted(email.to_email_addr for email in sender.sent) == sorted(
+            email.to_email_addr for email in emails
+        )
+
+
+@pytest.mark.asyncio
+class TestResendEmailSender:
+    async def test_send(self, respx_mock: respx.MockRouter) -> None:
+        route = respx_mock.post("https://api.resend.com/emails").mock(
+            return_value=httpx.Response(200, json={"id": "EMAIL_ID"})
+        )
+        sender = ResendEmailSender()
+
+        await sender.send(_get_emails(1)[0])
+
+        payload = json.loads(route.calls.last.request.content)
+        assert payload["to"] == ["user0@example.com"]
+        assert payload["reply_to"] == "Polar Support <support@polar.sh>"
+
+    async def test_send_batch(self, respx_mock: respx.MockRouter) -> None:
+        def _respond(request: httpx.Request) -> httpx.Response:
+            payload = json.loads(request.content)
+            return httpx.Response(
+                200, json={"data": [{"id": str(i)} for i in range(len(payload))]}
+            )
+
+        route = respx_mock.post("https://api.resend.com/emails/batch").mock(
+            side_effect=_respond
+        )
+        sender = ResendEmailSender()
+
+        await sender.send_batch(_get_emails(100), idempotency_key="JOB_ID:0")
+
+        assert route.call_count == 1
+        request = route.calls.last.request
+        assert len(json.loads(request.content)) == 100
+        assert request.headers["Idempotency-Key"] == "JOB_ID:0"
+
+    @pytest.mark.parametrize(
+        "status_code,retryable", [(422, False), (429, True), (500, True)]
+    )
+    async def test_error(
+        self, status_code: int, retryable: bool, respx_mock: respx.MockRouter
+    ) -> None:
+        respx_mock.post("https://api.resend.com/emails").mock(
+            return_value=httpx.Response(status_code)
+        )
+        sender = ResendEmailSender()
+
+        with pytest.raises(EmailSenderError) as e:
+            await sender.send(_get_emails(1)[0])
+        assert e.value.retryable is retryable
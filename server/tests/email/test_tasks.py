@@ -0,0 +1,88 @@
+from collections.abc import Sequence
+
+import pytest
+from arq import Retry
+
+from polar.email.sender import Email, EmailSenderError, InMemoryEmailSender
+from polar.email.tasks import MAX_RETRIES, email_send
+from polar.worker import JobContext
+
+
+def _get_emails(count: int) -> list[Email]:
+    return [
+        Email(
+            to_email_addr=f"user{i}@example.com", subject="Subject", html_content="Body"
+        )
+        for i in range(count)
+    ]
+
+
+class FailingEmailSender(InMemoryEmailSender):
+    def __init__(self, failing: set[str], *, retryable: bool = True) -> None:
+        super().__init__()
+        self.failing = failing
+        self.retryable = retryable
+        self.idempotency_keys: list[str | None] = []
+
+    async def send_batch(
+        self, emails: Sequence[Email], *, idempotency_key: str | None = None
+    ) -> None:
+        self.idempotency_keys.append(idempotency_key)
+        if any(email.to_email_addr in self.failing for email in emails):
+            raise EmailSenderError("Error", retryable=self.retryable)
+        await super().send_batch(emails, idempotency_key=idempotency_key)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestEmailSend:
+    async def test_send(self, job_context: JobContext) -> None:
+        sender = InMemoryEmailSender()
+        job_context["email_sender"] = sender
+        emails = _get_emails(1)
+
+        await email_send(job_context, emails=[email.model_dump() for email in emails])
+
+        assert sender.sent == emails
+
+    async def test_retry_failed_batches(self, job_context: JobContext) -> None:
+        sender = FailingEmailSender({"user1@example.com"})
+        job_context["email_sender"] = sender
+        emails = _get_emails(3)
+        payload = [email.model_dump() for email in emails]
+
+        job_context["job_try"] = 1
+        with pytest.raises(Retry):
+            await email_send(job_context, emails=payload)
+        assert sender.sent == [emails[0], emails[2]]
+
+        # Only the failed batch is sent again, with the same idempotency key
+        sender.idempotency_keys = []
+        job_context["job_try"] = 2
+        with pytest.raises(Retry):
+            await email_send(job_context, emails=payload)
+        assert sender.idempotency_keys == ["fake_job_id:1"]
+
+        sender.failing = set()
+        job_context["job_try"] = 3
+        await email_send(job_context, emails=payload)
+        assert sender.sent == [emails[0], emails[2], emails[1]]
+
+    async def test_max_retries(self, job_context: JobContext) -> None:
+        job_context["email_sender"] = FailingEmailSender({"user0@example.com"})
+        emails = _get_emails(1)
+
+        job_context["job_try"] = MAX_RETRIES
+        with pytest.raises(EmailSenderError):
+            await email_send(
+                job_context, emails=[email.model_dump() for email in emails]
+            )
+
+    async def test_not_retryable(self, job_context: JobContext) -> None:
+        sender = FailingEmailSender({"user0@example.com"}, retryable=False)
+        job_context["email_sender"] = sender
+        emails = _get_emails(2)
+
+        await email_send(job_context, emails=[email.model_dump() for email in emails])
+
+        assert sender.sent == [emails[1]]
@@ -0,0 +1,83 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeAsyncRedis
+
+from polar.eventstream.dispatcher import EventStreamDispatcher, Subscription
+from polar.redis import Redis
+
+
+@pytest_asyncio.fixture
+async def pubsub_redis() -> AsyncIterator[Redis]:
+    yield FakeAsyncRedis(decode_responses=True)
+
+
+@pytest_asyncio.fixture
+async def dispatcher(pubsub_redis: Redis) -> AsyncIterator[EventStreamDispatcher]:
+    async with EventStreamDispatcher(pubsub_redis, buffer_size=3) as dispatcher:
+        yield dispatcher
+
+
+async def _get_message(subscription: Subscription) -> str:
+    return await asyncio.wait_for(anext(subscription), timeout=5.0)
+
+
+async def _get_channels(redis: Redis) -> set[str]:
+    # Unsubscribing happens in the background
+    await asyncio.sleep(0.1)
+    return set(await redis.pubsub_channels())
+
+
+@pytest.mark.asyncio
+class TestEventStreamDispatcher:
+    async def test_fan_out(
+        self, pubsub_redis: Redis, dispatcher: EventStreamDispatcher
+    ) -> None:
+        async with (
+            dispatcher.subscribe(["user:1", "org:1"]) as subscription_1,
+            dispatcher.subscribe(["user:2", "org:1"]) as subscription_2,
+        ):
+            assert await _get_channels(pubsub_redis) == {"user:1", "user:2", "org:1"}
+
+            await pubsub_redis.publish("org:1", "ORG")
+            assert await _get_message(subscription_1) == "ORG"
+            assert await _get_message(subscription_2) == "ORG"
+
+            await pubsub_redis.publish("user:2", "USER")
+            assert await _get_message(subscription_2) == "USER"
+            assert subscription_1._queue.empty()
+
+    async def test_reference_counting(
+        self, pubsub_redis: Redis, dispatcher: EventStreamDispatcher
+    ) -> None:
+        async with dispatcher.subscribe(["org:1"]) as subscription_1:
+            async with dispatcher.subscribe(["org:1", "user:1"]):
+                assert await _get_channels(pubsub_redis) == {"org:1", "user:1"}
+
+            assert await _get_channels(pubsub_redis) == {"org:1"}
+
+            await pubsub_redis.publish("org:1", "ORG")
+            assert await _get_message(subscription_1) == "ORG"
+
+        assert await _get_channels(pubsub_redis) == set()
+
+    async def test_drop_oldest(
+        self, pubsub_redis: Redis, dispatcher: EventStreamDispatcher
+    ) -> None:
+        async with dispatcher.subscribe(["user:1"]) as subscription:
+            for i in range(5):
+                await pubsub_redis.publish("user:1", str(i))
+            await asyncio.sleep(0.1)
+
+            assert await _get_message(subscription) == "2"
+            assert await _get_message(subscription) == "3"
+            assert await _get_message(subscription) == "4"
+
+    async def test_close(self, pubsub_redis: Redis) -> None:
+        dispatcher = EventStreamDispatcher(pubsub_redis)
+        await dispatcher.__aenter__()
+        async with dispatcher.subscribe(["user:1"]) as subscription:
+            await dispatcher.__aexit__(None, None, None)
+            assert [message async for message in subscription] == []
@@ -0,0 +1,66 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from pytest_mock import MockerFixture
+
+from polar.eventstream.service import publish_members, send_event
+from polar.kit.db.postgres import AsyncSession
+from polar.models import Organization, UserOrganization
+
+
+@pytest.fixture
+def enqueue_job_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.eventstream.service.enqueue_job")
+
+
+@pytest.mark.asyncio
+async def test_send_event() -> None:
+    redis = FakeAsyncRedis(decode_responses=True)
+    pubsub = redis.pubsub()
+    await pubsub.subscribe("user:1", "user:2")
+
+    await send_event(redis, '{"foo":"bar"}', ["user:1", "user:2", "user:3"])
+
+    messages = []
+    for _ in range(5):
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+        if message is not None:
+            messages.append((message["channel"], message["data"]))
+    assert messages == [("user:1", '{"foo":"bar"}'), ("user:2", '{"foo":"bar"}')]
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestPublishMembers:
+    async def test_single_job(
+        self,
+        session: AsyncSession,
+        enqueue_job_mock: MagicMock,
+        organization: Organization,
+        user_organization: UserOrganization,
+        user_organization_second: UserOrganization,
+    ) -> None:
+        await publish_members(session, "issue.updated", {"id": 1}, organization.id)
+
+        enqueue_job_mock.assert_called_once()
+        name, event, channels = enqueue_job_mock.call_args[0]
+        assert name == "eventstream.publish"
+        assert json.loads(event)["key"] == "issue.updated"
+        assert sorted(channels) == sorted(
+            [
+                f"user:{user_organization.user_id}",
+                f"user:{user_organization_second.user_id}",
+            ]
+        )
+
+    async def test_no_members(
+        self,
+        session: AsyncSession,
+        enqueue_job_mock: MagicMock,
+        organization: Organization,
+    ) -> None:
+        await publish_members(session, "issue.updated", {"id": 1}, organization.id)
+
+        enqueue_job_mock.assert_not_called()
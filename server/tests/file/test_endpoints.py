@@ -80,7 +80,7 @@ class TestEndpoints:
         # S3 object is not available until we fully complete it
         with pytest.raises(S3FileError):
             s3_service = S3_SERVICES[created.service]
-            s3_service.get_head_or_raise(created.path)
+            await s3_service.get_head_or_raise(created.path)
 
         record = await file_service.get(session, created.id, allow_deleted=True)
         assert record
@@ -139,7 +139,7 @@ class TestEndpoints:
         # S3 object is definitely not available
         with pytest.raises(S3FileError):
             s3_service = S3_SERVICES[created.service]
-            s3_service.get_head_or_raise(created.path)
+            await s3_service.get_head_or_raise(created.path)
 
         record = await file_service.get(session, created.id, allow_deleted=True)
         assert record
@@ -1,4 +1,5 @@
-from collections.abc import AsyncGenerator
+import contextlib
+from collections.abc import AsyncGenerator, AsyncIterator
 from typing import Any
 
 import pytest
@@ -9,7 +10,8 @@ from polar.app import app
 from polar.auth.dependencies import get_auth_subject
 from polar.auth.models import AuthSubject, Subject
 from polar.checkout.ip_geolocation import _get_client_dependency
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_session, get_db_sessionmaker
+from polar.product.catalog import ProductCatalog, get_product_catalog
 from polar.redis import Redis, get_redis
 
 
@@ -20,10 +22,17 @@ async def client(
     session: AsyncSession,
     redis: Redis,
 ) -> AsyncGenerator[AsyncClient, None]:
+    @contextlib.asynccontextmanager
+    async def sessionmaker() -> AsyncIterator[AsyncSession]:
+        yield session
+
     app.dependency_overrides[get_db_session] = lambda: session
+    app.dependency_overrides[get_db_sessionmaker] = lambda: sessionmaker
     app.dependency_overrides[get_redis] = lambda: redis
     app.dependency_overrides[get_auth_subject] = lambda: auth_subject
     app.dependency_overrides[_get_client_dependency] = lambda: None
+    product_catalog = ProductCatalog(redis)
+    app.dependency_overrides[get_product_catalog] = lambda: product_catalog
 
     request_hooks = []
 
@@ -52,4 +61,5 @@ async def client(
         yield client
 
     app.dependency_overrides.pop(get_db_session)
+    app.dependency_overrides.pop(get_db_sessionmaker)
     app.dependency_overrides.pop(get_auth_subject)
@@ -15,6 +15,7 @@ from sqlalchemy.sql import text
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
 from polar.config import settings
+from polar.issue.search import issue_search
 from polar.kit.db.postgres import AsyncSession, create_async_engine
 from polar.kit.utils import generate_uuid
 from polar.models import Model
@@ -61,6 +62,7 @@ async def initialize_test_database(worker_id: str) -> AsyncIterator[None]:
 
     async with engine.begin() as conn:
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS citext"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Model.metadata.create_all)
     await engine.dispose()
 
@@ -69,6 +71,12 @@ async def initialize_test_database(worker_id: str) -> AsyncIterator[None]:
     drop_database(sync_database_url)
 
 
+@pytest.fixture(autouse=True)
+def clear_issue_search_cache() -> None:
+    # Cached search results are only valid for the database of a single test
+    issue_search.clear()
+
+
 polar_directory = Path(__file__).parent.parent.parent / "polar"
 tests_directory = Path(__file__).parent.parent.parent / "tests"
 
@@ -10,13 +10,7 @@ from typing import TYPE_CHECKING, Any
 import structlog
 from watchfiles import awatch
 
-from polar.email.sender import (
-    DEFAULT_FROM_EMAIL_ADDRESS,
-    DEFAULT_FROM_NAME,
-    DEFAULT_REPLY_TO_EMAIL_ADDRESS,
-    DEFAULT_REPLY_TO_NAME,
-    EmailSender,
-)
+from polar.email.sender import Email, EmailSender
 
 if TYPE_CHECKING:
     from tempfile import _TemporaryFileWrapper as TemporaryFileWrapper
@@ -39,21 +33,10 @@ class WatcherEmailSender(EmailSender):
     ) -> None:
         self.temporary_file.close()
 
-    def send_to_user(
-        self,
-        *,
-        to_email_addr: str,
-        subject: str,
-        html_content: str,
-        from_name: str = DEFAULT_FROM_NAME,
-        from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
-        email_headers: dict[str, str] = {},
-        reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
-        reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
-    ) -> None:
+    async def send(self, email: Email, *, idempotency_key: str | None = None) -> None:
         self.temporary_file.seek(0)
         self.temporary_file.truncate(0)
-        self.temporary_file.write(html_content)
+        self.temporary_file.write(email.html_content)
 
     @property
     def path(self) -> str:
@@ -7,16 +7,18 @@ import pytest
 import pytest_asyncio
 from arq import ArqRedis
 
+from polar.email.sender import InMemoryEmailSender
 from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
 from polar.kit.utils import utc_now
 from polar.postgres import create_async_engine
 from polar.redis import Redis
-from polar.worker import JobContext, PolarWorkerContext
+from polar.worker import JobContext, PolarWorkerContext, create_webhook_http_client
 
 
 @pytest_asyncio.fixture
 async def job_context(session: AsyncSession, redis: Redis) -> AsyncIterator[JobContext]:
     engine = create_async_engine("worker")
+    webhook_http_client = create_webhook_http_client()
 
     @contextlib.asynccontextmanager
     async def sessionmaker() -> AsyncIterator[AsyncSession]:
@@ -27,6 +29,8 @@ async def job_context(session: AsyncSession, redis: Redis) -> AsyncIterator[JobC
         "raw_redis": redis,
         "async_engine": engine,
         "async_sessionmaker": cast(AsyncSessionMaker, sessionmaker),
+        "webhook_http_client": webhook_http_client,
+        "email_sender": InMemoryEmailSender(),
         "exit_stack": contextlib.AsyncExitStack(),
         "job_id": "fake_job_id",
         "job_try": 1,
@@ -37,6 +41,7 @@ async def job_context(session: AsyncSession, redis: Redis) -> AsyncIterator[JobC
     }
 
     await engine.dispose()
+    await webhook_http_client.aclose()
 
 
 @pytest.fixture
@@ -96,7 +96,7 @@ async def run_calculate_sort_columns(session: AsyncSession) -> None:
     res = await session.execute(stmt)
     ids = res.scalars().unique().all()
     for id in ids:
-        await pledge_service.set_issue_pledged_amount_sum(session, id)
+        await pledge_service.set_issue_pledges_summary(session, id)
 
 
 @pytest.mark.asyncio
@@ -558,6 +558,7 @@ class TestGetByIssueId:
         issue, pledges = issues_pledges[0]
 
         # then
+        await run_calculate_sort_columns(session)
         session.expunge_all()
 
         result = await funding_service.get_by_issue_id(
@@ -585,6 +586,7 @@ class TestGetByIssueId:
         issue, pledges = issues_pledges[0]
 
         # then
+        await run_calculate_sort_columns(session)
         session.expunge_all()
 
         result = await funding_service.get_by_issue_id(
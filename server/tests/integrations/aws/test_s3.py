@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+from freezegun import freeze_time
+
+from polar.integrations.aws.s3 import S3FileError, S3Service
+from polar.integrations.aws.s3.cache import PresignedURLCache
+from polar.kit.utils import utc_now
+
+
+@pytest.mark.asyncio
+class TestS3Service:
+    async def test_runs_in_executor(self) -> None:
+        threads: list[threading.Thread] = []
+
+        def head_object(**kwargs: Any) -> dict[str, Any]:
+            threads.append(threading.current_thread())
+            return {"ContentLength": 42}
+
+        client = MagicMock()
+        client.head_object.side_effect = head_object
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            service = S3Service("bucket", client=client, executor=executor)
+            head = await service.get_head_or_raise("path", s3_version_id="v1")
+
+        assert head == {"ContentLength": 42}
+        client.head_object.assert_called_once_with(
+            Bucket="bucket", Key="path", VersionId="v1"
+        )
+        assert threads[0] is not threading.current_thread()
+
+    async def test_client_error(self) -> None:
+        client = MagicMock()
+        client.get_object.side_effect = ClientError(
+            {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            service = S3Service("bucket", client=client, executor=executor)
+            with pytest.raises(S3FileError):
+                await service.get_object_or_raise("path")
+
+
+class TestPresignedURLCache:
+    def test_margin(self) -> None:
+        cache = PresignedURLCache(margin=60, max_size=10)
+        now = utc_now()
+        with freeze_time(now):
+            cache.set("key", "URL", now + timedelta(seconds=600))
+            assert cache.get("key") == ("URL", now + timedelta(seconds=600))
+
+        with freeze_time(now + timedelta(seconds=539)):
+            assert cache.get("key") is not None
+
+        with freeze_time(now + timedelta(seconds=540)):
+            assert cache.get("key") is None
+
+    def test_max_size(self) -> None:
+        cache = PresignedURLCache(margin=0, max_size=2)
+        expires_at = utc_now() + timedelta(seconds=600)
+        cache.set("a", "A", expires_at)
+        cache.set("b", "B", expires_at)
+        cache.get("a")
+        cache.set("c", "C", expires_at)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+
+class TestGeneratePresignedDownloadURL:
+    def test_cached(self) -> None:
+        client = MagicMock()
+        client.generate_presigned_url.side_effect = ["URL_1", "URL_2"]
+        service = S3Service("bucket", client=client)
+
+        url, expires_at = service.generate_presigned_download_url(
+            path="path", filename="file.txt", mime_type="text/plain", version="v1"
+        )
+        assert url == "URL_1"
+        assert service.generate_presigned_download_url(
+            path="path", filename="file.txt", mime_type="text/plain", version="v1"
+        ) == (url, expires_at)
+        client.generate_presigned_url.assert_called_once()
+
+        url, _ = service.generate_presigned_download_url(
+            path="path", filename="file.txt", mime_type="text/plain", version="v2"
+        )
+        assert url == "URL_2"
+
+
+def test_get_public_url() -> None:
+    service = S3Service("bucket")
+    url = service.get_public_url("path/file.png")
+    assert "bucket" in url
+    assert "path/file.png" in url
+    assert "Signature" not in url
+    assert service.get_public_url("path/file.png") == url
@@ -0,0 +1,198 @@
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from polar.issue.search import IssueSearch, SearchMode, plan_search
+from polar.models import ExternalOrganization, Issue, Repository
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_issue
+
+
+@pytest.mark.parametrize(
+    "text,mode,words",
+    [
+        ("fix cli", SearchMode.prefix, ("fix", "cli")),
+        ("documentation", SearchMode.fuzzy, ("documentation",)),
+        ('"memory leak"', SearchMode.phrase, ("memory", "leak")),
+        ("bug | (crash) OR leak:*", SearchMode.fuzzy, ("bug", "crash", "leak")),
+    ],
+)
+@pytest.mark.skip_db_asserts
+def test_plan_search(text: str, mode: SearchMode, words: tuple[str, ...]) -> None:
+    plan = plan_search(text)
+    assert plan is not None
+    assert plan.mode == mode
+    assert plan.words == words
+
+
+@pytest.mark.parametrize("text", ["", "   ", "&| !"])
+@pytest.mark.skip_db_asserts
+def test_plan_search_empty(text: str) -> None:
+    assert plan_search(text) is None
+
+
+async def _create_issue(
+    save_fixture: SaveFixture,
+    external_organization: ExternalOrganization,
+    repository: Repository,
+    **kwargs: Any,
+) -> Issue:
+    issue = await create_issue(save_fixture, external_organization, repository)
+    for key, value in kwargs.items():
+        setattr(issue, key, value)
+    await save_fixture(issue)
+    return issue
+
+
+@pytest_asyncio.fixture
+async def issues(
+    save_fixture: SaveFixture,
+    external_organization: ExternalOrganization,
+    repository: Repository,
+) -> list[Issue]:
+    return [
+        await _create_issue(
+            save_fixture,
+            external_organization,
+            repository,
+            title="Memory leak in the worker",
+        ),
+        await _create_issue(
+            save_fixture,
+            external_organization,
+            repository,
+            title="Worker crashes on startup",
+            body="There seems to be a memory leak somewhere.",
+        ),
+        await _create_issue(
+            save_fixture,
+            external_organization,
+            repository,
+            title="Improve the documentation",
+            labels=[{"name": "docs"}, {"name": "good first issue"}],
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+class TestSearch:
+    async def test_ranking(self, session: AsyncSession, issues: list[Issue]) -> None:
+        plan = plan_search("leak")
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        issue_ids = await IssueSearch().search(session, plan, select(Issue.id))
+
+        # Title matches rank before body matches
+        assert issue_ids == [issues[0].id, issues[1].id]
+
+    async def test_labels(self, session: AsyncSession, issues: list[Issue]) -> None:
+        plan = plan_search("docs")
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        assert await IssueSearch().search(session, plan, select(Issue.id)) == [
+            issues[2].id
+        ]
+
+    async def test_phrase(self, session: AsyncSession, issues: list[Issue]) -> None:
+        plan = plan_search('"leak memory"')
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        assert await IssueSearch().search(session, plan, select(Issue.id)) == []
+
+    async def test_fuzzy(self, session: AsyncSession, issues: list[Issue]) -> None:
+        plan = plan_search("documetation")
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        assert await IssueSearch().search(session, plan, select(Issue.id)) == [
+            issues[2].id
+        ]
+
+    async def test_repository_scope(
+        self,
+        session: AsyncSession,
+        issues: list[Issue],
+        public_repository: Repository,
+    ) -> None:
+        plan = plan_search("leak")
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        search = IssueSearch()
+        assert (
+            await search.search(
+                session,
+                plan,
+                select(Issue.id).where(Issue.repository_id == issues[0].repository_id),
+            )
+            != []
+        )
+        assert (
+            await search.search(
+                session,
+                plan,
+                select(Issue.id).where(Issue.repository_id == public_repository.id),
+            )
+            == []
+        )
+
+    async def test_max_results_filtered(
+        self, session: AsyncSession, issues: list[Issue]
+    ) -> None:
+        plan = plan_search("leak")
+        assert plan is not None
+
+        # then
+        session.expunge_all()
+
+        search = IssueSearch(max_results=1)
+        assert await search.search(session, plan, select(Issue.id)) == [issues[0].id]
+        # Filtered out issues don't take the place of the others
+        assert await search.search(
+            session, plan, select(Issue.id).where(Issue.id != issues[0].id)
+        ) == [issues[1].id]
+
+    async def test_cache(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        external_organization: ExternalOrganization,
+        repository: Repository,
+        issues: list[Issue],
+    ) -> None:
+        plan = plan_search("leak")
+        assert plan is not None
+        search = IssueSearch(ttl=60)
+
+        # then
+        session.expunge_all()
+
+        issue_ids = await search.search(session, plan, select(Issue.id))
+
+        await _create_issue(
+            save_fixture, external_organization, repository, title="Another leak"
+        )
+
+        assert await search.search(session, plan, select(Issue.id)) == issue_ids
+
+        search.clear()
+        assert (
+            len(await search.search(session, plan, select(Issue.id)))
+            == len(issue_ids) + 1
+        )
@@ -1,6 +1,9 @@
+import gzip
+from collections.abc import AsyncIterator
+
 import pytest
 
-from polar.kit.csv import get_emails_from_csv
+from polar.kit.csv import get_emails_from_csv, gzip_iterable
 
 
 @pytest.mark.asyncio
@@ -47,3 +50,16 @@ async def test_get_emails_from_csv() -> None:
             "baz,bazexample.com",
         ]
     ) == {"foo@example.com", "bar@example.com"}
+
+
+@pytest.mark.asyncio
+async def test_gzip_iterable() -> None:
+    rows = [f"{i},foo{i}@example.com\r\n" for i in range(1000)]
+
+    async def content() -> AsyncIterator[str]:
+        for row in rows:
+            yield row
+
+    compressed = b"".join([chunk async for chunk in gzip_iterable(content())])
+
+    assert gzip.decompress(compressed).decode("utf-8") == "".join(rows)
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import select, text
+
+from polar.kit.search import TrigramSearch
+from polar.models import Organization, Product
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_product
+
+
+async def _search(session: AsyncSession, query: str) -> list[str]:
+    search = TrigramSearch(query, [Product.name])
+    statement = (
+        select(Product.name)
+        .where(search.clause)
+        .order_by(search.rank.desc(), Product.name)
+    )
+    result = await session.execute(statement)
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+class TestTrigramSearch:
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("book", ["Ebook", "Ebook bundle"]),
+            ("EBOOK", ["Ebook", "Ebook bundle"]),
+            ("50%", ["50% off course"]),
+            ("%", ["50% off course"]),
+            ("_", []),
+            ("cours", ["50% off course"]),
+            # Typo tolerance
+            ("ebok", ["Ebook", "Ebook bundle"]),
+        ],
+    )
+    async def test_match(
+        self,
+        query: str,
+        expected: list[str],
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        for name in ("Ebook", "Ebook bundle", "50% off course", "Sponsorship"):
+            await create_product(save_fixture, organization=organization, name=name)
+        session.expunge_all()
+
+        assert sorted(await _search(session, query)) == expected
+
+    async def test_rank(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        for name in ("Pro plan yearly", "Pro"):
+            await create_product(save_fixture, organization=organization, name=name)
+        session.expunge_all()
+
+        assert await _search(session, "pro") == ["Pro", "Pro plan yearly"]
+
+    async def test_uses_index(self, session: AsyncSession) -> None:
+        session.expunge_all()
+
+        search = TrigramSearch("ebook", [Product.name])
+        statement = select(Product.id).where(search.clause)
+
+        connection = await session.connection()
+        await connection.execute(text("SET LOCAL enable_seqscan = off"))
+        compiled = statement.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+        result = await connection.exec_driver_sql(f"EXPLAIN {compiled}")
+        plan = "\n".join(result.scalars().all())
+
+        assert "ix_products_name_trgm" in plan
@@ -0,0 +1,185 @@
+import asyncio
+from typing import Any
+
+import pytest
+from sqlalchemy import delete, event, func, select
+
+from polar.config import settings
+from polar.exceptions import NotPermitted
+from polar.kit.db.postgres import create_async_engine, create_async_sessionmaker
+from polar.license_key.schemas import LicenseKeyActivate, LicenseKeyValidate
+from polar.license_key.service import license_key as license_key_service
+from polar.models import (
+    Benefit,
+    LicenseKey,
+    LicenseKeyActivation,
+    Organization,
+    User,
+)
+from polar.models.benefit import BenefitType
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture, get_database_url, save_fixture_factory
+from tests.fixtures.random_objects import (
+    create_benefit,
+    create_organization,
+    create_user,
+)
+
+
+async def _create_license_key(
+    save_fixture: SaveFixture,
+    *,
+    organization: Organization,
+    user: User,
+    benefit: Benefit,
+    **kwargs: Any,
+) -> LicenseKey:
+    license_key = LicenseKey(
+        organization_id=organization.id,
+        user_id=user.id,
+        benefit_id=benefit.id,
+        key=f"TESTING-{organization.id}",
+        **kwargs,
+    )
+    await save_fixture(license_key)
+    return license_key
+
+
+@pytest.mark.asyncio
+class TestValidate:
+    async def test_single_statement(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        user: User,
+    ) -> None:
+        benefit = await create_benefit(
+            save_fixture, organization=organization, type=BenefitType.license_keys
+        )
+        license_key = await _create_license_key(
+            save_fixture,
+            organization=organization,
+            user=user,
+            benefit=benefit,
+            limit_activations=1,
+        )
+        activation = LicenseKeyActivation(
+            license_key_id=license_key.id, label="Device", conditions={}, meta={}
+        )
+        await save_fixture(activation)
+
+        # then
+        session.expunge_all()
+
+        statements: list[str] = []
+        connection = await session.connection()
+
+        def _before_cursor_execute(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(
+            connection.sync_connection, "before_cursor_execute", _before_cursor_execute
+        )
+        try:
+            validated, validated_activation = await license_key_service.validate(
+                session,
+                redis,
+                validate=LicenseKeyValidate(
+                    key=license_key.key,
+                    organization_id=organization.id,
+                    activation_id=activation.id,
+                ),
+            )
+        finally:
+            event.remove(
+                connection.sync_connection,
+                "before_cursor_execute",
+                _before_cursor_execute,
+            )
+
+        assert len(statements) == 1
+        assert validated.validations == 1
+        assert validated.user.id == user.id
+        assert validated_activation is not None
+        assert validated_activation.id == activation.id
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestActivate:
+    async def test_concurrency(self, worker_id: str) -> None:
+        # Activations race in their own transactions, so the license key
+        # is committed with a dedicated engine, and deleted afterwards.
+        engine = create_async_engine(
+            dsn=get_database_url(worker_id),
+            application_name=f"test_{worker_id}",
+            pool_size=settings.DATABASE_POOL_SIZE,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        )
+        sessionmaker = create_async_sessionmaker(engine)
+
+        async with sessionmaker() as session:
+            save_fixture = save_fixture_factory(session)
+            organization = await create_organization(save_fixture)
+            user = await create_user(save_fixture)
+            benefit = await create_benefit(
+                save_fixture, organization=organization, type=BenefitType.license_keys
+            )
+            license_key = await _create_license_key(
+                save_fixture,
+                organization=organization,
+                user=user,
+                benefit=benefit,
+                limit_activations=2,
+            )
+            await session.commit()
+
+        async def _activate(index: int) -> bool:
+            async with sessionmaker() as session:
+                loaded = await license_key_service.get(session, license_key.id)
+                assert loaded is not None
+                try:
+                    await license_key_service.activate(
+                        session,
+                        loaded,
+                        LicenseKeyActivate(
+                            key=license_key.key,
+                            organization_id=organization.id,
+                            label=f"Device {index}",
+                        ),
+                    )
+                except NotPermitted:
+                    return False
+                await session.commit()
+                return True
+
+        try:
+            results = await asyncio.gather(*(_activate(i) for i in range(10)))
+
+            async with sessionmaker() as session:
+                activations_count = await session.scalar(
+                    select(func.count(LicenseKeyActivation.id)).where(
+                        LicenseKeyActivation.license_key_id == license_key.id
+                    )
+                )
+                activation_count = await session.scalar(
+                    select(LicenseKey.activation_count).where(
+                        LicenseKey.id == license_key.id
+                    )
+                )
+
+            assert results.count(True) == 2
+            assert activations_count == 2
+            assert activation_count == 2
+        finally:
+            async with sessionmaker() as session:
+                # License keys and benefits are deleted in cascade
+                await session.execute(
+                    delete(Organization).where(Organization.id == organization.id)
+                )
+                await session.execute(delete(User).where(User.id == user.id))
+                await session.commit()
+            await engine.dispose()
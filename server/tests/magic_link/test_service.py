@@ -1,7 +1,7 @@
 import os
 from collections.abc import Callable, Coroutine
 from datetime import UTC, datetime, timedelta
-from unittest.mock import ANY, MagicMock
+from unittest.mock import ANY
 from uuid import UUID
 
 import pytest
@@ -92,10 +92,7 @@ async def test_send(
     mocker: MockerFixture,
     session: AsyncSession,
 ) -> None:
-    email_sender_mock = MagicMock()
-    mocker.patch(
-        "polar.magic_link.service.get_email_sender", return_value=email_sender_mock
-    )
+    enqueue_email_mock = mocker.patch("polar.magic_link.service.enqueue_email")
 
     # then
     session.expunge_all()
@@ -104,15 +101,14 @@ async def test_send(
 
     await magic_link_service.send(magic_link, "TOKEN", "BASE_URL")
 
-    send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-    assert send_to_user_mock.called
+    assert enqueue_email_mock.called
 
-    send_to_user_mock.assert_called_once_with(
+    enqueue_email_mock.assert_called_once_with(
         to_email_addr="user@example.com", html_content=ANY, subject="Sign in to Polar"
     )
 
-    sent_subject = send_to_user_mock.call_args_list[0].kwargs["subject"]
-    sent_body = send_to_user_mock.call_args_list[0].kwargs["html_content"]
+    sent_subject = enqueue_email_mock.call_args_list[0].kwargs["subject"]
+    sent_body = enqueue_email_mock.call_args_list[0].kwargs["html_content"]
     sent_content = f"{sent_subject}\n<hr>\n{sent_body}"
 
     # Run with `POLAR_TEST_RECORD=1 pytest` to produce new golden files :-)
@@ -134,10 +130,7 @@ async def test_send_return_to(
     mocker: MockerFixture,
     session: AsyncSession,
 ) -> None:
-    email_sender_mock = MagicMock()
-    mocker.patch(
-        "polar.magic_link.service.get_email_sender", return_value=email_sender_mock
-    )
+    enqueue_email_mock = mocker.patch("polar.magic_link.service.enqueue_email")
 
     # then
     session.expunge_all()
@@ -151,15 +144,14 @@ async def test_send_return_to(
         extra_url_params={"return_to": "https://polar.sh/foobar"},
     )
 
-    send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-    assert send_to_user_mock.called
+    assert enqueue_email_mock.called
 
-    send_to_user_mock.assert_called_once_with(
+    enqueue_email_mock.assert_called_once_with(
         to_email_addr="user@example.com", html_content=ANY, subject="Sign in to Polar"
     )
 
-    sent_subject = send_to_user_mock.call_args_list[0].kwargs["subject"]
-    sent_body = send_to_user_mock.call_args_list[0].kwargs["html_content"]
+    sent_subject = enqueue_email_mock.call_args_list[0].kwargs["subject"]
+    sent_body = enqueue_email_mock.call_args_list[0].kwargs["html_content"]
     sent_content = f"{sent_subject}\n<hr>\n{sent_body}"
 
     # Run with `POLAR_TEST_RECORD=1 pytest` to produce new golden files :-)
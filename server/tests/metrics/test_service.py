@@ -120,6 +120,7 @@ ORDERS: dict[str, OrderFixture] = {
 
 
 async def _create_fixtures(
+    session: AsyncSession,
     save_fixture: SaveFixture,
     user: User,
     organization: Organization,
@@ -166,15 +167,20 @@ async def _create_fixtures(
         )
         orders[key] = order
 
+    await metrics_service.update_rollups(session, organization.id)
+
     return products, subscriptions, orders
 
 
 @pytest_asyncio.fixture
 async def fixtures(
-    save_fixture: SaveFixture, user: User, organization: Organization
+    session: AsyncSession,
+    save_fixture: SaveFixture,
+    user: User,
+    organization: Organization,
 ) -> tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]]:
     return await _create_fixtures(
-        save_fixture, user, organization, PRODUCTS, SUBSCRIPTIONS, ORDERS
+        session, save_fixture, user, organization, PRODUCTS, SUBSCRIPTIONS, ORDERS
     )
 
 
@@ -504,7 +510,7 @@ class TestGetMetrics:
             },
         }
         await _create_fixtures(
-            save_fixture, user, organization, PRODUCTS, subscriptions, {}
+            session, save_fixture, user, organization, PRODUCTS, subscriptions, {}
         )
 
         metrics = await metrics_service.get_metrics(
@@ -597,7 +603,7 @@ class TestGetMetrics:
             }
         }
         await _create_fixtures(
-            save_fixture, user, organization, PRODUCTS, subscriptions, {}
+            session, save_fixture, user, organization, PRODUCTS, subscriptions, {}
         )
 
         metrics = await metrics_service.get_metrics(
@@ -635,3 +641,100 @@ class TestGetMetrics:
         assert feb.renewed_subscriptions_revenue == 0
         assert feb.active_subscriptions == 0
         assert feb.monthly_recurring_revenue == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestUpdateRollups:
+    @pytest.mark.auth
+    async def test_incremental(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User],
+        user_organization: UserOrganization,
+        user: User,
+        organization: Organization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        products, subscriptions, _ = fixtures
+
+        created_at = datetime(2024, 2, 1, 12, 30, tzinfo=UTC)
+        await create_order(
+            save_fixture,
+            product=products["one_time_product"],
+            user=user,
+            amount=50_00,
+            created_at=created_at,
+            stripe_invoice_id=None,
+        )
+        subscription = subscriptions["subscription_1"]
+        subscription.ended_at = datetime(2024, 3, 1, tzinfo=UTC)
+        await save_fixture(subscription)
+
+        await metrics_service.update_rollups(
+            session, organization.id, [created_at, subscription.ended_at]
+        )
+
+        metrics = await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            interval=Interval.month,
+        )
+
+        feb = metrics.periods[1]
+        assert feb.orders == 2
+        assert feb.revenue == 150_00
+        assert feb.one_time_products == 1
+        assert feb.one_time_products_revenue == 50_00
+        assert feb.renewed_subscriptions == 1
+        assert feb.active_subscriptions == 2
+
+        mar = metrics.periods[2]
+        assert mar.active_subscriptions == 2
+
+        apr = metrics.periods[3]
+        assert apr.active_subscriptions == 1
+        assert apr.monthly_recurring_revenue == 83_33
+
+    @pytest.mark.auth
+    async def test_subscription_started_at_changed(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User],
+        user_organization: UserOrganization,
+        organization: Organization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        _, subscriptions, _ = fixtures
+
+        subscription = subscriptions["subscription_1"]
+        previous_started_at = subscription.started_at
+        assert previous_started_at is not None
+        subscription.started_at = datetime(2024, 2, 1, 12, tzinfo=UTC)
+        await save_fixture(subscription)
+
+        await metrics_service.update_rollups(
+            session, organization.id, [previous_started_at, subscription.started_at]
+        )
+
+        metrics = await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            interval=Interval.month,
+        )
+
+        # The February order, created in another hour, moved to the new start
+        feb = metrics.periods[1]
+        assert feb.orders == 1
+        assert feb.renewed_subscriptions == 0
+
+    async def test_no_timestamps(
+        self, session: AsyncSession, organization: Organization
+    ) -> None:
+        await metrics_service.update_rollups(session, organization.id, [])
@@ -0,0 +1,72 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.kit.extensions.sqlalchemy import sql
+from polar.models import Organization, UserOrganization
+from polar.models.notification import Notification
+from polar.notifications.notification import (
+    MaintainerCreateAccountNotificationPayload,
+    NotificationType,
+)
+from polar.notifications.service import PartialNotification, notifications
+from polar.postgres import AsyncSession
+
+
+def _get_notification() -> PartialNotification:
+    return PartialNotification(
+        type=NotificationType.maintainer_create_account,
+        payload=MaintainerCreateAccountNotificationPayload(
+            organization_name="Polar", url="https://polar.sh"
+        ),
+    )
+
+
+@pytest.mark.asyncio
+class TestSendToOrgMembers:
+    async def test_no_members(
+        self, mocker: MockerFixture, session: AsyncSession, organization: Organization
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.notifications.service.enqueue_job")
+
+        # then
+        session.expunge_all()
+
+        await notifications.send_to_org_members(
+            session, organization.id, _get_notification()
+        )
+
+        enqueue_job_mock.assert_not_called()
+
+    async def test_members(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        organization: Organization,
+        user_organization: UserOrganization,
+        user_organization_second: UserOrganization,
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.notifications.service.enqueue_job")
+
+        # then
+        session.expunge_all()
+
+        await notifications.send_to_org_members(
+            session, organization.id, _get_notification()
+        )
+
+        result = await session.execute(
+            sql.select(Notification).where(
+                Notification.type == NotificationType.maintainer_create_account
+            )
+        )
+        created = result.scalars().all()
+        assert {notification.user_id for notification in created} == {
+            user_organization.user_id,
+            user_organization_second.user_id,
+        }
+
+        enqueue_job_mock.assert_called_once()
+        assert enqueue_job_mock.call_args.args == ("notifications.send_batch",)
+        assert set(enqueue_job_mock.call_args.kwargs["notification_ids"]) == {
+            notification.id for notification in created
+        }
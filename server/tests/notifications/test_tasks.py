@@ -0,0 +1,61 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.models import User
+from polar.models.notification import Notification
+from polar.notifications.notification import (
+    MaintainerCreateAccountNotificationPayload,
+    NotificationType,
+)
+from polar.notifications.tasks.email import notifications_send_batch
+from polar.postgres import AsyncSession
+from polar.worker import JobContext, PolarWorkerContext
+from tests.fixtures.database import SaveFixture
+
+
+@pytest.mark.asyncio
+class TestNotificationsSendBatch:
+    async def test_render_once(
+        self,
+        mocker: MockerFixture,
+        job_context: JobContext,
+        polar_worker_context: PolarWorkerContext,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        user: User,
+        user_second: User,
+    ) -> None:
+        enqueue_emails_mock = mocker.patch(
+            "polar.notifications.tasks.email.enqueue_emails"
+        )
+        render_spy = mocker.spy(MaintainerCreateAccountNotificationPayload, "render")
+
+        payload = MaintainerCreateAccountNotificationPayload(
+            organization_name="Polar", url="https://polar.sh"
+        ).model_dump(mode="json")
+        notification_ids = []
+        for recipient in (user, user_second):
+            notification = Notification(
+                user_id=recipient.id,
+                type=NotificationType.maintainer_create_account,
+                payload=payload,
+            )
+            await save_fixture(notification)
+            notification_ids.append(notification.id)
+
+        # then
+        session.expunge_all()
+
+        await notifications_send_batch(
+            job_context, notification_ids, polar_worker_context
+        )
+
+        assert render_spy.call_count == 1
+        enqueue_emails_mock.assert_called_once()
+        emails = enqueue_emails_mock.call_args.args[0]
+        assert {email.to_email_addr for email in emails} == {
+            user.email,
+            user_second.email,
+        }
+        assert emails[0].html_content == emails[1].html_content
+        assert emails[0].subject.startswith("[Polar] ")
@@ -1,5 +1,4 @@
 from typing import cast
-from unittest.mock import MagicMock
 
 import pytest
 from pytest_mock import MockerFixture
@@ -27,10 +26,8 @@ class TestRevokeLeaked:
         session: AsyncSession,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_client.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_email_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_client.enqueue_email"
         )
 
         result = await oauth2_client_service.revoke_leaked(
@@ -38,8 +35,7 @@ class TestRevokeLeaked:
         )
         assert result is False
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_not_called()
+        enqueue_email_mock.assert_not_called()
 
     @pytest.mark.parametrize(
         "token_type",
@@ -55,10 +51,8 @@ class TestRevokeLeaked:
         oauth2_client: OAuth2Client,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_client.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_email_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_client.enqueue_email"
         )
 
         token = cast(
@@ -83,5 +77,4 @@ class TestRevokeLeaked:
         else:
             assert updated_oauth2_client.registration_access_token != token
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_called_once()
+        enqueue_email_mock.assert_called_once()
@@ -1,5 +1,3 @@
-from unittest.mock import MagicMock
-
 import pytest
 from pytest_mock import MockerFixture
 
@@ -31,10 +29,8 @@ class TestRevokeLeaked:
         session: AsyncSession,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_token.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_emails_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_token.enqueue_emails"
         )
 
         result = await oauth2_token_service.revoke_leaked(
@@ -42,8 +38,7 @@ class TestRevokeLeaked:
         )
         assert result is False
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_not_called()
+        enqueue_emails_mock.assert_not_called()
 
     @pytest.mark.parametrize(
         "token, token_type",
@@ -62,10 +57,8 @@ class TestRevokeLeaked:
         user: User,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_token.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_emails_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_token.enqueue_emails"
         )
 
         oauth2_token = await create_oauth2_token(
@@ -85,8 +78,7 @@ class TestRevokeLeaked:
         assert oauth2_token.access_token_revoked_at is not None
         assert oauth2_token.refresh_token_revoked_at is not None
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_called_once()
+        enqueue_emails_mock.assert_called_once()
 
     @pytest.mark.parametrize(
         "token, token_type",
@@ -106,10 +98,8 @@ class TestRevokeLeaked:
         user_organization: UserOrganization,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_token.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_emails_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_token.enqueue_emails"
         )
 
         oauth2_token = await create_oauth2_token(
@@ -129,8 +119,7 @@ class TestRevokeLeaked:
         assert oauth2_token.access_token_revoked_at is not None
         assert oauth2_token.refresh_token_revoked_at is not None
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_called_once()
+        enqueue_emails_mock.assert_called_once()
 
     async def test_already_revoked(
         self,
@@ -140,10 +129,8 @@ class TestRevokeLeaked:
         user: User,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.oauth2.service.oauth2_token.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_emails_mock = mocker.patch(
+            "polar.oauth2.service.oauth2_token.enqueue_emails"
         )
         await create_oauth2_token(
             save_fixture,
@@ -161,5 +148,4 @@ class TestRevokeLeaked:
         )
         assert result is True
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_not_called()
+        enqueue_emails_mock.assert_not_called()
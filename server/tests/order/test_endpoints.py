@@ -1,3 +1,4 @@
+import gzip
 import uuid
 
 import pytest
@@ -149,3 +150,57 @@ class TesGetOrdersStatistics:
 
         json = response.json()
         assert len(json["periods"]) == 12
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestExportOrders:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/orders/export")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth
+    async def test_user_not_organization_member(
+        self, client: AsyncClient, orders: list[Order]
+    ) -> None:
+        response = await client.get("/v1/orders/export")
+
+        assert response.status_code == 200
+        assert len(response.text.splitlines()) == 1
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.orders_read}),
+    )
+    async def test_organization(
+        self,
+        client: AsyncClient,
+        orders: list[Order],
+        product: Product,
+        user_second: User,
+    ) -> None:
+        response = await client.get("/v1/orders/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        lines = response.text.splitlines()
+        assert lines[0] == (
+            "Email,Created At,Product,Amount,Tax Amount,Currency,Billing Reason,Discount"
+        )
+        assert len(lines) == len(orders) + 1
+        assert lines[1].startswith(f"{user_second.email},")
+        assert f",{product.name}," in lines[1]
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.orders_read}),
+    )
+    async def test_compress(self, client: AsyncClient, orders: list[Order]) -> None:
+        response = await client.get("/v1/orders/export", params={"compress": True})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert "polar-orders.csv.gz" in response.headers["content-disposition"]
+
+        lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+        assert len(lines) == len(orders) + 1
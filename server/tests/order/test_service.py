@@ -1,19 +1,22 @@
 import time
-from datetime import datetime
+from datetime import UTC, datetime
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, call
 
 import pytest
 import stripe as stripe_lib
 from pytest_mock import MockerFixture
 
 from polar.auth.models import AuthSubject
+from polar.email.sender import Email
+from polar.exceptions import PolarRequestValidationError
 from polar.held_balance.service import held_balance as held_balance_service
 from polar.integrations.stripe.schemas import ProductType
 from polar.integrations.stripe.service import StripeService
 from polar.kit.address import Address
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.pagination import PaginationParams
+from polar.kit.sorting import Sorting
 from polar.models import (
     Account,
     Discount,
@@ -34,6 +37,7 @@ from polar.order.service import (
     ProductPriceDoesNotExist,
 )
 from polar.order.service import order as order_service
+from polar.order.sorting import OrderSortProperty
 from polar.transaction.service.balance import BalanceTransactionService
 from polar.transaction.service.payment import (
     payment_transaction as payment_transaction_service,
@@ -128,7 +132,7 @@ class TestList:
     ) -> None:
         await create_order(save_fixture, product=product, user=user_second)
 
-        orders, count = await order_service.list(
+        orders, count, _ = await order_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
@@ -159,7 +163,7 @@ class TestList:
             stripe_invoice_id="INVOICE_2",
         )
 
-        orders, count = await order_service.list(
+        orders, count, _ = await order_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
@@ -199,7 +203,7 @@ class TestList:
         )
 
         # No filter
-        orders, count = await order_service.list(
+        orders, count, _ = await order_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
         assert count == 2
@@ -208,7 +212,7 @@ class TestList:
         assert orders[1].id == order_organization.id
 
         # Filter by organization
-        orders, count = await order_service.list(
+        orders, count, _ = await order_service.list(
             session,
             auth_subject,
             pagination=PaginationParams(1, 10),
@@ -242,7 +246,7 @@ class TestList:
             stripe_invoice_id="INVOICE_2",
         )
 
-        orders, count = await order_service.list(
+        orders, count, _ = await order_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
@@ -250,6 +254,69 @@ class TestList:
         assert len(orders) == 1
         assert orders[0].id == order.id
 
+    @pytest.mark.parametrize(
+        "sorting",
+        [
+            [(OrderSortProperty.created_at, True)],
+            [(OrderSortProperty.amount, False)],
+            [(OrderSortProperty.amount, True), (OrderSortProperty.created_at, False)],
+            [(OrderSortProperty.discount, False)],
+            [(OrderSortProperty.discount, True)],
+        ],
+    )
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_cursor(
+        self,
+        sorting: list[Sorting[OrderSortProperty]],
+        auth_subject: AuthSubject[Organization],
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        product: Product,
+        user_second: User,
+    ) -> None:
+        for i, amount in enumerate([1000, 2000, 2000, 3000, 2000, 1000, 4000]):
+            await create_order(
+                save_fixture,
+                product=product,
+                user=user_second,
+                amount=amount,
+                stripe_invoice_id=f"INVOICE_{i}",
+                created_at=datetime(2024, 1, 1 + i % 3, tzinfo=UTC),
+            )
+
+        all_orders, count, next_cursor = await order_service.list(
+            session, auth_subject, pagination=PaginationParams(1, 10), sorting=sorting
+        )
+        assert count == 7
+        assert next_cursor is None
+
+        orders, count, next_cursor = await order_service.list(
+            session, auth_subject, pagination=PaginationParams(1, 3), sorting=sorting
+        )
+        paginated_orders = list(orders)
+        while next_cursor is not None:
+            assert count == 7
+            orders, count, next_cursor = await order_service.list(
+                session,
+                auth_subject,
+                pagination=PaginationParams(1, 3, next_cursor),
+                sorting=sorting,
+            )
+            paginated_orders += orders
+
+        assert [order.id for order in paginated_orders] == [
+            order.id for order in all_orders
+        ]
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_invalid_cursor(
+        self, auth_subject: AuthSubject[Organization], session: AsyncSession
+    ) -> None:
+        with pytest.raises(PolarRequestValidationError):
+            await order_service.list(
+                session, auth_subject, pagination=PaginationParams(1, 10, "INVALID")
+            )
+
 
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
@@ -343,10 +410,10 @@ class TestCreateOrderFromStripe:
         assert updated_payment_transaction is not None
         assert updated_payment_transaction.order_id == order.id
 
-        enqueue_job_mock.assert_called_once_with(
-            "order.discord_notification",
-            order_id=order.id,
-        )
+        assert enqueue_job_mock.call_args_list == [
+            call("order.discord_notification", order_id=order.id),
+            call("storefront.invalidate_cache", product.organization_id),
+        ]
 
     async def test_subscription_proration(
         self,
@@ -499,10 +566,10 @@ class TestCreateOrderFromStripe:
         assert updated_payment_transaction is not None
         assert updated_payment_transaction.order_id == order.id
 
-        enqueue_job_mock.assert_called_once_with(
-            "order.discord_notification",
-            order_id=order.id,
-        )
+        assert enqueue_job_mock.call_args_list == [
+            call("order.discord_notification", order_id=order.id),
+            call("storefront.invalidate_cache", product.organization_id),
+        ]
 
     async def test_subscription_applied_balance(
         self,
@@ -1138,11 +1205,12 @@ async def test_send_confirmation_email(
     organization: Organization,
 ) -> None:
     with WatcherEmailSender() as email_sender:
-        mocker.patch("polar.order.service.get_email_sender", return_value=email_sender)
+        enqueue_email_mock = mocker.patch("polar.order.service.enqueue_email")
 
         order = await create_order(save_fixture, product=product, user=user)
 
         async def _send_confirmation_email() -> None:
             await order_service.send_confirmation_email(session, organization, order)
+            await email_sender.send(Email(**enqueue_email_mock.call_args.kwargs))
 
         await watch_email(_send_confirmation_email, email_sender.path)
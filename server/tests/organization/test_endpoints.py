@@ -5,6 +5,7 @@ from httpx import AsyncClient
 
 from polar.models.organization import Organization
 from polar.models.repository import Repository
+from polar.models.user import User
 from polar.models.user_organization import UserOrganization
 from polar.postgres import AsyncSession
 from tests.fixtures.auth import AuthSubjectFixture
@@ -46,6 +47,31 @@ class TestListOrganizations:
         assert json["pagination"]["total_count"] == 1
         assert json["items"][0]["id"] == str(organization.id)
 
+    @pytest.mark.auth
+    async def test_query(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        organization: Organization,
+        organization_second: Organization,
+        user: User,
+    ) -> None:
+        organization.name = "Acme Corporation"
+        organization_second.name = "Globex"
+        for member_organization in (organization, organization_second):
+            await save_fixture(member_organization)
+            await save_fixture(
+                UserOrganization(user=user, organization=member_organization)
+            )
+
+        response = await client.get("/v1/organizations/", params={"query": "acme"})
+
+        assert response.status_code == 200
+
+        json = response.json()
+        assert json["pagination"]["total_count"] == 1
+        assert json["items"][0]["id"] == str(organization.id)
+
 
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
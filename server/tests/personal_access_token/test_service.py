@@ -1,5 +1,4 @@
-from datetime import timedelta
-from unittest.mock import MagicMock
+from datetime import UTC, datetime, timedelta
 
 import pytest
 from pytest_mock import MockerFixture
@@ -12,7 +11,12 @@ from polar.models import PersonalAccessToken, User
 from polar.personal_access_token.service import (
     personal_access_token as personal_access_token_service,
 )
-from polar.postgres import AsyncSession
+from polar.postgres import (
+    AsyncSession,
+    clear_after_commit_hooks,
+    run_after_commit_hooks,
+)
+from polar.redis import Redis
 from tests.fixtures.database import SaveFixture
 
 
@@ -24,10 +28,8 @@ class TestRevokeLeaked:
         session: AsyncSession,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.personal_access_token.service.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_email_mock = mocker.patch(
+            "polar.personal_access_token.service.enqueue_email"
         )
 
         result = await personal_access_token_service.revoke_leaked(
@@ -39,8 +41,7 @@ class TestRevokeLeaked:
         )
         assert result is False
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_not_called()
+        enqueue_email_mock.assert_not_called()
 
     async def test_true_positive(
         self,
@@ -49,10 +50,8 @@ class TestRevokeLeaked:
         user: User,
         mocker: MockerFixture,
     ) -> None:
-        email_sender_mock = MagicMock()
-        mocker.patch(
-            "polar.personal_access_token.service.get_email_sender",
-            return_value=email_sender_mock,
+        enqueue_email_mock = mocker.patch(
+            "polar.personal_access_token.service.enqueue_email"
         )
 
         token_hash = get_token_hash("polar_pat_123", secret=settings.SECRET)
@@ -80,5 +79,109 @@ class TestRevokeLeaked:
         assert updated_personal_access_token is not None
         assert updated_personal_access_token.deleted_at is not None
 
-        send_to_user_mock: MagicMock = email_sender_mock.send_to_user
-        send_to_user_mock.assert_called_once()
+        enqueue_email_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestUsage:
+    async def test_flush_empty(self, session: AsyncSession, redis: Redis) -> None:
+        assert await personal_access_token_service.flush_usage(session, redis) == 0
+
+    async def test_record_and_flush(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        personal_access_tokens: list[PersonalAccessToken] = []
+        for i in range(2):
+            personal_access_token = PersonalAccessToken(
+                comment=f"Test {i}",
+                token=get_token_hash(f"polar_pat_{i}", secret=settings.SECRET),
+                user_id=user.id,
+                scope="openid",
+                last_used_at=datetime(2024, 1, 1, tzinfo=UTC),
+            )
+            await save_fixture(personal_access_token)
+            personal_access_tokens.append(personal_access_token)
+        first, second = personal_access_tokens
+
+        for last_used_at in (
+            datetime(2024, 6, 2, tzinfo=UTC),
+            datetime(2024, 6, 3, tzinfo=UTC),
+            datetime(2024, 6, 1, tzinfo=UTC),
+        ):
+            await personal_access_token_service.record_usage(
+                redis, first.id, last_used_at
+            )
+        # Older than the value already stored in database
+        await personal_access_token_service.record_usage(
+            redis, second.id, datetime(2023, 1, 1, tzinfo=UTC)
+        )
+
+        assert await personal_access_token_service.flush_usage(session, redis) == 2
+        await run_after_commit_hooks(session)
+        assert await personal_access_token_service.flush_usage(session, redis) == 0
+
+        updated_first = await session.get(PersonalAccessToken, first.id)
+        assert updated_first is not None
+        assert updated_first.last_used_at == datetime(2024, 6, 3, tzinfo=UTC)
+
+        updated_second = await session.get(PersonalAccessToken, second.id)
+        assert updated_second is not None
+        assert updated_second.last_used_at == datetime(2024, 1, 1, tzinfo=UTC)
+
+    async def test_flush_not_committed(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        personal_access_token = PersonalAccessToken(
+            comment="Test",
+            token=get_token_hash("polar_pat_123", secret=settings.SECRET),
+            user_id=user.id,
+            scope="openid",
+        )
+        await save_fixture(personal_access_token)
+
+        await personal_access_token_service.record_usage(
+            redis, personal_access_token.id, datetime(2024, 6, 1, tzinfo=UTC)
+        )
+
+        # The transaction is rolled back
+        assert await personal_access_token_service.flush_usage(session, redis) == 1
+        clear_after_commit_hooks(session)
+
+        assert await personal_access_token_service.flush_usage(session, redis) == 1
+
+    async def test_usage_recorded_while_flushing(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        personal_access_token = PersonalAccessToken(
+            comment="Test",
+            token=get_token_hash("polar_pat_123", secret=settings.SECRET),
+            user_id=user.id,
+            scope="openid",
+        )
+        await save_fixture(personal_access_token)
+
+        await personal_access_token_service.record_usage(
+            redis, personal_access_token.id, datetime(2024, 6, 1, tzinfo=UTC)
+        )
+        assert await personal_access_token_service.flush_usage(session, redis) == 1
+
+        # Recorded before the commit: kept for the next flush
+        await personal_access_token_service.record_usage(
+            redis, personal_access_token.id, datetime(2024, 6, 2, tzinfo=UTC)
+        )
+        await run_after_commit_hooks(session)
+
+        assert await personal_access_token_service.flush_usage(session, redis) == 1
@@ -0,0 +1,26 @@
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+from polar.personal_access_token.service import USAGE_KEY
+from polar.personal_access_token.tasks import record_usage
+from polar.redis import Redis
+from polar.worker import JobContext, PolarWorkerContext
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+async def test_record_usage(job_context: JobContext, redis: Redis) -> None:
+    personal_access_token_id = uuid.uuid4()
+    last_used_at = datetime(2024, 6, 1, tzinfo=UTC)
+
+    await record_usage(
+        job_context,
+        personal_access_token_id=personal_access_token_id,
+        last_used_at=last_used_at,
+        polar_context=PolarWorkerContext(),
+    )
+
+    score = await redis.zscore(USAGE_KEY, str(personal_access_token_id))
+    assert score == last_used_at.timestamp()
@@ -38,8 +38,10 @@ from tests.fixtures.random_objects import (
     create_external_organization,
     create_issue,
     create_organization,
+    create_pledge,
     create_repository,
     create_user,
+    create_user_pledge,
 )
 
 
@@ -1299,3 +1301,63 @@ async def test_pledge_states(
 
             if tc.pay_on_completion:
                 assert create_invoice.call_count == 2 if tc.other_pledged_first else 1
+
+
+@pytest.mark.asyncio
+async def test_set_issue_pledges_summary(
+    session: AsyncSession,
+    save_fixture: SaveFixture,
+    external_organization: ExternalOrganization,
+    repository: Repository,
+    issue: Issue,
+    organization: Organization,
+    user: User,
+) -> None:
+    organization_pledges = [
+        await create_pledge(
+            save_fixture,
+            external_organization,
+            repository,
+            issue,
+            pledging_organization=organization,
+            type=pledge_type,
+        )
+        for pledge_type in (PledgeType.pay_upfront, PledgeType.pay_on_completion)
+    ]
+    user_pledge = await create_user_pledge(
+        save_fixture,
+        external_organization,
+        repository,
+        issue,
+        pledging_user=user,
+        type=PledgeType.pay_directly,
+    )
+    # Not active, not part of the summary
+    await create_user_pledge(
+        save_fixture,
+        external_organization,
+        repository,
+        issue,
+        pledging_user=user,
+        state=PledgeState.initiated,
+    )
+
+    # then
+    session.expunge_all()
+
+    await pledge_service.set_issue_pledges_summary(session, issue.id)
+
+    updated_issue = await session.get(Issue, issue.id)
+    assert updated_issue is not None
+    active_pledges = [*organization_pledges, user_pledge]
+    assert updated_issue.pledged_amount_sum == sum(p.amount for p in active_pledges)
+    assert updated_issue.last_pledged_at == max(p.created_at for p in active_pledges)
+    assert (
+        updated_issue.pay_upfront_pledged_amount_sum == organization_pledges[0].amount
+    )
+    assert (
+        updated_issue.pay_on_completion_pledged_amount_sum
+        == organization_pledges[1].amount
+    )
+    assert updated_issue.pay_directly_pledged_amount_sum == user_pledge.amount
+    assert updated_issue.pledgers_count == 2
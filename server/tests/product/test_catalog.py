@@ -0,0 +1,283 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from polar.models import Organization, Product
+from polar.models.custom_field import CustomFieldType
+from polar.models.product_price import ProductPriceType
+from polar.postgres import (
+    AsyncSession,
+    clear_after_commit_hooks,
+    run_after_commit_hooks,
+)
+from polar.product import catalog
+from polar.product.catalog import ProductCatalog
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import (
+    create_custom_field,
+    create_product,
+    create_product_price_fixed,
+)
+
+
+@pytest_asyncio.fixture
+async def product_catalog(redis: Redis) -> AsyncIterator[ProductCatalog]:
+    async with ProductCatalog(redis) as product_catalog:
+        yield product_catalog
+
+
+@pytest.mark.asyncio
+class TestGetPrice:
+    async def test_not_existing(
+        self, session: AsyncSession, product_catalog: ProductCatalog
+    ) -> None:
+        session.expunge_all()
+
+        assert await product_catalog.get_price(session, uuid.uuid4()) is None
+
+    async def test_loaded(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product_catalog: ProductCatalog,
+        organization: Organization,
+    ) -> None:
+        custom_field = await create_custom_field(
+            save_fixture,
+            type=CustomFieldType.text,
+            slug="text",
+            organization=organization,
+        )
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            prices=[(1000, ProductPriceType.one_time, None)],
+            attached_custom_fields=[(custom_field, True)],
+        )
+        session.expunge_all()
+
+        price = await product_catalog.get_price(session, product.prices[0].id)
+
+        assert price is not None
+        assert price.id == product.prices[0].id
+        assert price.product.id == product.id
+        assert price.product.organization.id == organization.id
+        assert len(price.product.prices) == 1
+        assert len(price.product.attached_custom_fields) == 1
+        assert price.product.attached_custom_fields[0].custom_field.id == (
+            custom_field.id
+        )
+        assert price.product.product_medias == []
+        assert price.product.benefits == []
+
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        price = await product_catalog.get_price(session, product.prices[0].id)
+        assert price is not None
+
+        # Each session gets its own copy of the cached objects
+        session.expunge_all()
+        price_again = await product_catalog.get_price(session, product.prices[0].id)
+        assert price_again is not None
+        assert price_again is not price
+        assert price_again.id == price.id
+        assert price_again.product.organization.id == product.organization_id
+
+    async def test_archived_price(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        archived_price = await create_product_price_fixed(
+            save_fixture, product=product, is_archived=True
+        )
+        session.expunge_all()
+
+        price = await product_catalog.get_price(session, archived_price.id)
+
+        assert price is not None
+        assert price.is_archived
+        assert archived_price.id not in {p.id for p in price.product.prices}
+
+
+@pytest.mark.asyncio
+class TestGetProduct:
+    async def test_deleted(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        product.set_deleted_at()
+        await save_fixture(product)
+        session.expunge_all()
+
+        assert await product_catalog.get_product(session, product.id) is None
+
+    async def test_valid(
+        self,
+        session: AsyncSession,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+
+        assert loaded_product is not None
+        assert loaded_product.id == product.id
+        assert loaded_product.organization.id == product.organization_id
+
+
+@pytest.mark.asyncio
+class TestListProducts:
+    async def test_archived(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product_catalog: ProductCatalog,
+        organization: Organization,
+    ) -> None:
+        product = await create_product(save_fixture, organization=organization)
+        await create_product(save_fixture, organization=organization, is_archived=True)
+        session.expunge_all()
+
+        organization_loaded = await session.get(Organization, organization.id)
+        assert organization_loaded is not None
+        products = await product_catalog.list_products(session, organization_loaded)
+
+        assert [p.id for p in products] == [product.id]
+
+
+@pytest.mark.asyncio
+class TestInvalidate:
+    async def test_evicted(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+        assert loaded_product is not None
+        assert loaded_product.name == product.name
+
+        # Changes to the copy of the session don't leak into the cache
+        loaded_product.name = "Updated Product"
+        await session.flush()
+        session.expunge_all()
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+        assert loaded_product is not None
+        assert loaded_product.name != "Updated Product"
+
+        # The catalog of this process is evicted without waiting for the listener
+        await catalog.invalidate(redis, product.organization_id)
+        assert product.organization_id not in product_catalog._catalogs
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+        assert loaded_product is not None
+        assert loaded_product.name == "Updated Product"
+
+    async def test_invalidated_while_loading(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        # The invalidation of a newer version is received before the catalog is loaded
+        product_catalog.evict(product.organization_id, 1)
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+        assert loaded_product is not None
+        assert product_catalog._catalogs == {}
+
+        await catalog.invalidate(redis, product.organization_id)
+        session.expunge_all()
+
+        loaded_product = await product_catalog.get_product(session, product.id)
+        assert loaded_product is not None
+        assert product.organization_id in product_catalog._catalogs
+
+    async def test_listener(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        await product_catalog.get_product(session, product.id)
+        assert product.organization_id in product_catalog._catalogs
+
+        # Invalidation made by another process
+        await redis.publish(
+            catalog.INVALIDATION_CHANNEL, f"{product.organization_id}:1"
+        )
+
+        for _ in range(20):
+            if product.organization_id not in product_catalog._catalogs:
+                break
+            await asyncio.sleep(0.1)
+        assert product.organization_id not in product_catalog._catalogs
+
+
+@pytest.mark.asyncio
+class TestInvalidateAfterCommit:
+    async def test_committed(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        await product_catalog.get_product(session, product.id)
+        catalog.invalidate_after_commit(session, product.organization_id)
+        assert product.organization_id in product_catalog._catalogs
+
+        await run_after_commit_hooks(session)
+
+        assert product.organization_id not in product_catalog._catalogs
+        version = await redis.get(catalog.get_version_key(product.organization_id))
+        assert version is not None
+        assert int(version) == 1
+
+    async def test_rolled_back(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product_catalog: ProductCatalog,
+        product: Product,
+    ) -> None:
+        session.expunge_all()
+
+        await product_catalog.get_product(session, product.id)
+        catalog.invalidate_after_commit(session, product.organization_id)
+
+        clear_after_commit_hooks(session)
+        await run_after_commit_hooks(session)
+
+        assert product.organization_id in product_catalog._catalogs
+        version = await redis.get(catalog.get_version_key(product.organization_id))
+        assert version is None
@@ -0,0 +1,121 @@
+import pytest
+from httpx import AsyncClient
+
+from polar.models import Organization, Product
+from polar.postgres import AsyncSession
+from polar.product import catalog
+from polar.redis import Redis
+from polar.storefront import cache
+from tests.fixtures.database import SaveFixture
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGet:
+    async def test_not_enabled(
+        self, client: AsyncClient, organization: Organization
+    ) -> None:
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+
+        assert response.status_code == 404
+
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        organization.profile_settings = {"enabled": True}
+        await save_fixture(organization)
+        session.expunge_all()
+
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == cache.CACHE_CONTROL
+        etag = response.headers["ETag"]
+        json = response.json()
+        assert json["organization"]["id"] == str(organization.id)
+        assert [p["id"] for p in json["products"]] == [str(product.id)]
+
+        # Served from the cache, even if the storefront is disabled meanwhile
+        session.expunge_all()
+        organization.profile_settings = {"enabled": False}
+        await save_fixture(organization)
+        session.expunge_all()
+
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] == etag
+        assert response.json() == json
+
+    async def test_not_modified(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        organization.profile_settings = {"enabled": True}
+        await save_fixture(organization)
+        session.expunge_all()
+
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+        etag = response.headers["ETag"]
+
+        response = await client.get(
+            f"/v1/storefronts/{organization.slug}", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+        response = await client.get(
+            f"/v1/storefronts/{organization.slug}",
+            headers={"If-None-Match": '"outdated"'},
+        )
+
+        assert response.status_code == 200
+
+    async def test_invalidated(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        redis: Redis,
+        client: AsyncClient,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        organization.profile_settings = {"enabled": True}
+        await save_fixture(organization)
+        session.expunge_all()
+
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+        etag = response.headers["ETag"]
+
+        session.expunge_all()
+        organization.profile_settings = {"enabled": True, "description": "Hello"}
+        await save_fixture(organization)
+        await cache.invalidate(redis, organization.id)
+        session.expunge_all()
+
+        response = await client.get(f"/v1/storefronts/{organization.slug}")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        etag = response.headers["ETag"]
+
+        # Product changes invalidate it as well
+        await catalog.invalidate(redis, organization.id)
+
+        response = await client.get(
+            f"/v1/storefronts/{organization.slug}", headers={"If-None-Match": etag}
+        )
+
+        # Rebuilt, but unchanged
+        assert response.status_code == 304
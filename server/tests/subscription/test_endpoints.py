@@ -1,3 +1,4 @@
+import gzip
 from datetime import datetime
 
 import pytest
@@ -45,3 +46,61 @@ class TestListSubscriptions:
             assert "user" in item
             assert "github_username" in item["user"]
             assert "email" in item["user"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestExportSubscriptions:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/subscriptions/export")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        user: User,
+        user_organization: UserOrganization,
+        product: Product,
+    ) -> None:
+        await create_active_subscription(
+            save_fixture, product=product, user=user, started_at=datetime(2023, 1, 1)
+        )
+
+        response = await client.get("/v1/subscriptions/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        lines = response.text.splitlines()
+        assert lines[0] == "Email,Created At,Active,Product,Price,Currency,Interval"
+        assert len(lines) == 2
+        assert lines[1].startswith(f"{user.email},")
+        assert f",true,{product.name}," in lines[1]
+
+    @pytest.mark.auth
+    async def test_compress(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        user: User,
+        user_organization: UserOrganization,
+        product: Product,
+    ) -> None:
+        await create_active_subscription(
+            save_fixture, product=product, user=user, started_at=datetime(2023, 1, 1)
+        )
+
+        response = await client.get(
+            "/v1/subscriptions/export", params={"compress": True}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert "polar-subscribers.csv.gz" in response.headers["content-disposition"]
+
+        lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+        assert len(lines) == 2
+        assert lines[1].startswith(f"{user.email},")
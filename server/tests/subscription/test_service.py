@@ -8,7 +8,9 @@ from pytest_mock import MockerFixture
 from polar.auth.models import AuthSubject
 from polar.authz.service import Authz
 from polar.checkout.eventstream import CheckoutEvent
+from polar.email.sender import Email
 from polar.kit.pagination import PaginationParams
+from polar.kit.sorting import Sorting
 from polar.models import (
     Benefit,
     Discount,
@@ -27,6 +29,7 @@ from polar.postgres import AsyncSession
 from polar.subscription.service import (
     AssociatedSubscriptionTierPriceDoesNotExist,
     SubscriptionDoesNotExist,
+    SubscriptionSortProperty,
 )
 from polar.subscription.service import subscription as subscription_service
 from polar.user.service.user import user as user_service
@@ -839,7 +842,7 @@ class TestList:
         # then
         session.expunge_all()
 
-        results, count = await subscription_service.list(
+        results, count, _ = await subscription_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
@@ -867,7 +870,7 @@ class TestList:
         # then
         session.expunge_all()
 
-        results, count = await subscription_service.list(
+        results, count, _ = await subscription_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
@@ -895,13 +898,64 @@ class TestList:
         # then
         session.expunge_all()
 
-        results, count = await subscription_service.list(
+        results, count, _ = await subscription_service.list(
             session, auth_subject, pagination=PaginationParams(1, 10)
         )
 
         assert len(results) == 1
         assert count == 1
 
+    @pytest.mark.parametrize(
+        "sorting",
+        [
+            [(SubscriptionSortProperty.started_at, True)],
+            [(SubscriptionSortProperty.amount, True)],
+            [(SubscriptionSortProperty.status, False)],
+        ],
+    )
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_cursor(
+        self,
+        sorting: list[Sorting[SubscriptionSortProperty]],
+        auth_subject: AuthSubject[Organization],
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        user_second: User,
+        product: Product,
+    ) -> None:
+        for i in range(5):
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                user=user_second,
+                started_at=datetime(2023, 1, 1 + i % 2),
+            )
+
+        # then
+        session.expunge_all()
+
+        all_results, _, _ = await subscription_service.list(
+            session, auth_subject, pagination=PaginationParams(1, 10), sorting=sorting
+        )
+
+        results, count, next_cursor = await subscription_service.list(
+            session, auth_subject, pagination=PaginationParams(1, 2), sorting=sorting
+        )
+        paginated_results = list(results)
+        while next_cursor is not None:
+            results, count, next_cursor = await subscription_service.list(
+                session,
+                auth_subject,
+                pagination=PaginationParams(1, 2, next_cursor),
+                sorting=sorting,
+            )
+            paginated_results += results
+
+        assert count == 5
+        assert [result.id for result in paginated_results] == [
+            result.id for result in all_results
+        ]
+
 
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
@@ -915,9 +969,7 @@ async def test_send_confirmation_email(
     organization: Organization,
 ) -> None:
     with WatcherEmailSender() as email_sender:
-        mocker.patch(
-            "polar.subscription.service.get_email_sender", return_value=email_sender
-        )
+        enqueue_email_mock = mocker.patch("polar.subscription.service.enqueue_email")
 
         subscription = await create_subscription(
             save_fixture, product=product, user=user
@@ -925,5 +977,6 @@ async def test_send_confirmation_email(
 
         async def _send_confirmation_email() -> None:
             await subscription_service.send_confirmation_email(session, subscription)
+            await email_sender.send(Email(**enqueue_email_mock.call_args.kwargs))
 
         await watch_email(_send_confirmation_email, email_sender.path)
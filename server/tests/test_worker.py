@@ -0,0 +1,100 @@
+import asyncio
+import contextvars
+from datetime import timedelta
+
+import pytest
+from arq import ArqRedis
+from arq.constants import default_queue_name, job_key_prefix, result_key_prefix
+from arq.jobs import Job, JobStatus
+
+from polar.redis import Redis
+from polar.worker import (
+    ENQUEUE_BATCH_SIZE,
+    QueueName,
+    _jobs_to_enqueue,
+    enqueue_job,
+    flush_enqueued_jobs,
+    initialize_enqueued_jobs,
+)
+
+
+@pytest.fixture
+def arq_pool(redis: Redis) -> ArqRedis:
+    return ArqRedis(redis.connection_pool)
+
+
+@pytest.mark.asyncio
+class TestFlushEnqueuedJobs:
+    async def test_empty(self, arq_pool: ArqRedis) -> None:
+        _jobs_to_enqueue.set([])
+        await flush_enqueued_jobs(arq_pool)
+
+        assert await arq_pool.zcard(default_queue_name) == 0
+
+    async def test_batches(self, arq_pool: ArqRedis) -> None:
+        _jobs_to_enqueue.set([])
+        count = ENQUEUE_BATCH_SIZE + 10
+        for i in range(count):
+            enqueue_job("test.job", i, _job_id=f"job-{i}", foo="bar")
+        enqueue_job("test.crawl", _job_id="crawl", queue_name=QueueName.github_crawl)
+
+        await flush_enqueued_jobs(arq_pool)
+
+        assert _jobs_to_enqueue.get() == []
+        assert await arq_pool.zcard(default_queue_name) == count
+        assert await arq_pool.zcard(QueueName.github_crawl.value) == 1
+
+        job_info = await Job("job-42", arq_pool).info()
+        assert job_info is not None
+        assert job_info.function == "test.job"
+        assert job_info.args == (42,)
+        assert job_info.kwargs["foo"] == "bar"
+        assert "_job_id" not in job_info.kwargs
+        assert "_queue_name" not in job_info.kwargs
+        assert job_info.job_try is None
+
+        crawl_job = Job("crawl", arq_pool, _queue_name=QueueName.github_crawl.value)
+        assert await crawl_job.status() == JobStatus.queued
+
+    async def test_existing_job_id(self, arq_pool: ArqRedis) -> None:
+        await arq_pool.set(job_key_prefix + "existing-job", b"")
+        await arq_pool.set(result_key_prefix + "existing-result", b"")
+
+        _jobs_to_enqueue.set([])
+        enqueue_job("test.job", _job_id="existing-job")
+        enqueue_job("test.job", _job_id="existing-result")
+        enqueue_job("test.job", 1, _job_id="duplicate")
+        enqueue_job("test.job", 2, _job_id="duplicate")
+
+        await flush_enqueued_jobs(arq_pool)
+
+        assert await arq_pool.zrange(default_queue_name, 0, -1) == [b"duplicate"]
+        job_info = await Job("duplicate", arq_pool).info()
+        assert job_info is not None
+        assert job_info.args == (1,)
+
+    async def test_deferred_job(self, arq_pool: ArqRedis) -> None:
+        _jobs_to_enqueue.set([])
+        enqueue_job("test.job", _job_id="deferred", _defer_by=timedelta(hours=1))
+        enqueue_job("test.job", _job_id="immediate")
+
+        await flush_enqueued_jobs(arq_pool)
+
+        deferred_score = await arq_pool.zscore(default_queue_name, "deferred")
+        immediate_score = await arq_pool.zscore(default_queue_name, "immediate")
+        assert deferred_score is not None
+        assert immediate_score is not None
+        assert deferred_score - immediate_score >= 3600 * 1000 - 1000
+
+    async def test_jobs_enqueued_in_threads(self, arq_pool: ArqRedis) -> None:
+        initialize_enqueued_jobs()
+
+        def _enqueue() -> None:
+            enqueue_job("test.job", _job_id="thread")
+
+        context = contextvars.copy_context()
+        await asyncio.get_running_loop().run_in_executor(None, context.run, _enqueue)
+
+        await flush_enqueued_jobs(arq_pool)
+
+        assert await arq_pool.zrange(default_queue_name, 0, -1) == [b"thread"]
@@ -27,7 +27,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session, user_second, pagination=PaginationParams(1, 10)
         )
 
@@ -45,7 +45,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session, user, pagination=PaginationParams(1, 10)
         )
 
@@ -77,7 +77,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session,
             user,
             type=TransactionType.payout,
@@ -106,7 +106,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session, user, account_id=account.id, pagination=PaginationParams(1, 10)
         )
 
@@ -129,7 +129,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session, user, payment_user_id=user.id, pagination=PaginationParams(1, 10)
         )
 
@@ -153,7 +153,7 @@ class TestSearch:
         # then
         session.expunge_all()
 
-        results, count = await transaction_service.search(
+        results, count, _ = await transaction_service.search(
             session,
             user,
             payment_organization_id=organization.id,
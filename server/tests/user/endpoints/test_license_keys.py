@@ -414,6 +414,50 @@ class TestUserLicenseKeyEndpoints:
         assert validation["key"] == lk.key
         assert validation["activation"]["id"] == activation_id
 
+    async def test_validate_revoked(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        client: AsyncClient,
+        save_fixture: SaveFixture,
+        user: User,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        benefit, granted = await TestLicenseKey.create_benefit_and_grant(
+            session,
+            redis,
+            save_fixture,
+            user=user,
+            organization=organization,
+            product=product,
+            properties=BenefitLicenseKeysCreateProperties(
+                prefix="testing",
+            ),
+        )
+        id = UUID(granted["license_key_id"])
+        lk = await license_key_service.get(session, id)
+        assert lk
+
+        response = await client.post(
+            "/v1/users/license-keys/validate",
+            json={"key": lk.key, "organization_id": str(organization.id)},
+        )
+        assert response.status_code == 200
+        assert await redis.exists(f"license_key:{organization.id}:{lk.key}")
+
+        await license_key_service.user_revoke(
+            session, redis, user=user, benefit=benefit, license_key_id=id
+        )
+        assert not await redis.exists(f"license_key:{organization.id}:{lk.key}")
+
+        response = await client.post(
+            "/v1/users/license-keys/validate",
+            json={"key": lk.key, "organization_id": str(organization.id)},
+        )
+        assert response.status_code == 404
+        assert response.json()["detail"] == "License key is no longer active."
+
     async def test_activation(
         self,
         session: AsyncSession,
@@ -620,3 +664,13 @@ class TestUserLicenseKeyEndpoints:
             },
         )
         assert response.status_code == 200
+
+        response = await client.post(
+            "/v1/users/license-keys/deactivate",
+            json={
+                "key": lk.key,
+                "organization_id": str(organization.id),
+                "activation_id": activation_id,
+            },
+        )
+        assert response.status_code == 404
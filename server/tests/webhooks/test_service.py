@@ -18,7 +18,7 @@ from polar.models import (
     WebhookEndpoint,
     WebhookEvent,
 )
-from polar.models.webhook_endpoint import WebhookFormat
+from polar.models.webhook_endpoint import WebhookEventType, WebhookFormat
 from polar.postgres import AsyncSession
 from polar.webhook.schemas import HttpsUrl, WebhookEndpointCreate, WebhookEndpointUpdate
 from polar.webhook.service import EventDoesNotExist, EventNotSuccessul
@@ -466,3 +466,79 @@ class TestOnEventSuccess:
             CheckoutEvent.webhook_event_delivered,
             {"status": checkout.status},
         )
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestSendPayload:
+    async def test_no_endpoints(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        enqueue_job_mock: MagicMock,
+        product: Product,
+        organization: Organization,
+    ) -> None:
+        checkout = await create_checkout(save_fixture, price=product.prices[0])
+        payload = WebhookCheckoutUpdatedPayload.model_validate(
+            {"type": "checkout.updated", "data": checkout}
+        )
+
+        events = await webhook_service.send_payload(session, organization, payload)
+
+        assert events == []
+        enqueue_job_mock.assert_not_called()
+
+    async def test_multiple_endpoints(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        enqueue_job_mock: MagicMock,
+        product: Product,
+        organization: Organization,
+    ) -> None:
+        endpoints: list[WebhookEndpoint] = []
+        for format in [
+            WebhookFormat.raw,
+            WebhookFormat.raw,
+            WebhookFormat.raw,
+            WebhookFormat.discord,
+        ]:
+            endpoint = WebhookEndpoint(
+                url=webhook_url,
+                format=format,
+                secret="SECRET",
+                events=[WebhookEventType.checkout_updated],
+                organization_id=organization.id,
+            )
+            await save_fixture(endpoint)
+            endpoints.append(endpoint)
+
+        checkout = await create_checkout(save_fixture, price=product.prices[0])
+        payload = WebhookCheckoutUpdatedPayload.model_validate(
+            {"type": "checkout.updated", "data": checkout}
+        )
+        get_payload_spy = mocker.spy(WebhookCheckoutUpdatedPayload, "get_payload")
+
+        events = await webhook_service.send_payload(session, organization, payload)
+
+        assert len(events) == len(endpoints)
+        assert {event.webhook_endpoint_id for event in events} == {
+            endpoint.id for endpoint in endpoints
+        }
+        assert get_payload_spy.call_count == 2
+
+        raw_payloads = {
+            event.payload
+            for event in events
+            if event.webhook_endpoint_id != endpoints[-1].id
+        }
+        assert raw_payloads == {payload.get_raw_payload()}
+
+        assert enqueue_job_mock.call_count == len(endpoints)
+        for event in events:
+            assert event.id is not None
+            enqueue_job_mock.assert_any_call(
+                "webhook_event.send", webhook_event_id=event.id
+            )
@@ -1,3 +1,4 @@
+import asyncio
 from typing import cast
 
 import httpx
@@ -5,11 +6,13 @@ import pytest
 import respx
 from arq import Retry
 from pytest_mock import MockerFixture
+from sqlalchemy import select
 from standardwebhooks.webhooks import Webhook as StandardWebhook
 
 from polar.kit.db.postgres import AsyncSession
 from polar.models.organization import Organization
 from polar.models.subscription import Subscription
+from polar.models.webhook_delivery import WebhookDelivery
 from polar.models.webhook_endpoint import (
     WebhookEndpoint,
     WebhookEventType,
@@ -20,6 +23,8 @@ from polar.subscription.service import subscription as subscription_service
 from polar.webhook.service import webhook as webhook_service
 from polar.webhook.tasks import (
     MAX_RETRIES,
+    DeliveryTimer,
+    HostLimiter,
     _webhook_event_send,
     allowed_url,
     webhook_event_send,
@@ -145,6 +150,68 @@ async def test_webhook_delivery(
         polar_context=PolarWorkerContext(),
     )
 
+    delivery = (
+        await session.execute(
+            select(WebhookDelivery).where(WebhookDelivery.webhook_event_id == event.id)
+        )
+    ).scalar_one()
+    assert delivery.succeeded is True
+    assert delivery.response_duration is not None
+
+
+@pytest.mark.asyncio
+async def test_host_limiter() -> None:
+    limiter = HostLimiter(1)
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    async def _deliver() -> None:
+        async with limiter.acquire("example.com"):
+            entered.set()
+            await release.wait()
+
+    first = asyncio.create_task(_deliver())
+    await entered.wait()
+    entered.clear()
+    second = asyncio.create_task(_deliver())
+    await asyncio.sleep(0)
+
+    # The second delivery waits for the first one
+    assert not entered.is_set()
+    assert len(limiter) == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+
+    # Idle hosts are dropped
+    assert len(limiter) == 0
+
+
+@pytest.mark.asyncio
+async def test_delivery_timer() -> None:
+    timer = DeliveryTimer()
+    assert timer.get_durations()[0] is None
+
+    await timer.trace("connection.connect_tcp.started", {})
+    await timer.trace("http11.send_request_headers.started", {})
+    connect_duration, response_duration = timer.get_durations()
+    assert connect_duration is not None
+    assert connect_duration >= 0
+    assert response_duration >= 0
+
+
+@pytest.mark.asyncio
+async def test_delivery_timer_start() -> None:
+    timer = DeliveryTimer()
+    # Waiting before the delivery starts isn't part of the connect phase
+    await asyncio.sleep(0.1)
+    timer.start()
+
+    await timer.trace("http11.send_request_headers.started", {})
+    connect_duration, _ = timer.get_durations()
+    assert connect_duration is not None
+    assert connect_duration < 100
+
 
 @pytest.mark.asyncio
 @pytest.mark.http_auto_expunge